@@ -13,6 +13,8 @@ class ChatRequest(BaseModel):
     contentType: str = "caption"
     platform: str = "instagram"
     sessionId: str | None = None
+    variants: int = 1
+    variantMode: str = "best"  # 'best' or 'ranked'
 
 
 class CreateSessionRequest(BaseModel):
@@ -6,25 +6,33 @@ Research is performed via Perplexity API before generation.
 Files are sent to Claude as multimodal content blocks (vision, documents).
 """
 
+import asyncio
 import base64
 import os
 import sys
+import time
 from datetime import datetime
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from fastapi.responses import StreamingResponse
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
 import anthropic
 from backend.services.rag_service import RAGService
+from backend.services.prefetch_service import get_prefetched, should_prefetch, warm_prefetch
 from backend.services.research_service import research_topic
+from backend.services.variant_service import MAX_VARIANTS, generate_ranked_variants
 from backend.prompts.system_prompt import build_system_prompt
 from tools.utils.supabase_client import get_supabase_client
-from tools.generate_embeddings import generate_embedding
+from tools.embedding_worker import PRIORITY_FEEDBACK, enqueue_embeddings
+from tools.platforms import PLATFORM_MAP
+from tools.utils.model_router import create_message, record_model_usage, route_model
 
 router = APIRouter()
 
+VARIANT_MODES = ("best", "ranked")
+
 # Maps file MIME types to Claude content block types
 IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 PDF_TYPES = {"application/pdf"}
@@ -117,6 +125,61 @@ def _is_feedback_message(text: str) -> tuple[bool, str]:
     return False, ""
 
 
+FEEDBACK_CLASSIFICATION_PROMPT = """A user is chatting with a copywriter. Here is the copywriter's last output and the user's reply.
+
+Output:
+{assistant_message}
+
+Reply:
+{reply}
+
+Is the reply a reaction to the output? Answer with exactly one word: positive, negative, or none."""
+
+
+def _classify_feedback(reply: str, assistant_message: str, keyword_rating: str) -> str:
+    """Confirm a keyword feedback hit with the fast model. Returns rating or ""."""
+    try:
+        response = create_message(
+            "feedback_classification",
+            messages=[{
+                "role": "user",
+                "content": FEEDBACK_CLASSIFICATION_PROMPT.format(
+                    assistant_message=assistant_message[:1500],
+                    reply=reply[:500],
+                ),
+            }],
+        )
+        label = response.content[0].text.strip().lower()
+    except Exception as e:
+        print(f"Feedback classification failed, using keyword match: {e}")
+        return keyword_rating
+
+    if label.startswith("positive"):
+        return "positive"
+    if label.startswith("negative"):
+        return "negative"
+    return ""
+
+
+SESSION_TITLE_PROMPT = """Write a short title (at most 6 words) for a chat that starts with this request. Return only the title, no quotes.
+
+{message}"""
+
+
+def _generate_session_title(message: str) -> str | None:
+    """Title a new session with the fast model (best-effort)."""
+    try:
+        response = create_message(
+            "session_title",
+            messages=[{"role": "user", "content": SESSION_TITLE_PROMPT.format(message=message[:1000])}],
+        )
+        title = response.content[0].text.strip().strip('"')
+        return title[:80] or None
+    except Exception as e:
+        print(f"Session title generation failed: {e}")
+        return None
+
+
 def _save_conversational_feedback(messages: list[dict], content_type: str, platform: str):
     """Detect and save conversational feedback from chat history."""
     if len(messages) < 2:
@@ -138,33 +201,86 @@ def _save_conversational_feedback(messages: list[dict], content_type: str, platf
     if not assistant_msg:
         return
 
+    # Keywords are a cheap pre-filter; the fast model weeds out false hits like "more captions"
     is_feedback, rating = _is_feedback_message(latest["content"])
     if not is_feedback:
         return
-
-    try:
-        embedding = generate_embedding(assistant_msg[:2000])
-    except Exception:
-        embedding = None
+    rating = _classify_feedback(latest["content"], assistant_msg, rating)
+    if not rating:
+        return
 
     try:
         supabase = get_supabase_client()
-        supabase.table("content_feedback").insert({
+        response = supabase.table("content_feedback").insert({
             "content_type": content_type,
             "platform": platform,
             "user_message": user_msg_before or "",
             "assistant_message": assistant_msg[:5000],
             "rating": rating,
             "feedback_note": latest["content"],
-            "embedding": embedding,
         }).execute()
         print(f"Saved conversational feedback: {rating} - {latest['content'][:50]}")
     except Exception as e:
         print(f"Failed to save conversational feedback: {e}")
+        return
+
+    # The embedding worker fills in the embedding (the sweep catches a failed enqueue)
+    try:
+        enqueue_embeddings("content_feedback", [response.data[0]["id"]], PRIORITY_FEEDBACK)
+    except Exception as e:
+        print(f"Failed to queue feedback embedding, the sweep will pick it up: {e}")
+
+
+def _parse_variant_count(value) -> int:
+    """Validate the variants field (absent means 1). Raises a 422 on anything but 1..MAX_VARIANTS."""
+    if value is None:
+        return 1
+    try:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        count = int(value)
+    except (TypeError, ValueError):
+        count = 0
+    if not 1 <= count <= MAX_VARIANTS:
+        raise HTTPException(status_code=422, detail=f"variants must be an integer from 1 to {MAX_VARIANTS}")
+    return count
+
+
+def _save_chat_messages(session_id: str, user_message: str, assistant_message: str, model: str,
+                        tokens_used: int | None, rag_context_used: bool):
+    """Store one exchange in chat_messages (best-effort)."""
+    try:
+        supabase = get_supabase_client()
+        supabase.table("chat_messages").insert({
+            "session_id": session_id,
+            "role": "user",
+            "content": user_message,
+        }).execute()
+        supabase.table("chat_messages").insert({
+            "session_id": session_id,
+            "role": "assistant",
+            "content": assistant_message,
+            "model_used": model,
+            "tokens_used": tokens_used,
+            "rag_context_used": rag_context_used,
+        }).execute()
+    except Exception as e:
+        print(f"Error saving chat messages: {e}")
+
+
+def _update_session_title(session_id: str, user_message: str):
+    """Replace an auto-created session's placeholder title with a generated one."""
+    title = _generate_session_title(user_message)
+    if not title:
+        return
+    try:
+        get_supabase_client().table("chat_sessions").update({"title": title}).eq("id", session_id).execute()
+    except Exception as e:
+        print(f"Error updating session title: {e}")
 
 
 @router.post("/stream")
-async def chat_stream(request: Request):
+async def chat_stream(request: Request, background_tasks: BackgroundTasks):
     """
     Stream chat completions with optional file attachments.
 
@@ -176,6 +292,8 @@ async def chat_stream(request: Request):
         platform: "instagram" | "tiktok" | "youtube"
         files: [{ name, type, data (base64) }] (optional)
         sessionId: optional UUID
+        variants: number of options to generate concurrently (optional, 1-5)
+        variantMode: "best" (stream the top-ranked option) | "ranked" (all, best first)
     """
     body = await request.json()
     messages = body.get("messages", [])
@@ -183,6 +301,10 @@ async def chat_stream(request: Request):
     platform = body.get("platform", "instagram")
     files = body.get("files", [])
     session_id = body.get("sessionId")
+    variant_count = _parse_variant_count(body.get("variants"))
+    variant_mode = body.get("variantMode", "best")
+    if variant_mode not in VARIANT_MODES:
+        raise HTTPException(status_code=422, detail=f"variantMode must be one of: {', '.join(VARIANT_MODES)}")
 
     if not messages:
         return StreamingResponse(
@@ -192,44 +314,60 @@ async def chat_stream(request: Request):
 
     latest_user_message = messages[-1]["content"]
 
+    # Detect conversational feedback and save it for future RAG. Runs on the
+    # threadpool once the response is done, so classifying it never delays
+    # the first token, and also when the stream fails
+    background_tasks.add_task(_save_conversational_feedback, messages, content_type, platform)
+
     # Auto-create session if none provided
+    session_created = False
     if not session_id:
         try:
             supabase = get_supabase_client()
             title = latest_user_message[:80] + ("..." if len(latest_user_message) > 80 else "")
-            platform_map = {"instagram": 1, "tiktok": 2, "youtube": 3}
             content_type_map = {"caption": 1, "carousel": 2, "edm": 3, "reel_script": 4}
             result = supabase.table("chat_sessions").insert({
                 "title": title,
                 "content_type_id": content_type_map.get(content_type),
-                "platform_id": platform_map.get(platform),
+                "platform_id": PLATFORM_MAP.get(platform),
             }).execute()
             session_id = result.data[0]["id"]
+            session_created = True
         except Exception as e:
             print(f"Auto-create session failed: {e}")
 
-    # Detect conversational feedback and save for future RAG
-    _save_conversational_feedback(messages, content_type, platform)
+    # Steps 1-2 run concurrently: Perplexity research (blocking client, so on
+    # a thread) and RAG context (viral examples + brand voice + feedback),
+    # which may already be warm from the composer's /prefetch call
+    async def rag_context_for_message():
+        prefetched = await asyncio.to_thread(
+            get_prefetched, latest_user_message, content_type, platform
+        )
+        if prefetched:
+            print("Using prefetched RAG context")
+            return prefetched["rag_context"]
+        return await RAGService().aget_rag_context(
+            user_query=latest_user_message,
+            content_type=content_type,
+            platform=platform,
+        )
 
-    # Step 1: Research the topic via Perplexity (runs before streaming)
-    research = research_topic(
-        user_message=latest_user_message,
-        content_type=content_type,
-        platform=platform,
+    research, rag_context = await asyncio.gather(
+        asyncio.to_thread(
+            research_topic,
+            user_message=latest_user_message,
+            content_type=content_type,
+            platform=platform,
+        ),
+        rag_context_for_message(),
     )
     if research["success"]:
         print(f"Research complete: {len(research['findings'])} chars, {len(research['citations'])} citations")
 
-    # Step 2: Build RAG context (viral examples + brand voice + feedback)
-    rag_service = RAGService()
-    rag_context = rag_service.get_rag_context(
-        user_query=latest_user_message,
-        content_type=content_type,
-        platform=platform,
-    )
-
     # Step 3: Build system prompt with all context
-    system_prompt = build_system_prompt(rag_context, content_type, platform, research)
+    system_prompt = build_system_prompt(
+        rag_context, content_type, platform, research, user_query=latest_user_message
+    )
 
     # Step 4: Prepare messages for Claude
     claude_messages = []
@@ -255,41 +393,70 @@ async def chat_stream(request: Request):
             return
 
         client = anthropic.AsyncAnthropic(api_key=api_key)
+        route = route_model("chat", content_type, platform)
         full_response = []
+        usage = None
 
-        try:
-            async with client.messages.stream(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4096,
-                system=system_prompt,
-                messages=claude_messages,
-            ) as stream:
-                async for text in stream.text_stream:
-                    full_response.append(text)
-                    yield text
-        except Exception as e:
-            print(f"Streaming error: {type(e).__name__}: {e}")
-            yield f"\n\n[Error: {type(e).__name__}: {str(e)}]"
-            return
-
-        # Save messages to database (best-effort)
-        if session_id:
+        if variant_count > 1:
+            # Several options from the one prompt build, ranked against feedback
             try:
-                supabase = get_supabase_client()
-                supabase.table("chat_messages").insert({
-                    "session_id": session_id,
-                    "role": "user",
-                    "content": latest_user_message,
-                }).execute()
-                supabase.table("chat_messages").insert({
-                    "session_id": session_id,
-                    "role": "assistant",
-                    "content": "".join(full_response),
-                    "model_used": "claude-sonnet-4-20250514",
-                    "rag_context_used": bool(rag_context.get("viral_examples")),
-                }).execute()
+                text = await generate_ranked_variants(
+                    client,
+                    route,
+                    system_prompt,
+                    claude_messages,
+                    variant_count,
+                    content_type,
+                    mode=variant_mode,
+                    session_id=session_id,
+                )
             except Exception as e:
-                print(f"Error saving chat messages: {e}")
+                print(f"Variant error: {type(e).__name__}: {e}")
+                yield f"\n\n[Error: {type(e).__name__}: {str(e)}]"
+                return
+            full_response.append(text)
+            yield text
+        else:
+            first_token_ms = None
+            started = time.monotonic()
+            try:
+                async with client.messages.stream(
+                    model=route["model"],
+                    max_tokens=route["max_tokens"],
+                    system=system_prompt,
+                    messages=claude_messages,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        if first_token_ms is None:
+                            first_token_ms = int((time.monotonic() - started) * 1000)
+                        full_response.append(text)
+                        yield text
+                    final_message = await stream.get_final_message()
+            except Exception as e:
+                print(f"Streaming error: {type(e).__name__}: {e}")
+                yield f"\n\n[Error: {type(e).__name__}: {str(e)}]"
+                return
+
+            latency_ms = int((time.monotonic() - started) * 1000)
+            usage = final_message.usage
+            await asyncio.to_thread(
+                record_model_usage,
+                route, latency_ms, usage=usage, first_token_ms=first_token_ms, session_id=session_id,
+            )
+
+        # Save messages to database (best-effort); blocking clients, so on a thread
+        if session_id:
+            await asyncio.to_thread(
+                _save_chat_messages,
+                session_id,
+                latest_user_message,
+                "".join(full_response),
+                route["model"],
+                (usage.input_tokens + usage.output_tokens) if usage else None,
+                bool(rag_context.get("viral_examples")),
+            )
+            if session_created:
+                await asyncio.to_thread(_update_session_title, session_id, latest_user_message)
 
     return StreamingResponse(
         generate(),
@@ -302,6 +469,32 @@ async def chat_stream(request: Request):
     )
 
 
+@router.post("/prefetch")
+async def prefetch_context(request: Request, background_tasks: BackgroundTasks):
+    """
+    Warm the RAG context for a draft the user is still typing.
+
+    Called debounced by the composer. Drafts that are short or close to one
+    already warmed are skipped. Results are cached briefly in prefetch_cache
+    and reused by /stream when the sent message matches or is close to the
+    draft; research always runs on send.
+
+    Expects JSON body with:
+        draft: str
+        contentType: str
+        platform: str
+    """
+    body = await request.json()
+    draft = body.get("draft", "")
+    content_type = body.get("contentType", "caption")
+    platform = body.get("platform", "instagram")
+
+    warm, key = await asyncio.to_thread(should_prefetch, draft, content_type, platform)
+    if warm:
+        background_tasks.add_task(warm_prefetch, key, draft, content_type, platform)
+    return {"status": "warming" if warm else "skipped", "key": key}
+
+
 @router.post("/feedback")
 async def submit_feedback(request: Request):
     """
@@ -328,13 +521,6 @@ async def submit_feedback(request: Request):
     if not assistant_message:
         return {"error": "assistantMessage is required"}
 
-    # Generate embedding of the assistant's output for future similarity search
-    try:
-        embedding = generate_embedding(assistant_message[:2000])
-    except Exception as e:
-        print(f"Embedding generation failed for feedback: {e}")
-        embedding = None
-
     supabase = get_supabase_client()
     record = {
         "content_type": content_type,
@@ -343,16 +529,22 @@ async def submit_feedback(request: Request):
         "assistant_message": assistant_message[:5000],
         "rating": rating,
         "feedback_note": feedback_note,
-        "embedding": embedding,
     }
 
     try:
         response = supabase.table("content_feedback").insert(record).execute()
-        return {"success": True, "id": response.data[0]["id"]}
     except Exception as e:
         print(f"Error saving feedback: {e}")
         return {"error": str(e)}
 
+    # Queue the assistant output for embedding (future similarity search via match_feedback)
+    feedback_id = response.data[0]["id"]
+    try:
+        enqueue_embeddings("content_feedback", [feedback_id], PRIORITY_FEEDBACK)
+    except Exception as e:
+        print(f"Failed to queue feedback embedding, the sweep will pick it up: {e}")
+    return {"success": True, "id": feedback_id}
+
 
 @router.post("/sessions")
 async def create_session(request: Request):
@@ -360,13 +552,12 @@ async def create_session(request: Request):
     body = await request.json()
     supabase = get_supabase_client()
 
-    platform_map = {"instagram": 1, "tiktok": 2, "youtube": 3}
     content_type_map = {"caption": 1, "carousel": 2, "edm": 3, "reel_script": 4}
 
     session = {
         "title": body.get("title", f"Chat {datetime.now().strftime('%b %d, %H:%M')}"),
         "content_type_id": content_type_map.get(body.get("content_type")),
-        "platform_id": platform_map.get(body.get("platform")),
+        "platform_id": PLATFORM_MAP.get(body.get("platform")),
     }
 
     response = supabase.table("chat_sessions").insert(session).execute()
@@ -1,11 +1,11 @@
 """Content CRUD and browsing endpoints."""
 
 from fastapi import APIRouter, Request
+from tools.platforms import PLATFORM_MAP
 from tools.utils.supabase_client import get_supabase_client
 
 router = APIRouter()
 
-PLATFORM_MAP = {"instagram": 1, "tiktok": 2, "youtube": 3}
 CONTENT_TYPE_MAP = {"caption": 1, "carousel": 2, "edm": 3, "reel_script": 4}
 
 
@@ -93,6 +93,7 @@ async def list_viral_content(
     query = (
         supabase.table("scraped_content")
         .select("id, platform_id, source_url, source_handle, content_text, content_type, likes_count, comments_count, shares_count, views_count, virality_score, hashtags, posted_at")
+        .is_("duplicate_of", "null")
     )
 
     if platform and platform in PLATFORM_MAP:
@@ -1,15 +1,16 @@
 """Report generation and retrieval endpoints."""
 
-from fastapi import APIRouter, BackgroundTasks, Request
+from fastapi import APIRouter, Request
 from tools.utils.supabase_client import get_supabase_client
 
 router = APIRouter()
 
 
 @router.post("/generate")
-async def generate_report(request: Request, background_tasks: BackgroundTasks):
+async def generate_report(request: Request):
     """
-    Generate a new analytics report.
+    Queue a new analytics report. /scraping/jobs/{job_id} has the report_id
+    in result once it is done.
 
     Body:
         report_type: "content_audit" | "competitor_analysis" | "strategy"
@@ -17,10 +18,13 @@ async def generate_report(request: Request, background_tasks: BackgroundTasks):
     body = await request.json()
     report_type = body.get("report_type", "content_audit")
 
-    from tools.generate_report import generate_report as run_report
-    background_tasks.add_task(run_report, report_type)
+    from tools.generate_report import REPORT_PROMPTS
+    from tools.job_worker import enqueue_job
+    if report_type not in REPORT_PROMPTS:
+        return {"error": f"Unknown report type: {report_type}"}
+    job_id = enqueue_job("report", {"report_type": report_type})
 
-    return {"status": "started", "report_type": report_type}
+    return {"job_id": job_id, "status": "pending", "report_type": report_type}
 
 
 @router.get("/")
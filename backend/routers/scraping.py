@@ -1,43 +1,68 @@
 """Scraping job management endpoints."""
 
-from fastapi import APIRouter, BackgroundTasks, Request
+import asyncio
+import hmac
+import json
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from tools.utils.supabase_client import get_supabase_client
-from backend.services.scraping_service import create_scrape_job, run_scrape_job
+from backend.services.scraping_service import (
+    JOB_CANCEL_GRACE_SECONDS,
+    JOB_MIN_SECONDS,
+    JOB_TIME_BUDGET_SECONDS,
+    PLATFORM_MAP,
+    create_scrape_job,
+)
 
 router = APIRouter()
 
 
+def require_cron_secret(request: Request):
+    """
+    Guard the GET cron routes: Vercel cron sends GET with Authorization: Bearer $CRON_SECRET.
+
+    Refuses every call while CRON_SECRET is unset, so the queue can't be
+    driven by anyone who finds the URL.
+    """
+    secret = os.getenv("CRON_SECRET")
+    if not secret:
+        raise HTTPException(status_code=503, detail="CRON_SECRET is not set")
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {secret}"):
+        raise HTTPException(status_code=401, detail="Invalid cron secret")
+
+
 @router.post("/jobs")
-async def start_scrape_job(request: Request, background_tasks: BackgroundTasks):
+async def start_scrape_job(request: Request):
     """
-    Start a new scraping job. Runs in background.
+    Queue a new scraping job. The job worker (tools/job_worker.py) runs it.
+
+    Every handle and search term is scraped on every platform, concurrently.
 
     Body:
         platform: "instagram" | "tiktok" | "youtube"
+        platforms: ["instagram", "tiktok"] (instead of platform)
         job_type: "viral_research" | "brand_analysis" | "competitor"
         search_terms: ["hashtag1", "hashtag2"] (for viral/competitor)
-        target_handles: ["handle"] (for brand_analysis/competitor)
-        max_results: 100
+        target_handles: ["handle1", "handle2"] (for brand_analysis/competitor)
+        max_results: 100 (per target)
+        full: false (true ignores watermarks and re-fetches everything)
     """
     body = await request.json()
 
-    platform = body.get("platform", "instagram")
+    platforms = body.get("platforms") or [body.get("platform", "instagram")]
     job_type = body.get("job_type", "viral_research")
     search_terms = body.get("search_terms")
     target_handles = body.get("target_handles")
     max_results = body.get("max_results", 100)
+    incremental = not body.get("full", False)
 
-    job_id = create_scrape_job(platform, job_type, search_terms, target_handles, max_results)
+    unknown = [p for p in platforms if p not in PLATFORM_MAP]
+    if unknown:
+        return {"error": f"Unknown platforms: {', '.join(unknown)}"}
 
-    background_tasks.add_task(
-        run_scrape_job,
-        job_id=job_id,
-        platform=platform,
-        job_type=job_type,
-        search_terms=search_terms,
-        target_handles=target_handles,
-        max_results=max_results,
-    )
+    job_id = create_scrape_job(platforms, job_type, search_terms, target_handles, max_results, incremental)
 
     return {"job_id": job_id, "status": "pending"}
 
@@ -71,10 +96,161 @@ async def get_scrape_job_status(job_id: str):
     return {"error": "Job not found"}
 
 
+@router.get("/jobs/{job_id}/events")
+async def stream_scrape_job_events(job_id: str, request: Request):
+    """
+    Job progress as server-sent events, pushed from the job row over Supabase Realtime.
+
+    Sends a snapshot of the row (status, progress, targets_progress, ...)
+    now and whenever it changes, until the job completes or fails. The
+    stream closes before the 60 s function limit; EventSource reconnects
+    after the retry delay and starts from a fresh snapshot.
+    """
+    from tools.utils.job_events import stream
+
+    async def generate():
+        yield "retry: 3000\n\n"
+        async for event in stream(job_id):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Connection": "keep-alive", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/process", dependencies=[Depends(require_cron_secret)])
+@router.post("/jobs/process")
+async def process_job_queue():
+    """
+    Run queued jobs for up to the job time budget; GET is the Vercel cron.
+
+    Claims only while at least JOB_MIN_SECONDS remain before the cancel
+    point. Jobs still running JOB_CANCEL_GRACE_SECONDS before the budget
+    ends are cancelled at their next checkpoint and parked, so a scrape too
+    big for one function is spread over several calls instead of being killed
+    and retried. Returns completed, waiting, retrying, failed and lost counts.
+    """
+    from tools.job_worker import run_worker
+
+    cancel_after = JOB_TIME_BUDGET_SECONDS - JOB_CANCEL_GRACE_SECONDS
+    return await asyncio.to_thread(
+        run_worker, max_seconds=cancel_after - JOB_MIN_SECONDS, drain=True, cancel_after=cancel_after
+    )
+
+
+@router.post("/apify/webhook")
+async def apify_run_finished(request: Request):
+    """
+    Apify webhook for runs started with APIFY_WEBHOOK_URL set.
+
+    Only wakes the waiting job that owns the run; the worker reads the run's
+    status from Apify itself, so the payload is not trusted.
+    """
+    from tools.apify_runs import resume_job_for_run
+
+    body = await request.json()
+    run_id = (body.get("resource") or {}).get("id") or (body.get("eventData") or {}).get("actorRunId")
+    if not run_id:
+        return {"error": "No run id in webhook payload"}
+    job_id = await asyncio.to_thread(resume_job_for_run, run_id)
+    return {"run_id": run_id, "job_id": job_id}
+
+
+@router.get("/schedules")
+async def list_scrape_schedules():
+    """List recurring scrape schedules with their next and last runs."""
+    supabase = get_supabase_client()
+    response = supabase.table("scrape_schedules").select("*").order("name").execute()
+    return response.data
+
+
+@router.post("/schedules")
+async def save_scrape_schedule(request: Request):
+    """
+    Create or replace (by name) a recurring scrape.
+
+    Body:
+        name: "weekly-viral"
+        cron: "0 6 * * 1" (5-field, UTC) or "@daily"
+        platforms, job_type, search_terms, target_handles, max_results, full: as for /jobs
+        jitter_seconds: 300 (max random delay added to each run)
+    """
+    from tools.scheduler import add_schedule
+
+    body = await request.json()
+    try:
+        return add_schedule(
+            body["name"],
+            body["cron"],
+            body.get("platforms") or [body.get("platform", "instagram")],
+            body.get("search_terms"),
+            body.get("target_handles"),
+            body.get("max_results", 100),
+            body.get("job_type", "viral_research"),
+            not body.get("full", False),
+            body.get("jitter_seconds", 300),
+        )
+    except KeyError as e:
+        return {"error": f"Missing {e.args[0]}"}
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+@router.delete("/schedules/{schedule_id}")
+async def delete_scrape_schedule(schedule_id: str):
+    """Delete a schedule. Jobs it already queued are left alone."""
+    supabase = get_supabase_client()
+    response = supabase.table("scrape_schedules").delete().eq("id", schedule_id).execute()
+    return {"deleted": len(response.data or [])}
+
+
+@router.get("/schedules/tick", dependencies=[Depends(require_cron_secret)])
+@router.post("/schedules/tick")
+async def tick_scrape_schedules():
+    """
+    Queue jobs for every due schedule; GET is the Vercel cron, every few minutes.
+
+    Returns due, queued, coalesced, deferred and failed counts.
+    """
+    from tools.scheduler import tick
+
+    return await asyncio.to_thread(tick)
+
+
 @router.post("/brand-analysis")
-async def trigger_brand_analysis(background_tasks: BackgroundTasks):
-    """Trigger brand voice analysis (runs in background)."""
-    from tools.analyze_brand_voice import analyze_brand_voice
+async def trigger_brand_analysis():
+    """Queue brand voice analysis; poll /scraping/jobs/{job_id} for progress."""
+    from tools.job_worker import enqueue_job
+
+    job_id = enqueue_job("brand_voice")
+    return {"job_id": job_id, "status": "pending"}
+
+
+@router.post("/embeddings/process")
+async def process_embedding_queue(background_tasks: BackgroundTasks):
+    """Drain the embedding queue within the job time budget (runs in background)."""
+    from tools.embedding_worker import run_worker
+
+    background_tasks.add_task(run_worker, max_seconds=JOB_TIME_BUDGET_SECONDS, drain=True)
+    return {"status": "started", "message": "Embedding queue processing in background"}
+
+
+@router.get("/embeddings/process", dependencies=[Depends(require_cron_secret)])
+async def cron_embedding_queue():
+    """
+    Drain the embedding queue from the Vercel cron.
+
+    Runs inline rather than as a background task: Vercel may freeze the
+    function once the response is sent. Returns embedded, failed and
+    rows_per_second.
+    """
+    from tools.embedding_worker import run_worker
 
-    background_tasks.add_task(analyze_brand_voice)
-    return {"status": "started", "message": "Brand voice analysis running in background"}
+    return await asyncio.to_thread(run_worker, max_seconds=JOB_TIME_BUDGET_SECONDS, drain=True)
@@ -0,0 +1,215 @@
+"""
+Prefetch service: warms retrieval for a draft before the user presses send.
+
+The composer posts its draft (debounced) to /chat/prefetch. We build the RAG
+context for it in the background (one Voyage embedding plus match_content,
+brand voice and match_feedback) and cache it in the prefetch_cache table
+(migration 021), so /chat/stream finds it whichever serverless instance it
+lands on. An in-process copy answers repeat lookups on the same instance.
+chat_stream picks the context up when the final message matches the draft or
+is close to it. Perplexity research is paid per call and depends on the
+final wording, so it is never prefetched; chat_stream runs it on send.
+
+A draft is only warmed when it differs enough from every draft already
+warmed or warming for the same content type and platform (the same
+MIN_DRAFT_SIMILARITY that decides reuse), so a user typing a sentence costs
+a few warm-ups rather than one per debounce.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+
+from backend.services.rag_service import RAGService
+from tools.utils.supabase_client import get_supabase_client
+
+PREFETCH_TTL_SECONDS = 120
+# Final messages at least this similar to a warmed draft reuse its results,
+# and new drafts this similar to a warmed one are not warmed again
+MIN_DRAFT_SIMILARITY = 0.9
+MIN_DRAFT_LENGTH = 12
+MAX_ENTRIES = 256
+# Most recent shared entries compared for a near match
+SHARED_CANDIDATES = 20
+# How long chat_stream waits for a warm-up that is already running
+INFLIGHT_WAIT_SECONDS = 10.0
+
+_cache: dict[str, dict] = {}
+# key -> {"draft", "content_type", "platform", "done": threading.Event}
+_inflight: dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def normalize_draft(text: str) -> str:
+    """Lowercase and collapse whitespace so trivial edits still match."""
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def prefetch_key(draft: str, content_type: str, platform: str) -> str:
+    raw = f"{content_type}|{platform}|{normalize_draft(draft)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _evict_expired(now: float):
+    for key in [k for k, v in _cache.items() if v["expires_at"] <= now]:
+        del _cache[key]
+    # Bound memory if a client sends a flood of drafts
+    if len(_cache) > MAX_ENTRIES:
+        oldest = sorted(_cache, key=lambda k: _cache[k]["expires_at"])
+        for key in oldest[: len(_cache) - MAX_ENTRIES]:
+            del _cache[key]
+
+
+def _fresh_local() -> list[dict]:
+    """Unexpired in-process entries. Call with _lock held."""
+    now = time.monotonic()
+    return [v for v in _cache.values() if v["expires_at"] > now]
+
+
+def _shared_entries(content_type: str, platform: str) -> list[dict]:
+    """Unexpired prefetch_cache rows for a content type and platform, newest first."""
+    try:
+        response = (
+            get_supabase_client()
+            .table("prefetch_cache")
+            .select("key, content_type, platform, draft, rag_context")
+            .eq("content_type", content_type)
+            .eq("platform", platform)
+            .gt("expires_at", datetime.now(timezone.utc).isoformat())
+            .order("expires_at", desc=True)
+            .limit(SHARED_CANDIDATES)
+            .execute()
+        )
+        return response.data or []
+    except Exception as e:
+        print(f"Prefetch cache read failed: {e}")
+        return []
+
+
+def _store_shared(entry: dict):
+    now = datetime.now(timezone.utc)
+    try:
+        table = get_supabase_client().table("prefetch_cache")
+        table.delete().lt("expires_at", now.isoformat()).execute()
+        table.upsert({
+            "key": entry["key"],
+            "content_type": entry["content_type"],
+            "platform": entry["platform"],
+            "draft": entry["draft"],
+            # Round-trip so dates and other non-JSON values are stored as strings
+            "rag_context": json.loads(json.dumps(entry["rag_context"], default=str)),
+            "expires_at": (now + timedelta(seconds=PREFETCH_TTL_SECONDS)).isoformat(),
+        }).execute()
+    except Exception as e:
+        print(f"Prefetch cache write failed: {e}")
+
+
+def should_prefetch(draft: str, content_type: str, platform: str) -> tuple[bool, str]:
+    """
+    Check whether a draft is worth warming. Returns (should_warm, key).
+
+    Skips short drafts and drafts close to one already warmed (here or on
+    another instance) or warming here. Blocking: call it from a thread in
+    async code.
+    """
+    key = prefetch_key(draft, content_type, platform)
+    normalized = normalize_draft(draft)
+    if len(normalized) < MIN_DRAFT_LENGTH:
+        return False, key
+    with _lock:
+        if key in _inflight or _closest(
+            _fresh_local() + list(_inflight.values()), normalized, content_type, platform
+        ):
+            return False, key
+    if _closest(_shared_entries(content_type, platform), normalized, content_type, platform):
+        return False, key
+    with _lock:
+        # Re-check: another request may have started the same draft meanwhile
+        if key in _inflight or _closest(_inflight.values(), normalized, content_type, platform):
+            return False, key
+        _inflight[key] = {
+            "draft": normalized,
+            "content_type": content_type,
+            "platform": platform,
+            "done": threading.Event(),
+        }
+    return True, key
+
+
+def warm_prefetch(key: str, draft: str, content_type: str, platform: str):
+    """Build the RAG context for a draft and cache it (runs in background)."""
+    try:
+        rag_context = RAGService().get_rag_context(
+            user_query=draft,
+            content_type=content_type,
+            platform=platform,
+        )
+        entry = {
+            "key": key,
+            "draft": normalize_draft(draft),
+            "content_type": content_type,
+            "platform": platform,
+            "rag_context": rag_context,
+        }
+        with _lock:
+            now = time.monotonic()
+            _evict_expired(now)
+            _cache[key] = {**entry, "expires_at": now + PREFETCH_TTL_SECONDS}
+        _store_shared(entry)
+    except Exception as e:
+        print(f"Prefetch failed: {e}")
+    finally:
+        with _lock:
+            pending = _inflight.pop(key, None)
+        if pending:
+            pending["done"].set()
+
+
+def _closest(entries, normalized: str, content_type: str, platform: str):
+    """Closest entry for the same content type and platform, if similar enough."""
+    best, best_ratio = None, 0.0
+    for entry in entries:
+        if entry["content_type"] != content_type or entry["platform"] != platform:
+            continue
+        ratio = SequenceMatcher(None, normalized, entry["draft"]).ratio()
+        if ratio > best_ratio:
+            best, best_ratio = entry, ratio
+    return best if best_ratio >= MIN_DRAFT_SIMILARITY else None
+
+
+def get_prefetched(message: str, content_type: str, platform: str) -> dict | None:
+    """
+    Return a warmed entry ({"draft", "rag_context", ...}) for a message, or None.
+
+    Looks in this instance's cache, then in prefetch_cache: an exact draft
+    match or the closest warmed draft for the same content type and platform,
+    if it is similar enough. If a matching warm-up is still running in this
+    process, waits for it (up to INFLIGHT_WAIT_SECONDS) rather than starting
+    the same work twice. Blocking: call it from a thread in async code.
+    """
+    normalized = normalize_draft(message)
+    key = prefetch_key(message, content_type, platform)
+
+    with _lock:
+        fresh = _fresh_local()
+        entry = _cache.get(key)
+        if entry and entry["expires_at"] > time.monotonic():
+            return entry
+        entry = _closest(fresh, normalized, content_type, platform)
+        if entry:
+            return entry
+        pending = _closest(_inflight.values(), normalized, content_type, platform)
+
+    if pending is not None and pending["done"].wait(INFLIGHT_WAIT_SECONDS):
+        with _lock:
+            entry = _closest(_fresh_local(), normalized, content_type, platform)
+        if entry:
+            return entry
+
+    shared = _shared_entries(content_type, platform)
+    exact = next((row for row in shared if row["key"] == key), None)
+    return exact or _closest(shared, normalized, content_type, platform)
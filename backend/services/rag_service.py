@@ -7,16 +7,22 @@ Combines:
 3. User feedback from previous generations (content_feedback)
 """
 
+import asyncio
 import os
 import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from tools.search_vectors import search_similar_content
-from tools.generate_embeddings import generate_embedding
-from tools.utils.supabase_client import get_supabase_client
-
-PLATFORM_MAP = {"instagram": 1, "tiktok": 2, "youtube": 3}
+from backend.services.rerank_service import OVERFETCH_FACTOR, rerank_examples
+from tools.search_vectors import asearch_similar_content, search_similar_content
+from tools.generate_embeddings import (
+    agenerate_embedding,
+    aget_active_model,
+    generate_embedding,
+    get_active_model,
+)
+from tools.platforms import PLATFORM_MAP
+from tools.utils.supabase_client import get_async_supabase_client, get_supabase_client
 
 
 class RAGService:
@@ -38,30 +44,28 @@ class RAGService:
             - brand_voice: Brand voice profile dict
             - positive_feedback: Liked generations to emulate
             - negative_feedback: Disliked generations to avoid
+            - query_embedding: Embedding of the user query (None if embedding failed)
+            - query_model: Model that produced query_embedding
         """
-        # 1. Vector search for relevant viral content
+        # 1. Vector search for relevant viral content, over-fetched and
+        #    re-ranked by virality, recency and diversity
         platform_id = PLATFORM_MAP.get(platform) if platform else None
         try:
-            viral_examples = search_similar_content(
+            candidates = search_similar_content(
                 query=user_query,
-                match_count=max_examples,
+                match_count=max_examples * OVERFETCH_FACTOR,
                 match_threshold=0.3,
                 platform_filter=platform_id,
+                include_embedding=True,
             )
+            viral_examples = rerank_examples(candidates, max_examples)
         except Exception as e:
             print(f"Vector search failed (corpus may be empty): {e}")
             viral_examples = []
 
         # 2. Fetch latest brand voice profile
         try:
-            brand_voice_response = (
-                self.supabase.table("brand_voice_profiles")
-                .select("*")
-                .eq("brand_name", "YourSalonSupport")
-                .order("analyzed_at", desc=True)
-                .limit(1)
-                .execute()
-            )
+            brand_voice_response = _brand_voice_query(self.supabase).execute()
             brand_voice = brand_voice_response.data[0] if brand_voice_response.data else None
         except Exception as e:
             print(f"Brand voice fetch failed: {e}")
@@ -70,13 +74,15 @@ class RAGService:
         # 3. Fetch relevant feedback for RAG improvement
         positive_feedback = []
         negative_feedback = []
+        query_embedding = None
+        query_model = get_active_model()
         try:
-            query_embedding = generate_embedding(user_query)
+            query_embedding = generate_embedding(user_query, model=query_model)
             positive_feedback = self._search_feedback(
-                query_embedding, content_type, rating="positive", limit=3
+                query_embedding, content_type, rating="positive", limit=3, query_model=query_model
             )
             negative_feedback = self._search_feedback(
-                query_embedding, content_type, rating="negative", limit=2
+                query_embedding, content_type, rating="negative", limit=2, query_model=query_model
             )
         except Exception as e:
             print(f"Feedback search failed: {e}")
@@ -86,6 +92,8 @@ class RAGService:
             "brand_voice": brand_voice,
             "positive_feedback": positive_feedback,
             "negative_feedback": negative_feedback,
+            "query_embedding": query_embedding,
+            "query_model": query_model,
         }
 
     def _search_feedback(
@@ -94,20 +102,115 @@ class RAGService:
         content_type: str,
         rating: str,
         limit: int = 3,
+        query_model: str | None = None,
     ) -> list[dict]:
-        """Search content_feedback table for similar rated content."""
+        """Search content_feedback table for similar rated content (embedded with query_model)."""
         try:
             response = self.supabase.rpc(
                 "match_feedback",
-                {
-                    "query_embedding": query_embedding,
-                    "match_threshold": 0.3,
-                    "match_count": limit,
-                    "filter_rating": rating,
-                    "filter_content_type": content_type,
-                },
+                _feedback_params(query_embedding, content_type, rating, limit, query_model or get_active_model()),
             ).execute()
             return response.data or []
         except Exception as e:
             print(f"Feedback RPC failed: {e}")
             return []
+
+    async def aget_rag_context(
+        self,
+        user_query: str,
+        content_type: str = "caption",
+        platform: str | None = None,
+        max_examples: int = 5,
+    ) -> dict:
+        """
+        Async get_rag_context() for FastAPI handlers (same result).
+
+        The viral search, brand voice fetch and feedback search run
+        concurrently on the async Voyage and Supabase clients, so a slow
+        Voyage call no longer blocks the event loop.
+        """
+        platform_id = PLATFORM_MAP.get(platform) if platform else None
+        query_model = await aget_active_model()
+        supabase = await get_async_supabase_client()
+
+        async def viral_examples() -> list[dict]:
+            try:
+                candidates = await asearch_similar_content(
+                    query=user_query,
+                    match_count=max_examples * OVERFETCH_FACTOR,
+                    match_threshold=0.3,
+                    platform_filter=platform_id,
+                    include_embedding=True,
+                    query_model=query_model,
+                )
+                return rerank_examples(candidates, max_examples)
+            except Exception as e:
+                print(f"Vector search failed (corpus may be empty): {e}")
+                return []
+
+        async def brand_voice() -> dict | None:
+            try:
+                response = await _brand_voice_query(supabase).execute()
+                return response.data[0] if response.data else None
+            except Exception as e:
+                print(f"Brand voice fetch failed: {e}")
+                return None
+
+        async def search_feedback(query_embedding: list[float], rating: str, limit: int) -> list[dict]:
+            try:
+                response = await supabase.rpc(
+                    "match_feedback",
+                    _feedback_params(query_embedding, content_type, rating, limit, query_model),
+                ).execute()
+                return response.data or []
+            except Exception as e:
+                print(f"Feedback RPC failed: {e}")
+                return []
+
+        async def feedback() -> tuple[list[float] | None, list[dict], list[dict]]:
+            try:
+                query_embedding = await agenerate_embedding(user_query, model=query_model)
+            except Exception as e:
+                print(f"Feedback search failed: {e}")
+                return None, [], []
+            positive, negative = await asyncio.gather(
+                search_feedback(query_embedding, "positive", 3),
+                search_feedback(query_embedding, "negative", 2),
+            )
+            return query_embedding, positive, negative
+
+        examples, voice, (query_embedding, positive, negative) = await asyncio.gather(
+            viral_examples(), brand_voice(), feedback()
+        )
+        return {
+            "viral_examples": examples,
+            "brand_voice": voice,
+            "positive_feedback": positive,
+            "negative_feedback": negative,
+            "query_embedding": query_embedding,
+            "query_model": query_model,
+        }
+
+
+def _brand_voice_query(supabase):
+    """Latest YSS brand voice profile (works with the sync and async clients)."""
+    return (
+        supabase.table("brand_voice_profiles")
+        .select("*")
+        .eq("brand_name", "YourSalonSupport")
+        .order("analyzed_at", desc=True)
+        .limit(1)
+    )
+
+
+def _feedback_params(
+    query_embedding: list[float], content_type: str, rating: str, limit: int, query_model: str
+) -> dict:
+    return {
+        "query_embedding": query_embedding,
+        "match_threshold": 0.3,
+        "match_count": limit,
+        "filter_rating": rating,
+        "filter_content_type": content_type,
+        "query_model": query_model,
+    }
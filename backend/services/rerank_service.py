@@ -0,0 +1,121 @@
+"""
+Re-ranking for retrieved viral examples.
+
+Vector search orders candidates by cosine similarity alone, which tends to
+return near-identical captions from one account. The re-ranker blends
+similarity with virality (normalized within each platform, since scores are
+not comparable across platforms) and recency, then picks the final set with
+maximal marginal relevance (MMR) so the examples are diverse.
+
+Everything is NumPy matrix math over a few dozen candidates.
+"""
+
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.utils.vector_utils import normalize_rows, parse_vector
+
+# Relevance blend weights
+SIMILARITY_WEIGHT = 0.7
+VIRALITY_WEIGHT = 0.2
+RECENCY_WEIGHT = 0.1
+# Posts lose half their recency score every this many days
+RECENCY_HALF_LIFE_DAYS = 180
+# Recency score for posts without a posted_at
+UNKNOWN_RECENCY = 0.5
+# MMR trade-off: 1.0 = relevance only, 0.0 = diversity only
+MMR_LAMBDA = 0.7
+# Candidates fetched per final example
+OVERFETCH_FACTOR = 4
+
+
+def _parse_timestamp(value) -> float:
+    if not value:
+        return math.nan
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def normalize_virality(virality: np.ndarray, platform_ids: np.ndarray) -> np.ndarray:
+    """Scale log virality to 0-1 within each platform."""
+    scores = np.log1p(np.maximum(virality, 0))
+    groups, inverse = np.unique(platform_ids, return_inverse=True)
+    group_max = np.zeros(len(groups), dtype=np.float64)
+    np.maximum.at(group_max, inverse, scores)
+    return np.divide(
+        scores, group_max[inverse], out=np.zeros_like(scores), where=group_max[inverse] > 0
+    )
+
+
+def recency_scores(posted_at: np.ndarray, now: float | None = None) -> np.ndarray:
+    """Exponential decay by post age; UNKNOWN_RECENCY where posted_at is missing."""
+    now = time.time() if now is None else now
+    age_days = np.maximum(now - posted_at, 0) / 86400
+    scores = np.exp2(-age_days / RECENCY_HALF_LIFE_DAYS)
+    return np.where(np.isnan(posted_at), UNKNOWN_RECENCY, scores)
+
+
+def mmr_select(relevance: np.ndarray, pairwise: np.ndarray, k: int) -> list[int]:
+    """Greedy MMR: each pick maximizes relevance minus similarity to earlier picks."""
+    n = len(relevance)
+    selected = []
+    max_overlap = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    for _ in range(min(k, n)):
+        scores = MMR_LAMBDA * relevance - (1 - MMR_LAMBDA) * max_overlap
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_overlap = np.maximum(max_overlap, pairwise[best])
+    return selected
+
+
+def rerank_examples(candidates: list[dict], k: int) -> list[dict]:
+    """
+    Pick the k best candidates by blended relevance with MMR diversity.
+
+    Candidates are match_content rows (similarity, virality_score,
+    platform_id, posted_at, source_handle, optionally embedding). When
+    embeddings are missing, diversity falls back to penalizing repeats of
+    the same account. Embeddings are dropped from the returned rows.
+    """
+    if not candidates:
+        return []
+
+    similarity = np.array([c.get("similarity") or 0.0 for c in candidates], dtype=np.float64)
+    virality = np.array([c.get("virality_score") or 0.0 for c in candidates], dtype=np.float64)
+    platform_ids = np.array([c.get("platform_id") or 0 for c in candidates])
+    posted_at = np.array([_parse_timestamp(c.get("posted_at")) for c in candidates])
+
+    relevance = (
+        SIMILARITY_WEIGHT * similarity
+        + VIRALITY_WEIGHT * normalize_virality(virality, platform_ids)
+        + RECENCY_WEIGHT * recency_scores(posted_at)
+    )
+
+    vectors = [parse_vector(c.get("embedding")) for c in candidates]
+    if all(v is not None for v in vectors):
+        matrix = normalize_rows(vectors)
+        pairwise = matrix @ matrix.T
+    else:
+        handles = np.array([c.get("source_handle") or "" for c in candidates])
+        pairwise = (handles[:, None] == handles[None, :]).astype(np.float64)
+
+    selected = mmr_select(relevance, pairwise, k)
+
+    results = []
+    for i in selected:
+        row = {key: value for key, value in candidates[i].items() if key != "embedding"}
+        row["rerank_score"] = float(relevance[i])
+        results.append(row)
+    return results
@@ -1,104 +1,256 @@
 """
 Scraping service: Orchestrates scraping jobs.
 
-Manages job lifecycle and delegates to WAT tools.
+Creates queued jobs and runs them for the job worker (tools/job_worker.py),
+delegating to the platform adapters (tools/platforms/). A job fans out to one
+target per (platform, handle) and (platform, search term). Targets run
+concurrently, at most SCRAPE_CONCURRENCY[platform] Apify runs at a time per
+platform, and record their own progress in scrape_jobs.targets_progress.
+Incremental jobs (the default) load each target's watermark
+(tools/watermarks.py) so only posts newer than the last run are fetched
+and stored. Actor runs don't block: while any target's run is still going
+the job is parked as 'waiting' (tools/apify_runs.py) and resumed later,
+skipping the targets it already completed. A job the worker cancels (lost
+lease, or out of time in /scraping/jobs/process) stops before its next
+target or ingest batch. Progress (targets, ingest
+batches, embeddings, errors) is published to tools/utils/job_events.py as
+it happens. Raw dataset items are archived under the job id
+(tools/utils/raw_archive.py); rows keep a raw_ref, or raw_data if the upload failed.
 """
 
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
+from tools.apify_runs import APIFY_POLL_SECONDS, ActorRuns, RunPending
+from tools.job_worker import (
+    PRIORITY_SCRAPE,
+    JobCancelled,
+    JobWaiting,
+    enqueue_job,
+    raise_if_cancelled,
+    time_left,
+)
+from tools.platforms import PLATFORM_MAP, get_adapter, store_posts
+from tools.utils.job_events import publish
+from tools.utils.raw_archive import raw_archive_sink
 from tools.utils.supabase_client import get_supabase_client
+from tools.watermarks import Watermark
 
-PLATFORM_MAP = {"instagram": 1, "tiktok": 2, "youtube": 3}
+# Vercel functions stop at 60s; the embedding worker gets whatever is left
+# and the queue keeps the rest for the next run
+JOB_TIME_BUDGET_SECONDS = float(os.getenv("JOB_TIME_BUDGET_SECONDS", "55"))
+MIN_EMBEDDING_SECONDS = 5.0
+# /scraping/jobs/process cancels jobs this long before the budget ends, so
+# they can stop at a checkpoint and park, and claims nothing with less than
+# JOB_MIN_SECONDS left before that
+JOB_CANCEL_GRACE_SECONDS = 10.0
+JOB_MIN_SECONDS = 15.0
 
+# Concurrent Apify actor runs per platform within one job
+SCRAPE_CONCURRENCY = {
+    "instagram": int(os.getenv("SCRAPE_CONCURRENCY_INSTAGRAM", "3")),
+    "tiktok": int(os.getenv("SCRAPE_CONCURRENCY_TIKTOK", "3")),
+    "youtube": int(os.getenv("SCRAPE_CONCURRENCY_YOUTUBE", "2")),
+}
 
-def create_scrape_job(platform: str, job_type: str, search_terms: list[str] | None,
-                      target_handles: list[str] | None, max_results: int) -> str:
-    """Create a scrape job record in the database."""
-    supabase = get_supabase_client()
 
-    job = {
-        "platform_id": PLATFORM_MAP.get(platform),
-        "job_type": job_type,
-        "status": "pending",
-        "search_terms": search_terms,
-        "target_handles": target_handles,
-        "max_results": max_results,
-    }
+def build_targets(platforms: list[str], search_terms: list[str] | None,
+                  target_handles: list[str] | None) -> list[dict]:
+    """One target per (platform, handle) and (platform, search term), in order, without repeats."""
+    targets = {}
+    for platform in platforms:
+        for handle in target_handles or []:
+            handle = handle.strip().lstrip("@")
+            if handle:
+                key = f"{platform}:@{handle}"
+                targets[key] = {"key": key, "platform": platform, "kind": "handle", "value": handle,
+                                "name": f"@{handle}"}
+        for term in search_terms or []:
+            term = term.strip()
+            if term:
+                key = f"{platform}:{term}"
+                targets[key] = {"key": key, "platform": platform, "kind": "search", "value": term,
+                                "name": term}
+    return list(targets.values())
 
-    response = supabase.table("scrape_jobs").insert(job).execute()
-    return response.data[0]["id"]
 
+def create_scrape_job(platforms: list[str], job_type: str, search_terms: list[str] | None,
+                      target_handles: list[str] | None, max_results: int, incremental: bool = True,
+                      priority: int = PRIORITY_SCRAPE, schedule_id: str | None = None) -> str:
+    """Queue a scrape job for the job worker, with every target pending."""
+    payload = {"incremental": incremental}
+    if schedule_id:
+        payload["schedule_id"] = schedule_id
+    return enqueue_job(
+        job_type,
+        payload,
+        priority,
+        platform_id=PLATFORM_MAP.get(platforms[0]) if len(platforms) == 1 else None,
+        platforms=platforms,
+        search_terms=search_terms,
+        target_handles=target_handles,
+        max_results=max_results,
+        concurrency_limits={p: SCRAPE_CONCURRENCY.get(p, 1) for p in platforms},
+        targets_progress={
+            t["key"]: {"status": "pending"} for t in build_targets(platforms, search_terms, target_handles)
+        },
+    )
 
-def run_scrape_job(job_id: str, platform: str, job_type: str,
-                   search_terms: list[str] | None, target_handles: list[str] | None,
-                   max_results: int):
-    """Execute a scraping job (runs in background)."""
-    supabase = get_supabase_client()
-
-    # Mark as running
-    supabase.table("scrape_jobs").update({
-        "status": "running",
-        "started_at": datetime.utcnow().isoformat(),
-    }).eq("id", job_id).execute()
 
+def _set_progress(job_id: str, target_key: str, progress: dict):
+    publish(job_id, "target", target=target_key, **progress)
     try:
-        results_count = 0
+        get_supabase_client().rpc(
+            "set_scrape_target_progress",
+            {"job_id": job_id, "target_key": target_key, "progress": progress},
+        ).execute()
+    except Exception as e:
+        print(f"Progress update for {target_key} failed: {e}")
 
-        if platform == "instagram":
-            from tools.scrape_instagram import scrape_by_hashtags, scrape_profile, store_posts
 
-            if job_type == "brand_analysis" and target_handles:
-                items = scrape_profile(target_handles[0], max_results)
-            elif search_terms:
-                items = scrape_by_hashtags(search_terms, max_results)
-            else:
-                items = []
+def _run_target(job_id: str, target: dict, max_results: int, semaphore: threading.Semaphore,
+                incremental: bool = True, attempt: int = 1) -> int:
+    """
+    Scrape and store one target under its platform's limit. Returns new rows stored.
 
-            results_count = store_posts(items, job_id)
+    Raises RunPending if its actor run has not finished yet, JobCancelled
+    if the worker cancelled the job.
+    """
+    adapter = get_adapter(target["platform"])
+    scrape = adapter.scraper(target["kind"])
 
-        elif platform == "tiktok":
-            from tools.scrape_tiktok import scrape_by_hashtags, scrape_profile, store_posts
+    def on_batch(counts: dict):
+        publish(job_id, "batch", counts, target=target["key"])
+        raise_if_cancelled(job_id)
 
-            if target_handles:
-                items = scrape_profile(target_handles[0], max_results)
-            elif search_terms:
-                items = scrape_by_hashtags(search_terms, max_results)
-            else:
-                items = []
+    with semaphore:
+        raise_if_cancelled(job_id)
+        _set_progress(job_id, target["key"], {
+            "status": "running",
+            "started_at": datetime.utcnow().isoformat(),
+        })
+        watermark = None
+        try:
+            scrape_kwargs = {"runs": ActorRuns(job_id, target["key"], attempt)}
+            if incremental:
+                # Profiles list newest first; hashtag and search results don't
+                watermark = Watermark.load(
+                    target["platform"], target["name"], chronological=target["kind"] == "handle"
+                )
+                if target["kind"] in adapter.newer_than_kinds and watermark.newer_than():
+                    scrape_kwargs["newer_than"] = watermark.newer_than()
+            query = target["value"] if target["kind"] == "handle" else [target["value"]]
+            with raw_archive_sink(job_id) as raw_sink:
+                stored = store_posts(
+                    adapter,
+                    scrape(query, max_results, **scrape_kwargs),
+                    job_id,
+                    raw_sink=raw_sink,
+                    watermark=watermark,
+                    progress=on_batch,
+                )
+        except RunPending as pending:
+            _set_progress(job_id, target["key"], {"status": "waiting", "apify_run_id": pending.run_id})
+            raise
+        except JobCancelled:
+            # Rows stored so far stay; the resumed job runs the target again
+            _set_progress(job_id, target["key"], {"status": "cancelled"})
+            raise
+        except Exception as e:
+            publish(job_id, "error", {"errors": 1}, target=target["key"], message=str(e))
+            _set_progress(job_id, target["key"], {
+                "status": "failed",
+                "error": str(e),
+                "completed_at": datetime.utcnow().isoformat(),
+            })
+            raise
 
-            results_count = store_posts(items, job_id)
+    _set_progress(job_id, target["key"], {
+        "status": "completed",
+        "results_count": stored,
+        "known": watermark.known if watermark else 0,
+        "completed_at": datetime.utcnow().isoformat(),
+    })
+    print(f"Target {target['key']}: {stored} new rows")
+    return stored
 
-        elif platform == "youtube":
-            from tools.scrape_youtube import scrape_by_search, scrape_channel, store_posts
 
-            if target_handles:
-                items = scrape_channel(target_handles[0], max_results)
-            elif search_terms:
-                items = scrape_by_search(search_terms, max_results)
-            else:
-                items = []
+def _job_platforms(job: dict) -> list[str]:
+    if job.get("platforms"):
+        return job["platforms"]
+    names = {platform_id: name for name, platform_id in PLATFORM_MAP.items()}
+    return [names[job["platform_id"]]]
 
-            results_count = store_posts(items, job_id)
 
-        # Generate embeddings for new content
-        from tools.generate_embeddings import backfill_unembedded_content
-        backfill_unembedded_content()
+def execute_scrape_job(job: dict) -> dict:
+    """
+    Run a claimed scrape job (a scrape_jobs row); the job worker records the outcome.
 
-        # Mark as completed
-        supabase.table("scrape_jobs").update({
-            "status": "completed",
-            "results_count": results_count,
-            "completed_at": datetime.utcnow().isoformat(),
-        }).eq("id", job_id).execute()
+    payload.incremental=False ignores watermarks. Returns the scrape_jobs
+    columns to set on completion. Raises JobWaiting while actor runs are
+    still going, JobCancelled once the worker cancels it, and RuntimeError
+    if every target failed.
+    """
+    job_id = job["id"]
+    job_started = time.monotonic()
+    platforms = _job_platforms(job)
+    incremental = (job.get("payload") or {}).get("incremental", True)
+    max_results = job.get("max_results") or 100
 
-    except Exception as e:
-        supabase.table("scrape_jobs").update({
-            "status": "failed",
-            "error_message": str(e),
-            "completed_at": datetime.utcnow().isoformat(),
-        }).eq("id", job_id).execute()
-        raise
+    targets = build_targets(platforms, job.get("search_terms"), job.get("target_handles"))
+    semaphores = {p: threading.Semaphore(SCRAPE_CONCURRENCY.get(p, 1)) for p in platforms}
+
+    # A resumed job keeps what its completed targets stored
+    progress = job.get("targets_progress") or {}
+    done = [t for t in targets if progress.get(t["key"], {}).get("status") == "completed"]
+    todo = [t for t in targets if t not in done]
+    results_count = sum(progress[t["key"]].get("results_count") or 0 for t in done)
+    failures = []
+    waiting = []
+    cancelled = None
+    if todo:
+        workers = min(len(todo), sum(SCRAPE_CONCURRENCY.get(p, 1) for p in platforms))
+        # A job takes about as long as its slowest target, not the sum
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    _run_target, job_id, t, max_results, semaphores[t["platform"]], incremental,
+                    job.get("attempts") or 1,
+                ): t
+                for t in todo
+            }
+            for future in as_completed(futures):
+                try:
+                    results_count += future.result()
+                except RunPending as pending:
+                    waiting.append(pending.run_id)
+                except JobCancelled as e:
+                    cancelled = e
+                except Exception as e:
+                    failures.append(f"{futures[future]['key']}: {e}")
+
+    if cancelled is not None:
+        raise cancelled
+    if waiting:
+        raise JobWaiting(f"Waiting for {len(waiting)} Apify runs", APIFY_POLL_SECONDS)
+    if targets and len(failures) == len(targets):
+        raise RuntimeError("All targets failed: " + "; ".join(failures))
+
+    # store_posts queued the new rows; embed what fits in the remaining time budget
+    from tools.embedding_worker import run_worker
+    remaining = max(JOB_TIME_BUDGET_SECONDS - (time.monotonic() - job_started), MIN_EMBEDDING_SECONDS)
+    left = time_left(job_id)
+    if left is not None:
+        # Never past the cancel deadline; the sweep embeds whatever is left
+        remaining = min(remaining, left)
+    embedded = run_worker(max_seconds=remaining, drain=True) if remaining > 0 else {"embedded": 0}
+    publish(job_id, "embedded", {"embedded": embedded["embedded"]})
+
+    # Failed targets are listed but don't fail the job
+    return {"results_count": results_count, "error_message": "; ".join(failures) or None}
@@ -0,0 +1,192 @@
+"""
+Variant service: generates several options concurrently and ranks them.
+
+All variants share one prompt build (research, RAG, system prompt). Ranking
+is local: each candidate is embedded once, then scored against the user's
+rated content_feedback embeddings with NumPy. Close to liked outputs scores
+up, close to disliked outputs scores down.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from tools.generate_embeddings import agenerate_embeddings_batch, get_embedding_config
+from tools.utils.model_router import record_model_usage
+from tools.utils.supabase_client import get_supabase_client
+from tools.utils.vector_utils import normalize_rows, parse_vector
+
+MAX_VARIANTS = 5
+# How many of the closest liked outputs to average per candidate
+POSITIVE_TOP_K = 3
+# Weight of the similarity to the closest disliked output
+NEGATIVE_WEIGHT = 0.5
+FEEDBACK_SAMPLE_SIZE = 200
+
+
+def fetch_feedback_embeddings(content_type: str) -> tuple[np.ndarray, np.ndarray, str]:
+    """
+    Load recent rated feedback embeddings for a content type as (positive, negative, model).
+
+    Reads the live column (embedding_config.active_column, which a promote
+    switches to embedding_shadow) and only rows embedded with the active
+    model; candidates must be embedded with the returned model to compare.
+    """
+    config = get_embedding_config()
+    column, model = config["active_column"], config["active_model"]
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("content_feedback")
+        .select(f"rating, embedding:{column}")
+        .eq("content_type", content_type)
+        .eq(f"{column}_model", model)
+        .not_.is_(column, "null")
+        .order("created_at", desc=True)
+        .limit(FEEDBACK_SAMPLE_SIZE)
+        .execute()
+    )
+
+    positive, negative = [], []
+    for row in response.data or []:
+        vector = parse_vector(row.get("embedding"))
+        if vector is None:
+            continue
+        (positive if row["rating"] == "positive" else negative).append(vector)
+
+    return normalize_rows(positive), normalize_rows(negative), model
+
+
+def rank_variants(
+    candidates: np.ndarray,
+    positive: np.ndarray,
+    negative: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score candidate embeddings against liked and disliked feedback.
+
+    score = mean similarity to the closest liked outputs
+            - NEGATIVE_WEIGHT * similarity to the closest disliked output
+
+    Returns (order, scores), best first. With no feedback every score is 0
+    and the generation order is kept.
+    """
+    scores = np.zeros(len(candidates), dtype=np.float32)
+
+    if positive.size:
+        similarity = candidates @ positive.T
+        k = min(POSITIVE_TOP_K, similarity.shape[1])
+        top = np.partition(similarity, -k, axis=1)[:, -k:]
+        scores += top.mean(axis=1)
+
+    if negative.size:
+        scores -= NEGATIVE_WEIGHT * (candidates @ negative.T).max(axis=1)
+
+    order = np.argsort(-scores, kind="stable")
+    return order, scores
+
+
+async def generate_variants(
+    client,
+    route: dict,
+    system_prompt: str,
+    messages: list[dict],
+    count: int,
+    session_id: str | None = None,
+) -> list[str]:
+    """Run `count` generations of the same prompt concurrently."""
+
+    async def one_variant() -> str:
+        started = time.monotonic()
+        response = await client.messages.create(
+            model=route["model"],
+            max_tokens=route["max_tokens"],
+            system=system_prompt,
+            messages=messages,
+        )
+        latency_ms = int((time.monotonic() - started) * 1000)
+        await asyncio.to_thread(
+            record_model_usage, route, latency_ms, response.usage, None, session_id
+        )
+        return response.content[0].text
+
+    results = await asyncio.gather(
+        *(one_variant() for _ in range(count)), return_exceptions=True
+    )
+
+    variants = []
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Variant generation failed: {type(result).__name__}: {result}")
+        else:
+            variants.append(result)
+    return variants
+
+
+def format_ranked_variants(variants: list[str]) -> str:
+    """Render ranked variants as numbered options."""
+    return "\n\n---\n\n".join(
+        f"**Option {i}**\n\n{text}" for i, text in enumerate(variants, 1)
+    )
+
+
+def _log_feedback_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Feedback embedding load failed: {task.exception()}")
+
+
+async def generate_ranked_variants(
+    client,
+    route: dict,
+    system_prompt: str,
+    messages: list[dict],
+    count: int,
+    content_type: str,
+    mode: str = "best",
+    session_id: str | None = None,
+) -> str:
+    """
+    Generate `count` variants concurrently and rank them against feedback.
+
+    mode="best" returns the top variant, mode="ranked" returns all of them
+    as numbered options, best first.
+    """
+    # Feedback embeddings load while the variants generate. The callback
+    # reads the task's outcome, so a failed load is logged even when the
+    # task is never awaited (one variant, or generation failed).
+    feedback_task = asyncio.create_task(
+        asyncio.to_thread(fetch_feedback_embeddings, content_type)
+    )
+    feedback_task.add_done_callback(_log_feedback_failure)
+
+    try:
+        variants = await generate_variants(
+            client, route, system_prompt, messages, min(count, MAX_VARIANTS), session_id
+        )
+    except BaseException:
+        feedback_task.cancel()
+        raise
+    if not variants:
+        feedback_task.cancel()
+        raise RuntimeError("All variant generations failed")
+
+    ranked = variants
+    if len(variants) <= 1:
+        feedback_task.cancel()
+    else:
+        try:
+            positive, negative, model = await feedback_task
+            candidate_vectors = await agenerate_embeddings_batch([v[:2000] for v in variants], model=model)
+            order, scores = rank_variants(normalize_rows(candidate_vectors), positive, negative)
+            ranked = [variants[i] for i in order]
+            print(f"Ranked {len(variants)} variants, scores: {np.round(scores[order], 3).tolist()}")
+        except Exception as e:
+            print(f"Variant ranking failed, keeping generation order: {e}")
+
+    if mode == "ranked":
+        return format_ranked_variants(ranked)
+    return ranked[0]
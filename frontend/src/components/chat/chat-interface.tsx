@@ -43,6 +43,8 @@ const ACCEPTED_TYPES = [
 ];
 
 const MAX_FILE_SIZE = 20 * 1024 * 1024; // 20MB
+const PREFETCH_DEBOUNCE_MS = 700;
+const PREFETCH_MIN_LENGTH = 12;
 
 const ALL_SUGGESTIONS = [
   "Write a caption about salon growth tips",
@@ -264,6 +266,20 @@ export function ChatInterface() {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages, status]);
 
+  // Warm research + RAG for the draft while the user is still typing
+  useEffect(() => {
+    const draft = input.trim();
+    if (status !== "ready" || draft.length < PREFETCH_MIN_LENGTH) return;
+    const timer = setTimeout(() => {
+      fetch("/api/chat/prefetch", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ draft, contentType, platform }),
+      }).catch(() => {});
+    }, PREFETCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [input, contentType, platform, status]);
+
   const readFileAsBase64 = (file: File): Promise<string> => {
     return new Promise((resolve, reject) => {
       const reader = new FileReader();
@@ -34,16 +34,68 @@ export interface GeneratedContent {
   created_at: string;
 }
 
+export interface ScrapeTargetProgress {
+  status: "pending" | "running" | "waiting" | "cancelled" | "completed" | "failed";
+  results_count?: number;
+  known?: number;
+  apify_run_id?: string;
+  error?: string;
+  started_at?: string;
+  completed_at?: string;
+}
+
+export interface ScrapeJobProgress {
+  fetched?: number;
+  inserted?: number;
+  refreshed?: number;
+  duplicates?: number;
+  failed?: number;
+  known?: number;
+  embedded?: number;
+  errors?: number;
+  updated_at?: string;
+}
+
 export interface ScrapeJob {
   id: string;
-  platform_id: number;
+  platform_id: number | null;
+  platforms?: string[];
   job_type: string;
-  status: "pending" | "running" | "completed" | "failed";
+  status: "pending" | "waiting" | "running" | "completed" | "failed";
   search_terms?: string[];
   target_handles?: string[];
   max_results: number;
   results_count: number;
+  concurrency_limits?: Record<string, number>;
+  targets_progress?: Record<string, ScrapeTargetProgress>;
+  progress?: ScrapeJobProgress;
   error_message?: string;
+  payload?: Record<string, unknown>;
+  result?: Record<string, unknown>;
+  priority?: number;
+  attempts?: number;
+  max_attempts?: number;
+  run_after?: string;
+  apify_run_id?: string;
+  created_at: string;
+}
+
+export interface ScrapeSchedule {
+  id: string;
+  name: string;
+  cron: string;
+  platforms: string[];
+  job_type: string;
+  search_terms?: string[];
+  target_handles?: string[];
+  max_results: number;
+  incremental: boolean;
+  jitter_seconds: number;
+  enabled: boolean;
+  next_run_at: string;
+  last_run_at?: string;
+  last_job_ids: string[];
+  last_result?: string;
   created_at: string;
 }
 
@@ -0,0 +1,33 @@
+-- Model usage log for tiered model routing
+-- One row per Claude call: which task, tier and model served it, and how fast
+
+CREATE TABLE model_usage (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    task TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    model TEXT NOT NULL,
+    latency_ms INTEGER,
+    first_token_ms INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    session_id UUID REFERENCES chat_sessions(id) ON DELETE SET NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_model_usage_task ON model_usage(task, tier, created_at DESC);
+CREATE INDEX idx_model_usage_created ON model_usage(created_at DESC);
+
+-- Latency and token totals by task and tier, for comparing tiers
+CREATE OR REPLACE VIEW model_usage_summary AS
+SELECT
+    task,
+    tier,
+    model,
+    COUNT(*) AS calls,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) AS p50_latency_ms,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) AS p95_latency_ms,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY first_token_ms) AS p50_first_token_ms,
+    SUM(input_tokens) AS input_tokens,
+    SUM(output_tokens) AS output_tokens
+FROM model_usage
+GROUP BY task, tier, model;
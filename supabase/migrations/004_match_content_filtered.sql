@@ -0,0 +1,104 @@
+-- Index-friendly match_content
+--
+-- The original function filtered on similarity and platform in the same
+-- WHERE clause as the HNSW ordering. The index returns ef_search candidates
+-- before any filter runs, so platform-filtered queries came back short or
+-- fell back to a sequential scan. This version:
+--   * orders by distance inside a LIMITed subquery so the HNSW index drives it
+--   * over-fetches candidates and applies the threshold afterwards
+--   * uses a per-platform partial HNSW index when a platform filter is given
+--   * sets hnsw.ef_search per call, and hnsw.iterative_scan where supported
+
+-- ============================================================
+-- Per-platform partial HNSW indexes (1 = instagram, 2 = tiktok, 3 = youtube)
+-- ============================================================
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_instagram ON scraped_content
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 1;
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_tiktok ON scraped_content
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 2;
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_youtube ON scraped_content
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 3;
+
+-- ============================================================
+-- FUNCTION: match_content (vector similarity search)
+-- ============================================================
+DROP FUNCTION IF EXISTS match_content(VECTOR(1024), FLOAT, INT, INT);
+
+CREATE OR REPLACE FUNCTION match_content(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 10,
+    filter_platform_id INT DEFAULT NULL,
+    ef_search INT DEFAULT 100
+)
+RETURNS TABLE (
+    id UUID,
+    content_text TEXT,
+    source_url TEXT,
+    source_handle TEXT,
+    platform_id INT,
+    virality_score FLOAT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Over-fetch so the threshold filter still leaves match_count rows
+    candidate_count INT := GREATEST(match_count * 4, 40);
+    platform_clause TEXT := '';
+BEGIN
+    -- hnsw.ef_search caps how many candidates one index scan can return
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(ef_search, candidate_count), 1000)::TEXT,
+        true
+    );
+    -- pgvector >= 0.8 keeps scanning the graph until enough rows pass filters
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    -- Inline the platform id as a literal so the planner can match the
+    -- partial index predicate (a parameter never matches it)
+    IF filter_platform_id IS NOT NULL THEN
+        platform_clause := format('AND sc.platform_id = %s', filter_platform_id);
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            c.id,
+            c.content_text,
+            c.source_url,
+            c.source_handle,
+            c.platform_id,
+            c.virality_score,
+            1 - c.distance AS similarity
+        FROM (
+            SELECT
+                sc.id,
+                sc.content_text,
+                sc.source_url,
+                sc.source_handle,
+                sc.platform_id,
+                sc.virality_score,
+                sc.embedding <=> $1 AS distance
+            FROM scraped_content sc
+            WHERE sc.embedding IS NOT NULL %s
+            ORDER BY sc.embedding <=> $1
+            LIMIT $2
+        ) c
+        WHERE 1 - c.distance > $3
+        ORDER BY c.distance
+        LIMIT $4
+        $q$,
+        platform_clause
+    )
+    USING query_embedding, candidate_count, match_threshold, match_count;
+END;
+$$;
@@ -0,0 +1,90 @@
+-- match_content: return the fields the re-ranker needs
+--
+-- Adds posted_at (recency) to the result, and the stored embedding when
+-- include_embedding is true (for MMR diversity). Embeddings are large, so
+-- they are only returned on request.
+
+DROP FUNCTION IF EXISTS match_content(VECTOR(1024), FLOAT, INT, INT, INT);
+
+CREATE OR REPLACE FUNCTION match_content(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 10,
+    filter_platform_id INT DEFAULT NULL,
+    ef_search INT DEFAULT 100,
+    include_embedding BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (
+    id UUID,
+    content_text TEXT,
+    source_url TEXT,
+    source_handle TEXT,
+    platform_id INT,
+    virality_score FLOAT,
+    posted_at TIMESTAMPTZ,
+    similarity FLOAT,
+    embedding VECTOR(1024)
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Over-fetch so the threshold filter still leaves match_count rows
+    candidate_count INT := GREATEST(match_count * 4, 40);
+    platform_clause TEXT := '';
+BEGIN
+    -- hnsw.ef_search caps how many candidates one index scan can return
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(ef_search, candidate_count), 1000)::TEXT,
+        true
+    );
+    -- pgvector >= 0.8 keeps scanning the graph until enough rows pass filters
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    -- Inline the platform id as a literal so the planner can match the
+    -- partial index predicate (a parameter never matches it)
+    IF filter_platform_id IS NOT NULL THEN
+        platform_clause := format('AND sc.platform_id = %s', filter_platform_id);
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            c.id,
+            c.content_text,
+            c.source_url,
+            c.source_handle,
+            c.platform_id,
+            c.virality_score,
+            c.posted_at,
+            1 - c.distance AS similarity,
+            CASE WHEN $5 THEN c.embedding END AS embedding
+        FROM (
+            SELECT
+                sc.id,
+                sc.content_text,
+                sc.source_url,
+                sc.source_handle,
+                sc.platform_id,
+                sc.virality_score,
+                sc.posted_at,
+                sc.embedding,
+                sc.embedding <=> $1 AS distance
+            FROM scraped_content sc
+            WHERE sc.embedding IS NOT NULL %s
+            ORDER BY sc.embedding <=> $1
+            LIMIT $2
+        ) c
+        WHERE 1 - c.distance > $3
+        ORDER BY c.distance
+        LIMIT $4
+        $q$,
+        platform_clause
+    )
+    USING query_embedding, candidate_count, match_threshold, match_count, include_embedding;
+END;
+$$;
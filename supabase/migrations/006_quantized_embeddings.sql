@@ -0,0 +1,177 @@
+-- Reduced-dimension and quantized index columns for scraped_content
+--
+-- voyage-3.5 embeddings are Matryoshka-trained: the first N dimensions,
+-- re-normalized, are a usable lower-dimension embedding. Two compact
+-- representations are indexed alongside the full VECTOR(1024):
+--   * embedding_half: first 256 dims as halfvec (1/8 the size of the full vector)
+--   * binary_quantize(embedding): 1 bit per dim, Hamming distance (1/32 the size)
+-- match_content_quantized finds candidates on one of these indexes and
+-- re-ranks them exactly on the full vectors.
+--
+-- Requires pgvector >= 0.7 (halfvec, subvector, l2_normalize, binary_quantize).
+-- Existing rows are filled by tools/backfill_quantized_embeddings.py.
+
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS embedding_half HALFVEC(256);
+
+CREATE OR REPLACE FUNCTION embedding_to_half(v VECTOR)
+RETURNS HALFVEC(256)
+LANGUAGE sql
+IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT l2_normalize(subvector(v, 1, 256))::HALFVEC(256);
+$$;
+
+-- Keep embedding_half in step with embedding on every write
+CREATE OR REPLACE FUNCTION sync_embedding_half()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.embedding_half = CASE
+        WHEN NEW.embedding IS NULL THEN NULL
+        ELSE embedding_to_half(NEW.embedding)
+    END;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_scraped_content_embedding_half ON scraped_content;
+CREATE TRIGGER sync_scraped_content_embedding_half
+    BEFORE INSERT OR UPDATE OF embedding ON scraped_content
+    FOR EACH ROW EXECUTE FUNCTION sync_embedding_half();
+
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_half ON scraped_content
+    USING hnsw (embedding_half halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_binary ON scraped_content
+    USING hnsw ((binary_quantize(embedding)::BIT(1024)) bit_hamming_ops) WITH (m = 16, ef_construction = 64);
+
+-- Once VECTOR_SEARCH_MODE=half or binary is validated (see --measure-recall),
+-- the full-precision indexes can be dropped to reclaim their memory:
+--   DROP INDEX idx_scraped_content_embedding;
+--   DROP INDEX idx_scraped_content_embedding_instagram;
+--   DROP INDEX idx_scraped_content_embedding_tiktok;
+--   DROP INDEX idx_scraped_content_embedding_youtube;
+
+-- ============================================================
+-- FUNCTION: backfill_embedding_half (batched, for the backfill tool)
+-- ============================================================
+CREATE OR REPLACE FUNCTION backfill_embedding_half(batch_size INT DEFAULT 1000)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    UPDATE scraped_content sc
+    SET embedding_half = embedding_to_half(sc.embedding)
+    WHERE sc.id IN (
+        SELECT id FROM scraped_content
+        WHERE embedding IS NOT NULL AND embedding_half IS NULL
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    );
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: match_content_quantized
+-- Same signature and result as match_content, plus the quantization to use
+-- for candidate search ('half' or 'binary').
+-- ============================================================
+CREATE OR REPLACE FUNCTION match_content_quantized(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 10,
+    filter_platform_id INT DEFAULT NULL,
+    ef_search INT DEFAULT 100,
+    include_embedding BOOLEAN DEFAULT FALSE,
+    quantization TEXT DEFAULT 'half'
+)
+RETURNS TABLE (
+    id UUID,
+    content_text TEXT,
+    source_url TEXT,
+    source_handle TEXT,
+    platform_id INT,
+    virality_score FLOAT,
+    posted_at TIMESTAMPTZ,
+    similarity FLOAT,
+    embedding VECTOR(1024)
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Binary distances are coarse, so fetch more candidates to re-rank
+    candidate_count INT := CASE
+        WHEN quantization = 'binary' THEN GREATEST(match_count * 10, 100)
+        ELSE GREATEST(match_count * 4, 40)
+    END;
+    candidate_column TEXT;
+    candidate_order TEXT;
+    platform_clause TEXT := '';
+BEGIN
+    IF quantization = 'half' THEN
+        candidate_column := 'embedding_half';
+        candidate_order := 'sc.embedding_half <=> embedding_to_half($1)';
+    ELSIF quantization = 'binary' THEN
+        candidate_column := 'embedding';
+        candidate_order := 'binary_quantize(sc.embedding)::BIT(1024) <~> binary_quantize($1)';
+    ELSE
+        RAISE EXCEPTION 'Unknown quantization: %', quantization;
+    END IF;
+
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(ef_search, candidate_count), 1000)::TEXT,
+        true
+    );
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    IF filter_platform_id IS NOT NULL THEN
+        platform_clause := format('AND sc.platform_id = %s', filter_platform_id);
+    END IF;
+
+    -- Candidates from the compact index, exact cosine re-rank on the full vector
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            c.id,
+            c.content_text,
+            c.source_url,
+            c.source_handle,
+            c.platform_id,
+            c.virality_score,
+            c.posted_at,
+            1 - c.distance AS similarity,
+            CASE WHEN $5 THEN c.embedding END AS embedding
+        FROM (
+            SELECT
+                sc.id,
+                sc.content_text,
+                sc.source_url,
+                sc.source_handle,
+                sc.platform_id,
+                sc.virality_score,
+                sc.posted_at,
+                sc.embedding,
+                sc.embedding <=> $1 AS distance
+            FROM scraped_content sc
+            WHERE sc.%I IS NOT NULL %s
+            ORDER BY %s
+            LIMIT $2
+        ) c
+        WHERE 1 - c.distance > $3
+        ORDER BY c.distance
+        LIMIT $4
+        $q$,
+        candidate_column,
+        platform_clause,
+        candidate_order
+    )
+    USING query_embedding, candidate_count, match_threshold, match_count, include_embedding;
+END;
+$$;
@@ -0,0 +1,65 @@
+-- Near-duplicate tracking for scraped_content
+--
+-- simhash: 64-bit SimHash of the normalized caption (tools/dedup.py)
+-- duplicate_of: the cluster representative this row duplicates (NULL for
+--   representatives and unique rows)
+--
+-- Duplicates keep no embedding, so they never enter the HNSW indexes or the
+-- match_content results, and the embedding backfill skips them.
+
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS simhash BIGINT;
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS duplicate_of UUID
+    REFERENCES scraped_content(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_scraped_content_duplicate_of ON scraped_content(duplicate_of)
+    WHERE duplicate_of IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_scraped_content_source_url ON scraped_content(source_url);
+
+-- Two hashes within 3 bits of each other agree exactly on at least one of
+-- the four 16-bit bands, so these indexes find every candidate
+CREATE INDEX IF NOT EXISTS idx_scraped_content_simhash_b0 ON scraped_content(platform_id, ((simhash >> 48) & 65535));
+CREATE INDEX IF NOT EXISTS idx_scraped_content_simhash_b1 ON scraped_content(platform_id, ((simhash >> 32) & 65535));
+CREATE INDEX IF NOT EXISTS idx_scraped_content_simhash_b2 ON scraped_content(platform_id, ((simhash >> 16) & 65535));
+CREATE INDEX IF NOT EXISTS idx_scraped_content_simhash_b3 ON scraped_content(platform_id, (simhash & 65535));
+
+-- ============================================================
+-- FUNCTION: find_simhash_matches
+-- Existing rows on a platform within max_distance bits of any given hash.
+-- ============================================================
+CREATE OR REPLACE FUNCTION find_simhash_matches(
+    hashes BIGINT[],
+    filter_platform_id INT,
+    max_distance INT DEFAULT 3
+)
+RETURNS TABLE (
+    query_hash BIGINT,
+    id UUID,
+    duplicate_of UUID,
+    virality_score FLOAT,
+    distance INT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT DISTINCT ON (q.h, sc.id)
+        q.h AS query_hash,
+        sc.id,
+        sc.duplicate_of,
+        sc.virality_score,
+        bit_count((sc.simhash # q.h)::BIT(64))::INT AS distance
+    FROM unnest(hashes) AS q(h)
+    CROSS JOIN LATERAL (
+        SELECT s.id, s.duplicate_of, s.virality_score, s.simhash FROM scraped_content s
+        WHERE s.platform_id = filter_platform_id AND ((s.simhash >> 48) & 65535) = ((q.h >> 48) & 65535)
+        UNION ALL
+        SELECT s.id, s.duplicate_of, s.virality_score, s.simhash FROM scraped_content s
+        WHERE s.platform_id = filter_platform_id AND ((s.simhash >> 32) & 65535) = ((q.h >> 32) & 65535)
+        UNION ALL
+        SELECT s.id, s.duplicate_of, s.virality_score, s.simhash FROM scraped_content s
+        WHERE s.platform_id = filter_platform_id AND ((s.simhash >> 16) & 65535) = ((q.h >> 16) & 65535)
+        UNION ALL
+        SELECT s.id, s.duplicate_of, s.virality_score, s.simhash FROM scraped_content s
+        WHERE s.platform_id = filter_platform_id AND (s.simhash & 65535) = (q.h & 65535)
+    ) sc
+    WHERE bit_count((sc.simhash # q.h)::BIT(64)) <= max_distance;
+$$;
@@ -0,0 +1,34 @@
+-- Resumable bulk embedding backfill
+--
+-- backfill_checkpoints: one row per backfill, recording the last processed
+--   id so an interrupted run (crash, function timeout) resumes after it
+-- bulk_set_embeddings: writes a page of embeddings in one statement instead
+--   of one UPDATE per row
+
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    name TEXT PRIMARY KEY,
+    last_id UUID,
+    processed INTEGER DEFAULT 0,
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE OR REPLACE FUNCTION bulk_set_embeddings(
+    ids UUID[],
+    embeddings TEXT[]
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    UPDATE scraped_content sc
+    SET embedding = v.embedding::VECTOR(1024)
+    FROM unnest(ids, embeddings) AS v(id, embedding)
+    WHERE sc.id = v.id;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
@@ -0,0 +1,214 @@
+-- Durable embedding work queue
+--
+-- embedding_jobs: one row per (table, row) that still needs an embedding.
+--   Request handlers and scrapers enqueue; tools/embedding_worker.py claims
+--   batches, embeds them and deletes the finished jobs. Failed jobs are
+--   retried with exponential backoff until max_attempts, then kept as
+--   'failed' for inspection.
+-- claim_embedding_jobs: hands out ready jobs, highest priority first, with
+--   FOR UPDATE SKIP LOCKED so several workers never claim the same job
+-- fail_embedding_jobs: reschedules (or gives up on) a set of jobs
+-- enqueue_missing_embeddings: sweep that queues every row still missing an
+--   embedding, so nothing is left behind by a handler that failed to enqueue
+-- bulk_set_embeddings: now writes to any of the vector-bearing tables
+
+CREATE TABLE IF NOT EXISTS embedding_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL CHECK (table_name IN ('scraped_content', 'content_feedback', 'brand_voice_profiles')),
+    row_id UUID NOT NULL,
+    priority INT NOT NULL DEFAULT 100,          -- Higher runs first
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_jobs_row ON embedding_jobs(table_name, row_id);
+CREATE INDEX IF NOT EXISTS idx_embedding_jobs_ready ON embedding_jobs(priority DESC, run_after)
+    WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_embedding_jobs_running ON embedding_jobs(locked_at)
+    WHERE status = 'running';
+
+-- ============================================================
+-- FUNCTION: enqueue_embedding_jobs
+-- Queue rows of one table. Re-queuing a pending row only raises its priority.
+-- ============================================================
+CREATE OR REPLACE FUNCTION enqueue_embedding_jobs(
+    target_table TEXT,
+    ids UUID[],
+    job_priority INT DEFAULT 100
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    queued INT;
+BEGIN
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT target_table, v.id, job_priority
+    FROM unnest(ids) AS v(id)
+    ON CONFLICT (table_name, row_id) DO UPDATE
+        SET priority = GREATEST(embedding_jobs.priority, EXCLUDED.priority),
+            updated_at = NOW()
+        WHERE embedding_jobs.status = 'pending';
+    GET DIAGNOSTICS queued = ROW_COUNT;
+    RETURN queued;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: claim_embedding_jobs
+-- Ready jobs (and jobs whose worker died mid-batch), highest priority first.
+-- ============================================================
+CREATE OR REPLACE FUNCTION claim_embedding_jobs(
+    batch_size INT DEFAULT 100,
+    lock_timeout_seconds INT DEFAULT 300
+)
+RETURNS SETOF embedding_jobs
+LANGUAGE sql
+AS $$
+    UPDATE embedding_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_at = NOW(),
+        updated_at = NOW()
+    WHERE j.id IN (
+        SELECT id FROM embedding_jobs
+        WHERE (status = 'pending' AND run_after <= NOW())
+           OR (status = 'running' AND locked_at < NOW() - make_interval(secs => lock_timeout_seconds))
+        ORDER BY priority DESC, run_after
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$;
+
+-- ============================================================
+-- FUNCTION: fail_embedding_jobs
+-- Retry after 30s, 1m, 2m, ... (capped at 1h); give up after max_attempts.
+-- ============================================================
+CREATE OR REPLACE FUNCTION fail_embedding_jobs(
+    job_ids BIGINT[],
+    error_message TEXT
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    UPDATE embedding_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+        run_after = NOW() + LEAST(INTERVAL '30 seconds' * power(2, GREATEST(attempts - 1, 0)), INTERVAL '1 hour'),
+        locked_at = NULL,
+        last_error = left(error_message, 1000),
+        updated_at = NOW()
+    WHERE id = ANY(job_ids);
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: enqueue_missing_embeddings
+-- Queue rows without an embedding that have no job yet (failed jobs stay
+-- failed until reset). Returns the number of jobs created.
+-- ============================================================
+CREATE OR REPLACE FUNCTION enqueue_missing_embeddings(
+    max_rows_per_table INT DEFAULT 10000,
+    job_priority INT DEFAULT 0
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    queued INT := 0;
+    n INT;
+BEGIN
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'scraped_content', sc.id, job_priority
+    FROM scraped_content sc
+    WHERE sc.embedding IS NULL
+      AND sc.duplicate_of IS NULL
+      AND COALESCE(sc.content_text, '') <> ''
+      AND NOT EXISTS (
+          SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'scraped_content' AND j.row_id = sc.id
+      )
+    LIMIT max_rows_per_table
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'content_feedback', cf.id, job_priority
+    FROM content_feedback cf
+    WHERE cf.embedding IS NULL
+      AND COALESCE(cf.assistant_message, '') <> ''
+      AND NOT EXISTS (
+          SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'content_feedback' AND j.row_id = cf.id
+      )
+    LIMIT max_rows_per_table
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'brand_voice_profiles', bv.id, job_priority
+    FROM brand_voice_profiles bv
+    WHERE bv.analysis_embedding IS NULL
+      AND COALESCE(bv.analysis_text, '') <> ''
+      AND NOT EXISTS (
+          SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'brand_voice_profiles' AND j.row_id = bv.id
+      )
+    LIMIT max_rows_per_table
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    RETURN queued;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: bulk_set_embeddings
+-- Replaces the scraped_content-only version from 008.
+-- ============================================================
+DROP FUNCTION IF EXISTS bulk_set_embeddings(UUID[], TEXT[]);
+
+CREATE OR REPLACE FUNCTION bulk_set_embeddings(
+    ids UUID[],
+    embeddings TEXT[],
+    target_table TEXT DEFAULT 'scraped_content'
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    IF target_table = 'scraped_content' THEN
+        UPDATE scraped_content t
+        SET embedding = v.embedding::VECTOR(1024)
+        FROM unnest(ids, embeddings) AS v(id, embedding)
+        WHERE t.id = v.id;
+    ELSIF target_table = 'content_feedback' THEN
+        UPDATE content_feedback t
+        SET embedding = v.embedding::VECTOR(1024)
+        FROM unnest(ids, embeddings) AS v(id, embedding)
+        WHERE t.id = v.id;
+    ELSIF target_table = 'brand_voice_profiles' THEN
+        UPDATE brand_voice_profiles t
+        SET analysis_embedding = v.embedding::VECTOR(1024)
+        FROM unnest(ids, embeddings) AS v(id, embedding)
+        WHERE t.id = v.id;
+    ELSE
+        RAISE EXCEPTION 'Unknown embedding table: %', target_table;
+    END IF;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
@@ -0,0 +1,622 @@
+-- Embedding model versioning and shadow re-embedding
+--
+-- Every stored vector now records the model that produced it. scraped_content
+-- gets a second vector column, embedding_shadow, with its own HNSW indexes.
+-- embedding_config (one row) says which of the two columns is live and which
+-- model each holds:
+--   active_column / active_model   what match_content searches
+--   shadow_model                   what the other column holds (or is being
+--                                  filled with by tools/reembed.py)
+-- Upgrading the model: tools/reembed.py --start sets shadow_model, fills the
+-- standby column in throttled batches, then --promote swaps the two columns
+-- in one UPDATE of embedding_config. The old vectors stay in the standby
+-- column, so queries embedded with the old model keep working (and a
+-- rollback is another promote).
+--
+-- match_content and match_feedback take query_model and only compare a query
+-- against vectors from the same model. match_content_quantized falls back to
+-- match_content while the shadow column is live, because embedding_half and
+-- the binary index are derived from the embedding column.
+
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS embedding_shadow VECTOR(1024);
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS embedding_shadow_model TEXT;
+ALTER TABLE content_feedback ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE brand_voice_profiles ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+
+-- Everything embedded so far came from voyage-3.5
+UPDATE scraped_content SET embedding_model = 'voyage-3.5'
+    WHERE embedding IS NOT NULL AND embedding_model IS NULL;
+UPDATE content_feedback SET embedding_model = 'voyage-3.5'
+    WHERE embedding IS NOT NULL AND embedding_model IS NULL;
+UPDATE brand_voice_profiles SET embedding_model = 'voyage-3.5'
+    WHERE analysis_embedding IS NOT NULL AND embedding_model IS NULL;
+
+-- Same index layout as the embedding column (001, 004)
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_shadow ON scraped_content
+    USING hnsw (embedding_shadow vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_shadow_instagram ON scraped_content
+    USING hnsw (embedding_shadow vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 1;
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_shadow_tiktok ON scraped_content
+    USING hnsw (embedding_shadow vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 2;
+CREATE INDEX IF NOT EXISTS idx_scraped_content_embedding_shadow_youtube ON scraped_content
+    USING hnsw (embedding_shadow vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    WHERE platform_id = 3;
+
+CREATE TABLE IF NOT EXISTS embedding_config (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    active_column TEXT NOT NULL DEFAULT 'embedding' CHECK (active_column IN ('embedding', 'embedding_shadow')),
+    active_model TEXT NOT NULL,
+    shadow_model TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+INSERT INTO embedding_config (active_column, active_model)
+VALUES ('embedding', 'voyage-3.5')
+ON CONFLICT (id) DO NOTHING;
+
+-- ============================================================
+-- FUNCTION: embedding_column_for_model
+-- The scraped_content vector column holding the given model's vectors
+-- (NULL when neither does).
+-- ============================================================
+CREATE OR REPLACE FUNCTION embedding_column_for_model(model TEXT)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT CASE
+        WHEN model = c.active_model THEN c.active_column
+        WHEN model = c.shadow_model THEN
+            CASE WHEN c.active_column = 'embedding' THEN 'embedding_shadow' ELSE 'embedding' END
+    END
+    FROM embedding_config c;
+$$;
+
+-- ============================================================
+-- FUNCTION: match_content
+-- Adds query_model (default: the active model). Only rows whose vector in
+-- that model's column came from that model are compared.
+-- ============================================================
+DROP FUNCTION IF EXISTS match_content(VECTOR(1024), FLOAT, INT, INT, INT, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION match_content(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 10,
+    filter_platform_id INT DEFAULT NULL,
+    ef_search INT DEFAULT 100,
+    include_embedding BOOLEAN DEFAULT FALSE,
+    query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    content_text TEXT,
+    source_url TEXT,
+    source_handle TEXT,
+    platform_id INT,
+    virality_score FLOAT,
+    posted_at TIMESTAMPTZ,
+    similarity FLOAT,
+    embedding VECTOR(1024)
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Over-fetch so the threshold filter still leaves match_count rows
+    candidate_count INT := GREATEST(match_count * 4, 40);
+    platform_clause TEXT := '';
+    model TEXT := query_model;
+    vector_column TEXT;
+BEGIN
+    IF model IS NULL THEN
+        SELECT active_model INTO model FROM embedding_config;
+    END IF;
+    vector_column := embedding_column_for_model(model);
+    IF vector_column IS NULL THEN
+        RAISE EXCEPTION 'No stored embeddings for model %', model;
+    END IF;
+
+    -- hnsw.ef_search caps how many candidates one index scan can return
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(ef_search, candidate_count), 1000)::TEXT,
+        true
+    );
+    -- pgvector >= 0.8 keeps scanning the graph until enough rows pass filters
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    -- Inline the platform id as a literal so the planner can match the
+    -- partial index predicate (a parameter never matches it)
+    IF filter_platform_id IS NOT NULL THEN
+        platform_clause := format('AND sc.platform_id = %s', filter_platform_id);
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            c.id,
+            c.content_text,
+            c.source_url,
+            c.source_handle,
+            c.platform_id,
+            c.virality_score,
+            c.posted_at,
+            1 - c.distance AS similarity,
+            CASE WHEN $5 THEN c.embedding END AS embedding
+        FROM (
+            SELECT
+                sc.id,
+                sc.content_text,
+                sc.source_url,
+                sc.source_handle,
+                sc.platform_id,
+                sc.virality_score,
+                sc.posted_at,
+                sc.%1$I AS embedding,
+                sc.%1$I <=> $1 AS distance
+            FROM scraped_content sc
+            WHERE sc.%1$I IS NOT NULL AND sc.%2$I = $6 %3$s
+            ORDER BY sc.%1$I <=> $1
+            LIMIT $2
+        ) c
+        WHERE 1 - c.distance > $3
+        ORDER BY c.distance
+        LIMIT $4
+        $q$,
+        vector_column,
+        vector_column || '_model',
+        platform_clause
+    )
+    USING query_embedding, candidate_count, match_threshold, match_count, include_embedding, model;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: match_content_quantized
+-- Adds query_model. The compact indexes are built from the embedding
+-- column only, so queries for the model in embedding_shadow go to
+-- match_content.
+-- ============================================================
+DROP FUNCTION IF EXISTS match_content_quantized(VECTOR(1024), FLOAT, INT, INT, INT, BOOLEAN, TEXT);
+
+CREATE OR REPLACE FUNCTION match_content_quantized(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 10,
+    filter_platform_id INT DEFAULT NULL,
+    ef_search INT DEFAULT 100,
+    include_embedding BOOLEAN DEFAULT FALSE,
+    quantization TEXT DEFAULT 'half',
+    query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    content_text TEXT,
+    source_url TEXT,
+    source_handle TEXT,
+    platform_id INT,
+    virality_score FLOAT,
+    posted_at TIMESTAMPTZ,
+    similarity FLOAT,
+    embedding VECTOR(1024)
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    -- Binary distances are coarse, so fetch more candidates to re-rank
+    candidate_count INT := CASE
+        WHEN quantization = 'binary' THEN GREATEST(match_count * 10, 100)
+        ELSE GREATEST(match_count * 4, 40)
+    END;
+    candidate_column TEXT;
+    candidate_order TEXT;
+    platform_clause TEXT := '';
+    model TEXT := query_model;
+BEGIN
+    IF model IS NULL THEN
+        SELECT active_model INTO model FROM embedding_config;
+    END IF;
+    IF embedding_column_for_model(model) IS DISTINCT FROM 'embedding' THEN
+        RETURN QUERY SELECT * FROM match_content(
+            query_embedding, match_threshold, match_count, filter_platform_id,
+            ef_search, include_embedding, model
+        );
+        RETURN;
+    END IF;
+
+    IF quantization = 'half' THEN
+        candidate_column := 'embedding_half';
+        candidate_order := 'sc.embedding_half <=> embedding_to_half($1)';
+    ELSIF quantization = 'binary' THEN
+        candidate_column := 'embedding';
+        candidate_order := 'binary_quantize(sc.embedding)::BIT(1024) <~> binary_quantize($1)';
+    ELSE
+        RAISE EXCEPTION 'Unknown quantization: %', quantization;
+    END IF;
+
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(ef_search, candidate_count), 1000)::TEXT,
+        true
+    );
+    BEGIN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END;
+
+    IF filter_platform_id IS NOT NULL THEN
+        platform_clause := format('AND sc.platform_id = %s', filter_platform_id);
+    END IF;
+
+    -- Candidates from the compact index, exact cosine re-rank on the full vector
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            c.id,
+            c.content_text,
+            c.source_url,
+            c.source_handle,
+            c.platform_id,
+            c.virality_score,
+            c.posted_at,
+            1 - c.distance AS similarity,
+            CASE WHEN $5 THEN c.embedding END AS embedding
+        FROM (
+            SELECT
+                sc.id,
+                sc.content_text,
+                sc.source_url,
+                sc.source_handle,
+                sc.platform_id,
+                sc.virality_score,
+                sc.posted_at,
+                sc.embedding,
+                sc.embedding <=> $1 AS distance
+            FROM scraped_content sc
+            WHERE sc.%I IS NOT NULL AND sc.embedding_model = $6 %s
+            ORDER BY %s
+            LIMIT $2
+        ) c
+        WHERE 1 - c.distance > $3
+        ORDER BY c.distance
+        LIMIT $4
+        $q$,
+        candidate_column,
+        platform_clause,
+        candidate_order
+    )
+    USING query_embedding, candidate_count, match_threshold, match_count, include_embedding, model;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: match_feedback
+-- Adds query_model; feedback is re-embedded in place after a promote, and
+-- rows still on the old model are skipped until then.
+-- ============================================================
+DROP FUNCTION IF EXISTS match_feedback(VECTOR(1024), FLOAT, INT, TEXT, TEXT);
+
+CREATE OR REPLACE FUNCTION match_feedback(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INT DEFAULT 5,
+    filter_rating TEXT DEFAULT NULL,
+    filter_content_type TEXT DEFAULT NULL,
+    query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    content_type TEXT,
+    platform TEXT,
+    user_message TEXT,
+    assistant_message TEXT,
+    rating TEXT,
+    feedback_note TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        cf.id,
+        cf.content_type,
+        cf.platform,
+        cf.user_message,
+        cf.assistant_message,
+        cf.rating,
+        cf.feedback_note,
+        1 - (cf.embedding <=> query_embedding) AS similarity
+    FROM content_feedback cf
+    WHERE
+        cf.embedding IS NOT NULL
+        AND cf.embedding_model = COALESCE(query_model, (SELECT active_model FROM embedding_config))
+        AND 1 - (cf.embedding <=> query_embedding) > match_threshold
+        AND (filter_rating IS NULL OR cf.rating = filter_rating)
+        AND (filter_content_type IS NULL OR cf.content_type = filter_content_type)
+    ORDER BY cf.embedding <=> query_embedding
+    LIMIT match_count;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: bulk_set_embeddings
+-- Adds model (default: the active model). scraped_content vectors go to
+-- the column that holds that model; the other tables record it per row.
+-- ============================================================
+DROP FUNCTION IF EXISTS bulk_set_embeddings(UUID[], TEXT[], TEXT);
+
+CREATE OR REPLACE FUNCTION bulk_set_embeddings(
+    ids UUID[],
+    embeddings TEXT[],
+    target_table TEXT DEFAULT 'scraped_content',
+    model TEXT DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+    vector_column TEXT;
+BEGIN
+    IF model IS NULL THEN
+        SELECT active_model INTO model FROM embedding_config;
+    END IF;
+
+    IF target_table = 'scraped_content' THEN
+        vector_column := embedding_column_for_model(model);
+        IF vector_column IS NULL THEN
+            RAISE EXCEPTION 'No embedding column holds model %', model;
+        END IF;
+        EXECUTE format(
+            $q$
+            UPDATE scraped_content t
+            SET %1$I = v.embedding::VECTOR(1024), %2$I = $3
+            FROM unnest($1, $2) AS v(id, embedding)
+            WHERE t.id = v.id
+            $q$,
+            vector_column,
+            vector_column || '_model'
+        )
+        USING ids, embeddings, model;
+    ELSIF target_table = 'content_feedback' THEN
+        UPDATE content_feedback t
+        SET embedding = v.embedding::VECTOR(1024), embedding_model = model
+        FROM unnest(ids, embeddings) AS v(id, embedding)
+        WHERE t.id = v.id;
+    ELSIF target_table = 'brand_voice_profiles' THEN
+        UPDATE brand_voice_profiles t
+        SET analysis_embedding = v.embedding::VECTOR(1024), embedding_model = model
+        FROM unnest(ids, embeddings) AS v(id, embedding)
+        WHERE t.id = v.id;
+    ELSE
+        RAISE EXCEPTION 'Unknown embedding table: %', target_table;
+    END IF;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: enqueue_missing_embeddings
+-- Same sweep as 009, on whichever column is live. Also queues rows whose
+-- live vector is from another model (left behind by a partial promote).
+-- ============================================================
+CREATE OR REPLACE FUNCTION enqueue_missing_embeddings(
+    max_rows_per_table INT DEFAULT 10000,
+    job_priority INT DEFAULT 0
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    queued INT := 0;
+    n INT;
+    live_column TEXT;
+    live_model TEXT;
+BEGIN
+    SELECT active_column, active_model INTO live_column, live_model FROM embedding_config;
+
+    EXECUTE format(
+        $q$
+        INSERT INTO embedding_jobs (table_name, row_id, priority)
+        SELECT 'scraped_content', sc.id, $1
+        FROM scraped_content sc
+        WHERE sc.%I IS DISTINCT FROM $3
+          AND sc.duplicate_of IS NULL
+          AND COALESCE(sc.content_text, '') <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'scraped_content' AND j.row_id = sc.id
+          )
+        LIMIT $2
+        ON CONFLICT (table_name, row_id) DO NOTHING
+        $q$,
+        live_column || '_model'
+    )
+    USING job_priority, max_rows_per_table, live_model;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'content_feedback', cf.id, job_priority
+    FROM content_feedback cf
+    WHERE cf.embedding IS NULL
+      AND COALESCE(cf.assistant_message, '') <> ''
+      AND NOT EXISTS (
+          SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'content_feedback' AND j.row_id = cf.id
+      )
+    LIMIT max_rows_per_table
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'brand_voice_profiles', bv.id, job_priority
+    FROM brand_voice_profiles bv
+    WHERE bv.analysis_embedding IS NULL
+      AND COALESCE(bv.analysis_text, '') <> ''
+      AND NOT EXISTS (
+          SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'brand_voice_profiles' AND j.row_id = bv.id
+      )
+    LIMIT max_rows_per_table
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    RETURN queued;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: start_shadow_embedding
+-- Point the standby column at a new model; tools/reembed.py fills it.
+-- ============================================================
+CREATE OR REPLACE FUNCTION start_shadow_embedding(model TEXT)
+RETURNS embedding_config
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    config embedding_config;
+BEGIN
+    UPDATE embedding_config
+    SET shadow_model = model, updated_at = NOW()
+    WHERE active_model <> model
+    RETURNING * INTO config;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION '% is already the active model', model;
+    END IF;
+    RETURN config;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: reembed_candidates
+-- Next page (by id) of rows whose standby vector is not from the shadow model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION reembed_candidates(
+    after_id UUID DEFAULT NULL,
+    batch_size INT DEFAULT 500
+)
+RETURNS TABLE (id UUID, content_text TEXT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    config embedding_config;
+    standby_column TEXT;
+BEGIN
+    SELECT * INTO config FROM embedding_config;
+    IF config.shadow_model IS NULL THEN
+        RAISE EXCEPTION 'No shadow model set; run start_shadow_embedding first';
+    END IF;
+    standby_column := CASE WHEN config.active_column = 'embedding' THEN 'embedding_shadow' ELSE 'embedding' END;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT sc.id, sc.content_text
+        FROM scraped_content sc
+        WHERE sc.duplicate_of IS NULL
+          AND COALESCE(sc.content_text, '') <> ''
+          AND sc.%I IS DISTINCT FROM $1
+          AND ($2::UUID IS NULL OR sc.id > $2)
+        ORDER BY sc.id
+        LIMIT $3
+        $q$,
+        standby_column || '_model'
+    )
+    USING config.shadow_model, after_id, batch_size;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: embedding_coverage
+-- Rows to embed, and how many have a vector from each configured model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION embedding_coverage()
+RETURNS TABLE (
+    active_column TEXT,
+    active_model TEXT,
+    shadow_model TEXT,
+    total_rows BIGINT,
+    active_rows BIGINT,
+    shadow_rows BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        c.active_column,
+        c.active_model,
+        c.shadow_model,
+        COUNT(sc.id),
+        COUNT(sc.id) FILTER (WHERE
+            (CASE WHEN c.active_column = 'embedding' THEN sc.embedding_model ELSE sc.embedding_shadow_model END)
+            = c.active_model),
+        COUNT(sc.id) FILTER (WHERE
+            (CASE WHEN c.active_column = 'embedding' THEN sc.embedding_shadow_model ELSE sc.embedding_model END)
+            = c.shadow_model)
+    FROM embedding_config c
+    LEFT JOIN scraped_content sc
+        ON sc.duplicate_of IS NULL AND COALESCE(sc.content_text, '') <> ''
+    GROUP BY c.active_column, c.active_model, c.shadow_model;
+$$;
+
+-- ============================================================
+-- FUNCTION: promote_shadow_embeddings
+-- Swap the live and standby columns once the shadow covers at least
+-- min_coverage of the rows. Feedback and brand voice rows are queued to be
+-- re-embedded in place with the new model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION promote_shadow_embeddings(min_coverage FLOAT DEFAULT 1.0)
+RETURNS embedding_config
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    config embedding_config;
+    coverage RECORD;
+BEGIN
+    -- Lock the config row so concurrent promotes serialize
+    SELECT * INTO config FROM embedding_config FOR UPDATE;
+    IF config.shadow_model IS NULL THEN
+        RAISE EXCEPTION 'No shadow model to promote';
+    END IF;
+
+    SELECT * INTO coverage FROM embedding_coverage();
+    IF coverage.total_rows > 0 AND coverage.shadow_rows::FLOAT / coverage.total_rows < min_coverage THEN
+        RAISE EXCEPTION 'Shadow embeddings cover % of % rows, below %',
+            coverage.shadow_rows, coverage.total_rows, min_coverage;
+    END IF;
+
+    UPDATE embedding_config
+    SET active_column = CASE WHEN config.active_column = 'embedding' THEN 'embedding_shadow' ELSE 'embedding' END,
+        active_model = config.shadow_model,
+        shadow_model = config.active_model,
+        updated_at = NOW()
+    WHERE id
+    RETURNING * INTO config;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'content_feedback', cf.id, 50
+    FROM content_feedback cf
+    WHERE cf.embedding_model IS DISTINCT FROM config.active_model
+      AND COALESCE(cf.assistant_message, '') <> ''
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+
+    INSERT INTO embedding_jobs (table_name, row_id, priority)
+    SELECT 'brand_voice_profiles', bv.id, 50
+    FROM brand_voice_profiles bv
+    WHERE bv.embedding_model IS DISTINCT FROM config.active_model
+      AND COALESCE(bv.analysis_text, '') <> ''
+    ON CONFLICT (table_name, row_id) DO NOTHING;
+
+    RETURN config;
+END;
+$$;
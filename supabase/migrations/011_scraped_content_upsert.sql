@@ -0,0 +1,94 @@
+-- Bulk upsert ingestion for scraped_content
+--
+-- (platform_id, source_url) becomes unique, so the same post is never stored
+-- twice across scrape jobs. Existing repeats are folded into one row first.
+-- upsert_scraped_content: writes a whole chunk of transformed posts in one
+--   statement (tools/ingest.py). A post that is already stored keeps its id,
+--   text, SimHash and embedding; only its engagement counts, virality score
+--   and raw_data are refreshed.
+
+-- Empty URLs mean "unknown"; NULLs never conflict with each other
+UPDATE scraped_content SET source_url = NULL WHERE source_url = '';
+
+-- Keep one row per (platform_id, source_url): a representative over a
+-- duplicate, then an embedded row, then the oldest
+CREATE TEMP TABLE scraped_url_repeats AS
+SELECT id, keep_id
+FROM (
+    SELECT
+        id,
+        first_value(id) OVER (
+            PARTITION BY platform_id, source_url
+            ORDER BY duplicate_of IS NULL DESC, embedding IS NOT NULL DESC, created_at, id
+        ) AS keep_id
+    FROM scraped_content
+    WHERE source_url IS NOT NULL
+) ranked
+WHERE id <> keep_id;
+
+UPDATE scraped_content sc
+SET duplicate_of = NULLIF(r.keep_id, sc.id)
+FROM scraped_url_repeats r
+WHERE sc.duplicate_of = r.id;
+
+DELETE FROM embedding_jobs j
+USING scraped_url_repeats r
+WHERE j.table_name = 'scraped_content' AND j.row_id = r.id;
+
+DELETE FROM scraped_content sc
+USING scraped_url_repeats r
+WHERE sc.id = r.id;
+
+DROP TABLE scraped_url_repeats;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scraped_content_platform_source_url
+    ON scraped_content(platform_id, source_url);
+
+-- ============================================================
+-- FUNCTION: upsert_scraped_content
+-- Insert a JSON array of scraped_content rows; on (platform_id, source_url)
+-- conflict refresh the engagement fields. Returns one row per input row
+-- written, with inserted = FALSE for refreshed rows.
+-- ============================================================
+CREATE OR REPLACE FUNCTION upsert_scraped_content(content_rows JSONB)
+RETURNS TABLE (
+    id UUID,
+    source_url TEXT,
+    inserted BOOLEAN
+)
+LANGUAGE sql
+AS $$
+    INSERT INTO scraped_content AS sc (
+        id, platform_id, source_url, source_handle, content_text, content_type, media_urls,
+        likes_count, comments_count, shares_count, views_count, saves_count,
+        hashtags, mentions, posted_at, scrape_job_id, raw_data, virality_score,
+        simhash, duplicate_of
+    )
+    -- One row per key: a statement cannot update the same row twice
+    SELECT DISTINCT ON (r.platform_id, COALESCE(r.source_url, r.new_id::TEXT))
+        r.new_id, r.platform_id, r.source_url, r.source_handle, r.content_text, r.content_type, r.media_urls,
+        COALESCE(r.likes_count, 0), COALESCE(r.comments_count, 0), COALESCE(r.shares_count, 0),
+        COALESCE(r.views_count, 0), COALESCE(r.saves_count, 0),
+        r.hashtags, r.mentions, r.posted_at, r.scrape_job_id, r.raw_data, r.virality_score,
+        r.simhash, r.duplicate_of
+    FROM (
+        SELECT
+            COALESCE(p.id, uuid_generate_v4()) AS new_id,
+            NULLIF(p.source_url, '') AS source_url,
+            p.platform_id, p.source_handle, p.content_text, p.content_type, p.media_urls,
+            p.likes_count, p.comments_count, p.shares_count, p.views_count, p.saves_count,
+            p.hashtags, p.mentions, p.posted_at, p.scrape_job_id, p.raw_data, p.virality_score,
+            p.simhash, p.duplicate_of
+        FROM jsonb_populate_recordset(NULL::scraped_content, content_rows) AS p
+    ) r
+    ON CONFLICT (platform_id, source_url) DO UPDATE SET
+        likes_count = EXCLUDED.likes_count,
+        comments_count = EXCLUDED.comments_count,
+        shares_count = EXCLUDED.shares_count,
+        views_count = EXCLUDED.views_count,
+        saves_count = EXCLUDED.saves_count,
+        virality_score = EXCLUDED.virality_score,
+        raw_data = EXCLUDED.raw_data,
+        updated_at = NOW()
+    RETURNING sc.id, sc.source_url, (sc.xmax = 0) AS inserted;
+$$;
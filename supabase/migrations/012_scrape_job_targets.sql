@@ -0,0 +1,40 @@
+-- Multi-target scrape jobs
+--
+-- A job now fans out to one target per (platform, handle) and
+-- (platform, search term), run concurrently under per-platform limits
+-- (backend/services/scraping_service.py).
+-- platforms: every platform the job covers (platform_id stays set for
+--   single-platform jobs)
+-- concurrency_limits: {"instagram": 3, ...} the limits the job ran with
+-- targets_progress: {"instagram:@handle": {"status", "results_count",
+--   "refreshed_count", "error", "started_at", "completed_at"}, ...}
+-- set_scrape_target_progress: merges one target's progress in a single
+--   UPDATE, so concurrent targets never overwrite each other
+
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS platforms TEXT[];
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS concurrency_limits JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS targets_progress JSONB NOT NULL DEFAULT '{}';
+
+UPDATE scrape_jobs sj
+SET platforms = ARRAY[p.name]
+FROM platforms p
+WHERE sj.platform_id = p.id AND sj.platforms IS NULL;
+
+-- ============================================================
+-- FUNCTION: set_scrape_target_progress
+-- Merge progress fields into one target's entry.
+-- ============================================================
+CREATE OR REPLACE FUNCTION set_scrape_target_progress(
+    job_id UUID,
+    target_key TEXT,
+    progress JSONB
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE scrape_jobs
+    SET targets_progress = targets_progress || jsonb_build_object(
+        target_key, COALESCE(targets_progress -> target_key, '{}'::JSONB) || progress
+    )
+    WHERE id = job_id;
+$$;
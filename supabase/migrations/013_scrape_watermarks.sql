@@ -0,0 +1,52 @@
+-- Incremental scraping watermarks
+--
+-- scrape_watermarks: one row per scrape target, (platform, "@handle") or
+--   (platform, search term). Records the newest posted_at seen and the most
+--   recent source_urls, so the next scrape asks the actor for newer posts
+--   only (where it supports that) and skips known posts before they are
+--   transformed or written (tools/watermarks.py).
+-- advance_scrape_watermark: moves a target's watermark forward after a
+--   successful scrape
+
+CREATE TABLE IF NOT EXISTS scrape_watermarks (
+    platform TEXT NOT NULL,
+    target TEXT NOT NULL,
+    newest_posted_at TIMESTAMPTZ,
+    seen_urls TEXT[] NOT NULL DEFAULT '{}',      -- Most recent first, capped
+    last_scraped_at TIMESTAMPTZ,
+    runs INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (platform, target)
+);
+
+-- ============================================================
+-- FUNCTION: advance_scrape_watermark
+-- Raise newest_posted_at and prepend urls to seen_urls (deduplicated,
+-- keeping the max_seen most recent).
+-- ============================================================
+CREATE OR REPLACE FUNCTION advance_scrape_watermark(
+    target_platform TEXT,
+    target_key TEXT,
+    newest TIMESTAMPTZ,
+    urls TEXT[],
+    max_seen INT DEFAULT 2000
+)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO scrape_watermarks AS w (platform, target, newest_posted_at, seen_urls, last_scraped_at, runs)
+    VALUES (target_platform, target_key, newest, COALESCE(urls[1:max_seen], '{}'), NOW(), 1)
+    ON CONFLICT (platform, target) DO UPDATE SET
+        newest_posted_at = GREATEST(w.newest_posted_at, EXCLUDED.newest_posted_at),
+        seen_urls = (
+            SELECT COALESCE(array_agg(s.url ORDER BY s.ord), '{}')
+            FROM (
+                SELECT t.url, min(t.ord) AS ord
+                FROM unnest(EXCLUDED.seen_urls || w.seen_urls) WITH ORDINALITY AS t(url, ord)
+                GROUP BY t.url
+                ORDER BY min(t.ord)
+                LIMIT max_seen
+            ) s
+        ),
+        last_scraped_at = NOW(),
+        runs = w.runs + 1;
+$$;
@@ -0,0 +1,127 @@
+-- Durable job queue on scrape_jobs
+--
+-- scrape_jobs becomes the queue for every long-running job: scrapes
+-- (viral_research, competitor, brand_analysis), brand voice analysis
+-- ('brand_voice') and reports ('report'). Endpoints insert a 'pending' row
+-- and return; tools/job_worker.py claims jobs, runs them and records the
+-- outcome. Nothing runs in the serving process any more.
+-- payload: job arguments beyond the scrape columns ({"incremental": true},
+--   {"report_type": "strategy"}, ...)
+-- result: what a finished job produced ({"report_id": ...})
+-- locked_by / heartbeat_at: the worker holding a running job refreshes
+--   heartbeat_at; a job whose heartbeat is older than the lease is handed to
+--   another worker (or failed after max_attempts)
+-- claim_scrape_jobs: recovers expired leases, then hands out ready jobs,
+--   highest priority first, with FOR UPDATE SKIP LOCKED
+-- heartbeat_scrape_jobs: extends a worker's leases, returns the ids it still holds
+-- fail_scrape_job: reschedules a failed attempt with backoff (or gives up)
+
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS payload JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS result JSONB;
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS priority INT NOT NULL DEFAULT 100;    -- Higher runs first
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS max_attempts INT NOT NULL DEFAULT 3;
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS run_after TIMESTAMPTZ NOT NULL DEFAULT NOW();
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS locked_by TEXT;
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS locked_at TIMESTAMPTZ;
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+-- Jobs left 'running' by a BackgroundTasks run that died get a heartbeat
+-- in the past, so the first claim recovers them
+UPDATE scrape_jobs
+SET heartbeat_at = COALESCE(started_at, created_at), attempts = GREATEST(attempts, 1)
+WHERE status = 'running' AND heartbeat_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_ready ON scrape_jobs(priority DESC, run_after)
+    WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_running ON scrape_jobs(heartbeat_at)
+    WHERE status = 'running';
+
+-- ============================================================
+-- FUNCTION: claim_scrape_jobs
+-- Requeue (or fail) running jobs whose lease expired, then claim up to
+-- batch_size ready jobs for worker_id.
+-- ============================================================
+CREATE OR REPLACE FUNCTION claim_scrape_jobs(
+    worker_id TEXT,
+    batch_size INT DEFAULT 1,
+    lease_seconds INT DEFAULT 120
+)
+RETURNS SETOF scrape_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE scrape_jobs j
+    SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'failed' ELSE 'pending' END,
+        error_message = 'Worker ' || COALESCE(j.locked_by, 'unknown') || ' stopped heartbeating (attempt '
+            || j.attempts || ' of ' || j.max_attempts || ')',
+        completed_at = CASE WHEN j.attempts >= j.max_attempts THEN NOW() END,
+        run_after = NOW(),
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE j.id IN (
+        SELECT id FROM scrape_jobs
+        WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => lease_seconds)
+        FOR UPDATE SKIP LOCKED
+    );
+
+    RETURN QUERY
+    UPDATE scrape_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = worker_id,
+        locked_at = NOW(),
+        heartbeat_at = NOW(),
+        started_at = COALESCE(j.started_at, NOW())
+    WHERE j.id IN (
+        SELECT id FROM scrape_jobs
+        WHERE status = 'pending' AND run_after <= NOW()
+        ORDER BY priority DESC, run_after, created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: heartbeat_scrape_jobs
+-- Refresh the lease on jobs worker_id still holds. A job missing from the
+-- result was reclaimed by another worker.
+-- ============================================================
+CREATE OR REPLACE FUNCTION heartbeat_scrape_jobs(
+    worker_id TEXT,
+    job_ids UUID[]
+)
+RETURNS SETOF UUID
+LANGUAGE sql
+AS $$
+    UPDATE scrape_jobs
+    SET heartbeat_at = NOW()
+    WHERE id = ANY(job_ids) AND locked_by = worker_id AND status = 'running'
+    RETURNING id;
+$$;
+
+-- ============================================================
+-- FUNCTION: fail_scrape_job
+-- Retry after 1m, 2m, 4m, ... (capped at 1h); give up after max_attempts.
+-- Returns the job's new status, or NULL if worker_id no longer holds it.
+-- ============================================================
+CREATE OR REPLACE FUNCTION fail_scrape_job(
+    job_id UUID,
+    worker_id TEXT,
+    error_message TEXT
+)
+RETURNS TEXT
+LANGUAGE sql
+AS $$
+    UPDATE scrape_jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END,
+        run_after = NOW() + LEAST(INTERVAL '1 minute' * power(2, GREATEST(attempts - 1, 0)), INTERVAL '1 hour'),
+        completed_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+        error_message = left(fail_scrape_job.error_message, 1000),
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = job_id AND locked_by = worker_id AND status = 'running'
+    RETURNING status;
+$$;
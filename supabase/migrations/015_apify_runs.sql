@@ -0,0 +1,105 @@
+-- Non-blocking Apify actor runs
+--
+-- Scrape jobs start actor runs without waiting for them (tools/apify_runs.py)
+-- and record each run in apify_runs. While a run is still going the job is
+-- parked as 'waiting' and gives its worker slot back; the next claim after
+-- run_after (or an Apify webhook, which moves run_after to now) resumes the
+-- job. Targets already completed are skipped, and finished runs are read
+-- from their dataset instead of being started again.
+-- apify_runs: one row per actor run, keyed by the job, target, actor and
+--   a hash of the run input
+-- scrape_jobs.apify_run_id: the job's most recently started run
+-- claim_scrape_jobs: also claims 'waiting' jobs, without counting an attempt
+-- park_scrape_job: releases a running job as 'waiting' until delay_seconds
+
+ALTER TABLE scrape_jobs DROP CONSTRAINT IF EXISTS scrape_jobs_status_check;
+ALTER TABLE scrape_jobs ADD CONSTRAINT scrape_jobs_status_check
+    CHECK (status IN ('pending', 'waiting', 'running', 'completed', 'failed'));
+
+DROP INDEX IF EXISTS idx_scrape_jobs_ready;
+CREATE INDEX idx_scrape_jobs_ready ON scrape_jobs(priority DESC, run_after)
+    WHERE status IN ('pending', 'waiting');
+
+CREATE TABLE IF NOT EXISTS apify_runs (
+    run_id TEXT PRIMARY KEY,
+    scrape_job_id UUID NOT NULL REFERENCES scrape_jobs(id) ON DELETE CASCADE,
+    target_key TEXT NOT NULL,
+    actor_id TEXT NOT NULL,
+    input_hash TEXT NOT NULL,                   -- sha256 of the canonical run input
+    attempt INT NOT NULL DEFAULT 1,             -- Job attempt that started the run
+    status TEXT NOT NULL,                       -- Apify run status (READY, RUNNING, SUCCEEDED, FAILED, ...)
+    dataset_id TEXT,
+    started_at TIMESTAMPTZ DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_apify_runs_job_target ON apify_runs(scrape_job_id, target_key);
+
+-- ============================================================
+-- FUNCTION: claim_scrape_jobs
+-- As in 014; a 'waiting' job resumes the attempt it parked in.
+-- ============================================================
+CREATE OR REPLACE FUNCTION claim_scrape_jobs(
+    worker_id TEXT,
+    batch_size INT DEFAULT 1,
+    lease_seconds INT DEFAULT 120
+)
+RETURNS SETOF scrape_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE scrape_jobs j
+    SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'failed' ELSE 'pending' END,
+        error_message = 'Worker ' || COALESCE(j.locked_by, 'unknown') || ' stopped heartbeating (attempt '
+            || j.attempts || ' of ' || j.max_attempts || ')',
+        completed_at = CASE WHEN j.attempts >= j.max_attempts THEN NOW() END,
+        run_after = NOW(),
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE j.id IN (
+        SELECT id FROM scrape_jobs
+        WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => lease_seconds)
+        FOR UPDATE SKIP LOCKED
+    );
+
+    RETURN QUERY
+    UPDATE scrape_jobs j
+    SET status = 'running',
+        attempts = j.attempts + CASE WHEN j.status = 'waiting' THEN 0 ELSE 1 END,
+        locked_by = worker_id,
+        locked_at = NOW(),
+        heartbeat_at = NOW(),
+        started_at = COALESCE(j.started_at, NOW())
+    WHERE j.id IN (
+        SELECT id FROM scrape_jobs
+        WHERE status IN ('pending', 'waiting') AND run_after <= NOW()
+        ORDER BY priority DESC, run_after, created_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: park_scrape_job
+-- Release a job worker_id holds until its actor runs have had time to
+-- finish. Returns 'waiting', or NULL if worker_id no longer holds it.
+-- ============================================================
+CREATE OR REPLACE FUNCTION park_scrape_job(
+    job_id UUID,
+    worker_id TEXT,
+    delay_seconds INT DEFAULT 30
+)
+RETURNS TEXT
+LANGUAGE sql
+AS $$
+    UPDATE scrape_jobs
+    SET status = 'waiting',
+        run_after = NOW() + make_interval(secs => delay_seconds),
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = job_id AND locked_by = worker_id AND status = 'running'
+    RETURNING status;
+$$;
@@ -0,0 +1,10 @@
+-- Live scrape job progress
+--
+-- progress: running counters the job publishes while it runs
+--   ({"fetched", "inserted", "refreshed", "duplicates", "failed", "skipped",
+--   "embedded", "errors", "updated_at"}). Events go to in-process subscribers
+--   as they happen (tools/utils/job_events.py); this snapshot is flushed
+--   every couple of seconds so GET /scraping/jobs/{id}/events can follow a
+--   job run by a worker in another process.
+
+ALTER TABLE scrape_jobs ADD COLUMN IF NOT EXISTS progress JSONB NOT NULL DEFAULT '{}';
@@ -0,0 +1,57 @@
+-- Recurring scrapes
+--
+-- scrape_schedules: cron-style scrape definitions. tools/scheduler.py ticks
+--   (CLI loop or POST /scraping/schedules/tick), claims the schedules that
+--   are due and queues scrape jobs for them. Targets already in flight in
+--   another job are coalesced away, per-platform hourly budgets defer a
+--   schedule instead of stampeding Apify, and next_run_at carries up to
+--   jitter_seconds of random delay so schedules on the same cron spread out.
+-- claim_due_schedules: locks due schedules for one tick with FOR UPDATE
+--   SKIP LOCKED, so concurrent ticks never fire the same schedule twice
+
+CREATE TABLE IF NOT EXISTS scrape_schedules (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    cron TEXT NOT NULL,                         -- 5-field cron, UTC
+    platforms TEXT[] NOT NULL,
+    job_type TEXT NOT NULL DEFAULT 'viral_research',
+    search_terms TEXT[],
+    target_handles TEXT[],
+    max_results INT NOT NULL DEFAULT 100,
+    incremental BOOLEAN NOT NULL DEFAULT TRUE,
+    jitter_seconds INT NOT NULL DEFAULT 300,
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    next_run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    last_run_at TIMESTAMPTZ,
+    last_job_ids UUID[] NOT NULL DEFAULT '{}',
+    last_result TEXT,                           -- "queued 1 job", "coalesced", "deferred: ..."
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_schedules_due ON scrape_schedules(next_run_at) WHERE enabled;
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_created ON scrape_jobs(created_at);
+
+-- ============================================================
+-- FUNCTION: claim_due_schedules
+-- Lock enabled schedules whose next_run_at has passed for lease_seconds.
+-- ============================================================
+CREATE OR REPLACE FUNCTION claim_due_schedules(
+    lease_seconds INT DEFAULT 120
+)
+RETURNS SETOF scrape_schedules
+LANGUAGE sql
+AS $$
+    UPDATE scrape_schedules s
+    SET locked_until = NOW() + make_interval(secs => lease_seconds)
+    WHERE s.id IN (
+        SELECT id FROM scrape_schedules
+        WHERE enabled
+          AND next_run_at <= NOW()
+          AND (locked_until IS NULL OR locked_until < NOW())
+        ORDER BY next_run_at
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING s.*;
+$$;
@@ -0,0 +1,83 @@
+-- Raw payload archive
+--
+-- Raw Apify items move out of scraped_content.raw_data into compressed,
+-- append-only JSONL segments (tools/utils/raw_archive.py). Rows keep a
+-- pointer instead: raw_ref = "{job}/{segment}.jsonl.zst:{line}".
+-- upsert_scraped_content: writes raw_ref instead of raw_data. A refreshed
+--   post gets the new raw_ref, and its old raw_data is dropped once the
+--   archive holds a newer copy.
+-- set_raw_refs: used by tools/archive_raw_data.py to move rows stored
+--   before this migration into the archive, a chunk at a time.
+-- raw_data stays nullable for rows not yet archived; once the backfill is
+-- done, VACUUM FULL scraped_content returns the space.
+
+ALTER TABLE scraped_content ADD COLUMN IF NOT EXISTS raw_ref TEXT;
+
+-- ============================================================
+-- FUNCTION: upsert_scraped_content
+-- As in 011, with raw_ref in place of raw_data.
+-- ============================================================
+CREATE OR REPLACE FUNCTION upsert_scraped_content(content_rows JSONB)
+RETURNS TABLE (
+    id UUID,
+    source_url TEXT,
+    inserted BOOLEAN
+)
+LANGUAGE sql
+AS $$
+    INSERT INTO scraped_content AS sc (
+        id, platform_id, source_url, source_handle, content_text, content_type, media_urls,
+        likes_count, comments_count, shares_count, views_count, saves_count,
+        hashtags, mentions, posted_at, scrape_job_id, raw_ref, virality_score,
+        simhash, duplicate_of
+    )
+    -- One row per key: a statement cannot update the same row twice
+    SELECT DISTINCT ON (r.platform_id, COALESCE(r.source_url, r.new_id::TEXT))
+        r.new_id, r.platform_id, r.source_url, r.source_handle, r.content_text, r.content_type, r.media_urls,
+        COALESCE(r.likes_count, 0), COALESCE(r.comments_count, 0), COALESCE(r.shares_count, 0),
+        COALESCE(r.views_count, 0), COALESCE(r.saves_count, 0),
+        r.hashtags, r.mentions, r.posted_at, r.scrape_job_id, r.raw_ref, r.virality_score,
+        r.simhash, r.duplicate_of
+    FROM (
+        SELECT
+            COALESCE(p.id, uuid_generate_v4()) AS new_id,
+            NULLIF(p.source_url, '') AS source_url,
+            p.platform_id, p.source_handle, p.content_text, p.content_type, p.media_urls,
+            p.likes_count, p.comments_count, p.shares_count, p.views_count, p.saves_count,
+            p.hashtags, p.mentions, p.posted_at, p.scrape_job_id, p.raw_ref, p.virality_score,
+            p.simhash, p.duplicate_of
+        FROM jsonb_populate_recordset(NULL::scraped_content, content_rows) AS p
+    ) r
+    ON CONFLICT (platform_id, source_url) DO UPDATE SET
+        likes_count = EXCLUDED.likes_count,
+        comments_count = EXCLUDED.comments_count,
+        shares_count = EXCLUDED.shares_count,
+        views_count = EXCLUDED.views_count,
+        saves_count = EXCLUDED.saves_count,
+        virality_score = EXCLUDED.virality_score,
+        raw_ref = COALESCE(EXCLUDED.raw_ref, sc.raw_ref),
+        raw_data = CASE WHEN EXCLUDED.raw_ref IS NULL THEN sc.raw_data END,
+        updated_at = NOW()
+    RETURNING sc.id, sc.source_url, (sc.xmax = 0) AS inserted;
+$$;
+
+-- ============================================================
+-- FUNCTION: set_raw_refs
+-- Point rows at their archived payload and clear raw_data.
+-- refs: [{"id": uuid, "raw_ref": text}, ...]. Returns rows updated.
+-- ============================================================
+CREATE OR REPLACE FUNCTION set_raw_refs(refs JSONB)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+BEGIN
+    UPDATE scraped_content sc
+    SET raw_ref = r.raw_ref, raw_data = NULL
+    FROM jsonb_to_recordset(refs) AS r(id UUID, raw_ref TEXT)
+    WHERE sc.id = r.id;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
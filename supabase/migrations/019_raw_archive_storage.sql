@@ -0,0 +1,65 @@
+-- Durable raw payload archive
+--
+-- Raw archive segments move from a worker's local disk to the private
+-- raw-archive Storage bucket (tools/utils/raw_archive.py), readable from
+-- every instance and kept when a container is replaced. A scrape only drops
+-- raw_data for rows whose segment was uploaded; everything else keeps it.
+-- upsert_scraped_content: writes raw_data or raw_ref, whichever the row
+--   carries. A refreshed post with a raw_ref clears its old raw_data; one
+--   without keeps its previous raw_ref and takes the new raw_data.
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('raw-archive', 'raw-archive', false)
+ON CONFLICT (id) DO NOTHING;
+
+-- ============================================================
+-- FUNCTION: upsert_scraped_content
+-- As in 018, with raw_data written when there is no durable raw_ref.
+-- ============================================================
+CREATE OR REPLACE FUNCTION upsert_scraped_content(content_rows JSONB)
+RETURNS TABLE (
+    id UUID,
+    source_url TEXT,
+    inserted BOOLEAN
+)
+LANGUAGE sql
+AS $$
+    INSERT INTO scraped_content AS sc (
+        id, platform_id, source_url, source_handle, content_text, content_type, media_urls,
+        likes_count, comments_count, shares_count, views_count, saves_count,
+        hashtags, mentions, posted_at, scrape_job_id, raw_ref, raw_data, virality_score,
+        simhash, duplicate_of
+    )
+    -- One row per key: a statement cannot update the same row twice
+    SELECT DISTINCT ON (r.platform_id, COALESCE(r.source_url, r.new_id::TEXT))
+        r.new_id, r.platform_id, r.source_url, r.source_handle, r.content_text, r.content_type, r.media_urls,
+        COALESCE(r.likes_count, 0), COALESCE(r.comments_count, 0), COALESCE(r.shares_count, 0),
+        COALESCE(r.views_count, 0), COALESCE(r.saves_count, 0),
+        r.hashtags, r.mentions, r.posted_at, r.scrape_job_id, r.raw_ref,
+        CASE WHEN r.raw_ref IS NULL THEN r.raw_data END, r.virality_score,
+        r.simhash, r.duplicate_of
+    FROM (
+        SELECT
+            COALESCE(p.id, uuid_generate_v4()) AS new_id,
+            NULLIF(p.source_url, '') AS source_url,
+            p.platform_id, p.source_handle, p.content_text, p.content_type, p.media_urls,
+            p.likes_count, p.comments_count, p.shares_count, p.views_count, p.saves_count,
+            p.hashtags, p.mentions, p.posted_at, p.scrape_job_id, p.raw_ref, p.raw_data, p.virality_score,
+            p.simhash, p.duplicate_of
+        FROM jsonb_populate_recordset(NULL::scraped_content, content_rows) AS p
+    ) r
+    ON CONFLICT (platform_id, source_url) DO UPDATE SET
+        likes_count = EXCLUDED.likes_count,
+        comments_count = EXCLUDED.comments_count,
+        shares_count = EXCLUDED.shares_count,
+        views_count = EXCLUDED.views_count,
+        saves_count = EXCLUDED.saves_count,
+        virality_score = EXCLUDED.virality_score,
+        raw_ref = COALESCE(EXCLUDED.raw_ref, sc.raw_ref),
+        raw_data = CASE
+            WHEN EXCLUDED.raw_ref IS NOT NULL THEN NULL
+            ELSE COALESCE(EXCLUDED.raw_data, sc.raw_data)
+        END,
+        updated_at = NOW()
+    RETURNING sc.id, sc.source_url, (sc.xmax = 0) AS inserted;
+$$;
@@ -0,0 +1,387 @@
+-- Shadow re-embedding for feedback and brand voice
+--
+-- 010 gave only scraped_content a standby vector column; content_feedback
+-- and brand_voice_profiles were re-embedded in place after a promote, so
+-- match_feedback found nothing until the embedding worker caught up. Both
+-- tables now get a standby column too, filled by tools/reembed.py --fill
+-- alongside scraped_content, and embedding_config.active_column picks the
+-- live column for all three:
+--   'embedding'        -> embedding / analysis_embedding        (embedding_model)
+--   'embedding_shadow' -> embedding_shadow / analysis_embedding_shadow (embedding_shadow_model)
+-- promote_shadow_embeddings checks coverage on every table before swapping.
+
+ALTER TABLE content_feedback ADD COLUMN IF NOT EXISTS embedding_shadow VECTOR(1024);
+ALTER TABLE content_feedback ADD COLUMN IF NOT EXISTS embedding_shadow_model TEXT;
+ALTER TABLE brand_voice_profiles ADD COLUMN IF NOT EXISTS analysis_embedding_shadow VECTOR(1024);
+ALTER TABLE brand_voice_profiles ADD COLUMN IF NOT EXISTS embedding_shadow_model TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_content_feedback_embedding_shadow ON content_feedback
+    USING hnsw (embedding_shadow vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- ============================================================
+-- FUNCTION: embedding_vector_column
+-- A table's vector column for 'embedding' or 'embedding_shadow'. Its model
+-- column is always slot || '_model'.
+-- ============================================================
+CREATE OR REPLACE FUNCTION embedding_vector_column(target_table TEXT, slot TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE target_table
+        WHEN 'scraped_content' THEN slot
+        WHEN 'content_feedback' THEN slot
+        WHEN 'brand_voice_profiles' THEN 'analysis_' || slot
+    END;
+$$;
+
+-- ============================================================
+-- FUNCTION: match_feedback
+-- As in 010, on whichever content_feedback column holds query_model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION match_feedback(
+    query_embedding VECTOR(1024),
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INT DEFAULT 5,
+    filter_rating TEXT DEFAULT NULL,
+    filter_content_type TEXT DEFAULT NULL,
+    query_model TEXT DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    content_type TEXT,
+    platform TEXT,
+    user_message TEXT,
+    assistant_message TEXT,
+    rating TEXT,
+    feedback_note TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    model TEXT := query_model;
+    vector_column TEXT;
+BEGIN
+    IF model IS NULL THEN
+        SELECT active_model INTO model FROM embedding_config;
+    END IF;
+    vector_column := embedding_column_for_model(model);
+    IF vector_column IS NULL THEN
+        RAISE EXCEPTION 'No stored embeddings for model %', model;
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT
+            cf.id,
+            cf.content_type,
+            cf.platform,
+            cf.user_message,
+            cf.assistant_message,
+            cf.rating,
+            cf.feedback_note,
+            1 - (cf.%1$I <=> $1) AS similarity
+        FROM content_feedback cf
+        WHERE
+            cf.%1$I IS NOT NULL
+            AND cf.%2$I = $6
+            AND 1 - (cf.%1$I <=> $1) > $2
+            AND ($4::TEXT IS NULL OR cf.rating = $4)
+            AND ($5::TEXT IS NULL OR cf.content_type = $5)
+        ORDER BY cf.%1$I <=> $1
+        LIMIT $3
+        $q$,
+        vector_column,
+        vector_column || '_model'
+    )
+    USING query_embedding, match_threshold, match_count, filter_rating, filter_content_type, model;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: bulk_set_embeddings
+-- As in 010; every table writes to the column that holds the model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION bulk_set_embeddings(
+    ids UUID[],
+    embeddings TEXT[],
+    target_table TEXT DEFAULT 'scraped_content',
+    model TEXT DEFAULT NULL
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INT;
+    slot TEXT;
+BEGIN
+    IF embedding_vector_column(target_table, 'embedding') IS NULL THEN
+        RAISE EXCEPTION 'Unknown embedding table: %', target_table;
+    END IF;
+    IF model IS NULL THEN
+        SELECT active_model INTO model FROM embedding_config;
+    END IF;
+    slot := embedding_column_for_model(model);
+    IF slot IS NULL THEN
+        RAISE EXCEPTION 'No embedding column holds model %', model;
+    END IF;
+
+    EXECUTE format(
+        $q$
+        UPDATE %1$I t
+        SET %2$I = v.embedding::VECTOR(1024), %3$I = $3
+        FROM unnest($1, $2) AS v(id, embedding)
+        WHERE t.id = v.id
+        $q$,
+        target_table,
+        embedding_vector_column(target_table, slot),
+        slot || '_model'
+    )
+    USING ids, embeddings, model;
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: enqueue_missing_embeddings
+-- As in 010; feedback and brand voice rows are also queued when their live
+-- vector is missing or from another model.
+-- ============================================================
+CREATE OR REPLACE FUNCTION enqueue_missing_embeddings(
+    max_rows_per_table INT DEFAULT 10000,
+    job_priority INT DEFAULT 0
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    queued INT := 0;
+    n INT;
+    live_column TEXT;
+    live_model TEXT;
+BEGIN
+    SELECT active_column, active_model INTO live_column, live_model FROM embedding_config;
+
+    EXECUTE format(
+        $q$
+        INSERT INTO embedding_jobs (table_name, row_id, priority)
+        SELECT 'scraped_content', sc.id, $1
+        FROM scraped_content sc
+        WHERE sc.%I IS DISTINCT FROM $3
+          AND sc.duplicate_of IS NULL
+          AND COALESCE(sc.content_text, '') <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'scraped_content' AND j.row_id = sc.id
+          )
+        LIMIT $2
+        ON CONFLICT (table_name, row_id) DO NOTHING
+        $q$,
+        live_column || '_model'
+    )
+    USING job_priority, max_rows_per_table, live_model;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    EXECUTE format(
+        $q$
+        INSERT INTO embedding_jobs (table_name, row_id, priority)
+        SELECT 'content_feedback', cf.id, $1
+        FROM content_feedback cf
+        WHERE cf.%I IS DISTINCT FROM $3
+          AND COALESCE(cf.assistant_message, '') <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'content_feedback' AND j.row_id = cf.id
+          )
+        LIMIT $2
+        ON CONFLICT (table_name, row_id) DO NOTHING
+        $q$,
+        live_column || '_model'
+    )
+    USING job_priority, max_rows_per_table, live_model;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    EXECUTE format(
+        $q$
+        INSERT INTO embedding_jobs (table_name, row_id, priority)
+        SELECT 'brand_voice_profiles', bv.id, $1
+        FROM brand_voice_profiles bv
+        WHERE bv.%I IS DISTINCT FROM $3
+          AND COALESCE(bv.analysis_text, '') <> ''
+          AND NOT EXISTS (
+              SELECT 1 FROM embedding_jobs j WHERE j.table_name = 'brand_voice_profiles' AND j.row_id = bv.id
+          )
+        LIMIT $2
+        ON CONFLICT (table_name, row_id) DO NOTHING
+        $q$,
+        live_column || '_model'
+    )
+    USING job_priority, max_rows_per_table, live_model;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    queued := queued + n;
+
+    RETURN queued;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: reembed_candidates
+-- As in 010, for any of the three tables. content_text is the text the
+-- embedding worker embeds for that table (feedback capped at 2000 chars).
+-- ============================================================
+DROP FUNCTION IF EXISTS reembed_candidates(UUID, INT);
+
+CREATE OR REPLACE FUNCTION reembed_candidates(
+    after_id UUID DEFAULT NULL,
+    batch_size INT DEFAULT 500,
+    target_table TEXT DEFAULT 'scraped_content'
+)
+RETURNS TABLE (id UUID, content_text TEXT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    config embedding_config;
+    standby_slot TEXT;
+    text_expr TEXT;
+    row_filter TEXT := '';
+BEGIN
+    SELECT * INTO config FROM embedding_config;
+    IF config.shadow_model IS NULL THEN
+        RAISE EXCEPTION 'No shadow model set; run start_shadow_embedding first';
+    END IF;
+    standby_slot := CASE WHEN config.active_column = 'embedding' THEN 'embedding_shadow' ELSE 'embedding' END;
+
+    CASE target_table
+        WHEN 'scraped_content' THEN
+            text_expr := 't.content_text';
+            row_filter := 'AND t.duplicate_of IS NULL';
+        WHEN 'content_feedback' THEN
+            text_expr := 'LEFT(t.assistant_message, 2000)';
+        WHEN 'brand_voice_profiles' THEN
+            text_expr := 't.analysis_text';
+        ELSE
+            RAISE EXCEPTION 'Unknown embedding table: %', target_table;
+    END CASE;
+
+    RETURN QUERY EXECUTE format(
+        $q$
+        SELECT t.id, %2$s
+        FROM %1$I t
+        WHERE COALESCE(%2$s, '') <> ''
+          AND t.%3$I IS DISTINCT FROM $1
+          AND ($2::UUID IS NULL OR t.id > $2)
+          %4$s
+        ORDER BY t.id
+        LIMIT $3
+        $q$,
+        target_table,
+        text_expr,
+        standby_slot || '_model',
+        row_filter
+    )
+    USING config.shadow_model, after_id, batch_size;
+END;
+$$;
+
+-- ============================================================
+-- FUNCTION: embedding_coverage
+-- As in 010, one row per table.
+-- ============================================================
+DROP FUNCTION IF EXISTS embedding_coverage();
+
+CREATE OR REPLACE FUNCTION embedding_coverage()
+RETURNS TABLE (
+    table_name TEXT,
+    active_column TEXT,
+    active_model TEXT,
+    shadow_model TEXT,
+    total_rows BIGINT,
+    active_rows BIGINT,
+    shadow_rows BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH c AS (
+        SELECT
+            active_column,
+            active_model,
+            shadow_model,
+            active_column = 'embedding' AS first_live
+        FROM embedding_config
+    ),
+    models AS (
+        SELECT 'scraped_content' AS table_name, sc.embedding_model AS first_model,
+               sc.embedding_shadow_model AS second_model
+        FROM scraped_content sc
+        WHERE sc.duplicate_of IS NULL AND COALESCE(sc.content_text, '') <> ''
+        UNION ALL
+        SELECT 'content_feedback', cf.embedding_model, cf.embedding_shadow_model
+        FROM content_feedback cf
+        WHERE COALESCE(cf.assistant_message, '') <> ''
+        UNION ALL
+        SELECT 'brand_voice_profiles', bv.embedding_model, bv.embedding_shadow_model
+        FROM brand_voice_profiles bv
+        WHERE COALESCE(bv.analysis_text, '') <> ''
+    ),
+    tables(table_name) AS (
+        VALUES ('scraped_content'), ('content_feedback'), ('brand_voice_profiles')
+    )
+    SELECT
+        t.table_name,
+        c.active_column,
+        c.active_model,
+        c.shadow_model,
+        COUNT(m.table_name),
+        COUNT(m.table_name) FILTER (WHERE
+            (CASE WHEN c.first_live THEN m.first_model ELSE m.second_model END) = c.active_model),
+        COUNT(m.table_name) FILTER (WHERE
+            (CASE WHEN c.first_live THEN m.second_model ELSE m.first_model END) = c.shadow_model)
+    FROM c
+    CROSS JOIN tables t
+    LEFT JOIN models m ON m.table_name = t.table_name
+    GROUP BY t.table_name, c.active_column, c.active_model, c.shadow_model;
+$$;
+
+-- ============================================================
+-- FUNCTION: promote_shadow_embeddings
+-- As in 010, but every table must reach min_coverage. Rows the shadow
+-- model does not cover yet (min_coverage < 1) are queued for the worker.
+-- ============================================================
+CREATE OR REPLACE FUNCTION promote_shadow_embeddings(min_coverage FLOAT DEFAULT 1.0)
+RETURNS embedding_config
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    config embedding_config;
+    coverage RECORD;
+BEGIN
+    -- Lock the config row so concurrent promotes serialize
+    SELECT * INTO config FROM embedding_config FOR UPDATE;
+    IF config.shadow_model IS NULL THEN
+        RAISE EXCEPTION 'No shadow model to promote';
+    END IF;
+
+    FOR coverage IN SELECT * FROM embedding_coverage() LOOP
+        IF coverage.total_rows > 0 AND coverage.shadow_rows::FLOAT / coverage.total_rows < min_coverage THEN
+            RAISE EXCEPTION 'Shadow embeddings cover % of % % rows, below %',
+                coverage.shadow_rows, coverage.total_rows, coverage.table_name, min_coverage;
+        END IF;
+    END LOOP;
+
+    UPDATE embedding_config
+    SET active_column = CASE WHEN config.active_column = 'embedding' THEN 'embedding_shadow' ELSE 'embedding' END,
+        active_model = config.shadow_model,
+        shadow_model = config.active_model,
+        updated_at = NOW()
+    WHERE id
+    RETURNING * INTO config;
+
+    PERFORM enqueue_missing_embeddings(1000000, 50);
+
+    RETURN config;
+END;
+$$;
@@ -0,0 +1,20 @@
+-- Shared draft prefetch cache
+--
+-- prefetch_cache: RAG context warmed for a draft the user is still typing
+--   (backend/services/prefetch_service.py). Kept in the database rather than
+--   in process memory so /chat/stream finds it whichever serverless instance
+--   served /chat/prefetch. Rows live for a couple of minutes; readers ignore
+--   expired rows and writers delete them.
+
+CREATE TABLE IF NOT EXISTS prefetch_cache (
+    key TEXT PRIMARY KEY,                        -- sha1 of content_type|platform|normalized draft
+    content_type TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    draft TEXT NOT NULL,                         -- Normalized draft, for near matches
+    rag_context JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_prefetch_cache_lookup
+    ON prefetch_cache (content_type, platform, expires_at DESC);
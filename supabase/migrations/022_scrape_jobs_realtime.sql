@@ -0,0 +1,18 @@
+-- Live job progress over Supabase Realtime
+--
+-- GET /scraping/jobs/{id}/events (tools/utils/job_events.py) subscribes to
+-- UPDATEs of the job's scrape_jobs row instead of polling it. Realtime only
+-- sends changes for tables in the supabase_realtime publication. Skipped
+-- where that publication does not exist (plain Postgres); the endpoint then
+-- falls back to polling.
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'supabase_realtime')
+       AND NOT EXISTS (
+        SELECT 1 FROM pg_publication_tables
+        WHERE pubname = 'supabase_realtime' AND schemaname = current_schema() AND tablename = 'scrape_jobs'
+    ) THEN
+        ALTER PUBLICATION supabase_realtime ADD TABLE scrape_jobs;
+    END IF;
+END $$;
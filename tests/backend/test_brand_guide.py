@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from backend.prompts import brand_guide
+from backend.prompts.brand_guide import BRAND_GUIDE_SECTIONS, section_hash, select_sections
+from tools import generate_embeddings
+
+SECTIONS = {section["key"]: section for section in BRAND_GUIDE_SECTIONS}
+OPTIONAL = [section["key"] for section in BRAND_GUIDE_SECTIONS if brand_guide.is_optional(section)]
+CORE = {section["key"] for section in BRAND_GUIDE_SECTIONS if section.get("always")}
+
+
+def keys(sections):
+    return [section["key"] for section in sections]
+
+
+@pytest.fixture
+def embeddings_file(monkeypatch, tmp_path):
+    """Write a section embeddings file: each optional section gets its own axis."""
+    path = tmp_path / "brand_guide_embeddings.json"
+    monkeypatch.setattr(brand_guide, "SECTION_EMBEDDINGS_PATH", str(path))
+    brand_guide.load_section_embeddings.cache_clear()
+
+    def write(model="voyage-test", stale=()):
+        sections = {}
+        for i, key in enumerate(OPTIONAL):
+            vector = [0.0] * len(OPTIONAL)
+            vector[i] = 1.0
+            hash_ = "outdated" if key in stale else section_hash(SECTIONS[key])
+            sections[key] = {"hash": hash_, "embedding": vector}
+        path.write_text(json.dumps({"model": model, "sections": sections}))
+        brand_guide.load_section_embeddings.cache_clear()
+
+    yield write
+    brand_guide.load_section_embeddings.cache_clear()
+
+
+def axis(key):
+    vector = [0.0] * len(OPTIONAL)
+    vector[OPTIONAL.index(key)] = 1.0
+    return vector
+
+
+def test_core_and_format_sections_follow_the_content_type(embeddings_file):
+    selected = keys(select_sections("edm"))
+
+    assert CORE <= set(selected)
+    assert "format_edm" in selected
+    assert "format_caption" not in selected and "caption_structure" not in selected
+    assert selected == [key for key in SECTIONS if key in selected]
+
+
+def test_unknown_content_type_gets_the_whole_guide():
+    assert keys(select_sections("press_release")) == list(SECTIONS)
+
+
+def test_optional_sections_fall_back_to_keywords_without_embeddings(embeddings_file):
+    selected = keys(select_sections("caption", user_query="Quote Billy on why salons skip PR"))
+
+    assert "key_people" in selected and "cta_marketing" in selected
+    assert "scenario_meme" not in selected
+
+
+def test_query_embedding_selects_the_closest_section(embeddings_file):
+    embeddings_file()
+
+    selected = keys(select_sections(
+        "caption", user_query="write something", query_embedding=axis("scenario_event"), query_model="voyage-test"
+    ))
+    assert [key for key in selected if key in OPTIONAL] == ["scenario_event"]
+
+
+def test_embeddings_from_another_model_or_stale_text_are_ignored(embeddings_file):
+    embeddings_file(model="voyage-old")
+    assert brand_guide.load_section_embeddings("voyage-test") == {}
+
+    embeddings_file(stale={"scenario_event"})
+    loaded = brand_guide.load_section_embeddings("voyage-test")
+    assert "scenario_event" not in loaded and "scenario_meme" in loaded
+
+
+def test_platform_boost_and_section_cap(embeddings_file, monkeypatch):
+    monkeypatch.setattr(brand_guide, "MAX_OPTIONAL_SECTIONS", 2)
+    query = "podcast episode party meme tips club marketing"
+
+    selected = [key for key in keys(select_sections("caption", "youtube", query)) if key in OPTIONAL]
+    assert selected == ["scenario_podcast", "cta_podcast"]
+
+
+def test_if_stale_skips_a_current_file(embeddings_file, monkeypatch):
+    embeddings_file()
+    monkeypatch.setattr(generate_embeddings, "get_active_model", lambda: "voyage-test")
+
+    def embed(*args, **kwargs):
+        raise AssertionError("a current file must not be re-embedded")
+
+    monkeypatch.setattr(generate_embeddings, "generate_embeddings_batch", embed)
+    assert generate_embeddings.embed_brand_guide_sections(if_stale=True) == brand_guide.SECTION_EMBEDDINGS_PATH
+
+
+def test_if_stale_rewrites_a_file_for_another_model(embeddings_file, monkeypatch):
+    embeddings_file(model="voyage-old")
+    monkeypatch.setattr(generate_embeddings, "get_active_model", lambda: "voyage-test")
+    monkeypatch.setattr(
+        generate_embeddings, "generate_embeddings_batch", lambda texts, model: [[1.0, 0.0]] * len(texts)
+    )
+
+    generate_embeddings.embed_brand_guide_sections(if_stale=True)
+
+    with open(brand_guide.SECTION_EMBEDDINGS_PATH) as f:
+        payload = json.load(f)
+    assert payload["model"] == "voyage-test" and sorted(payload["sections"]) == sorted(OPTIONAL)
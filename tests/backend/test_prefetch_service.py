@@ -0,0 +1,68 @@
+import pytest
+
+from backend.services import prefetch_service
+
+DRAFT = "write a caption about slow monday mornings at the salon"
+
+
+class FakeRAG:
+    calls = 0
+
+    def get_rag_context(self, user_query, content_type, platform):
+        FakeRAG.calls += 1
+        return {"viral_examples": [], "query": user_query}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Fresh in-process cache, an in-memory shared cache and a fake RAGService."""
+    shared = []
+    monkeypatch.setattr(prefetch_service, "_cache", {})
+    monkeypatch.setattr(prefetch_service, "_inflight", {})
+    monkeypatch.setattr(prefetch_service, "RAGService", FakeRAG)
+    monkeypatch.setattr(prefetch_service, "_store_shared", shared.append)
+    monkeypatch.setattr(
+        prefetch_service, "_shared_entries",
+        lambda content_type, platform: [
+            e for e in shared if e["content_type"] == content_type and e["platform"] == platform
+        ],
+    )
+    FakeRAG.calls = 0
+    return shared
+
+
+def test_short_drafts_are_not_warmed(service):
+    assert prefetch_service.should_prefetch("hi there", "caption", "instagram")[0] is False
+
+
+def test_warm_then_reuse_for_a_close_message(service):
+    warm, key = prefetch_service.should_prefetch(DRAFT, "caption", "instagram")
+    assert warm
+    prefetch_service.warm_prefetch(key, DRAFT, "caption", "instagram")
+
+    entry = prefetch_service.get_prefetched(DRAFT.capitalize() + ".", "caption", "instagram")
+    assert entry["rag_context"]["query"] == DRAFT
+    assert "research" not in entry
+    assert len(service) == 1
+    assert prefetch_service.get_prefetched(DRAFT, "carousel", "instagram") is None
+
+
+def test_near_identical_drafts_are_not_warmed_twice(service):
+    _, key = prefetch_service.should_prefetch(DRAFT, "caption", "instagram")
+    # Still warming: the next keystroke's draft is skipped
+    assert prefetch_service.should_prefetch(DRAFT + "s", "caption", "instagram")[0] is False
+
+    prefetch_service.warm_prefetch(key, DRAFT, "caption", "instagram")
+    assert prefetch_service.should_prefetch(DRAFT + "!", "caption", "instagram")[0] is False
+    assert prefetch_service.should_prefetch("a reel script about colour corrections", "caption", "instagram")[0]
+    assert FakeRAG.calls == 1
+
+
+def test_entries_warmed_by_another_instance_are_used(service, monkeypatch):
+    _, key = prefetch_service.should_prefetch(DRAFT, "caption", "instagram")
+    prefetch_service.warm_prefetch(key, DRAFT, "caption", "instagram")
+    # A different instance: empty in-process cache, same shared table
+    monkeypatch.setattr(prefetch_service, "_cache", {})
+
+    assert prefetch_service.should_prefetch(DRAFT + "s", "caption", "instagram")[0] is False
+    assert prefetch_service.get_prefetched(DRAFT, "caption", "instagram")["key"] == key
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from backend.services.rerank_service import (
+    RECENCY_HALF_LIFE_DAYS,
+    UNKNOWN_RECENCY,
+    mmr_select,
+    normalize_virality,
+    recency_scores,
+    rerank_examples,
+)
+
+
+def test_mmr_skips_a_near_duplicate_of_an_earlier_pick():
+    relevance = np.array([1.0, 0.95, 0.6])
+    # 0 and 1 are the same caption; 2 is different
+    pairwise = np.array([[1.0, 0.99, 0.1], [0.99, 1.0, 0.1], [0.1, 0.1, 1.0]])
+
+    assert mmr_select(relevance, pairwise, 2) == [0, 2]
+    assert mmr_select(relevance, pairwise, 5) == [0, 2, 1]
+
+
+def test_mmr_without_overlap_is_relevance_order():
+    relevance = np.array([0.2, 0.9, 0.5])
+
+    assert mmr_select(relevance, np.eye(3), 3) == [1, 2, 0]
+
+
+def test_virality_is_normalized_within_each_platform():
+    scores = normalize_virality(np.array([100.0, 10.0, 5.0, 0.0]), np.array([1, 1, 2, 2]))
+
+    assert scores[0] == pytest.approx(1.0) and scores[2] == pytest.approx(1.0)
+    assert 0 < scores[1] < 1 and scores[3] == 0.0
+
+
+def test_recency_halves_every_half_life():
+    now = 1_000_000_000.0
+    posted_at = np.array([now, now - RECENCY_HALF_LIFE_DAYS * 86400, np.nan])
+
+    assert recency_scores(posted_at, now).tolist() == pytest.approx([1.0, 0.5, UNKNOWN_RECENCY])
+
+
+def test_rerank_spreads_examples_across_accounts_without_embeddings():
+    candidates = [
+        {"id": "a1", "similarity": 0.90, "source_handle": "@a"},
+        {"id": "a2", "similarity": 0.89, "source_handle": "@a"},
+        {"id": "b1", "similarity": 0.70, "source_handle": "@b"},
+    ]
+
+    assert [row["id"] for row in rerank_examples(candidates, 2)] == ["a1", "b1"]
+
+
+def test_rerank_uses_embeddings_for_diversity_and_drops_them():
+    candidates = [
+        {"id": "x", "similarity": 0.90, "embedding": [1.0, 0.0], "source_handle": "@a"},
+        {"id": "x-copy", "similarity": 0.89, "embedding": "[1.0, 0.01]", "source_handle": "@b"},
+        {"id": "y", "similarity": 0.70, "embedding": [0.0, 1.0], "source_handle": "@a"},
+    ]
+
+    results = rerank_examples(candidates, 2)
+    assert [row["id"] for row in results] == ["x", "y"]
+    assert all("embedding" not in row and "rerank_score" in row for row in results)
+    assert rerank_examples([], 3) == []
@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.services import variant_service
+from tests.fakes import FakeSupabase
+
+SHADOW_CONFIG = {"active_column": "embedding_shadow", "active_model": "voyage-4", "shadow_model": "voyage-3.5"}
+
+
+@pytest.fixture
+def feedback(monkeypatch):
+    supabase = FakeSupabase({"content_feedback": [
+        {"rating": "positive", "embedding": [1.0, 0.0, 0.0]},
+        {"rating": "negative", "embedding": [0.0, 1.0, 0.0]},
+        {"rating": "positive", "embedding": None},
+    ]})
+    monkeypatch.setattr(variant_service, "get_supabase_client", lambda: supabase)
+    monkeypatch.setattr(variant_service, "get_embedding_config", lambda: SHADOW_CONFIG)
+    return supabase
+
+
+def test_feedback_is_read_from_the_live_column_after_a_promote(feedback):
+    positive, negative, model = variant_service.fetch_feedback_embeddings("caption")
+
+    query = feedback.find("table", "content_feedback")[0]
+    assert query.called("select") == [("rating, embedding:embedding_shadow",)]
+    assert ("embedding_shadow_model", "voyage-4") in query.called("eq")
+    assert query.called("is_") == [("embedding_shadow", "null")]
+    assert model == "voyage-4"
+    assert positive.shape == (1, 3) and negative.shape == (1, 3)
+
+
+def test_candidates_are_embedded_with_the_feedback_model(feedback, monkeypatch):
+    embedded = {}
+
+    async def generate_variants(*args):
+        return ["close to liked", "close to disliked"]
+
+    async def agenerate_embeddings_batch(texts, model=None):
+        embedded["model"] = model
+        return [[0.9, 0.1, 0.0], [0.1, 0.9, 0.0]]
+
+    monkeypatch.setattr(variant_service, "generate_variants", generate_variants)
+    monkeypatch.setattr(variant_service, "agenerate_embeddings_batch", agenerate_embeddings_batch)
+
+    ranked = asyncio.run(variant_service.generate_ranked_variants(
+        None, {}, "system", [], 2, "caption", mode="ranked"
+    ))
+
+    assert embedded["model"] == "voyage-4"
+    assert ranked.index("close to liked") < ranked.index("close to disliked")
+
+
+def test_rank_against_shadow_vectors(feedback):
+    positive, negative, _ = variant_service.fetch_feedback_embeddings("caption")
+    candidates = variant_service.normalize_rows(np.array([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0]]))
+
+    order, _ = variant_service.rank_variants(candidates, positive, negative)
+    assert order.tolist() == [1, 0]
+
+
+def unit(*rows):
+    return variant_service.normalize_rows(np.array(rows, dtype=np.float64))
+
+
+def test_without_feedback_generation_order_is_kept():
+    empty = np.empty((0, 2))
+
+    order, scores = variant_service.rank_variants(unit([1.0, 0.0], [0.0, 1.0]), empty, empty)
+    assert order.tolist() == [0, 1] and scores.tolist() == [0.0, 0.0]
+
+
+def test_positive_score_averages_the_closest_liked_outputs(monkeypatch):
+    monkeypatch.setattr(variant_service, "POSITIVE_TOP_K", 2)
+    liked = unit([1.0, 0.0], [1.0, 0.0], [0.0, 1.0])
+
+    _, scores = variant_service.rank_variants(unit([1.0, 0.0], [0.0, 1.0]), liked, np.empty((0, 2)))
+    assert scores.tolist() == pytest.approx([1.0, 0.5])
+
+
+def test_disliked_output_costs_half_its_similarity():
+    candidates = unit([1.0, 0.0], [0.0, 1.0])
+
+    order, scores = variant_service.rank_variants(candidates, np.empty((0, 2)), unit([1.0, 0.0]))
+    assert order.tolist() == [1, 0]
+    assert scores.tolist() == pytest.approx([-variant_service.NEGATIVE_WEIGHT, 0.0])
+
+
+def test_a_failed_ranking_keeps_generation_order(feedback, monkeypatch):
+    async def generate_variants(*args):
+        return ["first", "second"]
+
+    async def agenerate_embeddings_batch(texts, model=None):
+        raise RuntimeError("Voyage down")
+
+    monkeypatch.setattr(variant_service, "generate_variants", generate_variants)
+    monkeypatch.setattr(variant_service, "agenerate_embeddings_batch", agenerate_embeddings_batch)
+
+    best = asyncio.run(variant_service.generate_ranked_variants(None, {}, "system", [], 2, "caption"))
+    assert best == "first"
+
+
+def test_all_generations_failing_raises(feedback, monkeypatch):
+    async def generate_variants(*args):
+        return []
+
+    monkeypatch.setattr(variant_service, "generate_variants", generate_variants)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(variant_service.generate_ranked_variants(None, {}, "system", [], 3, "caption"))
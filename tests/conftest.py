@@ -0,0 +1,54 @@
+"""
+Shared test setup.
+
+The unit tests cover pure logic, so they run without the service SDKs:
+any of them that is not installed is replaced with an empty module before
+tools/ or backend/ is imported. Tests that reach Supabase, Voyage or Apify
+monkeypatch the function that would make the call.
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _SdkClient:
+    """Stand-in for an SDK client class used only in annotations."""
+
+
+def _stub_if_missing(name: str, **attrs):
+    spec = importlib.util.find_spec(name)
+    # The repo's supabase/ (migrations) directory is found as a namespace package
+    if spec is not None and spec.origin not in (None, "namespace"):
+        return
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+
+
+def _not_installed(*args, **kwargs):
+    raise RuntimeError("SDK not installed in the test environment")
+
+
+_stub_if_missing(
+    "supabase",
+    Client=_SdkClient,
+    AsyncClient=_SdkClient,
+    create_client=_not_installed,
+    acreate_client=_not_installed,
+)
+_stub_if_missing(
+    "voyageai",
+    Client=_SdkClient,
+    AsyncClient=_SdkClient,
+    error=types.SimpleNamespace(**{
+        name: type(name, (Exception,), {})
+        for name in ("InvalidRequestError", "MalformedRequestError", "RateLimitError", "ServiceUnavailableError")
+    }),
+)
+_stub_if_missing("dotenv", load_dotenv=lambda *args, **kwargs: None)
+_stub_if_missing("apify_client", ApifyClient=_SdkClient)
+_stub_if_missing("anthropic", Anthropic=_SdkClient, AsyncAnthropic=_SdkClient)
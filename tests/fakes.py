@@ -0,0 +1,70 @@
+"""
+In-memory stand-ins for the Supabase client, for unit tests.
+
+FakeSupabase records every table() and rpc() query with the builder calls
+made on it (select, eq, in_, order, ...). What execute() returns comes from
+the responder: a callable taking the FakeQuery, or a dict mapping a table
+or RPC name to data (or to a callable taking the FakeQuery).
+"""
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client, kind: str, name: str, params=None):
+        self.client = client
+        self.kind = kind
+        self.name = name
+        self.params = params
+        self.calls = []
+
+    @property
+    def not_(self):
+        self.calls.append(("not_", (), {}))
+        return self
+
+    def __getattr__(self, method):
+        if method.startswith("__"):
+            raise AttributeError(method)
+
+        def record(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+
+        return record
+
+    def called(self, method: str) -> list[tuple]:
+        """Arguments of every call to a builder method, in order."""
+        return [args for name, args, _ in self.calls if name == method]
+
+    def execute(self):
+        return FakeResponse(self.client.respond(self))
+
+
+class FakeSupabase:
+    def __init__(self, responder=None):
+        self.responder = responder or {}
+        self.queries = []
+
+    def _query(self, kind: str, name: str, params=None) -> FakeQuery:
+        query = FakeQuery(self, kind, name, params)
+        self.queries.append(query)
+        return query
+
+    def table(self, name: str) -> FakeQuery:
+        return self._query("table", name)
+
+    def rpc(self, name: str, params=None) -> FakeQuery:
+        return self._query("rpc", name, params)
+
+    def respond(self, query: FakeQuery):
+        if callable(self.responder):
+            return self.responder(query)
+        data = self.responder.get(query.name, [])
+        return data(query) if callable(data) else data
+
+    def find(self, kind: str, name: str) -> list[FakeQuery]:
+        return [q for q in self.queries if q.kind == kind and q.name == name]
@@ -0,0 +1,158 @@
+"""ActorRuns against tools/apify_stub_server.py, over HTTP."""
+
+import json
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from tools import apify_runs
+from tools.apify_runs import ActorRuns, RunPending
+from tools.apify_stub_server import StubApify, _make_handler
+from tests.fakes import FakeSupabase
+
+ACTOR = "apify/instagram-scraper"
+RUN_INPUT = {"directUrls": ["https://www.instagram.com/somesalon/"], "resultsLimit": 20}
+
+
+class HttpApify:
+    """The Apify client calls ActorRuns makes, as plain HTTP against the stub."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def _request(self, method: str, path: str, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(f"{self.base_url}/v2/{path}", data=data, method=method,
+                          headers={"Content-Type": "application/json"})
+        with urlopen(request, timeout=5) as response:
+            return json.loads(response.read())
+
+    def actor(self, actor_id: str):
+        client = self
+
+        class Actor:
+            def start(self, run_input, timeout_secs=None, webhooks=None):
+                path = f"acts/{quote(actor_id.replace('/', '~'))}/runs?timeout={timeout_secs}"
+                return client._request("POST", path, run_input)["data"]
+
+        return Actor()
+
+    def run(self, run_id: str):
+        client = self
+
+        class Run:
+            def get(self):
+                return client._request("GET", f"actor-runs/{run_id}")["data"]
+
+        return Run()
+
+    def dataset_items(self, dataset_id: str) -> list[dict]:
+        return self._request("GET", f"datasets/{dataset_id}/items")
+
+
+class RunsTable:
+    """In-memory apify_runs behind FakeSupabase."""
+
+    def __init__(self):
+        self.rows = []
+        self.supabase = FakeSupabase(self.respond)
+
+    def respond(self, query):
+        if query.name != "apify_runs":
+            return []
+        filters = dict(args for args in query.called("eq"))
+        if query.called("insert"):
+            row = {**query.called("insert")[0][0], "started_at": datetime.now(timezone.utc).isoformat()}
+            self.rows.append(row)
+            return [row]
+        matches = [row for row in self.rows if all(row.get(k) == v for k, v in filters.items())]
+        if query.called("update"):
+            for row in matches:
+                row.update(query.called("update")[0][0])
+        return [dict(row) for row in matches]
+
+
+@pytest.fixture
+def stub():
+    stub = StubApify(run_seconds=0.3, items=3, fail=["tiktok"])
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(stub))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub.client = HttpApify(f"http://127.0.0.1:{server.server_address[1]}")
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def table(stub, monkeypatch):
+    table = RunsTable()
+    monkeypatch.setattr(apify_runs, "get_apify_client", lambda: stub.client)
+    monkeypatch.setattr(apify_runs, "get_supabase_client", lambda: table.supabase)
+    return table
+
+
+def wait_until_finished(stub):
+    for run_id in stub.runs:
+        assert stub.get_run(run_id, wait_seconds=5)["status"] != "RUNNING"
+
+
+def test_first_call_starts_the_run_and_parks(stub, table):
+    with pytest.raises(RunPending) as pending:
+        ActorRuns("job-1", "instagram:@somesalon").call(ACTOR, RUN_INPUT)
+
+    assert list(stub.runs) == [pending.value.run_id]
+    assert stub.runs[pending.value.run_id]["actId"] == ACTOR
+    assert [row["status"] for row in table.rows] == ["RUNNING"]
+
+
+def test_succeeded_run_is_read_from_its_dataset_by_a_new_instance(stub, table):
+    with pytest.raises(RunPending):
+        ActorRuns("job-1", "instagram:@somesalon").call(ACTOR, RUN_INPUT)
+    wait_until_finished(stub)
+
+    # A resumed job (or another worker) gets the same run, not a second one
+    run = ActorRuns("job-1", "instagram:@somesalon").call(ACTOR, RUN_INPUT)
+
+    assert len(stub.runs) == 1 and run["id"] in stub.runs
+    assert run["status"] == "SUCCEEDED" and table.rows[0]["status"] == "SUCCEEDED"
+    assert len(stub.client.dataset_items(run["defaultDatasetId"])) == 3
+
+
+def test_moved_watermark_cut_off_does_not_start_a_new_run(stub, table):
+    with pytest.raises(RunPending) as first:
+        ActorRuns("job-1", "instagram:@somesalon").call(ACTOR, {**RUN_INPUT, "onlyPostsNewerThan": "2026-01-01"})
+    wait_until_finished(stub)
+
+    run = ActorRuns("job-1", "instagram:@somesalon").call(ACTOR, {**RUN_INPUT, "onlyPostsNewerThan": "2026-02-01"})
+    assert run["id"] == first.value.run_id and len(stub.runs) == 1
+
+
+def test_changed_input_or_target_starts_its_own_run(stub, table):
+    for target, run_input in [
+        ("instagram:@somesalon", RUN_INPUT),
+        ("instagram:@somesalon", {**RUN_INPUT, "resultsLimit": 50}),
+        ("instagram:@othersalon", RUN_INPUT),
+    ]:
+        with pytest.raises(RunPending):
+            ActorRuns("job-1", target).call(ACTOR, run_input)
+
+    assert len(stub.runs) == 3
+
+
+def test_failed_run_fails_the_target_until_the_next_attempt(stub, table):
+    actor = "clockworks/tiktok-scraper"
+    with pytest.raises(RunPending):
+        ActorRuns("job-1", "tiktok:@somesalon").call(actor, RUN_INPUT)
+    wait_until_finished(stub)
+
+    with pytest.raises(RuntimeError, match="FAILED"):
+        ActorRuns("job-1", "tiktok:@somesalon").call(actor, RUN_INPUT)
+    assert len(stub.runs) == 1
+
+    with pytest.raises(RunPending):
+        ActorRuns("job-1", "tiktok:@somesalon", attempt=2).call(actor, RUN_INPUT)
+    assert len(stub.runs) == 2
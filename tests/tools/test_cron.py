@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from tools.utils.cron import CronExpression
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_next_after_is_strictly_later():
+    cron = CronExpression("30 6 * * *")
+    assert cron.next_after(utc(2026, 3, 2, 6, 29)) == utc(2026, 3, 2, 6, 30)
+    assert cron.next_after(utc(2026, 3, 2, 6, 30)) == utc(2026, 3, 3, 6, 30)
+
+
+def test_steps_and_ranges():
+    cron = CronExpression("*/15 8-18/2 * * *")
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.hours == {8, 10, 12, 14, 16, 18}
+    assert cron.next_after(utc(2026, 3, 2, 9, 5)) == utc(2026, 3, 2, 10, 0)
+    assert cron.next_after(utc(2026, 3, 2, 18, 45)) == utc(2026, 3, 3, 8, 0)
+
+
+def test_step_from_a_start_value_runs_to_the_end_of_the_range():
+    assert CronExpression("5/20 * * * *").minutes == {5, 25, 45}
+
+
+def test_day_of_month_or_day_of_week_when_both_restricted():
+    # The 13th, or any Friday
+    cron = CronExpression("0 0 13 * 5")
+    assert cron.next_after(utc(2026, 3, 1)) == utc(2026, 3, 6)  # Friday the 6th
+    assert cron.next_after(utc(2026, 3, 12)) == utc(2026, 3, 13)  # Friday the 13th
+    assert cron.next_after(utc(2026, 4, 10, 1)) == utc(2026, 4, 13)  # Monday the 13th
+
+
+def test_day_of_week_alone_restricts_only_the_weekday():
+    cron = CronExpression("0 6 * * 1")
+    assert cron.next_after(utc(2026, 3, 3)) == utc(2026, 3, 9, 6)  # Tuesday -> next Monday
+
+
+def test_sunday_is_0_and_7():
+    assert CronExpression("0 0 * * 7").weekdays == {0}
+    assert CronExpression("0 0 * * 0").next_after(utc(2026, 3, 2)) == utc(2026, 3, 8)
+
+
+def test_february_29_fires_only_in_leap_years():
+    cron = CronExpression("0 12 29 2 *")
+    assert cron.next_after(utc(2026, 1, 1)) == utc(2028, 2, 29, 12)
+
+
+def test_aliases():
+    assert CronExpression("@daily").next_after(utc(2026, 3, 2, 5)) == utc(2026, 3, 3)
+    assert CronExpression("@monthly").next_after(utc(2026, 12, 15)) == utc(2027, 1, 1)
+
+
+def test_keeps_timezone():
+    assert CronExpression("@hourly").next_after(utc(2026, 3, 2, 5, 10)).tzinfo is timezone.utc
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* * 0 * *", "*/0 * * * *", "a * * * *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_expression_that_never_fires():
+    with pytest.raises(ValueError, match="never fires"):
+        CronExpression("0 0 30 2 *").next_after(utc(2026, 1, 1))
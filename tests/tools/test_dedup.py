@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from tools import dedup
+
+CAPTION = "Five ways to fill your salon chair this winter with regulars and referrals"
+
+
+@pytest.fixture
+def no_database(monkeypatch):
+    """No stored URLs and no stored near-duplicates unless a test sets them."""
+    monkeypatch.setattr(dedup, "_known_urls", lambda urls: set())
+    monkeypatch.setattr(dedup, "_existing_matches", lambda hashes, platform_id: {})
+
+
+def post(url: str, text: str = CAPTION, virality: float = 1.0, platform_id: int = 1) -> dict:
+    return {"source_url": url, "content_text": text, "virality_score": virality, "platform_id": platform_id}
+
+
+def test_simhash_ignores_formatting_noise():
+    noisy = "FIVE ways to fill your salon chair this winter 💇 with regulars and referrals!! #salonowner @someone"
+    assert dedup.simhash(CAPTION) == dedup.simhash(noisy)
+    assert dedup.simhash("") is None
+
+
+def test_cluster_hashes_links_close_hashes_transitively():
+    base = dedup.simhash(CAPTION)
+    hashes = np.array([base, base ^ 0b11, base ^ 0b11111, base ^ (0xFFFF << 40)], dtype=np.int64)
+    clusters = sorted(sorted(c) for c in dedup.cluster_hashes(hashes))
+    assert clusters == [[0, 1, 2], [3]]
+
+
+def test_batch_near_duplicates_link_to_the_most_viral(no_database):
+    rows = [post("a", virality=2), post("b", CAPTION + " #salontok 🔥", virality=9), post("c", "Something else entirely here")]
+    prepared = dedup.prepare_for_insert(rows)
+
+    by_url = {row["source_url"]: row for row in prepared}
+    assert by_url["b"]["duplicate_of"] is None
+    assert by_url["a"]["duplicate_of"] == by_url["b"]["id"]
+    assert by_url["c"]["duplicate_of"] is None
+    # Representatives come before the rows pointing at them
+    assert prepared[-1]["source_url"] == "a"
+
+
+def test_repeated_and_stored_urls(no_database, monkeypatch):
+    monkeypatch.setattr(dedup, "_known_urls", lambda urls: {"stored"})
+    rows = [post("stored"), post("a", "Another caption about booking"), post("a", "Another caption about booking"),
+            post("known")]
+    prepared = dedup.prepare_for_insert(rows, known_urls={"known"})
+
+    assert [row["source_url"] for row in prepared] == ["a", "stored", "known"]
+    assert all(row["duplicate_of"] is None for row in prepared)
+
+
+def test_joins_a_stored_cluster_with_a_more_viral_representative(no_database, monkeypatch):
+    monkeypatch.setattr(
+        dedup, "_existing_matches",
+        lambda hashes, platform_id: {h: {"id": "stored", "duplicate_of": None, "virality_score": 50, "distance": 0}
+                                     for h in hashes},
+    )
+    prepared = dedup.prepare_for_insert([post("a", virality=10), post("b", CAPTION.upper() + "!!", virality=20)])
+
+    assert all(row["duplicate_of"] == "stored" for row in prepared)
+    assert not any("supersedes" in row for row in prepared)
+
+
+def test_more_viral_post_supersedes_the_stored_representative(no_database, monkeypatch):
+    monkeypatch.setattr(
+        dedup, "_existing_matches",
+        lambda hashes, platform_id: {h: {"id": "dup", "duplicate_of": "rep", "virality_score": 90, "distance": 1}
+                                     for h in hashes},
+    )
+    monkeypatch.setattr(dedup, "_representative_scores", lambda ids: {"rep": 5})
+    prepared = dedup.prepare_for_insert([post("a", virality=10), post("b", CAPTION.upper() + "!!", virality=7)])
+
+    by_url = {row["source_url"]: row for row in prepared}
+    assert by_url["a"]["duplicate_of"] is None
+    assert by_url["a"]["supersedes"] == "rep"
+    assert by_url["b"]["duplicate_of"] == by_url["a"]["id"]
@@ -0,0 +1,104 @@
+import pytest
+
+from tools import embedding_worker
+from tests.fakes import FakeSupabase
+
+ROWS = {
+    "a": "salon marketing tips",
+    "b": "bad text",
+    "c": "",
+    "d": "balayage before and after",
+}
+
+
+def make_jobs(row_ids, table_name="scraped_content"):
+    return [{"id": i, "table_name": table_name, "row_id": row_id} for i, row_id in enumerate(row_ids, 1)]
+
+
+class Queue:
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.supabase = FakeSupabase(self.respond)
+
+    def respond(self, query):
+        if query.name == "claim_embedding_jobs":
+            jobs, self.jobs = self.jobs, []
+            return jobs
+        if query.name == "scraped_content":
+            ids = query.called("in_")[0][1]
+            return [{"id": row_id, "content_text": ROWS[row_id]} for row_id in ids if row_id in ROWS]
+        if query.name == "enqueue_missing_embeddings":
+            return 7
+        return []
+
+    def rpc_params(self, name):
+        return [q.params for q in self.supabase.find("rpc", name)]
+
+    def deleted(self):
+        return [q.called("in_")[0][1] for q in self.supabase.find("table", "embedding_jobs")]
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    def install(jobs, embed=None):
+        queue = Queue(jobs)
+        monkeypatch.setattr(embedding_worker, "get_supabase_client", lambda: queue.supabase)
+        monkeypatch.setattr(embedding_worker, "get_active_model", lambda: "voyage-test")
+        monkeypatch.setattr(
+            embedding_worker,
+            "generate_embeddings_batch",
+            embed or (lambda texts, model: [None if "bad" in t else [0.5] for t in texts]),
+        )
+        return queue
+
+    return install
+
+
+def test_batch_writes_embeddings_and_fails_the_rest(queue):
+    q = queue(make_jobs(["a", "b", "c", "gone", "d"]))
+
+    assert embedding_worker.process_batch() == {"claimed": 5, "embedded": 4, "failed": 1}
+
+    [bulk] = q.rpc_params("bulk_set_embeddings")
+    assert bulk["ids"] == ["a", "d"] and bulk["model"] == "voyage-test"
+    # Empty texts and deleted rows have nothing to embed and are done too
+    assert sorted(q.deleted()[0]) == [1, 3, 4, 5]
+    assert q.rpc_params("fail_embedding_jobs") == [
+        {"job_ids": [2], "error_message": "Embedding request failed after splitting"}
+    ]
+
+
+def test_table_that_raises_fails_all_its_jobs_for_backoff(queue):
+    def embed(texts, model):
+        raise RuntimeError("Voyage down")
+
+    q = queue(make_jobs(["a", "d"]), embed)
+
+    assert embedding_worker.process_batch() == {"claimed": 2, "embedded": 0, "failed": 2}
+    assert q.rpc_params("fail_embedding_jobs") == [{"job_ids": [1, 2], "error_message": "Voyage down"}]
+    assert not q.deleted()
+
+
+def test_drain_stops_on_an_empty_queue_without_sweeping(queue):
+    q = queue(make_jobs(["a"]))
+
+    assert embedding_worker.run_worker(drain=True)["embedded"] == 1
+    assert len(q.rpc_params("claim_embedding_jobs")) == 2
+    assert not q.rpc_params("enqueue_missing_embeddings")
+
+
+def test_long_running_worker_sweeps_on_start(queue, monkeypatch):
+    monkeypatch.setattr(embedding_worker, "POLL_INTERVAL_SECONDS", 0.01)
+    q = queue([])
+
+    embedding_worker.run_worker(max_seconds=0.05)
+    assert q.rpc_params("enqueue_missing_embeddings") == [{"job_priority": embedding_worker.PRIORITY_SWEEP}]
+
+
+def test_enqueue_skips_empty_ids_and_rejects_unknown_tables(queue):
+    q = queue([])
+
+    assert embedding_worker.enqueue_embeddings("scraped_content", [None, ""]) == 0
+    assert not q.supabase.queries
+    with pytest.raises(ValueError):
+        embedding_worker.enqueue_embeddings("generated_content", ["a"])
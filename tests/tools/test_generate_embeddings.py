@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from voyageai import error as voyage_error
+
+from tools import generate_embeddings
+from tools.generate_embeddings import estimate_tokens, pack_batches
+from tools.utils.rate_limiter import RateLimiter
+
+
+def test_pack_batches_respects_the_token_budget(monkeypatch):
+    monkeypatch.setattr(generate_embeddings, "MAX_BATCH_TOKENS", 2 * estimate_tokens("x" * 30))
+    texts = ["x" * 30] * 5
+
+    assert pack_batches(texts) == [[0, 1], [2, 3], [4]]
+
+
+def test_pack_batches_respects_the_text_limit(monkeypatch):
+    monkeypatch.setattr(generate_embeddings, "MAX_BATCH_TEXTS", 3)
+
+    assert pack_batches(["a"] * 7) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_oversized_text_gets_its_own_batch(monkeypatch):
+    monkeypatch.setattr(generate_embeddings, "MAX_BATCH_TOKENS", 10)
+
+    assert pack_batches(["a", "x" * 300, "b"]) == [[0], [1], [2]]
+    assert pack_batches([]) == []
+
+
+class FakeVoyage:
+    """Embeds each text as [len(text)]; rejects requests over max_texts, or fails with `error`."""
+
+    def __init__(self, max_texts: int = 100, error: Exception | None = None):
+        self.max_texts = max_texts
+        self.error = error
+        self.requests = []
+
+    def embed(self, texts, **kwargs):
+        self.requests.append(list(texts))
+        if self.error is not None:
+            raise self.error
+        if len(texts) > self.max_texts or "bad" in texts:
+            raise voyage_error.InvalidRequestError("request too large")
+        return type("Result", (), {"embeddings": [[float(len(t))] for t in texts]})
+
+
+class FakeAsyncVoyage(FakeVoyage):
+    async def embed(self, texts, **kwargs):
+        return FakeVoyage.embed(self, texts, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def unlimited(monkeypatch):
+    monkeypatch.setattr(generate_embeddings, "_rate_limiter", RateLimiter(1_000_000))
+
+
+@pytest.fixture(params=["sync", "async"])
+def embedder(request, monkeypatch):
+    """(client class, embed(client, texts)) for _embed_with_split and _aembed_with_split."""
+    if request.param == "sync":
+        def embed(client, texts):
+            monkeypatch.setattr(generate_embeddings, "get_voyage_client", lambda: client)
+            return generate_embeddings._embed_with_split(texts, "document", "voyage-test")
+
+        return FakeVoyage, embed
+
+    def aembed(client, texts):
+        monkeypatch.setattr(generate_embeddings, "get_async_voyage_client", lambda: client)
+        return asyncio.run(generate_embeddings._aembed_with_split(
+            texts, "document", "voyage-test", asyncio.Semaphore(4)
+        ))
+
+    return FakeAsyncVoyage, aembed
+
+
+def test_rejected_batch_is_halved_until_it_fits(embedder):
+    client_class, embed = embedder
+    client = client_class(max_texts=2)
+
+    assert embed(client, ["a", "bb", "ccc", "dddd", "eeeee"]) == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert sorted(map(len, client.requests)) == [1, 2, 2, 3, 5]
+
+
+def test_rejected_text_only_loses_itself(embedder):
+    client_class, embed = embedder
+
+    assert embed(client_class(), ["a", "bad", "cc", "d"]) == [[1.0], None, [2.0], [1.0]]
+
+
+@pytest.mark.parametrize("error", [voyage_error.RateLimitError, voyage_error.ServiceUnavailableError, RuntimeError])
+def test_transient_failure_is_not_split(embedder, error):
+    client_class, embed = embedder
+    client = client_class(error=error("try again"))
+
+    assert embed(client, ["a", "b", "c", "d"]) == [None] * 4
+    assert len(client.requests) == 1
@@ -0,0 +1,49 @@
+from tools.ingest import _upsert_with_split
+from tests.fakes import FakeSupabase
+
+
+def make_rows(*urls):
+    return [{"id": url, "source_url": url} for url in urls]
+
+
+class UpsertRpc:
+    """upsert_scraped_content that rejects any request containing a poisoned row."""
+
+    def __init__(self, poisoned=()):
+        self.poisoned = set(poisoned)
+        self.requests = []
+        self.supabase = FakeSupabase(self.respond)
+
+    def respond(self, query):
+        rows = query.params["content_rows"]
+        self.requests.append([row["id"] for row in rows])
+        bad = self.poisoned.intersection(row["id"] for row in rows)
+        if bad:
+            raise ValueError(f"invalid row {sorted(bad)[0]}")
+        return [{"id": row["id"], "inserted": True} for row in rows]
+
+
+def test_batch_that_succeeds_is_one_request():
+    rpc = UpsertRpc()
+
+    written, failed = _upsert_with_split(rpc.supabase, make_rows("a", "b", "c"))
+    assert [row["id"] for row in written] == ["a", "b", "c"]
+    assert failed == []
+    assert rpc.requests == [["a", "b", "c"]]
+
+
+def test_bad_row_is_isolated_by_halving():
+    rpc = UpsertRpc(poisoned={"c"})
+
+    written, failed = _upsert_with_split(rpc.supabase, make_rows("a", "b", "c", "d", "e"))
+    assert [row["id"] for row in written] == ["a", "b", "d", "e"]
+    assert failed == [({"id": "c", "source_url": "c"}, "invalid row c")]
+    assert rpc.requests == [["a", "b", "c", "d", "e"], ["a", "b"], ["c", "d", "e"], ["c"], ["d", "e"]]
+
+
+def test_every_bad_row_is_reported():
+    rpc = UpsertRpc(poisoned={"a", "d"})
+
+    written, failed = _upsert_with_split(rpc.supabase, make_rows("a", "b", "c", "d"))
+    assert [row["id"] for row in written] == ["b", "c"]
+    assert [row["id"] for row, _ in failed] == ["a", "d"]
@@ -0,0 +1,177 @@
+import asyncio
+
+import pytest
+
+from tools.utils import job_events
+
+
+class FakeChannel:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.on_change = None
+        self.on_status = None
+        self.options = None
+
+    def on_postgres_changes(self, event, callback, **options):
+        self.options = {"event": event, **options}
+        self.on_change = callback
+        return self
+
+    async def subscribe(self, callback):
+        if self.fail:
+            raise ConnectionError("realtime socket refused")
+        self.on_status = callback
+        callback("SUBSCRIBED", None)
+
+
+class FakeRealtime:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.channels = []
+        self.removed = []
+
+    def channel(self, topic):
+        channel = FakeChannel(self.fail)
+        self.channels.append(channel)
+        return channel
+
+    async def remove_channel(self, channel):
+        self.removed.append(channel)
+
+
+class JobRow:
+    def __init__(self, status="running"):
+        self.row = {"id": "job-1", "status": status, "progress": {}}
+        self.reads = 0
+
+    async def read(self, job_id):
+        self.reads += 1
+        return dict(self.row, progress=dict(self.row["progress"]))
+
+
+@pytest.fixture
+def job(monkeypatch):
+    job = JobRow()
+    monkeypatch.setattr(job_events, "_read_job", job.read)
+    return job
+
+
+@pytest.fixture
+def realtime(monkeypatch):
+    def install(fail=False):
+        client = FakeRealtime(fail)
+
+        async def get_client():
+            return client
+
+        monkeypatch.setattr(job_events, "get_async_supabase_client", get_client)
+        return client
+
+    return install
+
+
+def run(coroutine_fn):
+    return asyncio.run(asyncio.wait_for(coroutine_fn(), 5))
+
+
+def test_changes_are_pushed_without_polling(job, realtime, monkeypatch):
+    monkeypatch.setattr(job_events, "DB_POLL_SECONDS", 0.001)
+    client = realtime()
+
+    async def scenario():
+        events = job_events.stream("job-1")
+        first = await events.__anext__()
+        channel = client.channels[0]
+        await asyncio.sleep(0.05)
+        # Idle: no polling while Realtime is up
+        assert job.reads == 1
+
+        job.row["progress"] = {"inserted": 5}
+        channel.on_change({"data": {"type": "UPDATE"}})
+        second = await events.__anext__()
+
+        job.row["status"] = "completed"
+        channel.on_change({"data": {"type": "UPDATE"}})
+        third = await events.__anext__()
+        rest = [event async for event in events]
+        return first, second, third, rest, channel
+
+    first, second, third, rest, channel = run(scenario)
+
+    assert channel.options == {"event": "UPDATE", "schema": "public", "table": "scrape_jobs", "filter": "id=eq.job-1"}
+    assert first["type"] == "snapshot" and first["status"] == "running"
+    assert second["progress"] == {"inserted": 5}
+    assert third["status"] == "completed" and rest == []
+    assert job.reads == 3
+    assert client.removed == [channel]
+
+
+def test_quiet_realtime_stream_sends_keep_alives_until_time_is_up(job, realtime, monkeypatch):
+    monkeypatch.setattr(job_events, "KEEPALIVE_SECONDS", 0.01)
+    realtime()
+
+    async def scenario():
+        return [event async for event in job_events.stream("job-1", max_seconds=0.1)]
+
+    events = run(scenario)
+
+    assert events[0]["type"] == "snapshot" and set(events[1:]) == {None}
+    assert job.reads == 1
+
+
+def test_falls_back_to_polling_when_realtime_is_unavailable(job, realtime, monkeypatch):
+    monkeypatch.setattr(job_events, "DB_POLL_SECONDS", 0.01)
+    realtime(fail=True)
+
+    async def scenario():
+        events = job_events.stream("job-1")
+        first = await events.__anext__()
+        job.row["status"] = "completed"
+        return first, [event async for event in events if event is not None]
+
+    first, rest = run(scenario)
+
+    assert first["status"] == "running"
+    assert [event["status"] for event in rest] == ["completed"]
+
+
+def test_channel_error_mid_stream_switches_to_polling(job, realtime, monkeypatch):
+    monkeypatch.setattr(job_events, "DB_POLL_SECONDS", 0.01)
+    client = realtime()
+
+    async def scenario():
+        events = job_events.stream("job-1")
+        await events.__anext__()
+        client.channels[0].on_status("CHANNEL_ERROR", ConnectionError("socket closed"))
+        assert await events.__anext__() is None
+        # Changes are now picked up by polling, with no notification
+        job.row["status"] = "failed"
+        return [event async for event in events if event is not None]
+
+    assert [event["status"] for event in run(scenario)] == ["failed"]
+
+
+def test_missing_job_is_reported(job, realtime, monkeypatch):
+    realtime()
+
+    async def missing(job_id):
+        return None
+
+    monkeypatch.setattr(job_events, "_read_job", missing)
+
+    async def scenario():
+        return [event async for event in job_events.stream("job-404")]
+
+    assert run(scenario) == [{"type": "error", "job_id": "job-404", "message": "Job not found"}]
+
+
+def test_counts_are_summed_and_flushed_on_status(monkeypatch):
+    flushed = []
+    monkeypatch.setattr(job_events, "_flush", lambda job_id, snapshot: flushed.append(snapshot))
+
+    job_events.seed_progress("job-2", {"inserted": 10, "updated_at": "earlier"})
+    job_events.publish("job-2", "batch", counts={"inserted": 3, "duplicates": 0})
+    job_events.publish("job-2", "status", status="completed")
+
+    assert flushed[-1]["inserted"] == 13 and "duplicates" not in flushed[-1]
+    assert "job-2" not in job_events._jobs
@@ -0,0 +1,128 @@
+import time
+
+import pytest
+
+from tools import job_worker
+from tools.job_worker import JobWaiting, raise_if_cancelled
+from tests.fakes import FakeSupabase
+
+
+def make_job(job_id="job-1", job_type="viral_research"):
+    return {"id": job_id, "job_type": job_type, "attempts": 1, "payload": {}}
+
+
+class Queue:
+    """Fake scrape_jobs RPCs: hands out `jobs` on the first claim and records outcomes."""
+
+    def __init__(self, jobs, held=True, fail_status="pending"):
+        self.jobs = list(jobs)
+        self.held = held
+        self.fail_status = fail_status
+        self.supabase = FakeSupabase(self.respond)
+
+    def respond(self, query):
+        if query.name == "claim_scrape_jobs":
+            jobs, self.jobs = self.jobs[: query.params["batch_size"]], self.jobs[query.params["batch_size"]:]
+            return jobs
+        if query.name == "heartbeat_scrape_jobs":
+            return list(query.params["job_ids"]) if self.held else []
+        if query.name == "park_scrape_job":
+            return "waiting"
+        if query.name == "fail_scrape_job":
+            return self.fail_status
+        if query.name == "scrape_jobs":
+            return [{"id": query.called("eq")[0][1]}] if self.held else []
+        raise AssertionError(f"Unexpected query {query.name}")
+
+    def rpc_params(self, name):
+        return [q.params for q in self.supabase.find("rpc", name)]
+
+
+@pytest.fixture
+def run(monkeypatch):
+    events = []
+    monkeypatch.setattr(job_worker, "publish", lambda job_id, kind, **fields: events.append(fields.get("status")))
+    monkeypatch.setattr(job_worker, "seed_progress", lambda *args: None)
+
+    def run(queue, handler, **kwargs):
+        monkeypatch.setattr(job_worker, "get_supabase_client", lambda: queue.supabase)
+        monkeypatch.setitem(job_worker.JOB_HANDLERS, "viral_research", handler)
+        return job_worker.run_worker(drain=True, worker_id="worker-a", **kwargs)
+
+    run.events = events
+    return run
+
+
+def counts(**nonzero):
+    return {"completed": 0, "waiting": 0, "retrying": 0, "failed": 0, "lost": 0, **nonzero}
+
+
+def test_completed_job_is_written_only_under_the_lease(run):
+    queue = Queue([make_job()])
+
+    assert run(queue, lambda job: {"results_count": 3}) == counts(completed=1)
+
+    update = queue.supabase.find("table", "scrape_jobs")[0]
+    assert update.called("update")[0][0]["results_count"] == 3
+    assert ("locked_by", "worker-a") in update.called("eq")
+    assert run.events == ["running", "completed"]
+
+
+def test_completion_after_the_lease_was_taken_over_is_lost(run):
+    assert run(Queue([make_job()], held=False), lambda job: {}) == counts(lost=1)
+
+
+def test_waiting_job_is_parked_with_its_delay(run):
+    queue = Queue([make_job()])
+
+    def handler(job):
+        raise JobWaiting("2 runs still going", delay_seconds=30)
+
+    assert run(queue, handler) == counts(waiting=1)
+    assert queue.rpc_params("park_scrape_job") == [
+        {"job_id": "job-1", "worker_id": "worker-a", "delay_seconds": 30}
+    ]
+
+
+def test_job_past_cancel_after_is_parked_to_resume(run):
+    queue = Queue([make_job()])
+
+    def handler(job):
+        while True:
+            raise_if_cancelled(job["id"])
+            time.sleep(0.005)
+
+    assert run(queue, handler, cancel_after=0.05) == counts(waiting=1)
+    assert queue.rpc_params("park_scrape_job")[0]["delay_seconds"] == 0
+    assert job_worker.time_left("job-1") is None
+
+
+def test_lost_heartbeat_cancels_the_job_without_recording_it(run, monkeypatch):
+    monkeypatch.setattr(job_worker, "HEARTBEAT_SECONDS", 0.01)
+    queue = Queue([make_job()], held=False)
+
+    def handler(job):
+        while True:
+            raise_if_cancelled(job["id"])
+            time.sleep(0.005)
+
+    assert run(queue, handler) == counts(lost=1)
+    assert queue.rpc_params("heartbeat_scrape_jobs")[0]["job_ids"] == ["job-1"]
+    assert not queue.rpc_params("park_scrape_job") and not queue.rpc_params("fail_scrape_job")
+
+
+@pytest.mark.parametrize("status, outcome", [("pending", "retrying"), ("failed", "failed")])
+def test_failed_job_is_retried_or_given_up(run, status, outcome):
+    queue = Queue([make_job()], fail_status=status)
+
+    def handler(job):
+        raise RuntimeError("actor crashed")
+
+    assert run(queue, handler) == counts(**{outcome: 1})
+    assert queue.rpc_params("fail_scrape_job")[0]["error_message"] == "actor crashed"
+    assert run.events[-1] == outcome
+
+
+def test_unknown_job_type_is_not_queued():
+    with pytest.raises(ValueError):
+        job_worker.enqueue_job("mystery")
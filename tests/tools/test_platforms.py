@@ -0,0 +1,46 @@
+import pytest
+
+from tools.platforms import ADAPTERS, PLATFORM_MAP, get_adapter, transform_batch
+
+
+def test_platform_map_matches_the_adapters():
+    assert PLATFORM_MAP == {"instagram": 1, "tiktok": 2, "youtube": 3}
+    assert get_adapter("tiktok") is ADAPTERS["tiktok"]
+    with pytest.raises(ValueError):
+        get_adapter("myspace")
+
+
+def test_instagram_transform_batch():
+    items = [
+        {
+            "shortCode": "abc",
+            "ownerUsername": "somesalon",
+            "caption": "Booked out all week #salonowner",
+            "type": "Sidecar",
+            "displayUrl": "https://cdn/1.jpg",
+            "likesCount": 120,
+            "commentsCount": 8,
+            "timestamp": "2026-03-01T10:00:00.000Z",
+        },
+        {"shortCode": "empty", "caption": ""},
+        {"url": "https://www.instagram.com/p/xyz/", "owner": {"username": "other"}, "text": "Reel", "type": "Video"},
+    ]
+    rows = transform_batch(get_adapter("instagram"), items, "job-1")
+
+    assert rows[1] is None
+    first, third = rows[0], rows[2]
+    assert first["source_url"] == "https://www.instagram.com/p/abc/"
+    assert first["source_handle"] == "somesalon"
+    assert first["content_type"] == "carousel"
+    assert first["media_urls"] == ["https://cdn/1.jpg"]
+    assert (first["likes_count"], first["comments_count"], first["shares_count"]) == (120, 8, 0)
+    assert first["platform_id"] == 1 and first["scrape_job_id"] == "job-1"
+    assert first["virality_score"] > third["virality_score"] >= 0
+    assert third["source_url"] == "https://www.instagram.com/p/xyz/"
+    assert third["source_handle"] == "other"
+    assert third["content_type"] == "reel"
+
+
+def test_transform_batch_without_text():
+    assert transform_batch(get_adapter("instagram"), [{"caption": ""}], "job") == [None]
+    assert transform_batch(get_adapter("instagram"), [], "job") == []
@@ -0,0 +1,44 @@
+import pytest
+
+from tools.utils import rate_limiter
+from tools.utils.rate_limiter import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_up_to_capacity_then_waits(clock):
+    limiter = RateLimiter(requests_per_minute=3)
+    assert [limiter._try_take(0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter._try_take(0) == pytest.approx(20.0)
+
+    clock.now += 20
+    assert limiter._try_take(0) == 0.0
+
+
+def test_token_budget(clock):
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600)
+    assert limiter._try_take(500) == 0.0
+    # 100 tokens left, refilling at 10 per second
+    assert limiter._try_take(300) == pytest.approx(20.0)
+
+    clock.now += 20
+    assert limiter._try_take(300) == 0.0
+
+
+def test_request_larger_than_the_bucket_is_capped(clock):
+    limiter = RateLimiter(requests_per_minute=100, tokens_per_minute=600)
+    assert limiter._try_take(10_000) == 0.0
+    assert limiter.token_level == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from tools.utils import raw_archive
+from tools.utils.raw_archive import RawArchiveWriter, read_raw
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    """In-memory stand-in for the Storage bucket: path -> bytes."""
+    objects = {}
+
+    def upload(path, data):
+        if path in objects:
+            raise RuntimeError("exists")
+        objects[path] = data
+
+    monkeypatch.setattr(raw_archive, "_upload", upload)
+    monkeypatch.setattr(raw_archive, "_download", lambda path: objects[path])
+    return objects
+
+
+def test_round_trip(bucket):
+    items = [{"id": i, "caption": f"post {i} 💇", "nested": {"likes": i * 10}} for i in range(7)]
+    with RawArchiveWriter("job/1", segment_items=3) as writer:
+        refs = [writer(item) for item in items]
+
+    assert len(bucket) == 3
+    assert all(path.startswith("job_1/") for path in bucket)
+    assert all(writer.is_durable(ref) for ref in refs)
+    assert [read_raw(ref) for ref in refs] == items
+
+
+def test_refs_are_not_durable_until_flushed(bucket):
+    writer = RawArchiveWriter("job")
+    ref = writer.write({"id": 1})
+    assert not writer.is_durable(ref)
+
+    writer.flush()
+    assert writer.is_durable(ref)
+
+
+def test_failed_upload_keeps_items_non_durable(monkeypatch):
+    def upload(path, data):
+        raise RuntimeError("storage down")
+
+    monkeypatch.setattr(raw_archive, "_upload", upload)
+    writer = RawArchiveWriter("job")
+    refs = [writer.write({"id": i}) for i in range(2)]
+    writer.close()
+
+    assert writer.failed == 2
+    assert not any(writer.is_durable(ref) for ref in refs)
+
+
+def test_read_raw_missing_line_or_segment(bucket):
+    with RawArchiveWriter("job") as writer:
+        ref = writer.write({"id": 1})
+    segment = ref.rpartition(":")[0]
+
+    assert read_raw(f"{segment}:5") is None
+    assert read_raw("job/missing.jsonl.zst:0") is None
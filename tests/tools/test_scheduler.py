@@ -0,0 +1,96 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+from tools import scheduler
+
+NOW = datetime(2026, 3, 2, 6, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Jobs create_scrape_job was asked for, as (platforms, terms, handles)."""
+    jobs = []
+
+    def create_scrape_job(platforms, job_type, search_terms, target_handles, max_results,
+                          incremental=True, priority=0, schedule_id=None):
+        jobs.append((platforms, search_terms, target_handles))
+        return f"job-{len(jobs)}"
+
+    monkeypatch.setattr(scheduler, "create_scrape_job", create_scrape_job)
+    monkeypatch.setitem(scheduler.SCRAPE_BUDGET_PER_HOUR, "instagram", 4)
+    monkeypatch.setitem(scheduler.SCRAPE_BUDGET_PER_HOUR, "tiktok", 4)
+    return jobs
+
+
+def schedule(**overrides) -> dict:
+    return {
+        "id": "schedule-1",
+        "name": "weekly",
+        "cron": "0 6 * * 1",
+        "platforms": ["instagram", "tiktok"],
+        "search_terms": ["salonowner"],
+        "target_handles": ["somesalon"],
+        "max_results": 50,
+        "jitter_seconds": 0,
+        **overrides,
+    }
+
+
+def test_queues_every_target_when_nothing_is_in_flight(created):
+    in_flight, used = set(), Counter()
+    update = scheduler.fire_schedule(schedule(), in_flight, used, NOW)
+
+    assert created == [(["instagram", "tiktok"], ["salonowner"], ["somesalon"])]
+    assert update["last_job_ids"] == ["job-1"]
+    assert update["last_result"] == "queued 1 job (4 targets)"
+    assert update["next_run_at"] == "2026-03-09T06:00:00+00:00"
+    assert in_flight == {"instagram:@somesalon", "instagram:salonowner", "tiktok:@somesalon", "tiktok:salonowner"}
+    assert used == Counter({"instagram": 2, "tiktok": 2})
+
+
+def test_coalesces_targets_already_in_flight(created):
+    in_flight = {"instagram:@somesalon", "tiktok:salonowner"}
+    update = scheduler.fire_schedule(schedule(), in_flight, Counter(), NOW)
+
+    # What is left differs per platform, so it takes one job each
+    assert sorted(created) == [(["instagram"], ["salonowner"], None), (["tiktok"], None, ["somesalon"])]
+    assert update["last_result"] == "queued 2 jobs (2 targets, 2 coalesced)"
+
+
+def test_schedule_with_everything_in_flight_queues_nothing(created):
+    in_flight = {"instagram:@somesalon", "instagram:salonowner", "tiktok:@somesalon", "tiktok:salonowner"}
+    update = scheduler.fire_schedule(schedule(), in_flight, Counter(), NOW)
+
+    assert created == []
+    assert update["last_job_ids"] == []
+    assert update["last_result"].startswith("coalesced:")
+    assert update["next_run_at"] == "2026-03-09T06:00:00+00:00"
+
+
+def test_second_schedule_in_the_same_tick_is_coalesced(created):
+    in_flight, used = set(), Counter()
+    scheduler.fire_schedule(schedule(), in_flight, used, NOW)
+    update = scheduler.fire_schedule(schedule(id="schedule-2", name="daily"), in_flight, used, NOW)
+
+    assert len(created) == 1
+    assert update["last_result"].startswith("coalesced:")
+
+
+def test_defers_when_over_the_hourly_budget(created):
+    update = scheduler.fire_schedule(schedule(), set(), Counter({"instagram": 3}), NOW)
+
+    assert created == []
+    assert update["last_result"].startswith("deferred: over budget for instagram (3/4 used, needs 2)")
+    assert update["next_run_at"] == "2026-03-02T06:10:00+00:00"
+    assert "last_run_at" not in update
+
+
+def test_unused_platform_gets_its_run_even_when_oversized(created):
+    handles = [f"salon{i}" for i in range(6)]
+    update = scheduler.fire_schedule(
+        schedule(platforms=["instagram"], search_terms=None, target_handles=handles), set(), Counter(), NOW
+    )
+
+    assert update["last_result"] == "queued 1 job (6 targets)"
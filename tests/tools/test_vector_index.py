@@ -0,0 +1,127 @@
+import uuid
+
+import pytest
+
+from tools import generate_embeddings, vector_index
+from tools.vector_index import LocalVectorIndex, read_manifest, sync_index
+from tests.fakes import FakeSupabase
+
+IDS = {name: str(uuid.uuid5(uuid.NAMESPACE_URL, name)) for name in ("ig-1", "ig-2", "tt-1", "tt-2")}
+
+
+def make_row(name, platform_id, embedding, updated_at="2026-01-01T00:00:00+00:00", **extra):
+    return {
+        "id": IDS[name],
+        "platform_id": platform_id,
+        "virality_score": 10.0,
+        "content_text": f"caption {name}",
+        "source_url": f"https://example.com/{name}",
+        "source_handle": "@salon",
+        "posted_at": None,
+        "duplicate_of": None,
+        "embedding": embedding,
+        "embedding_model": "voyage-test",
+        "updated_at": updated_at,
+        **extra,
+    }
+
+
+class Source:
+    """Fake scraped_content for sync_index: changed rows per call and the live ids."""
+
+    def __init__(self, monkeypatch):
+        self.changed = []
+        self.live = set(IDS.values())
+        self.calls = []
+        self.config = {"active_column": "embedding", "active_model": "voyage-test", "shadow_model": None}
+        monkeypatch.setattr(vector_index, "_fetch_changed_rows", self.fetch_changed)
+        monkeypatch.setattr(vector_index, "_fetch_live_ids", lambda: self.live)
+        monkeypatch.setattr(generate_embeddings, "get_embedding_config", lambda refresh=False: self.config)
+
+    def fetch_changed(self, watermark, column):
+        self.calls.append((watermark, column))
+        changed, self.changed = self.changed, []
+        return changed
+
+
+@pytest.fixture
+def source(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_index, "INDEX_DIR", str(tmp_path))
+    return Source(monkeypatch)
+
+
+def search_ids(query, **kwargs):
+    index = LocalVectorIndex(read_manifest())
+    return [row["id"] for row in index.search(query, **kwargs)]
+
+
+def test_sync_then_search_in_similarity_order(source):
+    source.changed = [
+        make_row("ig-1", 1, [1.0, 0.0, 0.0]),
+        make_row("ig-2", 1, [0.6, 0.8, 0.0]),
+        make_row("tt-1", 2, [0.0, 0.0, 1.0]),
+    ]
+    manifest = sync_index()
+
+    assert manifest["count"] == 3 and manifest["platform_ranges"] == {"1": [0, 2], "2": [2, 3]}
+    assert search_ids([1.0, 0.1, 0.0], match_count=2) == [IDS["ig-1"], IDS["ig-2"]]
+    assert search_ids([1.0, 0.0, 0.0], platform_filter=2) == []
+    assert search_ids([0.0, 0.0, 1.0], platform_filter=2, match_count=5) == [IDS["tt-1"]]
+    assert search_ids([0.0, 1.0, 0.0], match_threshold=0.5) == [IDS["ig-2"]]
+
+    row = LocalVectorIndex(read_manifest()).search([0.0, 0.0, 1.0], match_count=1)[0]
+    assert row["content_text"] == "caption tt-1" and row["similarity"] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_incremental_sync_merges_changes_and_drops_new_duplicates(source):
+    source.changed = [make_row("ig-1", 1, [1.0, 0.0]), make_row("ig-2", 1, [0.0, 1.0])]
+    sync_index()
+
+    source.changed = [
+        make_row("ig-2", 1, [0.0, 1.0], "2026-01-02T00:00:00+00:00", duplicate_of=IDS["ig-1"]),
+        make_row("tt-1", 2, [0.7, 0.7], "2026-01-02T00:00:00+00:00"),
+    ]
+    manifest = sync_index()
+
+    assert source.calls[-1] == ("2026-01-01T00:00:00+00:00", "embedding")
+    assert manifest["generation"] == 2 and manifest["watermark"] == "2026-01-02T00:00:00+00:00"
+    assert sorted(search_ids([1.0, 1.0], match_count=5)) == sorted([IDS["ig-1"], IDS["tt-1"]])
+
+
+def test_reconcile_drops_deleted_rows(source, monkeypatch):
+    source.changed = [make_row("ig-1", 1, [1.0, 0.0]), make_row("tt-1", 2, [0.0, 1.0])]
+    sync_index()
+
+    monkeypatch.setenv("LOCAL_VECTOR_INDEX_RECONCILE", "0")
+    source.live = {IDS["ig-1"]}
+    assert sync_index()["count"] == 1
+
+
+def test_promoted_model_forces_a_full_rebuild_from_the_live_column(source):
+    source.changed = [make_row("ig-1", 1, [1.0, 0.0])]
+    sync_index()
+
+    source.config = {"active_column": "embedding_shadow", "active_model": "voyage-next", "shadow_model": None}
+    # A row still embedded with the old model is left out of the new index
+    source.changed = [make_row("ig-1", 1, [1.0, 0.0]), make_row("tt-1", 2, [0.0, 1.0], embedding_model="voyage-next")]
+    manifest = sync_index()
+
+    assert source.calls[-1] == (None, "embedding_shadow")
+    assert manifest["model"] == "voyage-next" and manifest["count"] == 1
+
+
+def test_changed_rows_are_paged_by_keyset(monkeypatch):
+    monkeypatch.setattr(vector_index, "SYNC_PAGE_SIZE", 2)
+    pages = [
+        [{"id": "a", "updated_at": "t1"}, {"id": "b", "updated_at": "t1"}],
+        [{"id": "c", "updated_at": "t2"}],
+    ]
+    supabase = FakeSupabase({"scraped_content": lambda query: pages.pop(0)})
+    monkeypatch.setattr(vector_index, "get_supabase_client", lambda: supabase)
+
+    rows = vector_index._fetch_changed_rows("2026-01-01T00:10:00+00:00", "embedding")
+
+    assert [row["id"] for row in rows] == ["a", "b", "c"]
+    first, second = supabase.queries
+    assert first.called("gte") == [("updated_at", "2026-01-01T00:08:00+00:00")]
+    assert second.called("or_") == [('updated_at.gt."t1",and(updated_at.eq."t1",id.gt.b)',)]
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+from tools.watermarks import STOP_AFTER_OLD, Watermark, parse_posted_at
+
+WATERMARK = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def post(url: str, day: int) -> dict:
+    return {"source_url": url, "posted_at": f"2026-03-{day:02d}T12:00:00Z"}
+
+
+def test_parse_posted_at():
+    assert parse_posted_at("2026-03-01T00:00:00Z") == WATERMARK
+    assert parse_posted_at(WATERMARK.timestamp()) == WATERMARK
+    assert parse_posted_at("2026-03-01T00:00:00") == WATERMARK
+    assert parse_posted_at("not a date") is None
+    assert parse_posted_at("") is None
+
+
+def test_newer_than():
+    assert Watermark("instagram", "@salon").newer_than() is None
+    assert Watermark("instagram", "@salon", WATERMARK).newer_than() == "2026-03-01"
+
+
+def test_filter_passes_known_posts_through_and_counts_them():
+    watermark = Watermark("instagram", "#salonowner", WATERMARK, seen_urls={"old-1"})
+    rows = [post("new-1", 5), post("old-1", 1), post("new-2", 4)]
+
+    assert list(watermark.filter(rows)) == rows
+    assert watermark.known == 1
+
+
+def test_chronological_filter_stops_after_a_run_of_old_posts():
+    watermark = Watermark("instagram", "@salon", datetime(2026, 3, 10, tzinfo=timezone.utc), chronological=True)
+    pinned = [post("pinned", 1)]
+    newer = [post(f"new-{day}", day) for day in (20, 19, 18)]
+    older = [post(f"old-{day}", day) for day in range(9, 9 - STOP_AFTER_OLD - 2, -1)]
+
+    kept = list(watermark.filter(pinned + newer + older))
+
+    # A pinned old post at the top does not end the scrape; the streak does
+    assert kept == pinned + newer + older[: STOP_AFTER_OLD - 1]
+
+
+def test_record_leaves_out_failed_rows():
+    watermark = Watermark("instagram", "@salon", WATERMARK, seen_urls={"seen"})
+    stored, failed = post("stored", 5), post("failed", 9)
+    watermark.record([stored, failed, post("seen", 3)], [failed])
+
+    assert watermark._new_urls == ["stored"]
+    assert watermark._newest_seen == parse_posted_at(stored["posted_at"])
+    assert watermark.is_known("stored")
+    assert not watermark.is_known("failed")
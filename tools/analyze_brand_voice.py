@@ -22,8 +22,8 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from tools.scrape_instagram import scrape_profile as scrape_ig_profile
-from tools.generate_embeddings import generate_embedding
-from tools.utils.claude_client import get_claude_client
+from tools.embedding_worker import PRIORITY_BRAND_VOICE, enqueue_embeddings
+from tools.utils.model_router import create_message
 from tools.utils.supabase_client import get_supabase_client
 
 
@@ -92,13 +92,10 @@ def analyze_brand_voice(ig_limit: int = 30):
 
     # Step 2: Analyze with Claude
     print("Step 2: Analyzing brand voice with Claude...")
-    client = get_claude_client()
-
     content_samples = "\n\n---\n\n".join(captions[:20])
 
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
+    response = create_message(
+        "brand_voice",
         messages=[
             {
                 "role": "user",
@@ -125,15 +122,12 @@ def analyze_brand_voice(ig_limit: int = 30):
 
     print("  Brand voice analysis complete")
 
-    # Step 4: Generate embedding
-    print("Step 3: Generating analysis embedding...")
     analysis_prose = analysis.get("overall_personality", "") + "\n\n" + analysis.get(
         "writing_guidelines", ""
     )
-    embedding = generate_embedding(analysis_prose)
 
-    # Step 5: Store in Supabase
-    print("Step 4: Storing in Supabase...")
+    # Step 4: Store in Supabase (the embedding worker fills in analysis_embedding)
+    print("Step 3: Storing in Supabase...")
     supabase = get_supabase_client()
 
     record = {
@@ -146,13 +140,16 @@ def analyze_brand_voice(ig_limit: int = 30):
         "hashtag_strategy": analysis.get("hashtag_strategy"),
         "cta_patterns": analysis.get("cta_patterns"),
         "analysis_text": analysis_prose,
-        "analysis_embedding": embedding,
         "source_posts_count": len(captions),
         "source_urls": ["https://instagram.com/yoursalonsupport"],
     }
 
-    supabase.table("brand_voice_profiles").insert(record).execute()
-    print("  Stored brand voice profile in Supabase")
+    response = supabase.table("brand_voice_profiles").insert(record).execute()
+    try:
+        enqueue_embeddings("brand_voice_profiles", [response.data[0]["id"]], PRIORITY_BRAND_VOICE)
+        print("  Stored brand voice profile in Supabase (embedding queued)")
+    except Exception as e:
+        print(f"  Stored brand voice profile in Supabase; failed to queue its embedding, the sweep will pick it up: {e}")
 
     # Save to .tmp
     tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp")
@@ -0,0 +1,228 @@
+"""
+Resumable Apify actor runs for scrape jobs (migration 015).
+
+Usage:
+    python tools/apify_runs.py --job <scrape_job_id>     # Runs started for a job
+
+Scrape functions take runs=ActorRuns(job_id, target_key, attempt) and call
+runs.call(actor_id, run_input) where they used to call
+client.actor(actor_id).call(run_input=...). Instead of blocking until the
+actor finishes, call():
+    - starts the run and records it in apify_runs, or finds the run this
+      target already started with the same input
+    - raises RunPending while the run is still going; the job worker parks
+      the job as 'waiting' and resumes it APIFY_POLL_SECONDS later (or as
+      soon as the APIFY_WEBHOOK_URL webhook reports the run finished)
+    - returns the run once it SUCCEEDED, so its dataset is read and never
+      bought twice, even after a worker restart
+A run that failed is started again only by a later job attempt. Runs are
+matched on their input without the watermark date cut-off
+(WATERMARK_INPUT_KEYS): the watermark moves as a resumed job stores posts,
+and that must not start a second paid run. Runs are started with an Apify
+timeout of APIFY_RUN_TIMEOUT_SECONDS; one still active well past it (stuck
+in READY, say) is aborted and fails the target. Without a job (CLI, brand
+voice analysis) call() blocks like the Apify client does.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.utils.apify_client import get_apify_client
+from tools.utils.supabase_client import get_supabase_client
+
+# Seconds a job with unfinished runs waits before it is claimed again
+APIFY_POLL_SECONDS = int(os.getenv("APIFY_POLL_SECONDS", "30"))
+# Public URL of POST /scraping/apify/webhook, so finished runs resume their job at once (optional)
+APIFY_WEBHOOK_URL = os.getenv("APIFY_WEBHOOK_URL")
+# Longest an actor run may take; Apify stops it, and we give up on it after a grace period
+APIFY_RUN_TIMEOUT_SECONDS = int(os.getenv("APIFY_RUN_TIMEOUT_SECONDS", "3600"))
+RUN_TIMEOUT_GRACE_SECONDS = 300
+# Date cut-offs derived from the target's watermark, left out of the run key
+WATERMARK_INPUT_KEYS = frozenset({"onlyPostsNewerThan", "oldestPostDate"})
+
+RUN_ACTIVE = {"READY", "RUNNING", "TIMING-OUT", "ABORTING"}
+WEBHOOK_EVENTS = ["ACTOR.RUN.SUCCEEDED", "ACTOR.RUN.FAILED", "ACTOR.RUN.TIMED_OUT", "ACTOR.RUN.ABORTED"]
+
+
+class RunPending(Exception):
+    """An actor run has not finished yet."""
+
+    def __init__(self, actor_id: str, run_id: str):
+        super().__init__(f"Apify run {run_id} ({actor_id}) still running")
+        self.actor_id = actor_id
+        self.run_id = run_id
+
+
+def _input_hash(run_input: dict) -> str:
+    """Key of a run input, ignoring the watermark cut-off."""
+    keyed = {key: value for key, value in run_input.items() if key not in WATERMARK_INPUT_KEYS}
+    return hashlib.sha256(json.dumps(keyed, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _webhooks() -> list[dict] | None:
+    if not APIFY_WEBHOOK_URL:
+        return None
+    return [{"event_types": WEBHOOK_EVENTS, "request_url": APIFY_WEBHOOK_URL}]
+
+
+class ActorRuns:
+    """The actor runs of one scrape target, recorded in apify_runs."""
+
+    def __init__(self, job_id: str | None = None, target_key: str | None = None, attempt: int = 1):
+        self.job_id = job_id
+        self.target_key = target_key
+        self.attempt = attempt
+        self._records = None
+
+    def _load(self) -> dict:
+        if self._records is None:
+            rows = (
+                get_supabase_client()
+                .table("apify_runs")
+                .select("*")
+                .eq("scrape_job_id", self.job_id)
+                .eq("target_key", self.target_key)
+                .order("started_at")
+                .execute()
+            ).data or []
+            # The latest run for each (actor, input) wins
+            self._records = {(row["actor_id"], row["input_hash"]): row for row in rows}
+        return self._records
+
+    def _start(self, actor_id: str, run_input: dict, input_hash: str) -> dict:
+        run = get_apify_client().actor(actor_id).start(
+            run_input=run_input, timeout_secs=APIFY_RUN_TIMEOUT_SECONDS, webhooks=_webhooks()
+        )
+        record = {
+            "run_id": run["id"],
+            "scrape_job_id": self.job_id,
+            "target_key": self.target_key,
+            "actor_id": actor_id,
+            "input_hash": input_hash,
+            "attempt": self.attempt,
+            "status": run.get("status") or "READY",
+            "dataset_id": run.get("defaultDatasetId"),
+        }
+        supabase = get_supabase_client()
+        supabase.table("apify_runs").insert(record).execute()
+        supabase.table("scrape_jobs").update({"apify_run_id": run["id"]}).eq("id", self.job_id).execute()
+        print(f"Started Apify run {run['id']} ({actor_id})")
+        return record
+
+    def _refresh(self, record: dict) -> dict:
+        run = get_apify_client().run(record["run_id"]).get() or {}
+        status = run.get("status") or record["status"]
+        if status == record["status"]:
+            return record
+        update = {
+            "status": status,
+            "dataset_id": run.get("defaultDatasetId") or record["dataset_id"],
+            "finished_at": run.get("finishedAt") or (
+                None if status in RUN_ACTIVE else datetime.now(timezone.utc).isoformat()
+            ),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        get_supabase_client().table("apify_runs").update(update).eq("run_id", record["run_id"]).execute()
+        return {**record, **update}
+
+    def _expire(self, record: dict) -> dict:
+        """Abort a run that outlived its timeout and record it as TIMED-OUT."""
+        started = datetime.fromisoformat(record["started_at"]) if record.get("started_at") else None
+        age = (datetime.now(timezone.utc) - started).total_seconds() if started else 0
+        if age < APIFY_RUN_TIMEOUT_SECONDS + RUN_TIMEOUT_GRACE_SECONDS:
+            return record
+        try:
+            get_apify_client().run(record["run_id"]).abort()
+        except Exception as e:
+            print(f"Abort of Apify run {record['run_id']} failed: {e}")
+        now = datetime.now(timezone.utc).isoformat()
+        update = {"status": "TIMED-OUT", "finished_at": now, "updated_at": now}
+        get_supabase_client().table("apify_runs").update(update).eq("run_id", record["run_id"]).execute()
+        print(f"Apify run {record['run_id']} still {record['status']} after {age:.0f}s, gave up on it")
+        return {**record, **update}
+
+    def call(self, actor_id: str, run_input: dict) -> dict:
+        """
+        The finished run for actor_id and run_input, starting it if needed.
+
+        Returns the run (id, status, defaultDatasetId). Raises RunPending
+        while it is still going and RuntimeError if it did not succeed or
+        ran past its timeout.
+        """
+        if self.job_id is None:
+            return get_apify_client().actor(actor_id).call(run_input=run_input)
+
+        input_hash = _input_hash(run_input)
+        records = self._load()
+        record = records.get((actor_id, input_hash))
+        failed_earlier = (
+            record is not None
+            and record["status"] not in RUN_ACTIVE | {"SUCCEEDED"}
+            and record["attempt"] < self.attempt
+        )
+        if record is None or failed_earlier:
+            record = self._start(actor_id, run_input, input_hash)
+        elif record["status"] in RUN_ACTIVE:
+            record = self._refresh(record)
+            if record["status"] in RUN_ACTIVE:
+                record = self._expire(record)
+        records[(actor_id, input_hash)] = record
+
+        if record["status"] in RUN_ACTIVE:
+            raise RunPending(actor_id, record["run_id"])
+        if record["status"] != "SUCCEEDED":
+            raise RuntimeError(f"Apify run {record['run_id']} ({actor_id}) {record['status']}")
+        return {"id": record["run_id"], "status": record["status"], "defaultDatasetId": record["dataset_id"]}
+
+
+def resume_job_for_run(run_id: str) -> str | None:
+    """Make the waiting job that owns run_id ready now. Returns its id, if any."""
+    supabase = get_supabase_client()
+    rows = supabase.table("apify_runs").select("scrape_job_id").eq("run_id", run_id).execute().data or []
+    if not rows:
+        return None
+    job_id = rows[0]["scrape_job_id"]
+    (
+        supabase.table("scrape_jobs")
+        .update({"run_after": datetime.now(timezone.utc).isoformat()})
+        .eq("id", job_id)
+        .eq("status", "waiting")
+        .execute()
+    )
+    return job_id
+
+
+def list_runs(job_id: str) -> list[dict]:
+    supabase = get_supabase_client()
+    rows = (
+        supabase.table("apify_runs")
+        .select("run_id, target_key, actor_id, attempt, status, started_at, finished_at")
+        .eq("scrape_job_id", job_id)
+        .order("started_at")
+        .execute()
+    ).data or []
+    for row in rows:
+        print(
+            f"  {row['run_id']:<20} {row['target_key']:<32} {row['actor_id']:<36} "
+            f"attempt {row['attempt']} {row['status']}"
+        )
+    if not rows:
+        print("No Apify runs for this job")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apify runs started by scrape jobs")
+    parser.add_argument("--job", required=True, help="scrape_jobs id")
+    args = parser.parse_args()
+    list_runs(args.job)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Local stand-in for the parts of the Apify API the scrapers use.
+
+Usage:
+    python tools/apify_stub_server.py                              # http://127.0.0.1:8765
+    python tools/apify_stub_server.py --run-seconds 20 --items 50
+    python tools/apify_stub_server.py --fail voyager/              # Runs of matching actors fail
+
+    APIFY_API_URL=http://127.0.0.1:8765 APIFY_API_TOKEN=stub python tools/job_worker.py --drain
+
+Serves, under /v2:
+    POST /acts/{actor}/runs          start a run (RUNNING for --run-seconds)
+    GET  /actor-runs/{run_id}        run status, honouring waitForFinish
+    GET  /datasets/{id}/items        --items fake posts, with Apify's pagination headers
+When a run started with webhooks finishes, the stub POSTs Apify's default
+webhook payload to each requestUrl, so APIFY_WEBHOOK_URL can be exercised
+too. Everything is in memory; the token is ignored.
+"""
+
+import argparse
+import base64
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from urllib.request import Request, urlopen
+
+FINISHED = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+
+
+class StubApify:
+    """In-memory runs and datasets."""
+
+    def __init__(self, run_seconds: float, items: int, fail: list[str]):
+        self.run_seconds = run_seconds
+        self.items = items
+        self.fail = fail
+        self.runs = {}
+        self.datasets = {}
+        self.lock = threading.Lock()
+
+    def start(self, actor_id: str, webhooks: list[dict]) -> dict:
+        run_id = uuid.uuid4().hex[:17]
+        dataset_id = uuid.uuid4().hex[:17]
+        run = {
+            "id": run_id,
+            "actId": actor_id,
+            "status": "RUNNING",
+            "startedAt": datetime.now(timezone.utc).isoformat(),
+            "finishedAt": None,
+            "defaultDatasetId": dataset_id,
+            "defaultKeyValueStoreId": uuid.uuid4().hex[:17],
+        }
+        with self.lock:
+            self.runs[run_id] = run
+            self.datasets[dataset_id] = _fake_items(actor_id, run_id, self.items)
+        timer = threading.Timer(self.run_seconds, self._finish, args=(run_id, webhooks))
+        timer.daemon = True
+        timer.start()
+        print(f"Started {actor_id} run {run_id}")
+        return dict(run)
+
+    def _finish(self, run_id: str, webhooks: list[dict]):
+        with self.lock:
+            run = self.runs[run_id]
+            run["status"] = "FAILED" if any(f in run["actId"] for f in self.fail) else "SUCCEEDED"
+            run["finishedAt"] = datetime.now(timezone.utc).isoformat()
+            if run["status"] == "FAILED":
+                self.datasets[run["defaultDatasetId"]] = []
+            run = dict(run)
+        print(f"Run {run_id} {run['status']}")
+        for webhook in webhooks:
+            event = f"ACTOR.RUN.{run['status'].replace('-', '_')}"
+            if event not in webhook.get("eventTypes", [event]):
+                continue
+            payload = {
+                "userId": "stub",
+                "createdAt": run["finishedAt"],
+                "eventType": event,
+                "eventData": {"actorId": run["actId"], "actorRunId": run_id},
+                "resource": run,
+            }
+            try:
+                urlopen(Request(
+                    webhook["requestUrl"],
+                    data=json.dumps(payload).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                ), timeout=10)
+            except Exception as e:
+                print(f"Webhook to {webhook['requestUrl']} failed: {e}")
+
+    def get_run(self, run_id: str, wait_seconds: float = 0) -> dict | None:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            with self.lock:
+                run = self.runs.get(run_id)
+                run = dict(run) if run else None
+            if run is None or run["status"] in FINISHED or time.monotonic() >= deadline:
+                return run
+            time.sleep(0.2)
+
+
+def _fake_items(actor_id: str, run_id: str, count: int) -> list[dict]:
+    """Posts with the fields every platform adapter reads, newest first."""
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(count):
+        url = f"https://stub.apify.local/{actor_id}/{run_id}/{i}"
+        posted_at = (now - timedelta(hours=i)).isoformat()
+        text = f"Stub post {i} from {actor_id}: five ways to fill your salon chair #salonowner"
+        items.append({
+            "id": f"{run_id}-{i}",
+            "url": url,
+            "webVideoUrl": url,
+            "shortCode": f"{run_id}{i}",
+            "caption": text,
+            "text": text,
+            "title": text,
+            "description": text,
+            "ownerUsername": "stubsalon",
+            "channelName": "stubsalon",
+            "authorMeta": {"name": "stubsalon"},
+            "type": "Image",
+            "likesCount": 100 * (count - i),
+            "diggCount": 100 * (count - i),
+            "likes": 100 * (count - i),
+            "commentsCount": 10 * (count - i),
+            "commentCount": 10 * (count - i),
+            "playCount": 1000 * (count - i),
+            "viewCount": 1000 * (count - i),
+            "hashtags": [{"name": "salonowner"}] if "tiktok" in actor_id else ["salonowner"],
+            "timestamp": posted_at,
+            "createTimeISO": posted_at,
+            "date": posted_at,
+        })
+    return items
+
+
+def _make_handler(stub: StubApify):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body, headers: dict | None = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            self._send(404, {"error": {"type": "record-not-found", "message": f"Not found: {self.path}"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) == 4 and parts[:2] == ["v2", "acts"] and parts[3] == "runs":
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                query = parse_qs(url.query)
+                webhooks = []
+                if query.get("webhooks"):
+                    webhooks = json.loads(base64.b64decode(query["webhooks"][0]))
+                actor_id = unquote(parts[2]).replace("~", "/")
+                self._send(201, {"data": stub.start(actor_id, webhooks)})
+            else:
+                self._not_found()
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            query = parse_qs(url.query)
+            if len(parts) == 3 and parts[:2] == ["v2", "actor-runs"]:
+                wait_seconds = min(float(query.get("waitForFinish", ["0"])[0]), 60)
+                run = stub.get_run(parts[2], wait_seconds)
+                if run is None:
+                    return self._not_found()
+                self._send(200, {"data": run})
+            elif len(parts) == 4 and parts[:2] == ["v2", "datasets"] and parts[3] == "items":
+                items = stub.datasets.get(parts[2])
+                if items is None:
+                    return self._not_found()
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", [str(len(items))])[0] or len(items))
+                page = items[offset : offset + limit]
+                self._send(200, page, {
+                    "X-Apify-Pagination-Total": str(len(items)),
+                    "X-Apify-Pagination-Offset": str(offset),
+                    "X-Apify-Pagination-Count": str(len(page)),
+                    "X-Apify-Pagination-Limit": str(limit),
+                    "X-Apify-Pagination-Desc": "false",
+                })
+            else:
+                self._not_found()
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Apify API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--run-seconds", type=float, default=3, help="How long each run stays RUNNING")
+    parser.add_argument("--items", type=int, default=20, help="Items in each run's dataset")
+    parser.add_argument("--fail", action="append", default=[], help="Actor id substring whose runs fail")
+    args = parser.parse_args()
+
+    stub = StubApify(args.run_seconds, args.items, args.fail)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(stub))
+    print(f"Apify stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
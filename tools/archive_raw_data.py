@@ -0,0 +1,82 @@
+"""
+Move raw_data stored before migration 018 into the raw archive.
+
+Usage:
+    python tools/archive_raw_data.py                     # Archive every row still holding raw_data
+    python tools/archive_raw_data.py --batch-size 500
+    python tools/archive_raw_data.py --show <raw_ref>    # Print one archived item
+
+Rows are read a batch at a time, their payloads written to one new segment
+per batch under RAW_ARCHIVE_BUCKET/legacy_{timestamp}/, and only once that
+segment is uploaded does set_raw_refs() point the rows at it and clear
+raw_data. If the bucket is not configured or an upload fails, the run stops
+without touching raw_data. An interrupted run loses nothing and picks up
+where it stopped.
+Afterwards run VACUUM FULL scraped_content to give the space back.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.utils.raw_archive import RAW_ARCHIVE_BUCKET, RawArchiveWriter, read_raw
+from tools.utils.supabase_client import get_supabase_client
+
+
+def archive_raw_data(batch_size: int = 1000) -> int:
+    """Archive raw_data in batches until no row has it. Returns rows moved."""
+    if not RAW_ARCHIVE_BUCKET:
+        sys.exit("RAW_ARCHIVE_BUCKET is not set; raw_data stays where it is")
+    supabase = get_supabase_client()
+    key = f"legacy_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    total = 0
+    started = time.monotonic()
+
+    while True:
+        rows = (
+            supabase.table("scraped_content")
+            .select("id, raw_data")
+            .not_.is_("raw_data", "null")
+            .order("id")
+            .limit(batch_size)
+            .execute()
+        ).data or []
+        if not rows:
+            break
+
+        with RawArchiveWriter(key, segment_items=batch_size) as writer:
+            refs = [{"id": row["id"], "raw_ref": writer.write(row["raw_data"])} for row in rows]
+        if not all(writer.is_durable(ref["raw_ref"]) for ref in refs):
+            sys.exit(f"Upload failed after {total} rows; raw_data for the rest is kept")
+        total += supabase.rpc("set_raw_refs", {"refs": refs}).execute().data or 0
+        elapsed = time.monotonic() - started
+        print(f"  {total} rows ({total / max(elapsed, 1e-9):.0f} rows/s)")
+        if len(rows) < batch_size:
+            break
+
+    print(f"Archived raw_data for {total} rows in {time.monotonic() - started:.1f}s")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move scraped_content.raw_data into the raw archive")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--show", metavar="RAW_REF", help="Print the archived item a raw_ref points to")
+    args = parser.parse_args()
+
+    if args.show:
+        item = read_raw(args.show)
+        if item is None:
+            sys.exit(f"Nothing archived at {args.show}")
+        print(json.dumps(item, indent=2))
+    else:
+        archive_raw_data(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Backfill and evaluate the quantized embedding columns (migration 006).
+
+Usage:
+    python tools/backfill_quantized_embeddings.py
+    python tools/backfill_quantized_embeddings.py --batch-size 2000
+    python tools/backfill_quantized_embeddings.py --measure-recall --queries 50 --k 10
+
+Backfill fills scraped_content.embedding_half for rows embedded before the
+migration (new writes are covered by the trigger). The conversion runs in
+the database in batches, so no vectors cross the network.
+
+--measure-recall samples stored embeddings as queries and compares the
+top-k of the "half" and "binary" search modes against the full-precision
+match_content results, reporting recall@k and client-side latency. Use it
+before switching VECTOR_SEARCH_MODE.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.search_vectors import search_similar_content
+from tools.utils.supabase_client import get_supabase_client
+from tools.utils.vector_utils import parse_vector
+
+
+def backfill(batch_size: int = 1000) -> int:
+    """Fill embedding_half in batches until no rows are missing it."""
+    supabase = get_supabase_client()
+    total = 0
+    started = time.monotonic()
+
+    while True:
+        updated = supabase.rpc("backfill_embedding_half", {"batch_size": batch_size}).execute().data or 0
+        total += updated
+        elapsed = time.monotonic() - started
+        if updated:
+            print(f"  {total} rows ({total / max(elapsed, 1e-9):.0f} rows/s)")
+        if updated < batch_size:
+            break
+
+    print(f"Backfilled embedding_half for {total} rows in {time.monotonic() - started:.1f}s")
+    return total
+
+
+def _timed_search(embedding: list[float], k: int, mode: str) -> tuple[list[str], float]:
+    started = time.perf_counter()
+    results = search_similar_content(
+        query="",
+        match_count=k,
+        match_threshold=-1.0,
+        query_embedding=embedding,
+        mode=mode,
+    )
+    return [r["id"] for r in results], (time.perf_counter() - started) * 1000
+
+
+def measure_recall(queries: int = 50, k: int = 10) -> dict:
+    """Compare half and binary search modes against full precision."""
+    supabase = get_supabase_client()
+    rows = (
+        supabase.table("scraped_content")
+        .select("id, embedding")
+        .not_.is_("embedding_half", "null")
+        .order("id")
+        .limit(queries)
+        .execute()
+    ).data or []
+    if not rows:
+        print("No backfilled rows to query. Run the backfill first.")
+        return {}
+
+    embeddings = [parse_vector(row["embedding"]) for row in rows]
+    latencies = {"full": [], "half": [], "binary": []}
+    recalls = {"half": [], "binary": []}
+
+    for embedding in embeddings:
+        reference, ms = _timed_search(embedding, k, "full")
+        latencies["full"].append(ms)
+        for mode in recalls:
+            found, ms = _timed_search(embedding, k, mode)
+            latencies[mode].append(ms)
+            if reference:
+                recalls[mode].append(len(set(found) & set(reference)) / len(reference))
+
+    report = {}
+    print(f"\n{len(embeddings)} queries, k={k} (recall vs full-precision match_content)\n")
+    for mode, values in latencies.items():
+        recall = statistics.mean(recalls[mode]) if recalls.get(mode) else 1.0
+        report[mode] = {
+            "recall_at_k": round(recall, 4),
+            "p50_ms": round(statistics.median(values), 1),
+            "max_ms": round(max(values), 1),
+        }
+        print(
+            f"  {mode:<7} recall@{k}: {recall:.3f}  "
+            f"p50: {report[mode]['p50_ms']:.1f} ms  max: {report[mode]['max_ms']:.1f} ms"
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill and evaluate quantized embeddings")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--measure-recall", action="store_true", help="Compare search modes instead of backfilling")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.measure_recall:
+        measure_recall(args.queries, args.k)
+    else:
+        backfill(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,571 @@
+"""
+Retrieval quality and latency benchmark.
+
+Usage:
+    python tools/benchmark_retrieval.py --posts 20000 --queries 200
+    python tools/benchmark_retrieval.py --ef-search 40,100,200 --hnsw-m 24 --ef-construction 128
+    python tools/benchmark_retrieval.py --export .tmp/benchmarks/corpus   # snapshot Supabase embeddings
+    python tools/benchmark_retrieval.py --corpus .tmp/benchmarks/corpus --compare .tmp/benchmarks/<previous>.json
+
+Runs search_similar_content and RAGService._search_feedback against a local
+Postgres + pgvector database (BENCHMARK_DATABASE_URL) instead of Supabase.
+The migrations in supabase/migrations/ are applied to a scratch schema
+("benchmark", dropped and recreated on every run), the corpus is loaded,
+and the HNSW indexes are rebuilt with the requested parameters. The
+Supabase client singleton is swapped for a shim that runs RPCs as SQL, so
+the code under test is the production code.
+
+Corpus: synthetic topic clusters by default, or a snapshot exported from
+Supabase with --export. Each query is a perturbed copy of an anchor post,
+which gives a labelled query -> relevant-post pair.
+
+Reported per scenario:
+    recall@k   overlap with exact top-k (NumPy brute force, same filters and threshold)
+    label_hit  share of queries whose anchor post is in the results
+    p50/p99    client-side latency in ms
+    qps        throughput with --concurrency threads
+
+The JSON report is written to .tmp/benchmarks/. --compare prints the
+deltas against an earlier report.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools.search_vectors as search_vectors
+import tools.utils.supabase_client as supabase_client
+from tools.utils.vector_utils import normalize_rows, parse_vector
+from tools.utils.voyage_client import EMBEDDING_DIMENSIONS, VOYAGE_MODEL
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, "supabase", "migrations")
+REPORT_DIR = os.path.join(ROOT_DIR, ".tmp", "benchmarks")
+SCHEMA = "benchmark"
+
+PLATFORM_IDS = [1, 2, 3]
+CONTENT_TYPES = ["caption", "carousel", "edm", "reel_script"]
+# RAGService thresholds: viral search and feedback search
+RAG_THRESHOLD = 0.3
+FEEDBACK_THRESHOLD = 0.3
+# tools/search_vectors.py CLI default
+CLI_THRESHOLD = 0.5
+
+
+# ============================================================
+# RPC shim
+# ============================================================
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _RPCCall:
+    def __init__(self, client, name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> _Response:
+        return _Response(self.client.call(self.name, self.params))
+
+
+def _to_sql_value(value):
+    # Vectors go over the wire as pgvector text literals
+    if isinstance(value, (list, np.ndarray)):
+        return "[" + ",".join(repr(float(v)) for v in value) + "]"
+    return value
+
+
+def _to_json_value(value):
+    # Match what PostgREST returns: strings for uuids and timestamps
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class LocalRPCClient:
+    """Stands in for the Supabase client: rpc(name, params).execute() runs SQL."""
+
+    def __init__(self, dsn: str):
+        import psycopg
+
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._psycopg.connect(self.dsn, autocommit=True)
+            conn.execute(f"SET search_path = {SCHEMA}, public")
+            self._local.conn = conn
+        return conn
+
+    def rpc(self, name: str, params: dict) -> _RPCCall:
+        return _RPCCall(self, name, params)
+
+    def call(self, name: str, params: dict) -> list[dict]:
+        if not re.fullmatch(r"[a-z_]+", name):
+            raise ValueError(f"Bad function name: {name}")
+        args = ", ".join(f"{key} => %({key})s" for key in params)
+        values = {key: _to_sql_value(value) for key, value in params.items()}
+        # SET LOCAL in the function needs a transaction to scope it
+        with self._connection().transaction():
+            cur = self._connection().execute(f"SELECT * FROM {name}({args})", values)
+            columns = [c.name for c in cur.description]
+            return [
+                {col: _to_json_value(value) for col, value in zip(columns, row)}
+                for row in cur.fetchall()
+            ]
+
+
+# ============================================================
+# Corpus
+# ============================================================
+
+def synthetic_corpus(posts: int, feedback: int, dim: int, topics: int, seed: int) -> dict:
+    """Topic-clustered unit vectors with intra-topic cosine around 0.4-0.8."""
+    rng = np.random.default_rng(seed)
+
+    def ids(count: int) -> list[str]:
+        return [str(uuid.UUID(bytes=rng.bytes(16), version=4)) for _ in range(count)]
+
+    centroids = normalize_rows(rng.normal(size=(topics, dim)))
+
+    def sample(count: int) -> np.ndarray:
+        topic = rng.integers(0, topics, count)
+        spread = rng.uniform(0.5, 1.5, (count, 1))
+        noise = rng.normal(size=(count, dim)) / np.sqrt(dim)
+        return normalize_rows(centroids[topic] + spread * noise)
+
+    now = time.time()
+    post_vectors = sample(posts)
+    return {
+        "posts": {
+            "ids": ids(posts),
+            "embeddings": post_vectors,
+            "platform_id": rng.choice(PLATFORM_IDS, posts),
+            "virality_score": rng.lognormal(0, 1.5, posts),
+            "posted_at": now - rng.uniform(0, 2 * 365 * 86400, posts),
+            "source_handle": [f"account{i}" for i in rng.integers(0, max(posts // 20, 1), posts)],
+        },
+        "feedback": {
+            "ids": ids(feedback),
+            "embeddings": sample(feedback),
+            "rating": rng.choice(["positive", "negative"], feedback),
+            "content_type": rng.choice(CONTENT_TYPES, feedback),
+        },
+    }
+
+
+def export_corpus(path: str, limit: int, page_size: int = 500):
+    """Snapshot scraped_content and content_feedback embeddings from Supabase."""
+    supabase = supabase_client.get_supabase_client()
+
+    def fetch(table: str, columns: str) -> list[dict]:
+        rows, offset = [], 0
+        while len(rows) < limit:
+            page = (
+                supabase.table(table)
+                .select(columns)
+                .not_.is_("embedding", "null")
+                .order("id")
+                .range(offset, offset + page_size - 1)
+                .execute()
+            ).data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            offset += page_size
+        return rows[:limit]
+
+    posts = fetch("scraped_content", "id, platform_id, virality_score, posted_at, source_handle, embedding")
+    feedback = fetch("content_feedback", "id, rating, content_type, embedding")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path,
+        post_embeddings=normalize_rows([parse_vector(r["embedding"]) for r in posts]),
+        feedback_embeddings=normalize_rows([parse_vector(r["embedding"]) for r in feedback]),
+    )
+    for rows in (posts, feedback):
+        for row in rows:
+            row.pop("embedding")
+    with open(f"{path}.json", "w") as f:
+        json.dump({"posts": posts, "feedback": feedback}, f)
+    print(f"Exported {len(posts)} posts and {len(feedback)} feedback rows to {path}.npz")
+
+
+def load_corpus(path: str) -> dict:
+    arrays = np.load(f"{path}.npz")
+    with open(f"{path}.json") as f:
+        meta = json.load(f)
+
+    def posted(value) -> float:
+        if not value:
+            return np.nan
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+    posts, feedback = meta["posts"], meta["feedback"]
+    return {
+        "posts": {
+            "ids": [r["id"] for r in posts],
+            "embeddings": arrays["post_embeddings"],
+            "platform_id": np.array([r.get("platform_id") or 0 for r in posts]),
+            "virality_score": np.array([r.get("virality_score") or 0.0 for r in posts]),
+            "posted_at": np.array([posted(r.get("posted_at")) for r in posts]),
+            "source_handle": [r.get("source_handle") or "" for r in posts],
+        },
+        "feedback": {
+            "ids": [r["id"] for r in feedback],
+            "embeddings": arrays["feedback_embeddings"],
+            "rating": np.array([r["rating"] for r in feedback]),
+            "content_type": np.array([r["content_type"] for r in feedback]),
+        },
+    }
+
+
+def make_queries(embeddings: np.ndarray, count: int, seed: int, noise: float = 0.6) -> tuple[np.ndarray, np.ndarray]:
+    """Perturbed copies of random anchor rows. Returns (queries, anchor indexes)."""
+    rng = np.random.default_rng(seed + 1)
+    anchors = rng.choice(len(embeddings), min(count, len(embeddings)), replace=False)
+    perturbation = rng.normal(size=(len(anchors), embeddings.shape[1])) / np.sqrt(embeddings.shape[1])
+    return normalize_rows(embeddings[anchors] + noise * perturbation), anchors
+
+
+# ============================================================
+# Database setup
+# ============================================================
+
+def _vector_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{v:.7g}" for v in vector) + "]"
+
+
+def setup_database(dsn: str, corpus: dict, hnsw_m: int, ef_construction: int):
+    """Recreate the scratch schema, apply migrations, load the corpus, rebuild indexes."""
+    import psycopg
+
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.execute(f"CREATE SCHEMA {SCHEMA}")
+        conn.execute(f"SET search_path = {SCHEMA}, public")
+
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if name.endswith(".sql"):
+                with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                    conn.execute(f.read())
+        print(f"Applied migrations to schema '{SCHEMA}'")
+
+        posts = corpus["posts"]
+        started = time.monotonic()
+        with conn.cursor().copy(
+            "COPY scraped_content (id, platform_id, virality_score, posted_at, source_handle, "
+            "content_text, source_url, embedding, embedding_model) FROM STDIN"
+        ) as copy:
+            for i, post_id in enumerate(posts["ids"]):
+                posted_at = posts["posted_at"][i]
+                copy.write_row((
+                    post_id,
+                    int(posts["platform_id"][i]),
+                    float(posts["virality_score"][i]),
+                    None if np.isnan(posted_at) else datetime.fromtimestamp(posted_at, timezone.utc),
+                    posts["source_handle"][i],
+                    f"post {i}",
+                    f"https://example.com/p/{post_id}",
+                    _vector_literal(posts["embeddings"][i]),
+                    VOYAGE_MODEL,
+                ))
+
+        feedback = corpus["feedback"]
+        with conn.cursor().copy(
+            "COPY content_feedback (id, content_type, platform, user_message, assistant_message, "
+            "rating, embedding, embedding_model) FROM STDIN"
+        ) as copy:
+            for i, feedback_id in enumerate(feedback["ids"]):
+                copy.write_row((
+                    feedback_id,
+                    str(feedback["content_type"][i]),
+                    "instagram",
+                    f"request {i}",
+                    f"output {i}",
+                    str(feedback["rating"][i]),
+                    _vector_literal(feedback["embeddings"][i]),
+                    VOYAGE_MODEL,
+                ))
+        print(f"Loaded {len(posts['ids'])} posts and {len(feedback['ids'])} feedback rows "
+              f"in {time.monotonic() - started:.1f}s")
+
+        # Rebuild every HNSW index with the requested parameters (bulk build is
+        # also much faster than the incremental inserts during COPY)
+        started = time.monotonic()
+        conn.execute("SET maintenance_work_mem = '1GB'")
+        indexes = conn.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = %s AND indexdef ILIKE %s",
+            (SCHEMA, "%USING hnsw%"),
+        ).fetchall()
+        for index_name, index_def in indexes:
+            index_def = re.sub(
+                r"WITH \(.*?\)", f"WITH (m = {hnsw_m}, ef_construction = {ef_construction})", index_def
+            )
+            conn.execute(f"DROP INDEX {SCHEMA}.{index_name}")
+            conn.execute(index_def)
+        conn.execute("ANALYZE")
+        print(f"Rebuilt {len(indexes)} HNSW indexes (m={hnsw_m}, ef_construction={ef_construction}) "
+              f"in {time.monotonic() - started:.1f}s")
+
+
+# ============================================================
+# Measurement
+# ============================================================
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int, threshold: float, mask=None) -> np.ndarray:
+    """Exact cosine top-k over rows passing the mask and threshold."""
+    scores = matrix @ query
+    if mask is not None:
+        scores = np.where(mask, scores, -np.inf)
+    candidates = np.flatnonzero(scores > threshold)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return candidates
+
+
+def run_scenario(name: str, search, queries: list[dict], k: int, concurrency: int) -> dict:
+    """Time search(query) over all queries and score it against the exact results."""
+
+    def one(query: dict) -> tuple[float, list[str]]:
+        started = time.perf_counter()
+        results = search(query)
+        return (time.perf_counter() - started) * 1000, [r["id"] for r in results]
+
+    for query in queries[: min(5, len(queries))]:
+        search(query)  # warm connections and caches
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, queries))
+    wall = time.perf_counter() - started
+
+    latencies = np.array([ms for ms, _ in outcomes])
+    recalls, hits, returned = [], [], []
+    for query, (_, ids) in zip(queries, outcomes):
+        found = set(ids)
+        returned.append(len(ids))
+        if query["exact"]:
+            recalls.append(len(found & query["exact"]) / len(query["exact"]))
+        hits.append(query["anchor"] in found)
+
+    result = {
+        "queries": len(queries),
+        "recall_at_k": round(float(np.mean(recalls)), 4) if recalls else None,
+        "label_hit_at_k": round(float(np.mean(hits)), 4),
+        "mean_results": round(float(np.mean(returned)), 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "qps": round(len(queries) / wall, 1),
+    }
+    print(
+        f"  {name:<40} recall@{k} {result['recall_at_k'] if recalls else '-':<7} "
+        f"hit {result['label_hit_at_k']:<7} p50 {result['p50_ms']:>7.2f} ms  "
+        f"p99 {result['p99_ms']:>7.2f} ms  {result['qps']:>7.1f} q/s"
+    )
+    return result
+
+
+def build_scenarios(corpus: dict, args) -> dict:
+    """Scenario name -> (search function, labelled queries with exact answers)."""
+    from backend.services.rag_service import RAGService
+
+    posts = corpus["posts"]
+    post_matrix = posts["embeddings"]
+    post_queries, post_anchors = make_queries(post_matrix, args.queries, args.seed)
+    platform_ids = np.asarray(posts["platform_id"])
+    k = args.k
+
+    exact_cache = {}
+
+    def content_queries(threshold: float, filtered: bool) -> list[dict]:
+        if (threshold, filtered) in exact_cache:
+            return exact_cache[(threshold, filtered)]
+        queries = []
+        for q, anchor in zip(post_queries, post_anchors):
+            platform = int(platform_ids[anchor]) if filtered else None
+            mask = platform_ids == platform if filtered else None
+            exact = exact_top_k(post_matrix, q, k, threshold, mask)
+            queries.append({
+                "embedding": q,
+                "platform": platform,
+                "anchor": posts["ids"][anchor],
+                "exact": {posts["ids"][i] for i in exact},
+            })
+        exact_cache[(threshold, filtered)] = queries
+        return queries
+
+    def content_search(threshold: float, mode: str):
+        def search(query: dict) -> list[dict]:
+            return search_vectors.search_similar_content(
+                query="",
+                match_count=k,
+                match_threshold=threshold,
+                platform_filter=query["platform"],
+                query_embedding=query["embedding"],
+                mode=mode,
+            )
+        return search
+
+    scenarios = {}
+    for ef in args.ef_search:
+        search_vectors.HNSW_EF_SEARCH = ef
+        for mode in args.modes:
+            for threshold, filtered, label in (
+                (RAG_THRESHOLD, False, "rag"),
+                (RAG_THRESHOLD, True, "rag+platform"),
+                (CLI_THRESHOLD, False, "cli"),
+            ):
+                name = f"content/{mode}/{label}/ef{ef}"
+                scenarios[name] = (content_search(threshold, mode), content_queries(threshold, filtered), ef)
+
+    feedback = corpus["feedback"]
+    if len(feedback["ids"]):
+        rag = RAGService()
+        fb_matrix = feedback["embeddings"]
+        fb_queries, fb_anchors = make_queries(fb_matrix, args.queries, args.seed + 7)
+        queries = []
+        for q, anchor in zip(fb_queries, fb_anchors):
+            rating, content_type = str(feedback["rating"][anchor]), str(feedback["content_type"][anchor])
+            mask = (feedback["rating"] == rating) & (feedback["content_type"] == content_type)
+            exact = exact_top_k(fb_matrix, q, k, FEEDBACK_THRESHOLD, mask)
+            queries.append({
+                "embedding": q,
+                "rating": rating,
+                "content_type": content_type,
+                "anchor": feedback["ids"][anchor],
+                "exact": {feedback["ids"][i] for i in exact},
+            })
+
+        def feedback_search(query: dict) -> list[dict]:
+            return rag._search_feedback(
+                query["embedding"].tolist(), query["content_type"], rating=query["rating"], limit=k
+            )
+
+        scenarios["feedback/rag"] = (feedback_search, queries, None)
+    return scenarios
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_reports(current: dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nChange vs {os.path.basename(previous_path)}:")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        deltas = []
+        for metric in ("recall_at_k", "label_hit_at_k", "p50_ms", "p99_ms", "qps"):
+            if result.get(metric) is not None and before.get(metric) is not None:
+                deltas.append(f"{metric} {result[metric] - before[metric]:+.3f}")
+        print(f"  {name:<40} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality and latency benchmark")
+    parser.add_argument("--dsn", default=os.getenv("BENCHMARK_DATABASE_URL"),
+                        help="Local Postgres with pgvector (default: BENCHMARK_DATABASE_URL)")
+    parser.add_argument("--corpus", help="Exported corpus path (without extension); default synthetic")
+    parser.add_argument("--export", help="Export a corpus snapshot from Supabase to this path and exit")
+    parser.add_argument("--export-limit", type=int, default=100000)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--feedback", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", default="100", help="Comma-separated hnsw.ef_search values")
+    parser.add_argument("--modes", default="full,half,binary", help="Comma-separated VECTOR_SEARCH_MODEs")
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-load", action="store_true", help="Reuse the schema from the last run")
+    parser.add_argument("--compare", help="Earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    if args.export:
+        export_corpus(args.export, args.export_limit)
+        return
+    if not args.dsn:
+        parser.error("Set BENCHMARK_DATABASE_URL or pass --dsn")
+    args.ef_search = [int(x) for x in args.ef_search.split(",")]
+    args.modes = [x.strip() for x in args.modes.split(",")]
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        corpus = synthetic_corpus(args.posts, args.feedback, EMBEDDING_DIMENSIONS, args.topics, args.seed)
+    if not args.skip_load:
+        setup_database(args.dsn, corpus, args.hnsw_m, args.ef_construction)
+
+    # Route every Supabase RPC made by the code under test to the local database
+    supabase_client._client = LocalRPCClient(args.dsn)
+
+    print(f"\nRunning {args.queries} queries per scenario, k={args.k}, concurrency={args.concurrency}\n")
+    results = {}
+    for name, (search, queries, ef) in build_scenarios(corpus, args).items():
+        if ef is not None:
+            search_vectors.HNSW_EF_SEARCH = ef
+        results[name] = run_scenario(name, search, queries, args.k, args.concurrency)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "config": {
+            "corpus": args.corpus or "synthetic",
+            "posts": len(corpus["posts"]["ids"]),
+            "feedback": len(corpus["feedback"]["ids"]),
+            "dim": int(corpus["posts"]["embeddings"].shape[1]),
+            "queries": args.queries,
+            "k": args.k,
+            "hnsw_m": args.hnsw_m,
+            "ef_construction": args.ef_construction,
+            "ef_search": args.ef_search,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "scenarios": results,
+    }
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    path = os.path.join(REPORT_DIR, f"retrieval-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {path}")
+
+    if args.compare:
+        compare_reports(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
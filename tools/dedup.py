@@ -0,0 +1,450 @@
+"""
+Near-duplicate detection for scraped content.
+
+Usage:
+    python tools/dedup.py --collapse
+    python tools/dedup.py --collapse --platform tiktok
+    python tools/dedup.py --text "caption one" --text "caption two"
+
+Hashtag scrapes return the same reposted or templated captions over and
+over. Captions are normalized (case, URLs, mentions, hashtags, emoji and
+punctuation removed) and hashed with a 64-bit SimHash over word shingles.
+Captions within SIMHASH_MAX_DISTANCE bits are near-duplicates.
+
+Ingestion (prepare_for_insert, used by tools/ingest.py):
+    - posts whose source_url is already stored (or that the caller says are
+      known, see tools/watermarks.py) are passed through unclustered; the
+      upsert only refreshes their engagement counts
+    - near-duplicates within the batch are clustered; the most viral post
+      is the representative, the rest get duplicate_of
+    - posts matching an existing row's hash join that row's cluster: they
+      are linked to its representative, unless the most viral of them beats
+      it. Then that post is the new representative (marked "supersedes"),
+      and once it is stored promote_representatives() re-points the old
+      cluster at it
+Duplicates are stored without embeddings, so they cost no Voyage calls and
+stay out of the HNSW index and match_content.
+
+--collapse re-clusters the whole corpus per platform. It also links pairs
+within SIMHASH_CANDIDATE_DISTANCE bits whose embeddings are nearly identical
+(cosine >= MIN_EMBEDDING_SIMILARITY), re-elects the most viral
+representative of each cluster and drops embeddings from duplicates.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import uuid
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.utils.supabase_client import get_supabase_client
+from tools.utils.vector_utils import normalize_rows, parse_vector
+
+SIMHASH_MAX_DISTANCE = 3
+# Looser hash distance for pairs confirmed by embedding similarity (--collapse)
+SIMHASH_CANDIDATE_DISTANCE = 10
+MIN_EMBEDDING_SIMILARITY = 0.95
+SHINGLE_SIZE = 3
+BAND_BITS = 16
+# Largest band bucket compared pairwise; bigger buckets are compared in windows
+MAX_BUCKET_PAIRS = 256
+PAGE_SIZE = 1000
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+_TAG_RE = re.compile(r"[@#]\w+")
+_NON_WORD_RE = re.compile(r"[^\w\s]|_")
+
+# Bits set per byte value, for vectorized popcount
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize_text(text: str | None) -> str:
+    """Lowercase and strip URLs, mentions, hashtags, emoji and punctuation."""
+    text = (text or "").lower()
+    text = _URL_RE.sub(" ", text)
+    text = _TAG_RE.sub(" ", text)
+    text = _NON_WORD_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def simhash(text: str | None) -> int | None:
+    """64-bit SimHash of the normalized text as a signed int (Postgres BIGINT), or None if empty."""
+    words = normalize_text(text).split()
+    if not words:
+        return None
+    if len(words) < SHINGLE_SIZE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+    digests = np.frombuffer(
+        b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles),
+        dtype=">u8",
+    )
+    bits = (digests[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    value = int(np.sum((votes > 0).astype(np.uint64) << np.arange(64, dtype=np.uint64)))
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def hamming_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Bitwise Hamming distance between paired int64 hashes."""
+    xor = np.bitwise_xor(a.astype(np.int64), b.astype(np.int64)).view(np.uint8).reshape(-1, 8)
+    return _POPCOUNT[xor].sum(axis=1)
+
+
+def candidate_pairs(hashes: np.ndarray) -> np.ndarray:
+    """Index pairs that share at least one 16-bit band (every pair within 3 bits does)."""
+    pairs = []
+    unsigned = hashes.astype(np.int64).view(np.uint64)
+    for band in range(64 // BAND_BITS):
+        keys = (unsigned >> np.uint64(band * BAND_BITS)) & np.uint64((1 << BAND_BITS) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for group in np.split(order, bounds):
+            if len(group) < 2:
+                continue
+            if len(group) > MAX_BUCKET_PAIRS:
+                # Compare each member with its neighbours in hash order only
+                group = group[np.argsort(unsigned[group])]
+                for offset in range(1, 8):
+                    pairs.append(np.stack([group[:-offset], group[offset:]], axis=1))
+                continue
+            i, j = np.triu_indices(len(group), k=1)
+            pairs.append(np.stack([group[i], group[j]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            self.parent[root_j] = root_i
+
+    def clusters(self) -> list[list[int]]:
+        groups = defaultdict(list)
+        for i in range(len(self.parent)):
+            groups[self.find(i)].append(i)
+        return list(groups.values())
+
+
+def cluster_hashes(hashes: np.ndarray, max_distance: int = SIMHASH_MAX_DISTANCE) -> list[list[int]]:
+    """Group indexes whose hashes are within max_distance bits (transitively)."""
+    clusters = _DisjointSet(len(hashes))
+    pairs = candidate_pairs(hashes)
+    if len(pairs):
+        close = hamming_distances(hashes[pairs[:, 0]], hashes[pairs[:, 1]]) <= max_distance
+        for i, j in pairs[close]:
+            clusters.union(int(i), int(j))
+    return clusters.clusters()
+
+
+def _known_urls(urls: list[str]) -> set[str]:
+    supabase = get_supabase_client()
+    known = set()
+    for i in range(0, len(urls), 100):
+        response = (
+            supabase.table("scraped_content")
+            .select("source_url")
+            .in_("source_url", urls[i : i + 100])
+            .execute()
+        )
+        known.update(row["source_url"] for row in response.data or [])
+    return known
+
+
+def _existing_matches(hashes: list[int], platform_id: int) -> dict[int, dict]:
+    """Closest existing row per hash: {hash: {"id", "duplicate_of", "virality_score", "distance"}}."""
+    supabase = get_supabase_client()
+    best = {}
+    for i in range(0, len(hashes), 500):
+        response = supabase.rpc(
+            "find_simhash_matches",
+            {
+                "hashes": hashes[i : i + 500],
+                "filter_platform_id": platform_id,
+                "max_distance": SIMHASH_MAX_DISTANCE,
+            },
+        ).execute()
+        for match in response.data or []:
+            current = best.get(match["query_hash"])
+            if current is None or match["distance"] < current["distance"]:
+                best[match["query_hash"]] = match
+    return best
+
+
+def _representative_scores(ids: list[str]) -> dict[str, float]:
+    supabase = get_supabase_client()
+    scores = {}
+    for i in range(0, len(ids), 100):
+        response = supabase.table("scraped_content").select("id, virality_score").in_("id", ids[i : i + 100]).execute()
+        for row in response.data or []:
+            scores[row["id"]] = row.get("virality_score") or 0
+    return scores
+
+
+def prepare_for_insert(rows: list[dict], known_urls: set[str] | None = None) -> list[dict]:
+    """
+    Drop repeated URLs and mark near-duplicates in a batch of transformed rows.
+
+    Sets id, simhash and duplicate_of on each returned row. Representatives
+    come first so duplicate_of references are valid when inserted in order.
+    A new representative that outranks a stored cluster's also gets
+    supersedes (the stored representative's id); the caller removes the key
+    before the upsert and passes it to promote_representatives() after.
+    Already-stored posts come last and are never cluster members: the upsert
+    keeps their stored id and links. URLs in known_urls are taken as stored
+    without a lookup.
+    """
+    if not rows:
+        return []
+
+    known_urls = known_urls or set()
+    urls = [r["source_url"] for r in rows if r.get("source_url")]
+    lookup = [url for url in urls if url not in known_urls]
+    known = {url for url in urls if url in known_urls} | (_known_urls(lookup) if lookup else set())
+    seen = set()
+    fresh = []
+    stored = []
+    for row in rows:
+        url = row.get("source_url")
+        if url and url in seen:
+            continue
+        seen.add(url)
+        row["id"] = str(uuid.uuid4())
+        row["simhash"] = simhash(row.get("content_text"))
+        row["duplicate_of"] = None
+        (stored if url and url in known else fresh).append(row)
+
+    linked = 0
+    ordered = []
+    by_platform = defaultdict(list)
+    for row in fresh:
+        if row["simhash"] is None:
+            ordered.append(row)
+        else:
+            by_platform[row.get("platform_id")].append(row)
+
+    for platform_id, platform_rows in by_platform.items():
+        hashes = np.array([r["simhash"] for r in platform_rows], dtype=np.int64)
+        try:
+            existing = _existing_matches(hashes.tolist(), platform_id)
+        except Exception as e:
+            print(f"Duplicate lookup failed, checking the batch only: {e}")
+            existing = {}
+
+        # Batch clusters that match a stored cluster are merged into it below
+        joining = defaultdict(list)
+        stored_scores = {}
+        for cluster in cluster_hashes(hashes):
+            members = [platform_rows[i] for i in cluster]
+            match = next((existing[m["simhash"]] for m in members if m["simhash"] in existing), None)
+            if match:
+                canonical_id = match["duplicate_of"] or match["id"]
+                joining[canonical_id].extend(members)
+                if match["duplicate_of"] is None:
+                    stored_scores[canonical_id] = match.get("virality_score") or 0
+            else:
+                joining[None].append(members)
+
+        unscored = [canonical_id for canonical_id in joining if canonical_id and canonical_id not in stored_scores]
+        if unscored:
+            try:
+                stored_scores.update(_representative_scores(unscored))
+            except Exception as e:
+                print(f"Representative lookup failed, keeping stored representatives: {e}")
+
+        groups = [(None, members) for members in joining.pop(None, [])] + list(joining.items())
+        for canonical_id, members in groups:
+            members = sorted(members, key=lambda r: r.get("virality_score") or 0, reverse=True)
+            # Missing score (lookup failed or row gone): keep the stored representative
+            stored_score = stored_scores.get(canonical_id, float("inf")) if canonical_id else None
+            if canonical_id is None or (members[0].get("virality_score") or 0) > stored_score:
+                if canonical_id is not None:
+                    members[0]["supersedes"] = canonical_id
+                canonical_id = members[0]["id"]
+                start = 1
+            else:
+                start = 0
+            for member in members[start:]:
+                member["duplicate_of"] = canonical_id
+                linked += 1
+            ordered.extend(members)
+
+    # Representatives before the rows that point at them
+    ordered.sort(key=lambda r: r["duplicate_of"] is not None)
+    if stored or linked:
+        print(f"Dedup: {len(stored)} already-stored posts to refresh, linked {linked} near-duplicates")
+    return ordered + stored
+
+
+def promote_representatives(superseded: dict[str, str]) -> int:
+    """
+    Re-point stored clusters at the new representatives that outranked theirs.
+
+    superseded maps each new (stored) representative id to the id of the
+    representative it replaces. The old representative and its duplicates
+    are linked to the new one, and the old one drops its embeddings, as in
+    --collapse. Returns the number of clusters re-pointed.
+    """
+    supabase = get_supabase_client()
+    promoted = 0
+    for new_id, old_id in superseded.items():
+        try:
+            supabase.table("scraped_content").update({"duplicate_of": new_id}).eq("duplicate_of", old_id).execute()
+            supabase.table("scraped_content").update(
+                {"duplicate_of": new_id, "embedding": None, "embedding_shadow": None}
+            ).eq("id", old_id).execute()
+            promoted += 1
+        except Exception as e:
+            print(f"Re-pointing cluster {old_id} to {new_id} failed, --collapse will fix it: {e}")
+    return promoted
+
+
+def _fetch_platform_rows(platform_id: int) -> list[dict]:
+    supabase = get_supabase_client()
+    rows, offset = [], 0
+    while True:
+        page = (
+            supabase.table("scraped_content")
+            .select("id, content_text, simhash, virality_score, duplicate_of")
+            .eq("platform_id", platform_id)
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
+
+
+def _fetch_half_embeddings(ids: list[str]) -> dict[str, np.ndarray]:
+    """Normalized 256-dim embeddings for the given rows (rows without one are omitted)."""
+    supabase = get_supabase_client()
+    vectors = {}
+    for i in range(0, len(ids), 100):
+        response = (
+            supabase.table("scraped_content")
+            .select("id, embedding_half")
+            .in_("id", ids[i : i + 100])
+            .not_.is_("embedding_half", "null")
+            .execute()
+        )
+        for row in response.data or []:
+            vectors[row["id"]] = normalize_rows(parse_vector(row["embedding_half"]))[0]
+    return vectors
+
+
+def collapse_duplicates(platform_id: int) -> dict:
+    """Re-cluster one platform's corpus and relink duplicates to the most viral representative."""
+    supabase = get_supabase_client()
+    rows = _fetch_platform_rows(platform_id)
+
+    # Fill hashes for rows stored before dedup existed
+    missing = [r for r in rows if r["simhash"] is None and r.get("content_text")]
+    for row in missing:
+        row["simhash"] = simhash(row["content_text"])
+    for i in range(0, len(missing), 500):
+        supabase.table("scraped_content").upsert(
+            [{"id": r["id"], "simhash": r["simhash"]} for r in missing[i : i + 500] if r["simhash"] is not None]
+        ).execute()
+
+    rows = [r for r in rows if r["simhash"] is not None]
+    if not rows:
+        return {"rows": 0, "clusters": 0, "duplicates": 0}
+    hashes = np.array([r["simhash"] for r in rows], dtype=np.int64)
+    clusters = _DisjointSet(len(rows))
+
+    pairs = candidate_pairs(hashes)
+    if len(pairs):
+        distances = hamming_distances(hashes[pairs[:, 0]], hashes[pairs[:, 1]])
+        for i, j in pairs[distances <= SIMHASH_MAX_DISTANCE]:
+            clusters.union(int(i), int(j))
+
+        # Looser hash matches need near-identical embeddings too. The 256-dim
+        # halfvec (migration 006) is plenty to confirm a near-duplicate.
+        loose = pairs[(distances > SIMHASH_MAX_DISTANCE) & (distances <= SIMHASH_CANDIDATE_DISTANCE)]
+        vectors = _fetch_half_embeddings([rows[i]["id"] for i in np.unique(loose)])
+        confirmed = 0
+        for i, j in loose:
+            a, b = vectors.get(rows[i]["id"]), vectors.get(rows[j]["id"])
+            if a is None or b is None:
+                continue
+            if float(a @ b) >= MIN_EMBEDDING_SIMILARITY:
+                clusters.union(int(i), int(j))
+                confirmed += 1
+        if len(loose):
+            print(f"  {confirmed}/{len(loose)} loose hash matches confirmed by embedding similarity")
+
+    duplicates = 0
+    changed = 0
+    multi = 0
+    for cluster in clusters.clusters():
+        if len(cluster) > 1:
+            multi += 1
+        canonical = max(cluster, key=lambda i: rows[i].get("virality_score") or 0)
+        canonical_id = rows[canonical]["id"]
+        if rows[canonical]["duplicate_of"] is not None:
+            supabase.table("scraped_content").update({"duplicate_of": None}).eq("id", canonical_id).execute()
+            changed += 1
+        relink = [rows[i]["id"] for i in cluster if i != canonical and rows[i]["duplicate_of"] != canonical_id]
+        duplicates += len(cluster) - 1
+        for k in range(0, len(relink), 100):
+            # Duplicates drop their embeddings; a representative without one
+            # is picked up by the embedding backfill
+            supabase.table("scraped_content").update(
+                {"duplicate_of": canonical_id, "embedding": None, "embedding_shadow": None}
+            ).in_("id", relink[k : k + 100]).execute()
+        changed += len(relink)
+
+    summary = {"rows": len(rows), "clusters": multi, "duplicates": duplicates, "changed": changed}
+    print(f"  {len(rows)} rows, {multi} duplicate clusters, {duplicates} duplicates ({changed} rows updated)")
+    return summary
+
+
+def main():
+    # Imported here: tools.platforms imports the ingest path, which imports this module
+    from tools.platforms import PLATFORM_MAP
+
+    parser = argparse.ArgumentParser(description="Near-duplicate detection")
+    parser.add_argument("--collapse", action="store_true", help="Re-cluster stored content")
+    parser.add_argument("--platform", choices=list(PLATFORM_MAP))
+    parser.add_argument("--text", action="append", help="Show normalized text and SimHash (repeatable)")
+    args = parser.parse_args()
+
+    if args.text:
+        hashes = [simhash(t) for t in args.text]
+        for text, value in zip(args.text, hashes):
+            print(f"{value:>21}  {normalize_text(text)[:80]}")
+        if len(hashes) > 1 and None not in hashes:
+            print(f"Hamming distance (first two): {int(hamming_distances(np.array(hashes[:1]), np.array(hashes[1:2]))[0])}")
+    elif args.collapse:
+        platforms = [args.platform] if args.platform else list(PLATFORM_MAP)
+        for name in platforms:
+            print(f"Collapsing {name}...")
+            collapse_duplicates(PLATFORM_MAP[name])
+    else:
+        parser.error("Provide --collapse or --text")
+
+
+if __name__ == "__main__":
+    main()
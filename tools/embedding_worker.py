@@ -0,0 +1,271 @@
+"""
+Embedding work queue (migration 009).
+
+Usage:
+    python tools/embedding_worker.py                     # Run until stopped
+    python tools/embedding_worker.py --drain             # Exit once the queue is empty
+    python tools/embedding_worker.py --drain --max-seconds 50
+    python tools/embedding_worker.py --sweep             # Queue every row missing an embedding
+    python tools/embedding_worker.py --retry-failed      # Give failed jobs another round
+    python tools/embedding_worker.py --status
+
+Every embedding for scraped_content, content_feedback and brand_voice_profiles
+goes through the embedding_jobs table. Request handlers and scrapers call
+enqueue_embeddings() and return; the worker claims batches (highest priority
+first), embeds them with generate_embeddings_batch() and writes them back with
+one bulk_set_embeddings() call per table. Jobs that fail are retried with
+exponential backoff and marked 'failed' after max_attempts.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.generate_embeddings import generate_embeddings_batch, get_active_model
+from tools.utils.supabase_client import get_supabase_client
+
+# Text column and character cap for each vector-bearing table
+EMBEDDING_SOURCES = {
+    "scraped_content": {"text": "content_text", "max_chars": None},
+    "content_feedback": {"text": "assistant_message", "max_chars": 2000},
+    "brand_voice_profiles": {"text": "analysis_text", "max_chars": None},
+}
+
+# Higher runs first; feedback is small and feeds match_feedback right away
+PRIORITY_FEEDBACK = 200
+PRIORITY_BRAND_VOICE = 150
+PRIORITY_SCRAPED = 100
+PRIORITY_SWEEP = 0
+
+WORKER_BATCH_SIZE = int(os.getenv("EMBEDDING_WORKER_BATCH_SIZE", "200"))
+POLL_INTERVAL_SECONDS = 5
+SWEEP_INTERVAL_SECONDS = 600
+
+
+def enqueue_embeddings(table_name: str, row_ids: list[str], priority: int = PRIORITY_SCRAPED) -> int:
+    """Queue rows of one table for embedding. Returns the number of jobs queued."""
+    if table_name not in EMBEDDING_SOURCES:
+        raise ValueError(f"Unknown embedding table: {table_name}")
+    row_ids = [row_id for row_id in row_ids if row_id]
+    if not row_ids:
+        return 0
+    supabase = get_supabase_client()
+    response = supabase.rpc(
+        "enqueue_embedding_jobs",
+        {"target_table": table_name, "ids": row_ids, "job_priority": priority},
+    ).execute()
+    return response.data or 0
+
+
+def sweep_missing_embeddings() -> int:
+    """Queue every row that has no embedding and no job (safety net for missed enqueues)."""
+    supabase = get_supabase_client()
+    queued = supabase.rpc("enqueue_missing_embeddings", {"job_priority": PRIORITY_SWEEP}).execute().data or 0
+    if queued:
+        print(f"Sweep queued {queued} rows missing embeddings")
+    return queued
+
+
+def _fail_jobs(supabase, job_ids: list[int], error: str):
+    if job_ids:
+        supabase.rpc("fail_embedding_jobs", {"job_ids": job_ids, "error_message": error}).execute()
+
+
+def _process_table(supabase, table_name: str, jobs: list[dict]) -> tuple[list[int], list[int]]:
+    """Embed one table's share of a claimed batch. Returns (done job ids, failed job ids)."""
+    source = EMBEDDING_SOURCES[table_name]
+    text_column = source["text"]
+    job_by_row = {job["row_id"]: job["id"] for job in jobs}
+
+    rows = (
+        supabase.table(table_name)
+        .select(f"id, {text_column}")
+        .in_("id", list(job_by_row))
+        .execute()
+        .data
+        or []
+    )
+    texts = {row["id"]: (row.get(text_column) or "")[: source["max_chars"]] for row in rows}
+    # Deleted rows and empty texts have nothing to embed; their jobs are simply done
+    pending = [row_id for row_id in job_by_row if texts.get(row_id)]
+    done = [job_by_row[row_id] for row_id in job_by_row if not texts.get(row_id)]
+    if not pending:
+        return done, []
+
+    model = get_active_model()
+    embeddings = generate_embeddings_batch([texts[row_id] for row_id in pending], model=model)
+    embedded = [(row_id, e) for row_id, e in zip(pending, embeddings) if e is not None]
+    failed = [job_by_row[row_id] for row_id, e in zip(pending, embeddings) if e is None]
+
+    if embedded:
+        supabase.rpc(
+            "bulk_set_embeddings",
+            {
+                "ids": [row_id for row_id, _ in embedded],
+                "embeddings": [json.dumps(e, separators=(",", ":")) for _, e in embedded],
+                "target_table": table_name,
+                "model": model,
+            },
+        ).execute()
+        done.extend(job_by_row[row_id] for row_id, _ in embedded)
+    return done, failed
+
+
+def process_batch(batch_size: int = WORKER_BATCH_SIZE) -> dict:
+    """
+    Claim up to batch_size jobs and embed them.
+
+    Returns dict with claimed, embedded and failed counts.
+    """
+    supabase = get_supabase_client()
+    jobs = supabase.rpc("claim_embedding_jobs", {"batch_size": batch_size}).execute().data or []
+    if not jobs:
+        return {"claimed": 0, "embedded": 0, "failed": 0}
+
+    by_table = defaultdict(list)
+    for job in jobs:
+        by_table[job["table_name"]].append(job)
+
+    embedded = failed = 0
+    for table_name, table_jobs in by_table.items():
+        try:
+            done, failed_ids = _process_table(supabase, table_name, table_jobs)
+        except Exception as e:
+            print(f"  Embedding {len(table_jobs)} {table_name} rows failed: {e}")
+            _fail_jobs(supabase, [job["id"] for job in table_jobs], str(e))
+            failed += len(table_jobs)
+            continue
+
+        if done:
+            supabase.table("embedding_jobs").delete().in_("id", done).execute()
+        _fail_jobs(supabase, failed_ids, "Embedding request failed after splitting")
+        embedded += len(done)
+        failed += len(failed_ids)
+
+    return {"claimed": len(jobs), "embedded": embedded, "failed": failed}
+
+
+def run_worker(
+    max_seconds: float | None = None,
+    drain: bool = False,
+    batch_size: int = WORKER_BATCH_SIZE,
+) -> dict:
+    """
+    Process embedding jobs until stopped, out of time, or (with drain) out of ready jobs.
+
+    With max_seconds, stops before a batch that would not finish in time, like
+    the backfill. Long-running workers sweep for missed rows every
+    SWEEP_INTERVAL_SECONDS.
+
+    Returns dict with embedded, failed and rows_per_second.
+    """
+    started = time.monotonic()
+    last_sweep = None if not drain else started
+    slowest_batch = 0.0
+    totals = Counter()
+
+    while True:
+        elapsed = time.monotonic() - started
+        if max_seconds is not None and elapsed + slowest_batch > max_seconds:
+            break
+
+        if last_sweep is None or time.monotonic() - last_sweep > SWEEP_INTERVAL_SECONDS:
+            try:
+                sweep_missing_embeddings()
+            except Exception as e:
+                print(f"Embedding sweep failed: {e}")
+            last_sweep = time.monotonic()
+
+        batch_started = time.monotonic()
+        result = process_batch(batch_size)
+        totals.update(result)
+
+        if result["claimed"] == 0:
+            if drain:
+                break
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+
+        slowest_batch = max(slowest_batch, time.monotonic() - batch_started)
+        rate = totals["embedded"] / max(time.monotonic() - started, 1e-9)
+        print(f"  {totals['embedded']} embedded, {totals['failed']} failed ({rate:.1f} rows/s)")
+
+    elapsed = time.monotonic() - started
+    rate = totals["embedded"] / elapsed if elapsed > 0 else 0.0
+    if totals["claimed"]:
+        print(
+            f"Embedding worker: {totals['embedded']} embedded, {totals['failed']} failed "
+            f"in {elapsed:.1f}s ({rate:.1f} rows/s)"
+        )
+    return {"embedded": totals["embedded"], "failed": totals["failed"], "rows_per_second": round(rate, 1)}
+
+
+def retry_failed() -> int:
+    """Reset jobs that exhausted their attempts so the worker tries them again."""
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("embedding_jobs")
+        .update({
+            "status": "pending",
+            "attempts": 0,
+            "run_after": datetime.now(timezone.utc).isoformat(),
+            "locked_at": None,
+        })
+        .eq("status", "failed")
+        .execute()
+    )
+    count = len(response.data or [])
+    print(f"Reset {count} failed embedding jobs")
+    return count
+
+
+def queue_status() -> dict:
+    """Job counts by table and status."""
+    supabase = get_supabase_client()
+    counts = {}
+    for table_name in EMBEDDING_SOURCES:
+        for status in ("pending", "running", "failed"):
+            response = (
+                supabase.table("embedding_jobs")
+                .select("id", count="exact")
+                .eq("table_name", table_name)
+                .eq("status", status)
+                .limit(1)
+                .execute()
+            )
+            if response.count:
+                counts[f"{table_name}.{status}"] = response.count
+                print(f"  {table_name:<22} {status:<8} {response.count}")
+    if not counts:
+        print("Embedding queue is empty")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding work queue worker")
+    parser.add_argument("--drain", action="store_true", help="Exit once no jobs are ready")
+    parser.add_argument("--max-seconds", type=float, help="Time budget")
+    parser.add_argument("--batch-size", type=int, default=WORKER_BATCH_SIZE)
+    parser.add_argument("--sweep", action="store_true", help="Queue all rows missing embeddings and exit")
+    parser.add_argument("--retry-failed", action="store_true", help="Reset failed jobs and exit")
+    parser.add_argument("--status", action="store_true", help="Show queue counts and exit")
+    args = parser.parse_args()
+
+    if args.sweep:
+        sweep_missing_embeddings()
+    elif args.retry_failed:
+        retry_failed()
+    elif args.status:
+        queue_status()
+    else:
+        run_worker(max_seconds=args.max_seconds, drain=args.drain, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
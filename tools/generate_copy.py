@@ -19,7 +19,8 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.utils.claude_client import get_claude_client
+from tools.platforms import PLATFORM_MAP
+from tools.utils.model_router import create_message
 from tools.utils.supabase_client import get_supabase_client
 from tools.search_vectors import search_similar_content
 
@@ -27,7 +28,6 @@ from tools.search_vectors import search_similar_content
 from backend.prompts.system_prompt import build_system_prompt
 from backend.services.rag_service import RAGService
 
-PLATFORM_MAP = {"instagram": 1, "tiktok": 2, "youtube": 3}
 CONTENT_TYPE_MAP = {"caption": 1, "carousel": 2, "edm": 3, "reel_script": 4}
 
 
@@ -43,15 +43,15 @@ def generate_copy(content_type: str, platform: str, user_prompt: str) -> str:
     )
 
     # Build system prompt
-    system_prompt = build_system_prompt(rag_context, content_type, platform)
+    system_prompt = build_system_prompt(rag_context, content_type, platform, user_query=user_prompt)
 
-    # Generate with Claude
-    client = get_claude_client()
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        system=system_prompt,
+    # Generate with Claude (model picked by the routing policy)
+    response = create_message(
+        "copy",
         messages=[{"role": "user", "content": user_prompt}],
+        content_type=content_type,
+        platform=platform,
+        system=system_prompt,
     )
 
     generated_text = response.content[0].text
@@ -65,7 +65,7 @@ def generate_copy(content_type: str, platform: str, user_prompt: str) -> str:
         "platform_id": PLATFORM_MAP.get(platform),
         "body": generated_text,
         "prompt_used": user_prompt,
-        "model_used": "claude-sonnet-4-20250514",
+        "model_used": response.model,
         "rag_sources": rag_source_ids if rag_source_ids else None,
     }
 
@@ -77,7 +77,7 @@ def generate_copy(content_type: str, platform: str, user_prompt: str) -> str:
 def main():
     parser = argparse.ArgumentParser(description="Copy generation tool")
     parser.add_argument("--type", required=True, choices=["caption", "carousel", "edm", "reel_script"])
-    parser.add_argument("--platform", default="instagram", choices=["instagram", "tiktok", "youtube"])
+    parser.add_argument("--platform", default="instagram", choices=list(PLATFORM_MAP))
     parser.add_argument("--prompt", required=True, help="What kind of content to generate")
     args = parser.parse_args()
 
@@ -4,78 +4,429 @@ Embedding generation tool using Voyage AI.
 Usage:
     python tools/generate_embeddings.py --text "some text to embed"
     python tools/generate_embeddings.py --batch --unembedded
+    python tools/generate_embeddings.py --batch --unembedded --max-seconds 50
+    python tools/generate_embeddings.py --brand-guide
+    python tools/generate_embeddings.py --brand-guide --if-stale
 
 Modes:
     --text        Embed a single text string, print the vector
     --batch       Find all scraped_content rows without embeddings and generate them
+                  (resumes from the last checkpoint; --restart starts over)
+    --brand-guide Precompute embeddings for the optional brand guide sections
+                  (--if-stale: only when a section or the active model changed;
+                  run before each deploy)
 """
 
 import argparse
+import asyncio
+import json
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.utils.voyage_client import get_voyage_client, VOYAGE_MODEL, BATCH_SIZE
+from tools.utils.rate_limiter import RateLimiter
+from tools.utils.voyage_client import (
+    EMBED_CONCURRENCY,
+    EMBEDDING_DIMENSIONS,
+    MAX_BATCH_TEXTS,
+    MAX_BATCH_TOKENS,
+    SPLIT_ERRORS,
+    VOYAGE_MODEL,
+    VOYAGE_RPM,
+    VOYAGE_TPM,
+    get_async_voyage_client,
+    get_voyage_client,
+)
 from tools.utils.supabase_client import get_supabase_client
 
 
-def generate_embedding(text: str, input_type: str = "document") -> list[float]:
-    """Generate a single embedding vector."""
+# embedding_config changes only on a model promotion; re-read it this often
+CONFIG_CACHE_SECONDS = 30
+
+_config: dict | None = None
+_config_read_at = 0.0
+
+
+def get_embedding_config(refresh: bool = False) -> dict:
+    """
+    The embedding_config row (migration 010): active_column, active_model, shadow_model.
+
+    Cached for CONFIG_CACHE_SECONDS. Falls back to VOYAGE_MODEL in the
+    embedding column when the table can't be read.
+    """
+    global _config, _config_read_at
+    now = time.monotonic()
+    if _config is not None and not refresh and now - _config_read_at < CONFIG_CACHE_SECONDS:
+        return _config
+    try:
+        supabase = get_supabase_client()
+        rows = supabase.table("embedding_config").select("active_column, active_model, shadow_model").execute().data
+        config = rows[0]
+    except Exception as e:
+        if _config is not None:
+            _config_read_at = now
+            return _config
+        print(f"Embedding config unavailable, using {VOYAGE_MODEL}: {e}")
+        config = {"active_column": "embedding", "active_model": VOYAGE_MODEL, "shadow_model": None}
+    _config, _config_read_at = config, now
+    return config
+
+
+def get_active_model() -> str:
+    """The model that live queries and new rows are embedded with."""
+    return get_embedding_config()["active_model"]
+
+
+def generate_embedding(text: str, input_type: str = "document", model: str | None = None) -> list[float]:
+    """Generate a single embedding vector (with the active model unless one is given)."""
     client = get_voyage_client()
-    result = client.embed([text], model=VOYAGE_MODEL, input_type=input_type)
+    result = client.embed(
+        [text], model=model or get_active_model(), input_type=input_type, output_dimension=EMBEDDING_DIMENSIONS
+    )
     return result.embeddings[0]
 
 
-def generate_embeddings_batch(texts: list[str], input_type: str = "document") -> list[list[float]]:
-    """Generate embeddings for a batch of texts."""
+_rate_limiter = RateLimiter(VOYAGE_RPM, VOYAGE_TPM)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough upper bound on Voyage tokens (about 3 UTF-8 bytes per token; emoji count more)."""
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def pack_batches(texts: list[str]) -> list[list[int]]:
+    """Group text indexes into requests under MAX_BATCH_TOKENS and MAX_BATCH_TEXTS, in order."""
+    batches, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > MAX_BATCH_TOKENS or len(current) >= MAX_BATCH_TEXTS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _embed_with_split(texts: list[str], input_type: str, model: str) -> list[list[float] | None]:
+    """
+    Embed one packed batch.
+
+    Rate limits and 5xx are retried with backoff by the client. If Voyage
+    rejects the request itself (SPLIT_ERRORS), split it in half and retry
+    each half, so one bad text (or an underestimated token count) only loses
+    itself. Any other failure returns None for the whole batch, to be
+    embedded on a later pass.
+    """
     client = get_voyage_client()
-    all_embeddings = []
+    _rate_limiter.acquire(sum(estimate_tokens(t) for t in texts))
+    try:
+        result = client.embed(
+            texts, model=model, input_type=input_type, output_dimension=EMBEDDING_DIMENSIONS
+        )
+        return result.embeddings
+    except SPLIT_ERRORS as e:
+        if len(texts) == 1:
+            print(f"  Embedding failed for one text ({len(texts[0])} chars): {e}")
+            return [None]
+        middle = len(texts) // 2
+        print(f"  Batch of {len(texts)} failed ({e}); retrying as {middle} + {len(texts) - middle}")
+        return (
+            _embed_with_split(texts[:middle], input_type, model)
+            + _embed_with_split(texts[middle:], input_type, model)
+        )
+    except Exception as e:
+        print(f"  Batch of {len(texts)} failed after retries: {e}")
+        return [None] * len(texts)
 
-    for i in range(0, len(texts), BATCH_SIZE):
-        batch = texts[i : i + BATCH_SIZE]
-        print(f"  Embedding batch {i // BATCH_SIZE + 1} ({len(batch)} texts)...")
-        result = client.embed(batch, model=VOYAGE_MODEL, input_type=input_type)
-        all_embeddings.extend(result.embeddings)
 
-    return all_embeddings
+def generate_embeddings_batch(
+    texts: list[str],
+    input_type: str = "document",
+    model: str | None = None,
+) -> list[list[float] | None]:
+    """
+    Generate embeddings for many texts (with the active model unless one is given).
 
+    Texts are packed into requests by estimated token count and sent
+    VOYAGE_CONCURRENCY at a time under the account rate limits. Results
+    keep the input order; a text that still fails after splitting gets None.
+    """
+    if not texts:
+        return []
 
-def backfill_unembedded_content():
-    """Find scraped_content without embeddings and generate them."""
-    supabase = get_supabase_client()
+    model = model or get_active_model()
+    batches = pack_batches(texts)
+    started = time.monotonic()
+    embeddings: list[list[float] | None] = [None] * len(texts)
 
-    response = (
-        supabase.table("scraped_content")
-        .select("id, content_text")
-        .is_("embedding", "null")
-        .not_.is_("content_text", "null")
-        .limit(500)
-        .execute()
-    )
+    with ThreadPoolExecutor(max_workers=min(EMBED_CONCURRENCY, len(batches))) as pool:
+        futures = {
+            pool.submit(_embed_with_split, [texts[i] for i in batch], input_type, model): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            for i, embedding in zip(futures[future], future.result()):
+                embeddings[i] = embedding
+
+    _report_batch(len(texts), len(batches), embeddings, started)
+    return embeddings
+
+
+def _report_batch(count: int, requests: int, embeddings: list, started: float):
+    elapsed = time.monotonic() - started
+    failed = sum(e is None for e in embeddings)
+    if requests > 1 or failed:
+        print(
+            f"  Embedded {count - failed}/{count} texts in {requests} requests "
+            f"({count / max(elapsed, 1e-9):.0f} texts/s)"
+        )
 
-    rows = response.data
-    if not rows:
-        print("No unembedded content found.")
-        return 0
 
-    print(f"Found {len(rows)} unembedded content items. Generating embeddings...")
+# Async variants for FastAPI handlers: same behaviour, but they await the
+# async Voyage client instead of blocking the event loop.
+
+async def aget_active_model() -> str:
+    """get_active_model() for coroutines; only a stale cache reads the database (in a thread)."""
+    if _config is not None and time.monotonic() - _config_read_at < CONFIG_CACHE_SECONDS:
+        return _config["active_model"]
+    return (await asyncio.to_thread(get_embedding_config))["active_model"]
+
+
+async def agenerate_embedding(text: str, input_type: str = "document", model: str | None = None) -> list[float]:
+    """Async generate_embedding()."""
+    client = get_async_voyage_client()
+    result = await client.embed(
+        [text],
+        model=model or await aget_active_model(),
+        input_type=input_type,
+        output_dimension=EMBEDDING_DIMENSIONS,
+    )
+    return result.embeddings[0]
 
-    texts = [row["content_text"] for row in rows]
-    embeddings = generate_embeddings_batch(texts)
 
-    updated = 0
-    for row, embedding in zip(rows, embeddings):
+async def _aembed_with_split(
+    texts: list[str], input_type: str, model: str, semaphore: asyncio.Semaphore
+) -> list[list[float] | None]:
+    """Async _embed_with_split(); the halves of a failed batch are retried concurrently."""
+    async with semaphore:
+        await _rate_limiter.acquire_async(sum(estimate_tokens(t) for t in texts))
         try:
-            supabase.table("scraped_content").update({"embedding": embedding}).eq(
-                "id", row["id"]
-            ).execute()
-            updated += 1
+            result = await get_async_voyage_client().embed(
+                texts, model=model, input_type=input_type, output_dimension=EMBEDDING_DIMENSIONS
+            )
+            return result.embeddings
+        except SPLIT_ERRORS as e:
+            error = e
         except Exception as e:
-            print(f"Error updating embedding for {row['id']}: {e}")
+            print(f"  Batch of {len(texts)} failed after retries: {e}")
+            return [None] * len(texts)
+
+    if len(texts) == 1:
+        print(f"  Embedding failed for one text ({len(texts[0])} chars): {error}")
+        return [None]
+    middle = len(texts) // 2
+    print(f"  Batch of {len(texts)} failed ({error}); retrying as {middle} + {len(texts) - middle}")
+    left, right = await asyncio.gather(
+        _aembed_with_split(texts[:middle], input_type, model, semaphore),
+        _aembed_with_split(texts[middle:], input_type, model, semaphore),
+    )
+    return left + right
+
+
+async def agenerate_embeddings_batch(
+    texts: list[str],
+    input_type: str = "document",
+    model: str | None = None,
+) -> list[list[float] | None]:
+    """Async generate_embeddings_batch(): VOYAGE_CONCURRENCY requests in flight, no threads."""
+    if not texts:
+        return []
+
+    model = model or await aget_active_model()
+    batches = pack_batches(texts)
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    results = await asyncio.gather(*(
+        _aembed_with_split([texts[i] for i in batch], input_type, model, semaphore)
+        for batch in batches
+    ))
+
+    embeddings: list[list[float] | None] = [None] * len(texts)
+    for batch, batch_embeddings in zip(batches, results):
+        for i, embedding in zip(batch, batch_embeddings):
+            embeddings[i] = embedding
+    _report_batch(len(texts), len(batches), embeddings, started)
+    return embeddings
 
-    print(f"Generated embeddings for {updated}/{len(rows)} content items.")
-    return updated
+
+BACKFILL_CHECKPOINT = "scraped_content_embeddings"
+BACKFILL_PAGE_SIZE = 500
+
+
+def _save_checkpoint(supabase, last_id: str | None, processed: int, completed: bool = False, new_run: bool = False):
+    now = datetime.now(timezone.utc).isoformat()
+    checkpoint = {
+        "name": BACKFILL_CHECKPOINT,
+        "last_id": last_id,
+        "processed": processed,
+        "updated_at": now,
+        "completed_at": now if completed else None,
+    }
+    if new_run:
+        checkpoint["started_at"] = now
+    supabase.table("backfill_checkpoints").upsert(checkpoint).execute()
+
+
+def backfill_unembedded_content(
+    max_seconds: float | None = None,
+    page_size: int = BACKFILL_PAGE_SIZE,
+    restart: bool = False,
+) -> dict:
+    """
+    Embed every scraped_content row without an embedding (near-duplicates are skipped).
+
+    Pages through rows by id (keyset pagination) and writes each page back
+    with one bulk_set_embeddings call. Progress is checkpointed after every
+    page in backfill_checkpoints, so an interrupted run resumes after the
+    last written page. With max_seconds, stops before a page that would not
+    finish in time.
+
+    Returns dict with processed, complete and rows_per_second.
+    """
+    supabase = get_supabase_client()
+
+    checkpoint = None
+    if not restart:
+        response = (
+            supabase.table("backfill_checkpoints")
+            .select("last_id, processed, completed_at")
+            .eq("name", BACKFILL_CHECKPOINT)
+            .execute()
+        )
+        checkpoint = response.data[0] if response.data else None
+    # A completed run starts over to pick up rows added since
+    if checkpoint and checkpoint.get("completed_at"):
+        checkpoint = None
+    last_id = checkpoint["last_id"] if checkpoint else None
+    total = checkpoint["processed"] if checkpoint else 0
+    if last_id:
+        print(f"Resuming backfill after {last_id} ({total} rows done previously)")
+    elif checkpoint is None:
+        _save_checkpoint(supabase, None, 0, new_run=True)
+
+    # Fill whichever column is live, with its model
+    config = get_embedding_config(refresh=True)
+    started = time.monotonic()
+    processed = 0
+    slowest_page = 0.0
+    complete = False
+
+    while True:
+        elapsed = time.monotonic() - started
+        if max_seconds is not None and elapsed + slowest_page > max_seconds:
+            print(f"Time budget reached after {elapsed:.1f}s; next run resumes from the checkpoint.")
+            break
+
+        page_started = time.monotonic()
+        query = (
+            supabase.table("scraped_content")
+            .select("id, content_text")
+            .is_(config["active_column"], "null")
+            .is_("duplicate_of", "null")
+            .not_.is_("content_text", "null")
+            .neq("content_text", "")
+        )
+        if last_id:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(page_size).execute().data or []
+
+        if not rows:
+            complete = True
+            _save_checkpoint(supabase, None, total, completed=True)
+            break
+
+        embeddings = generate_embeddings_batch(
+            [row["content_text"] for row in rows], model=config["active_model"]
+        )
+        # Texts that failed stay unembedded and are retried by the next full pass
+        embedded = [(row["id"], e) for row, e in zip(rows, embeddings) if e is not None]
+        if embedded:
+            supabase.rpc(
+                "bulk_set_embeddings",
+                {
+                    "ids": [row_id for row_id, _ in embedded],
+                    "embeddings": [json.dumps(e, separators=(",", ":")) for _, e in embedded],
+                    "model": config["active_model"],
+                },
+            ).execute()
+
+        last_id = rows[-1]["id"]
+        processed += len(rows)
+        total += len(rows)
+        _save_checkpoint(supabase, last_id, total)
+
+        slowest_page = max(slowest_page, time.monotonic() - page_started)
+        rate = processed / max(time.monotonic() - started, 1e-9)
+        print(f"  {processed} rows embedded this run ({rate:.1f} rows/s)")
+
+        if len(rows) < page_size:
+            complete = True
+            _save_checkpoint(supabase, None, total, completed=True)
+            break
+
+    elapsed = time.monotonic() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    status = "complete" if complete else "paused"
+    print(f"Backfill {status}: {processed} rows in {elapsed:.1f}s ({rate:.1f} rows/s)")
+    return {"processed": processed, "complete": complete, "rows_per_second": round(rate, 1)}
+
+
+def embed_brand_guide_sections(if_stale: bool = False) -> str:
+    """
+    Embed the optional brand guide sections and write them next to the guide.
+
+    With if_stale, does nothing when the file already covers every section's
+    current text with the active model.
+    """
+    from backend.prompts.brand_guide import (
+        BRAND_GUIDE_SECTIONS,
+        SECTION_EMBEDDINGS_PATH,
+        is_optional,
+        load_section_embeddings,
+        section_hash,
+    )
+
+    sections = [s for s in BRAND_GUIDE_SECTIONS if is_optional(s)]
+    model = get_active_model()
+    if if_stale:
+        load_section_embeddings.cache_clear()
+        current = load_section_embeddings(model)
+        if all(s["key"] in current for s in sections):
+            print(f"Section embeddings in {SECTION_EMBEDDINGS_PATH} are up to date")
+            return SECTION_EMBEDDINGS_PATH
+    print(f"Embedding {len(sections)} optional brand guide sections...")
+    embeddings = generate_embeddings_batch([s["text"] for s in sections], model=model)
+    if any(e is None for e in embeddings):
+        raise RuntimeError("Some brand guide sections failed to embed; nothing was written")
+
+    payload = {
+        "model": model,
+        "sections": {
+            section["key"]: {"hash": section_hash(section), "embedding": embedding}
+            for section, embedding in zip(sections, embeddings)
+        },
+    }
+    with open(SECTION_EMBEDDINGS_PATH, "w") as f:
+        json.dump(payload, f)
+
+    print(f"Section embeddings saved to {SECTION_EMBEDDINGS_PATH}")
+    return SECTION_EMBEDDINGS_PATH
 
 
 def main():
@@ -87,6 +438,18 @@ def main():
         action="store_true",
         help="Process unembedded content (use with --batch)",
     )
+    parser.add_argument("--max-seconds", type=float, help="Time budget for --batch (resumable)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the --batch checkpoint")
+    parser.add_argument(
+        "--brand-guide",
+        action="store_true",
+        help="Precompute embeddings for the optional brand guide sections",
+    )
+    parser.add_argument(
+        "--if-stale",
+        action="store_true",
+        help="Skip --brand-guide when the section embeddings are current",
+    )
     args = parser.parse_args()
 
     if args.text:
@@ -94,9 +457,14 @@ def main():
         print(f"Embedding dimensions: {len(embedding)}")
         print(f"First 5 values: {embedding[:5]}")
     elif args.batch and args.unembedded:
-        backfill_unembedded_content()
+        backfill_unembedded_content(max_seconds=args.max_seconds, restart=args.restart)
+    elif args.brand_guide:
+        embed_brand_guide_sections(if_stale=args.if_stale)
     else:
-        parser.error("Provide --text for single embedding or --batch --unembedded for batch mode")
+        parser.error(
+            "Provide --text for single embedding, --batch --unembedded for batch mode, "
+            "or --brand-guide for brand guide sections"
+        )
 
 
 if __name__ == "__main__":
@@ -22,7 +22,7 @@ from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.utils.claude_client import get_claude_client
+from tools.utils.model_router import create_message
 from tools.utils.supabase_client import get_supabase_client
 
 
@@ -152,6 +152,34 @@ def gather_report_data(report_type: str) -> dict:
     return data
 
 
+SUMMARY_PROMPT = """Summarize this report in 2-3 plain sentences for a dashboard preview. Lead with the single most important finding. Return only the summary.
+
+{report}"""
+
+
+def extract_summary(report_content: str) -> str:
+    """Summarize a report with the fast model, falling back to its first lines."""
+    try:
+        response = create_message(
+            "report_summary",
+            messages=[{"role": "user", "content": SUMMARY_PROMPT.format(report=report_content[:12000])}],
+        )
+        summary = response.content[0].text.strip()
+        if summary:
+            return summary
+    except Exception as e:
+        print(f"Summary extraction failed, using first lines: {e}")
+
+    # Fallback: first few non-heading lines
+    summary_lines = []
+    for line in report_content.split("\n"):
+        if line.strip() and not line.startswith("#"):
+            summary_lines.append(line.strip())
+            if len(summary_lines) >= 3:
+                break
+    return " ".join(summary_lines)
+
+
 def generate_report(report_type: str) -> dict:
     """Generate a report using Claude and store it in Supabase."""
     if report_type not in REPORT_PROMPTS:
@@ -164,26 +192,17 @@ def generate_report(report_type: str) -> dict:
     data = gather_report_data(report_type)
 
     # Generate with Claude
-    client = get_claude_client()
     prompt = config["prompt"].format(**data)
 
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=8192,
+    response = create_message(
+        "report",
         messages=[{"role": "user", "content": prompt}],
     )
 
     report_content = response.content[0].text
 
-    # Extract summary (first paragraph or executive summary)
-    lines = report_content.split("\n")
-    summary_lines = []
-    for line in lines:
-        if line.strip() and not line.startswith("#"):
-            summary_lines.append(line.strip())
-            if len(summary_lines) >= 3:
-                break
-    summary = " ".join(summary_lines)
+    # Extract summary (fast model, first lines as fallback)
+    summary = extract_summary(report_content)
 
     # Store in Supabase
     supabase = get_supabase_client()
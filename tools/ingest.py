@@ -0,0 +1,99 @@
+"""
+Bulk writer for scraped_content, shared by the scrapers' store_posts (migration 011).
+
+Transformed rows go through prepare_for_insert() (tools/dedup.py) and are
+written INGEST_CHUNK_SIZE at a time with the upsert_scraped_content() RPC:
+one round trip per chunk instead of one per post. (platform_id, source_url)
+is unique, so a post scraped again refreshes its engagement counts instead
+of being stored twice. A chunk that fails is split in half and retried down
+to single rows, so one bad row only loses itself. New representatives with
+text are queued for embedding, and stored clusters they outrank are
+re-pointed at them. Concurrent scrape targets write one batch at a time, so
+every batch is deduplicated against the ones stored before it.
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.dedup import prepare_for_insert, promote_representatives
+from tools.embedding_worker import PRIORITY_SCRAPED, enqueue_embeddings
+from tools.utils.supabase_client import get_supabase_client
+
+# Rows per upsert call; most raw payloads are archived (raw_ref), so rows are small
+INGEST_CHUNK_SIZE = 500
+
+# Serializes dedup + upsert across threads; actor runs and paging stay concurrent
+_write_lock = threading.Lock()
+
+
+def _upsert_with_split(supabase, rows: list[dict]) -> tuple[list[dict], list[tuple[dict, str]]]:
+    """Upsert rows, halving on failure. Returns (written rows from the RPC, [(failed row, error)])."""
+    try:
+        response = supabase.rpc("upsert_scraped_content", {"content_rows": rows}).execute()
+        return response.data or [], []
+    except Exception as e:
+        if len(rows) == 1:
+            return [], [(rows[0], str(e))]
+        mid = len(rows) // 2
+        left_written, left_failed = _upsert_with_split(supabase, rows[:mid])
+        right_written, right_failed = _upsert_with_split(supabase, rows[mid:])
+        return left_written + right_written, left_failed + right_failed
+
+
+def store_scraped_rows(rows: list[dict], label: str = "post", known_urls: set[str] | None = None) -> dict:
+    """
+    Dedup, upsert and queue embeddings for transformed scraped_content rows.
+
+    known_urls (a watermark's stored URLs) are treated as already stored
+    without looking them up: they skip clustering and only refresh counts.
+    Returns dict with inserted, refreshed, failed and duplicates (repeated
+    URLs dropped plus new near-duplicates) counts, and failed_rows.
+    """
+    supabase = get_supabase_client()
+
+    inserted_ids = set()
+    refreshed = 0
+    failed_rows = []
+    with _write_lock:
+        prepared = prepare_for_insert(rows, known_urls)
+        superseded = {row["id"]: row.pop("supersedes") for row in prepared if "supersedes" in row}
+        for i in range(0, len(prepared), INGEST_CHUNK_SIZE):
+            written, errors = _upsert_with_split(supabase, prepared[i : i + INGEST_CHUNK_SIZE])
+            for row in written:
+                if row["inserted"]:
+                    inserted_ids.add(row["id"])
+                else:
+                    refreshed += 1
+            for row, error in errors:
+                print(f"Error storing {label} {row.get('source_url') or 'unknown'}: {error}")
+                failed_rows.append(row)
+        promoted = promote_representatives(
+            {new_id: old_id for new_id, old_id in superseded.items() if new_id in inserted_ids}
+        )
+    failed = len(failed_rows)
+
+    duplicates = len(rows) - len(prepared) + sum(
+        1 for row in prepared if row["id"] in inserted_ids and row["duplicate_of"] is not None
+    )
+    to_embed = [
+        row["id"]
+        for row in prepared
+        if row["id"] in inserted_ids and row["duplicate_of"] is None and row.get("content_text")
+    ]
+    try:
+        enqueue_embeddings("scraped_content", to_embed, PRIORITY_SCRAPED)
+    except Exception as e:
+        print(f"Failed to queue embeddings, the sweep will pick them up: {e}")
+
+    if refreshed or failed or promoted:
+        print(f"Ingest: {len(inserted_ids)} new, {refreshed} refreshed, {failed} failed, {promoted} clusters re-pointed")
+    return {
+        "inserted": len(inserted_ids),
+        "refreshed": refreshed,
+        "failed": failed,
+        "duplicates": duplicates,
+        "failed_rows": failed_rows,
+    }
@@ -0,0 +1,143 @@
+"""
+Streaming ingestion for Apify datasets.
+
+Usage (what tools/platforms/engine.py store_posts does):
+    items = scrape_by_hashtags(hashtags, limit)          # lazy dataset iterator
+    transform = lambda batch: transform_batch(TIKTOK, batch, scrape_job_id)
+    with raw_archive_sink(scrape_job_id) as sink:
+        summary = ingest(items, transform, "TikTok video", raw_sink=sink)
+
+Each stage is a generator: dataset items -> raw archive -> batch transform
+(batch_size raw items at a time) -> watermark filter (incremental scrapes,
+tools/watermarks.py) -> batches of INGEST_BATCH_SIZE -> store_scraped_rows()
+(dedup, upsert, queue embeddings; known posts only refresh their counts). A batch is written as soon as it fills,
+while the next dataset pages are still being fetched, and only a batch or
+two is held in memory however large the scrape. Dedup across batches goes
+through the database: earlier batches are already stored when the next one
+runs prepare_for_insert().
+Raw items go to the compressed archive (tools/utils/raw_archive.py). The
+archive is flushed before each batch is stored, and a row gets its item's
+raw_ref instead of raw_data only if that segment was uploaded; otherwise
+(no archive, failed upload) the row keeps raw_data.
+"""
+
+import os
+import sys
+from collections.abc import Callable, Iterable, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.ingest import store_scraped_rows
+from tools.utils.raw_archive import RawArchiveWriter
+from tools.watermarks import Watermark
+
+INGEST_BATCH_SIZE = 500
+
+
+def _tee(items: Iterable[dict], sink: RawArchiveWriter | None, counter: dict) -> Iterator[tuple[dict, str | None]]:
+    for item in items:
+        counter["scraped"] += 1
+        yield item, sink(item) if sink is not None else None
+
+
+def _transform(
+    items: Iterable[tuple[dict, str | None]],
+    transform: Callable[[list[dict]], list[dict | None]],
+    size: int,
+) -> Iterator[dict]:
+    for chunk in _batched(items, size):
+        rows = transform([item for item, _ in chunk])
+        for row, (item, raw_ref) in zip(rows, chunk):
+            if row is not None:
+                row["raw_data"] = item
+                if raw_ref is not None:
+                    row["raw_ref"] = raw_ref
+                yield row
+
+
+def _settle_raw(batch: list[dict], sink: RawArchiveWriter | None) -> list[dict]:
+    """Upload the open archive segment, then keep raw_ref or raw_data per row."""
+    if sink is None:
+        return batch
+    sink.flush()
+    for row in batch:
+        raw_ref = row.get("raw_ref")
+        if raw_ref is not None and sink.is_durable(raw_ref):
+            del row["raw_data"]
+        else:
+            row.pop("raw_ref", None)
+    return batch
+
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(
+    items: Iterable[dict],
+    transform: Callable[[list[dict]], list[dict | None]],
+    label: str = "post",
+    raw_sink: RawArchiveWriter | None = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    watermark: Watermark | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Stream raw items into scraped_content.
+
+    transform takes a list of raw items and returns one scraped_content row
+    per item, or None to skip it.
+    raw_sink, if given, is a RawArchiveWriter (what raw_archive_sink yields):
+    every raw item is written to it before it is transformed. Rows carry
+    raw_ref when their segment is durable, raw_data otherwise.
+    With a watermark, known posts skip dedup (their counts are still
+    refreshed), rows are recorded once they are stored, and the watermark is
+    advanced at the end. progress, if given, is called after every batch
+    with the counts since the previous call (fetched, inserted, refreshed,
+    duplicates, failed, known).
+    Returns dict with scraped, inserted, refreshed, failed, duplicates and known counts.
+    """
+    totals = {"scraped": 0, "inserted": 0, "refreshed": 0, "failed": 0, "duplicates": 0, "known": 0}
+    reported = dict(totals)
+
+    def report():
+        if watermark is not None:
+            totals["known"] = watermark.known
+        delta = {key: totals[key] - reported[key] for key in totals}
+        reported.update(totals)
+        if progress is not None and any(delta.values()):
+            delta["fetched"] = delta.pop("scraped")
+            progress(delta)
+
+    rows = _transform(_tee(items, raw_sink, totals), transform, batch_size)
+    if watermark is not None:
+        rows = watermark.filter(rows)
+    for batch in _batched(rows, batch_size):
+        known_urls = watermark.seen_urls if watermark is not None else None
+        result = store_scraped_rows(_settle_raw(batch, raw_sink), label, known_urls)
+        if watermark is not None:
+            watermark.record(batch, result["failed_rows"])
+        for key in ("inserted", "refreshed", "failed", "duplicates"):
+            totals[key] += result[key]
+        report()
+        print(f"  {totals['scraped']} {label}s read, {totals['inserted']} new so far")
+
+    # Items read after the last batch (without text)
+    report()
+    if watermark is not None:
+        watermark.save()
+
+    print(
+        f"Ingested {totals['scraped']} {label}s: {totals['inserted']} new, "
+        f"{totals['refreshed']} refreshed, {totals['duplicates']} duplicates, {totals['failed']} failed, "
+        f"{totals['known']} already known"
+    )
+    return totals
+
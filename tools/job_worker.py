@@ -0,0 +1,368 @@
+"""
+Scrape job queue worker (migration 014).
+
+Usage:
+    python tools/job_worker.py                           # Run until stopped
+    python tools/job_worker.py --drain                   # Exit once no jobs are ready
+    python tools/job_worker.py --drain --max-seconds 50
+    python tools/job_worker.py --drain --max-seconds 30 --cancel-after 45
+    python tools/job_worker.py --concurrency 8
+    python tools/job_worker.py --retry-failed            # Give failed jobs another round
+    python tools/job_worker.py --status
+
+scrape_jobs is the queue for every long-running job: scrapes
+(viral_research, competitor, brand_analysis), brand voice analysis
+('brand_voice') and reports ('report'). Endpoints call enqueue_job() (or
+create_scrape_job()) and return; the worker claims ready jobs with
+claim_scrape_jobs(), highest priority first, and runs up to --concurrency of
+them at once on threads. While they run it refreshes their lease every
+HEARTBEAT_SECONDS. A job whose worker stops heartbeating for
+SCRAPE_JOB_LEASE_SECONDS is picked up again by the next claim; a worker
+that finds it lost a lease cancels the job instead of letting it run on.
+Failed jobs are retried with exponential backoff and marked 'failed' after
+max_attempts. A handler that raises JobWaiting (a scrape whose Apify runs
+are still going, migration 015) gives its slot back: the job is parked as
+'waiting' and claimed again once the delay has passed, in the same attempt.
+Cancellation is cooperative: handlers call raise_if_cancelled() at safe
+points (scrapes: before each target and after every ingest batch). With
+cancel_after (the /scraping/jobs/process endpoint inside a 60 s function),
+jobs still running at that point are cancelled the same way and parked, to
+resume where they stopped on the next claim. Status changes are published
+to tools/utils/job_events.py for live progress.
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.utils.job_events import publish, seed_progress
+from tools.utils.supabase_client import get_supabase_client
+
+# Higher runs first; brand voice and reports have someone waiting on them
+PRIORITY_INTERACTIVE = 200
+PRIORITY_SCRAPE = 100
+PRIORITY_SCHEDULED = 50
+
+JOB_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+LEASE_SECONDS = int(os.getenv("SCRAPE_JOB_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = LEASE_SECONDS / 4
+POLL_INTERVAL_SECONDS = 5
+
+# Cancelled jobs (lost lease) and per-job cancel deadlines (time.monotonic())
+_cancelled = set()
+_cancel_at = {}
+_cancel_lock = threading.Lock()
+
+
+class JobWaiting(Exception):
+    """The job is waiting on outside work; run it again after delay_seconds."""
+
+    def __init__(self, message: str, delay_seconds: int):
+        super().__init__(message)
+        self.delay_seconds = delay_seconds
+
+
+class JobCancelled(Exception):
+    """The worker cancelled the job: its lease was lost or its time is up."""
+
+
+def cancel_job(job_id: str):
+    """Ask a running job to stop at its next raise_if_cancelled() check."""
+    with _cancel_lock:
+        _cancelled.add(job_id)
+
+
+def raise_if_cancelled(job_id: str):
+    """Raise JobCancelled if the job was cancelled or is past its cancel deadline."""
+    with _cancel_lock:
+        if job_id in _cancelled:
+            raise JobCancelled(f"Job {job_id} lost its lease")
+        deadline = _cancel_at.get(job_id)
+    if deadline is not None and time.monotonic() >= deadline:
+        raise JobCancelled(f"Job {job_id} ran out of time")
+
+
+def time_left(job_id: str) -> float | None:
+    """Seconds until the job is cancelled, or None without a deadline."""
+    with _cancel_lock:
+        deadline = _cancel_at.get(job_id)
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _run_scrape(job: dict) -> dict:
+    from backend.services.scraping_service import execute_scrape_job
+    return execute_scrape_job(job)
+
+
+def _run_brand_voice(job: dict) -> dict:
+    from tools.analyze_brand_voice import analyze_brand_voice
+    analyze_brand_voice(**job.get("payload") or {})
+    return {"results_count": 1}
+
+
+def _run_report(job: dict) -> dict:
+    from tools.generate_report import generate_report
+    report = generate_report(job["payload"]["report_type"])
+    return {"results_count": 1, "result": {"report_id": report["id"], "title": report["title"]}}
+
+
+# job_type -> handler(job) returning the scrape_jobs columns to set on completion
+JOB_HANDLERS = {
+    "viral_research": _run_scrape,
+    "competitor": _run_scrape,
+    "brand_analysis": _run_scrape,
+    "brand_voice": _run_brand_voice,
+    "report": _run_report,
+}
+
+
+def enqueue_job(job_type: str, payload: dict | None = None, priority: int = PRIORITY_INTERACTIVE,
+                **columns) -> str:
+    """Queue a job for the worker. Extra columns (search_terms, platforms, ...) are stored as given."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+    supabase = get_supabase_client()
+    job = {
+        "job_type": job_type,
+        "status": "pending",
+        "payload": payload or {},
+        "priority": priority,
+        **columns,
+    }
+    response = supabase.table("scrape_jobs").insert(job).execute()
+    return response.data[0]["id"]
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _claim(supabase, worker_id: str, batch_size: int) -> list[dict]:
+    return supabase.rpc(
+        "claim_scrape_jobs",
+        {"worker_id": worker_id, "batch_size": batch_size, "lease_seconds": LEASE_SECONDS},
+    ).execute().data or []
+
+
+def _heartbeat(supabase, worker_id: str, jobs: list[dict]):
+    """Refresh the leases on running jobs; cancel the ones another worker took over."""
+    try:
+        held = supabase.rpc(
+            "heartbeat_scrape_jobs",
+            {"worker_id": worker_id, "job_ids": [job["id"] for job in jobs]},
+        ).execute().data or []
+    except Exception as e:
+        print(f"Heartbeat failed: {e}")
+        return
+    held = {row if isinstance(row, str) else row.get("heartbeat_scrape_jobs") for row in held}
+    for job in jobs:
+        if job["id"] not in held:
+            print(f"  Lost the lease on job {job['id']}; cancelling it")
+            cancel_job(job["id"])
+
+
+def _run_job(job: dict) -> dict:
+    print(f"Running {job['job_type']} job {job['id']} (attempt {job['attempts']})")
+    seed_progress(job["id"], job.get("progress"))
+    publish(job["id"], "status", status="running", attempt=job["attempts"])
+    return JOB_HANDLERS[job["job_type"]](job) or {}
+
+
+def _finish(supabase, worker_id: str, job: dict, future) -> str:
+    """Record a job's outcome. Returns completed, waiting, retrying, failed or lost."""
+    with _cancel_lock:
+        lost = job["id"] in _cancelled
+        _cancelled.discard(job["id"])
+        _cancel_at.pop(job["id"], None)
+    try:
+        outcome = future.result()
+    except JobCancelled as e:
+        if lost:
+            return "lost"
+        # Out of time: resume in the same attempt on the next claim
+        print(f"  Job {job['id']} cancelled: {e}")
+        status = supabase.rpc(
+            "park_scrape_job",
+            {"job_id": job["id"], "worker_id": worker_id, "delay_seconds": 0},
+        ).execute().data
+        if not status:
+            return "lost"
+        publish(job["id"], "status", status="waiting", message=str(e))
+        return "waiting"
+    except JobWaiting as e:
+        print(f"  Job {job['id']} parked for {e.delay_seconds}s: {e}")
+        status = supabase.rpc(
+            "park_scrape_job",
+            {"job_id": job["id"], "worker_id": worker_id, "delay_seconds": e.delay_seconds},
+        ).execute().data
+        if not status:
+            return "lost"
+        publish(job["id"], "status", status="waiting", message=str(e))
+        return "waiting"
+    except Exception as e:
+        print(f"  Job {job['id']} failed: {e}")
+        status = supabase.rpc(
+            "fail_scrape_job",
+            {"job_id": job["id"], "worker_id": worker_id, "error_message": str(e)},
+        ).execute().data
+        if not status:
+            return "lost"
+        outcome = "failed" if status == "failed" else "retrying"
+        publish(job["id"], "status", status=outcome, message=str(e))
+        return outcome
+
+    response = (
+        supabase.table("scrape_jobs")
+        .update({
+            "status": "completed",
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "error_message": None,
+            "locked_by": None,
+            "locked_at": None,
+            **outcome,
+        })
+        .eq("id", job["id"])
+        .eq("locked_by", worker_id)
+        .execute()
+    )
+    if not response.data:
+        print(f"  Job {job['id']} finished after its lease was taken over")
+        return "lost"
+    publish(job["id"], "status", status="completed", **outcome)
+    print(f"  Job {job['id']} completed")
+    return "completed"
+
+
+def run_worker(
+    max_seconds: float | None = None,
+    drain: bool = False,
+    concurrency: int = JOB_CONCURRENCY,
+    worker_id: str | None = None,
+    cancel_after: float | None = None,
+) -> dict:
+    """
+    Run queued jobs until stopped, out of time, or (with drain) out of ready jobs.
+
+    With max_seconds, no new job is claimed once the budget is spent; jobs
+    already running are waited for. With cancel_after, jobs still running
+    that many seconds after the start are cancelled and parked to resume
+    later. Returns dict with completed, waiting, retrying, failed and lost
+    counts.
+    """
+    supabase = get_supabase_client()
+    worker_id = worker_id or _worker_id()
+    started = time.monotonic()
+    last_heartbeat = started
+    running = {}
+    totals = Counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while True:
+            out_of_time = max_seconds is not None and time.monotonic() - started > max_seconds
+            free = concurrency - len(running)
+            if free > 0 and not out_of_time:
+                for job in _claim(supabase, worker_id, free):
+                    if cancel_after is not None:
+                        with _cancel_lock:
+                            _cancel_at[job["id"]] = started + cancel_after
+                    running[pool.submit(_run_job, job)] = job
+
+            if not running:
+                if drain or out_of_time:
+                    break
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            # Wake up for finished jobs, the next heartbeat, or (with free slots) new jobs
+            timeout = HEARTBEAT_SECONDS - (time.monotonic() - last_heartbeat)
+            if len(running) < concurrency and not out_of_time:
+                timeout = min(timeout, POLL_INTERVAL_SECONDS)
+            done, _ = wait(running, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                totals[_finish(supabase, worker_id, running.pop(future), future)] += 1
+
+            if running and time.monotonic() - last_heartbeat >= HEARTBEAT_SECONDS:
+                _heartbeat(supabase, worker_id, list(running.values()))
+                last_heartbeat = time.monotonic()
+
+    if sum(totals.values()):
+        print(
+            f"Job worker {worker_id}: {totals['completed']} completed, {totals['waiting']} waiting, "
+            f"{totals['retrying']} retrying, {totals['failed']} failed in {time.monotonic() - started:.1f}s"
+        )
+    return {key: totals[key] for key in ("completed", "waiting", "retrying", "failed", "lost")}
+
+
+def retry_failed() -> int:
+    """Reset jobs that exhausted their attempts so the worker tries them again."""
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("scrape_jobs")
+        .update({
+            "status": "pending",
+            "attempts": 0,
+            "run_after": datetime.now(timezone.utc).isoformat(),
+            "completed_at": None,
+        })
+        .eq("status", "failed")
+        .execute()
+    )
+    count = len(response.data or [])
+    print(f"Reset {count} failed jobs")
+    return count
+
+
+def queue_status() -> dict:
+    """Job counts by status for jobs that are not finished yet, plus failures."""
+    supabase = get_supabase_client()
+    counts = {}
+    for status in ("pending", "waiting", "running", "failed"):
+        response = (
+            supabase.table("scrape_jobs")
+            .select("id", count="exact")
+            .eq("status", status)
+            .limit(1)
+            .execute()
+        )
+        if response.count:
+            counts[status] = response.count
+            print(f"  {status:<8} {response.count}")
+    if not counts:
+        print("Job queue is empty")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape job queue worker")
+    parser.add_argument("--drain", action="store_true", help="Exit once no jobs are ready")
+    parser.add_argument("--max-seconds", type=float, help="Stop claiming jobs after this long")
+    parser.add_argument("--cancel-after", type=float, help="Cancel and park jobs still running after this long")
+    parser.add_argument("--concurrency", type=int, default=JOB_CONCURRENCY, help="Jobs run at once")
+    parser.add_argument("--retry-failed", action="store_true", help="Reset failed jobs and exit")
+    parser.add_argument("--status", action="store_true", help="Show queue counts and exit")
+    args = parser.parse_args()
+
+    if args.retry_failed:
+        retry_failed()
+    elif args.status:
+        queue_status()
+    else:
+        run_worker(
+            max_seconds=args.max_seconds,
+            drain=args.drain,
+            concurrency=args.concurrency,
+            cancel_after=args.cancel_after,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Platform adapter registry.
+
+Each platform is a declarative PlatformAdapter (tools/platforms/<name>.py):
+its platform_id, the scraped_content column mapping and its scrape
+functions. The shared engine transforms whole batches column-wise. To add a
+platform, write its scrape functions and adapter and list it here.
+"""
+
+from tools.platforms.base import Field, PlatformAdapter
+from tools.platforms.engine import store_posts, transform_batch, virality_scores
+from tools.platforms.instagram import INSTAGRAM
+from tools.platforms.tiktok import TIKTOK
+from tools.platforms.youtube import YOUTUBE
+
+__all__ = [
+    "ADAPTERS",
+    "PLATFORM_MAP",
+    "Field",
+    "PlatformAdapter",
+    "get_adapter",
+    "store_posts",
+    "transform_batch",
+    "virality_scores",
+]
+
+ADAPTERS: dict[str, PlatformAdapter] = {adapter.name: adapter for adapter in (INSTAGRAM, TIKTOK, YOUTUBE)}
+
+PLATFORM_MAP = {name: adapter.platform_id for name, adapter in ADAPTERS.items()}
+
+
+def get_adapter(platform: str) -> PlatformAdapter:
+    """The adapter for a platform name. Raises ValueError for unknown platforms."""
+    try:
+        return ADAPTERS[platform]
+    except KeyError:
+        raise ValueError(f"Unknown platform: {platform}") from None
+
@@ -0,0 +1,86 @@
+"""
+Declarative platform adapters.
+
+A PlatformAdapter says how one platform's Apify items become scraped_content
+rows: a mapping from column to Field (dotted paths into the raw item), a
+callable for the odd derived value, or a constant. The shared engine
+(tools/platforms/engine.py) applies the mapping to whole batches, column by
+column, and scores virality for the batch at once.
+"""
+
+import importlib
+from collections.abc import Callable
+
+
+class Field:
+    """
+    First non-empty value among dotted paths into a raw item ("owner.username").
+
+    convert, if given, is applied to the value found; default is used as is.
+    """
+
+    def __init__(self, *paths: str, default=None, convert: Callable | None = None):
+        self.paths = [path.split(".") for path in paths]
+        self.default = default
+        self.convert = convert
+
+    def column(self, items: list[dict]) -> list:
+        """This field for a batch of items, one path at a time over the whole batch."""
+        values = None
+        for head, *rest in self.paths:
+            found = [item.get(head) for item in items]
+            for part in rest:
+                found = [value.get(part) if isinstance(value, dict) else None for value in found]
+            values = found if values is None else [value or other for value, other in zip(values, found)]
+            if all(values):
+                break
+        if self.convert:
+            convert, default = self.convert, self.default
+            return [convert(value) if value else default for value in values]
+        return [value or self.default for value in values]
+
+
+class PlatformAdapter:
+    """
+    One platform: its scraped_content mapping and its scrape functions.
+
+    scrapers maps a target kind ("handle", "search") to "module:function";
+    modules are imported on first use. newer_than_kinds are the kinds whose
+    scrape function takes newer_than (actors with a date cut-off).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        platform_id: int,
+        label: str,
+        columns: dict,
+        scrapers: dict[str, str],
+        newer_than_kinds: frozenset[str] = frozenset(),
+    ):
+        self.name = name
+        self.platform_id = platform_id
+        self.label = label
+        self.columns = columns
+        self.scrapers = scrapers
+        self.newer_than_kinds = newer_than_kinds
+
+    def extract(self, column: str, items: list[dict]) -> list:
+        """One column's values for a batch of raw items."""
+        spec = self.columns.get(column)
+        if isinstance(spec, Field):
+            return spec.column(items)
+        if callable(spec):
+            return [spec(item) for item in items]
+        return [spec] * len(items)
+
+    def scraper(self, kind: str) -> Callable:
+        """The scrape function for a target kind."""
+        try:
+            module_name, function_name = self.scrapers[kind].split(":")
+        except KeyError:
+            raise ValueError(f"{self.name} has no scraper for {kind} targets") from None
+        return getattr(importlib.import_module(module_name), function_name)
+
+    def __repr__(self):
+        return f"PlatformAdapter({self.name!r})"
@@ -0,0 +1,105 @@
+"""
+Batch transform and ingest for every platform adapter.
+
+transform_batch() turns a list of raw items into scraped_content rows one
+column at a time, then scores virality for the whole batch with NumPy:
+
+    engagement = likes + 2 * comments + 3 * shares + 4 * saves
+    score      = engagement / views, or engagement / (10 * likes) without views
+
+(platforms without shares or saves map them to 0). Items without text are
+skipped. store_posts() runs an adapter's dataset through ingest().
+"""
+
+import os
+import sys
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from tools.ingest_pipeline import ingest
+from tools.platforms.base import PlatformAdapter
+from tools.utils.raw_archive import RawArchiveWriter
+from tools.watermarks import Watermark
+
+COUNT_COLUMNS = ("likes_count", "comments_count", "shares_count", "views_count", "saves_count")
+TEXT_COLUMNS = (
+    "source_url", "source_handle", "content_text", "content_type", "media_urls",
+    "hashtags", "mentions", "posted_at",
+)
+
+
+def _to_number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _count_array(values: list) -> np.ndarray:
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_number(v) for v in values], dtype=np.float64)
+
+
+def virality_scores(likes: np.ndarray, comments: np.ndarray, shares: np.ndarray,
+                    saves: np.ndarray, views: np.ndarray) -> np.ndarray:
+    """Weighted engagement per view (per 10 likes without views), rounded to 6 places."""
+    engagement = likes + 2 * comments + 3 * shares + 4 * saves
+    per_view = np.divide(engagement, views, out=np.zeros_like(engagement), where=views > 0)
+    per_like = np.divide(engagement, likes * 10, out=np.zeros_like(engagement), where=likes > 0)
+    return np.round(np.where(views > 0, per_view, per_like), 6)
+
+
+def transform_batch(adapter: PlatformAdapter, items: list[dict], scrape_job_id: str) -> list[dict | None]:
+    """scraped_content rows for raw items, in order; None for items without text."""
+    if not items:
+        return []
+    text = adapter.extract("content_text", items)
+    keep = [i for i, value in enumerate(text) if value]
+    if not keep:
+        return [None] * len(items)
+    kept = [items[i] for i in keep] if len(keep) < len(items) else items
+
+    columns = {name: adapter.extract(name, kept) for name in TEXT_COLUMNS if name != "content_text"}
+    columns["content_text"] = [text[i] for i in keep] if len(keep) < len(items) else text
+    for name in COUNT_COLUMNS:
+        columns[name] = adapter.extract(name, kept)
+    counts = {name: _count_array(columns[name]) for name in COUNT_COLUMNS}
+    columns["virality_score"] = virality_scores(
+        counts["likes_count"], counts["comments_count"], counts["shares_count"],
+        counts["saves_count"], counts["views_count"],
+    ).tolist()
+    columns["platform_id"] = [adapter.platform_id] * len(kept)
+    columns["scrape_job_id"] = [scrape_job_id] * len(kept)
+
+    names = list(columns)
+    transformed = [dict(zip(names, values)) for values in zip(*columns.values())]
+    if len(keep) == len(items):
+        return transformed
+    rows = [None] * len(items)
+    for position, row in zip(keep, transformed):
+        rows[position] = row
+    return rows
+
+
+def store_posts(
+    adapter: PlatformAdapter,
+    posts: Iterable[dict],
+    scrape_job_id: str,
+    raw_sink: RawArchiveWriter | None = None,
+    watermark: Watermark | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> int:
+    """Stream posts through transform, dedup and upsert. Returns count of new posts stored."""
+    return ingest(
+        posts,
+        lambda items: transform_batch(adapter, items, scrape_job_id),
+        adapter.label,
+        raw_sink=raw_sink,
+        watermark=watermark,
+        progress=progress,
+    )["inserted"]
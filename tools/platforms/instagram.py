@@ -0,0 +1,51 @@
+"""Instagram: apify/instagram-scraper and the hashtag/post fallbacks (tools/scrape_instagram.py)."""
+
+from tools.platforms.base import Field, PlatformAdapter
+
+CONTENT_TYPES = {
+    "Image": "post",
+    "Video": "reel",
+    "Sidecar": "carousel",
+    "GraphImage": "post",
+    "GraphVideo": "reel",
+    "GraphSidecar": "carousel",
+}
+
+
+def _post_url(raw_post: dict) -> str:
+    if raw_post.get("url"):
+        return raw_post["url"]
+    if raw_post.get("shortCode"):
+        return f"https://www.instagram.com/p/{raw_post['shortCode']}/"
+    return ""
+
+
+INSTAGRAM = PlatformAdapter(
+    name="instagram",
+    platform_id=1,
+    label="Instagram post",
+    columns={
+        "source_url": _post_url,
+        "source_handle": Field("ownerUsername", "owner.username", "username", default=""),
+        "content_text": Field("caption", "text", default=""),
+        "content_type": Field(
+            "type", "__typename", "productType",
+            default="post", convert=lambda t: CONTENT_TYPES.get(t, "post"),
+        ),
+        "media_urls": Field("displayUrl", default=[], convert=lambda url: [url]),
+        "likes_count": Field("likesCount", "likes", default=0),
+        "comments_count": Field("commentsCount", "comments", default=0),
+        "shares_count": 0,
+        "views_count": Field("videoViewCount", "views", default=0),
+        "saves_count": 0,
+        "hashtags": Field("hashtags", default=[]),
+        "mentions": Field("mentions", default=[]),
+        "posted_at": Field("timestamp", "date", "takenAtTimestamp"),
+    },
+    scrapers={
+        "handle": "tools.scrape_instagram:scrape_profile",
+        "search": "tools.scrape_instagram:scrape_by_hashtags",
+    },
+    # Both actors take onlyPostsNewerThan
+    newer_than_kinds=frozenset({"handle", "search"}),
+)
@@ -0,0 +1,30 @@
+"""TikTok: clockworks/tiktok-scraper and tiktok-hashtag-scraper (tools/scrape_tiktok.py)."""
+
+from tools.platforms.base import Field, PlatformAdapter
+
+TIKTOK = PlatformAdapter(
+    name="tiktok",
+    platform_id=2,
+    label="TikTok video",
+    columns={
+        "source_url": Field("webVideoUrl", default=""),
+        "source_handle": Field("authorMeta.name", default=""),
+        "content_text": Field("text", default=""),
+        "content_type": "video",
+        "media_urls": Field("videoUrl", default=[], convert=lambda url: [url]),
+        "likes_count": Field("diggCount", default=0),
+        "comments_count": Field("commentCount", default=0),
+        "shares_count": Field("shareCount", default=0),
+        "views_count": Field("playCount", default=0),
+        "saves_count": Field("collectCount", default=0),
+        "hashtags": Field("hashtags", default=[], convert=lambda tags: [t.get("name", "") for t in tags]),
+        "mentions": Field("mentions", default=[]),
+        "posted_at": Field("createTimeISO"),
+    },
+    scrapers={
+        "handle": "tools.scrape_tiktok:scrape_profile",
+        "search": "tools.scrape_tiktok:scrape_by_hashtags",
+    },
+    # The hashtag actor has no date cut-off, so known videos are only recognised after fetching
+    newer_than_kinds=frozenset({"handle"}),
+)
@@ -0,0 +1,34 @@
+"""YouTube: streamers/youtube-scraper and youtube-channel-scraper (tools/scrape_youtube.py)."""
+
+from tools.platforms.base import Field, PlatformAdapter
+
+
+def _title_and_description(raw_post: dict) -> str:
+    return f"{raw_post.get('title') or ''}\n\n{raw_post.get('description') or ''}".strip()
+
+
+YOUTUBE = PlatformAdapter(
+    name="youtube",
+    platform_id=3,
+    label="YouTube video",
+    columns={
+        "source_url": Field("url", default=""),
+        "source_handle": Field("channelName", default=""),
+        "content_text": _title_and_description,
+        "content_type": "video",
+        "media_urls": Field("thumbnailUrl", default=[], convert=lambda url: [url]),
+        "likes_count": Field("likes", default=0),
+        "comments_count": Field("commentsCount", default=0),
+        "shares_count": 0,
+        "views_count": Field("viewCount", default=0),
+        "saves_count": 0,
+        "hashtags": Field("hashtags", default=[]),
+        "mentions": [],
+        "posted_at": Field("date"),
+    },
+    scrapers={
+        "handle": "tools.scrape_youtube:scrape_channel",
+        "search": "tools.scrape_youtube:scrape_by_search",
+    },
+    # Neither actor takes a date cut-off; known videos are only recognised after fetching
+)
@@ -0,0 +1,178 @@
+"""
+Re-embed stored vectors with a new model, without downtime (migrations 010, 020).
+
+Usage:
+    python tools/reembed.py --start --model voyage-3.5-lite    # Point the shadow column at a model
+    python tools/reembed.py --fill                              # Fill it (resumable, throttled)
+    python tools/reembed.py --fill --max-seconds 50 --tokens-per-minute 200000
+    python tools/reembed.py --status                            # Coverage of both columns
+    python tools/reembed.py --promote                           # Switch queries to the shadow model
+
+scraped_content, content_feedback and brand_voice_profiles each have two
+vector columns. embedding_config names the live one and the model each
+holds. --fill embeds every table's rows into the standby column with the
+shadow model while match_content and match_feedback keep serving the live
+one. It pages by id, throttled to --tokens-per-minute so live traffic keeps
+its Voyage quota. Rows already filled are skipped, so an interrupted run just
+starts again. --promote checks coverage of all three tables and swaps the
+columns in one UPDATE, so feedback search switches with content search.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.generate_embeddings import estimate_tokens, generate_embeddings_batch, get_embedding_config
+from tools.utils.rate_limiter import RateLimiter
+from tools.utils.supabase_client import get_supabase_client
+
+REEMBED_PAGE_SIZE = 500
+REEMBED_TABLES = ("scraped_content", "content_feedback", "brand_voice_profiles")
+# Share of the account's Voyage token budget the re-embed may use
+DEFAULT_TOKENS_PER_MINUTE = 300_000
+
+
+def start(model: str) -> dict:
+    """Set the shadow model; rows embedded with another model become re-embed candidates."""
+    supabase = get_supabase_client()
+    config = supabase.rpc("start_shadow_embedding", {"model": model}).execute().data
+    print(f"Shadow model set to {model}; run --fill to embed the standby column")
+    return config
+
+
+def coverage() -> dict:
+    """Rows to embed and how many each model covers, per table."""
+    supabase = get_supabase_client()
+    rows = supabase.rpc("embedding_coverage", {}).execute().data or []
+    stats = {row["table_name"]: row for row in rows}
+    for table_name, row in stats.items():
+        print(f"  {table_name}")
+        total = row.get("total_rows") or 0
+        for label, model_key, count_key in (
+            ("active", "active_model", "active_rows"),
+            ("shadow", "shadow_model", "shadow_rows"),
+        ):
+            if row.get(model_key):
+                pct = 100.0 * (row.get(count_key) or 0) / total if total else 100.0
+                print(f"    {label:<6} {row[model_key]:<24} {row.get(count_key) or 0}/{total} rows ({pct:.1f}%)")
+    if rows:
+        print(f"  live column: {rows[0]['active_column']}")
+    return stats
+
+
+def fill(
+    max_seconds: float | None = None,
+    tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+    page_size: int = REEMBED_PAGE_SIZE,
+) -> dict:
+    """
+    Embed every candidate row of every table into the standby column with the shadow model.
+
+    Returns dict with processed, complete and rows_per_second.
+    """
+    supabase = get_supabase_client()
+    config = get_embedding_config(refresh=True)
+    model = config.get("shadow_model")
+    if not model:
+        raise RuntimeError("No shadow model set; run --start --model <name> first")
+
+    # Separate, smaller budget than the shared limiter in generate_embeddings
+    throttle = RateLimiter(requests_per_minute=600, tokens_per_minute=tokens_per_minute)
+    started = time.monotonic()
+    processed = 0
+    slowest_page = 0.0
+    tables = list(REEMBED_TABLES)
+    last_id = None
+    complete = False
+
+    while True:
+        elapsed = time.monotonic() - started
+        if max_seconds is not None and elapsed + slowest_page > max_seconds:
+            print(f"Time budget reached after {elapsed:.1f}s; run --fill again to continue.")
+            break
+
+        page_started = time.monotonic()
+        rows = supabase.rpc(
+            "reembed_candidates", {"after_id": last_id, "batch_size": page_size, "target_table": tables[0]}
+        ).execute().data or []
+        if not rows:
+            tables.pop(0)
+            last_id = None
+            if not tables:
+                complete = True
+                break
+            continue
+
+        texts = [row["content_text"] for row in rows]
+        throttle.acquire(sum(estimate_tokens(t) for t in texts))
+        embeddings = generate_embeddings_batch(texts, model=model)
+        embedded = [(row["id"], e) for row, e in zip(rows, embeddings) if e is not None]
+        if embedded:
+            supabase.rpc(
+                "bulk_set_embeddings",
+                {
+                    "ids": [row_id for row_id, _ in embedded],
+                    "embeddings": [json.dumps(e, separators=(",", ":")) for _, e in embedded],
+                    "target_table": tables[0],
+                    "model": model,
+                },
+            ).execute()
+
+        last_id = rows[-1]["id"]
+        processed += len(embedded)
+        slowest_page = max(slowest_page, time.monotonic() - page_started)
+        rate = processed / max(time.monotonic() - started, 1e-9)
+        print(f"  {processed} rows re-embedded with {model} ({tables[0]}, {rate:.1f} rows/s)")
+
+    elapsed = time.monotonic() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    status = "complete" if complete else "paused"
+    print(f"Re-embed {status}: {processed} rows in {elapsed:.1f}s ({rate:.1f} rows/s)")
+    return {"processed": processed, "complete": complete, "rows_per_second": round(rate, 1)}
+
+
+def promote(min_coverage: float = 1.0) -> dict:
+    """Swap live and standby columns once the shadow model covers enough rows."""
+    supabase = get_supabase_client()
+    config = supabase.rpc("promote_shadow_embeddings", {"min_coverage": min_coverage}).execute().data
+    get_embedding_config(refresh=True)
+    print(
+        f"Promoted {config['active_model']} ({config['active_column']}); "
+        f"{config['shadow_model']} stays in the standby column for rollback"
+    )
+    print("Rows the shadow model did not cover were queued; run tools/embedding_worker.py --drain")
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zero-downtime embedding model upgrade")
+    parser.add_argument("--start", action="store_true", help="Set the shadow model (with --model)")
+    parser.add_argument("--model", help="Voyage model to re-embed with")
+    parser.add_argument("--fill", action="store_true", help="Embed the standby column")
+    parser.add_argument("--max-seconds", type=float, help="Time budget for --fill")
+    parser.add_argument("--tokens-per-minute", type=int, default=DEFAULT_TOKENS_PER_MINUTE)
+    parser.add_argument("--status", action="store_true", help="Show coverage")
+    parser.add_argument("--promote", action="store_true", help="Switch queries to the shadow model")
+    parser.add_argument("--min-coverage", type=float, default=1.0, help="Coverage required to promote")
+    args = parser.parse_args()
+
+    if args.start:
+        if not args.model:
+            parser.error("--start needs --model")
+        start(args.model)
+    elif args.fill:
+        fill(max_seconds=args.max_seconds, tokens_per_minute=args.tokens_per_minute)
+    elif args.status:
+        coverage()
+    elif args.promote:
+        promote(args.min_coverage)
+    else:
+        parser.error("Provide --start --model, --fill, --status or --promote")
+
+
+if __name__ == "__main__":
+    main()
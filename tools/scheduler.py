@@ -0,0 +1,312 @@
+"""
+Recurring scrape scheduler (migration 017).
+
+Usage:
+    python tools/scheduler.py --tick                     # Fire due schedules once
+    python tools/scheduler.py --run                      # Tick every minute until stopped
+    python tools/scheduler.py --list
+    python tools/scheduler.py --add weekly-viral --cron "0 6 * * 1" \\
+        --platforms instagram,tiktok --hashtags salonowner,salontok --limit 100
+    python tools/scheduler.py --disable weekly-viral     # --enable / --remove likewise
+
+A schedule is a cron expression (UTC) plus what /scraping/jobs takes:
+platforms, hashtags/search terms, handles, max_results. Each tick claims the
+schedules that are due (claim_due_schedules(), FOR UPDATE SKIP LOCKED) and
+queues scrape jobs for the job worker at PRIORITY_SCHEDULED:
+    - targets (platform + handle or term) already pending, waiting or
+      running in another job are coalesced away; a schedule whose targets
+      are all in flight queues nothing this time
+    - a platform that has started SCRAPE_BUDGET_PER_HOUR_<PLATFORM> targets
+      in the last hour defers the schedule by RETRY_SECONDS instead
+    - missed runs (scheduler down) fire once, not once per missed tick
+    - next_run_at gets up to jitter_seconds of random delay, so schedules
+      sharing a cron don't all hit Apify in the same minute
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.scraping_service import PLATFORM_MAP, build_targets, create_scrape_job
+from tools.job_worker import PRIORITY_SCHEDULED
+from tools.utils.cron import CronExpression
+from tools.utils.supabase_client import get_supabase_client
+
+TICK_SECONDS = 60
+SCHEDULE_LEASE_SECONDS = 120
+# Delay before a deferred (over budget) or failed schedule is tried again
+RETRY_SECONDS = 600
+
+# Targets (actor runs) started per platform per rolling hour, across all jobs
+BUDGET_WINDOW_SECONDS = 3600
+SCRAPE_BUDGET_PER_HOUR = {
+    "instagram": int(os.getenv("SCRAPE_BUDGET_PER_HOUR_INSTAGRAM", "30")),
+    "tiktok": int(os.getenv("SCRAPE_BUDGET_PER_HOUR_TIKTOK", "30")),
+    "youtube": int(os.getenv("SCRAPE_BUDGET_PER_HOUR_YOUTUBE", "20")),
+}
+
+IN_FLIGHT_STATUSES = ["pending", "waiting", "running"]
+TARGET_DONE = {"completed", "failed"}
+
+
+def _next_run(schedule: dict, after: datetime) -> datetime:
+    jitter = random.uniform(0, schedule.get("jitter_seconds") or 0)
+    return CronExpression(schedule["cron"]).next_after(after) + timedelta(seconds=jitter)
+
+
+def _in_flight_targets(supabase) -> set[str]:
+    """Target keys still to run in pending, waiting or running jobs."""
+    jobs = (
+        supabase.table("scrape_jobs")
+        .select("targets_progress")
+        .in_("status", IN_FLIGHT_STATUSES)
+        .execute()
+    ).data or []
+    return {
+        key
+        for job in jobs
+        for key, progress in (job.get("targets_progress") or {}).items()
+        if (progress or {}).get("status") not in TARGET_DONE
+    }
+
+
+def _budget_used(supabase, now: datetime) -> Counter:
+    """Targets per platform in jobs created within the budget window."""
+    since = (now - timedelta(seconds=BUDGET_WINDOW_SECONDS)).isoformat()
+    jobs = (
+        supabase.table("scrape_jobs")
+        .select("targets_progress")
+        .gte("created_at", since)
+        .execute()
+    ).data or []
+    return Counter(key.split(":", 1)[0] for job in jobs for key in (job.get("targets_progress") or {}))
+
+
+def _over_budget(needed: Counter, used: Counter) -> list[str]:
+    """Platforms the targets would push over budget. A platform with nothing
+    used yet always gets its run, so an oversized schedule isn't starved."""
+    return [
+        f"{platform} ({used[platform]}/{SCRAPE_BUDGET_PER_HOUR.get(platform, 0)} used, needs {count})"
+        for platform, count in needed.items()
+        if used[platform] and used[platform] + count > SCRAPE_BUDGET_PER_HOUR.get(platform, 0)
+    ]
+
+
+def _job_groups(targets: list[dict]) -> list[tuple[list[str], list[str], list[str]]]:
+    """(platforms, handles, terms) per job: platforms left with the same handles and terms share one."""
+    by_platform = {}
+    for target in targets:
+        handles, terms = by_platform.setdefault(target["platform"], ([], []))
+        (handles if target["kind"] == "handle" else terms).append(target["value"])
+    groups = {}
+    for platform, (handles, terms) in by_platform.items():
+        groups.setdefault((tuple(handles), tuple(terms)), []).append(platform)
+    return [(platforms, list(handles), list(terms)) for (handles, terms), platforms in groups.items()]
+
+
+def fire_schedule(schedule: dict, in_flight: set[str], used: Counter, now: datetime) -> dict:
+    """
+    Queue jobs for one due schedule. in_flight and used are updated with what was queued.
+
+    Returns the scrape_schedules columns to update.
+    """
+    targets = build_targets(schedule["platforms"], schedule.get("search_terms"), schedule.get("target_handles"))
+    fresh = [t for t in targets if t["key"] not in in_flight]
+    coalesced = len(targets) - len(fresh)
+
+    if not fresh:
+        return {
+            "next_run_at": _next_run(schedule, now).isoformat(),
+            "last_run_at": now.isoformat(),
+            "last_job_ids": [],
+            "last_result": f"coalesced: all {len(targets)} targets already in flight",
+        }
+
+    needed = Counter(t["platform"] for t in fresh)
+    over = _over_budget(needed, used)
+    if over:
+        retry_at = now + timedelta(seconds=RETRY_SECONDS + random.uniform(0, schedule.get("jitter_seconds") or 0))
+        return {"next_run_at": retry_at.isoformat(), "last_result": "deferred: over budget for " + ", ".join(over)}
+
+    job_ids = []
+    for platforms, handles, terms in _job_groups(fresh):
+        job_ids.append(create_scrape_job(
+            platforms,
+            schedule.get("job_type") or "viral_research",
+            terms or None,
+            handles or None,
+            schedule.get("max_results") or 100,
+            schedule.get("incremental", True),
+            priority=PRIORITY_SCHEDULED,
+            schedule_id=schedule["id"],
+        ))
+    in_flight.update(t["key"] for t in fresh)
+    used.update(needed)
+
+    result = f"queued {len(job_ids)} job{'s' if len(job_ids) != 1 else ''} ({len(fresh)} targets"
+    result += f", {coalesced} coalesced)" if coalesced else ")"
+    return {
+        "next_run_at": _next_run(schedule, now).isoformat(),
+        "last_run_at": now.isoformat(),
+        "last_job_ids": job_ids,
+        "last_result": result,
+    }
+
+
+def tick() -> dict:
+    """Fire every due schedule once. Returns dict with due, queued, coalesced, deferred and failed counts."""
+    supabase = get_supabase_client()
+    due = supabase.rpc("claim_due_schedules", {"lease_seconds": SCHEDULE_LEASE_SECONDS}).execute().data or []
+    totals = Counter(due=len(due))
+    if not due:
+        return {"due": 0, "queued": 0, "coalesced": 0, "deferred": 0, "failed": 0}
+
+    now = datetime.now(timezone.utc)
+    in_flight = _in_flight_targets(supabase)
+    used = _budget_used(supabase, now)
+    for schedule in due:
+        try:
+            update = fire_schedule(schedule, in_flight, used, now)
+        except Exception as e:
+            update = {
+                "next_run_at": (now + timedelta(seconds=RETRY_SECONDS)).isoformat(),
+                "last_result": f"error: {e}"[:500],
+            }
+        outcome = update["last_result"].split(" ", 1)[0].rstrip(":")
+        totals[{"error": "failed"}.get(outcome, outcome)] += 1
+        print(f"  {schedule['name']}: {update['last_result']}")
+        supabase.table("scrape_schedules").update({
+            **update,
+            "locked_until": None,
+            "updated_at": now.isoformat(),
+        }).eq("id", schedule["id"]).execute()
+
+    return {key: totals[key] for key in ("due", "queued", "coalesced", "deferred", "failed")}
+
+
+def run_scheduler(max_seconds: float | None = None):
+    """Tick every TICK_SECONDS until stopped or out of time."""
+    started = time.monotonic()
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        try:
+            tick()
+        except Exception as e:
+            print(f"Scheduler tick failed: {e}")
+        time.sleep(TICK_SECONDS)
+
+
+def add_schedule(name: str, cron: str, platforms: list[str], search_terms: list[str] | None = None,
+                 target_handles: list[str] | None = None, max_results: int = 100,
+                 job_type: str = "viral_research", incremental: bool = True, jitter_seconds: int = 300) -> dict:
+    """Create or replace a schedule. Raises ValueError for a bad cron, platform or empty target list."""
+    CronExpression(cron)
+    unknown = [p for p in platforms if p not in PLATFORM_MAP]
+    if unknown:
+        raise ValueError(f"Unknown platforms: {', '.join(unknown)}")
+    if not build_targets(platforms, search_terms, target_handles):
+        raise ValueError("A schedule needs at least one search term or handle")
+
+    schedule = {
+        "name": name,
+        "cron": cron,
+        "platforms": platforms,
+        "job_type": job_type,
+        "search_terms": search_terms,
+        "target_handles": target_handles,
+        "max_results": max_results,
+        "incremental": incremental,
+        "jitter_seconds": jitter_seconds,
+        "enabled": True,
+        "locked_until": None,
+    }
+    schedule["next_run_at"] = _next_run(schedule, datetime.now(timezone.utc)).isoformat()
+    response = get_supabase_client().table("scrape_schedules").upsert(schedule, on_conflict="name").execute()
+    print(f"Schedule {name}: next run {schedule['next_run_at']}")
+    return response.data[0]
+
+
+def list_schedules() -> list[dict]:
+    rows = get_supabase_client().table("scrape_schedules").select("*").order("name").execute().data or []
+    for row in rows:
+        state = "on " if row["enabled"] else "off"
+        print(
+            f"  {state} {row['name']:<24} {row['cron']:<16} {','.join(row['platforms']):<24} "
+            f"next {row['next_run_at']}  {row.get('last_result') or ''}"
+        )
+    if not rows:
+        print("No schedules")
+    return rows
+
+
+def set_enabled(name: str, enabled: bool) -> int:
+    update = {"enabled": enabled}
+    if enabled:
+        schedule = get_supabase_client().table("scrape_schedules").select("*").eq("name", name).execute().data
+        if schedule:
+            update["next_run_at"] = _next_run(schedule[0], datetime.now(timezone.utc)).isoformat()
+    response = get_supabase_client().table("scrape_schedules").update(update).eq("name", name).execute()
+    return len(response.data or [])
+
+
+def remove_schedule(name: str) -> int:
+    response = get_supabase_client().table("scrape_schedules").delete().eq("name", name).execute()
+    return len(response.data or [])
+
+
+def _split(value: str | None) -> list[str] | None:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recurring scrape scheduler")
+    parser.add_argument("--tick", action="store_true", help="Fire due schedules once and exit")
+    parser.add_argument("--run", action="store_true", help="Tick every minute until stopped")
+    parser.add_argument("--max-seconds", type=float, help="Time budget for --run")
+    parser.add_argument("--list", action="store_true", help="Show schedules")
+    parser.add_argument("--add", metavar="NAME", help="Create or replace a schedule")
+    parser.add_argument("--enable", metavar="NAME")
+    parser.add_argument("--disable", metavar="NAME")
+    parser.add_argument("--remove", metavar="NAME")
+    parser.add_argument("--cron", help='5-field cron in UTC, e.g. "0 6 * * 1", or @daily')
+    parser.add_argument("--platforms", default="instagram", help="Comma-separated platforms")
+    parser.add_argument("--hashtags", help="Comma-separated hashtags / search terms")
+    parser.add_argument("--handles", help="Comma-separated handles")
+    parser.add_argument("--limit", type=int, default=100, help="Max results per target")
+    parser.add_argument("--job-type", default="viral_research", choices=["viral_research", "competitor", "brand_analysis"])
+    parser.add_argument("--full", action="store_true", help="Ignore watermarks on every run")
+    parser.add_argument("--jitter", type=int, default=300, help="Max random delay in seconds")
+    args = parser.parse_args()
+
+    if args.tick:
+        print(tick())
+    elif args.run:
+        run_scheduler(args.max_seconds)
+    elif args.list:
+        list_schedules()
+    elif args.add:
+        if not args.cron:
+            parser.error("--add needs --cron")
+        try:
+            add_schedule(
+                args.add, args.cron, _split(args.platforms), _split(args.hashtags), _split(args.handles),
+                args.limit, args.job_type, not args.full, args.jitter,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.enable or args.disable:
+        name = args.enable or args.disable
+        print(f"{'Enabled' if args.enable else 'Disabled'} {set_enabled(name, bool(args.enable))} schedules")
+    elif args.remove:
+        print(f"Removed {remove_schedule(args.remove)} schedules")
+    else:
+        parser.error("Provide --tick, --run, --list, --add, --enable, --disable or --remove")
+
+
+if __name__ == "__main__":
+    main()
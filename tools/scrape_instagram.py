@@ -11,24 +11,41 @@ Modes:
 
 Outputs:
     Stores results in Supabase scraped_content table.
-    Writes raw results to .tmp/instagram_scrape_{timestamp}.json
+    Archives raw results to the raw-archive bucket under {scrape_job_id}/ (zstd JSONL)
 """
 
 import argparse
+import itertools
 import json
 import os
 import sys
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from tools.apify_runs import ActorRuns, RunPending
 from tools.utils.apify_client import get_apify_client
-from tools.utils.supabase_client import get_supabase_client
+from tools.platforms import get_adapter, store_posts
+from tools.utils.raw_archive import raw_archive_sink
 
+# Hashtag actor runs in flight at once in the fallback path
+FALLBACK_CONCURRENCY = 3
 
-def scrape_by_hashtags(hashtags: list[str], limit: int = 100) -> list[dict]:
-    """Scrape viral Instagram posts by hashtag."""
+
+def scrape_by_hashtags(hashtags: list[str], limit: int = 100, newer_than: str | None = None,
+                       runs: ActorRuns | None = None) -> Iterator[dict]:
+    """
+    Scrape viral Instagram posts by hashtag. Returns a lazy iterator over the dataset(s).
+
+    newer_than ("YYYY-MM-DD") limits the main actor to newer posts; the
+    fallback actor has no such option. With runs, actor runs are resumable
+    (see tools/apify_runs.py); every fallback run is started before RunPending
+    is raised.
+    """
     client = get_apify_client()
+    runs = runs or ActorRuns()
 
     # Build hashtag URLs for direct scraping
     directUrls = [f"https://www.instagram.com/explore/tags/{tag}/" for tag in hashtags]
@@ -40,39 +57,55 @@ def scrape_by_hashtags(hashtags: list[str], limit: int = 100) -> list[dict]:
         "searchType": "hashtag",
         "searchLimit": limit,
     }
+    if newer_than:
+        run_input["onlyPostsNewerThan"] = newer_than
 
     print(f"Starting Instagram hashtag scrape: {hashtags} (limit: {limit})")
     try:
         # Try with apify/instagram-scraper (more general)
-        run = client.actor("apify/instagram-scraper").call(run_input=run_input)
-        items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-        print(f"Scraped {len(items)} posts")
-        return items
+        run = runs.call("apify/instagram-scraper", run_input)
+        return client.dataset(run["defaultDatasetId"]).iterate_items()
+    except RunPending:
+        raise
     except Exception as e:
         print(f"Error with apify/instagram-scraper: {e}")
         print("Trying alternative approach...")
         
-        # Fallback: scrape profiles that use these hashtags
-        all_items = []
-        for tag in hashtags[:3]:  # Limit to first 3 hashtags to avoid rate limits
+        # Fallback: one hashtag actor run per tag, a few in flight at once
+        def run_tag(tag: str):
             try:
                 run_input_fallback = {
                     "hashtags": [tag],
-                    "resultsLimit": limit // len(hashtags),
+                    "resultsLimit": max(limit // len(hashtags), 1),
                 }
-                run = client.actor("voyager/instagram-hashtag-scraper").call(run_input=run_input_fallback)
-                items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-                all_items.extend(items)
-                print(f"Scraped {len(items)} posts for #{tag}")
+                run = runs.call("voyager/instagram-hashtag-scraper", run_input_fallback)
+                print(f"Scrape finished for #{tag}")
+                return client.dataset(run["defaultDatasetId"])
+            except RunPending as pending:
+                return pending
             except Exception as e2:
                 print(f"Error scraping #{tag}: {e2}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(len(hashtags), FALLBACK_CONCURRENCY)) as pool:
+            results = list(pool.map(run_tag, hashtags))
+        pending = [r for r in results if isinstance(r, RunPending)]
+        if pending:
+            raise pending[0]
+        datasets = [d for d in results if d is not None]
         
-        return all_items
+        return itertools.chain.from_iterable(d.iterate_items() for d in datasets)
 
 
-def scrape_profile(handle: str, limit: int = 50) -> list[dict]:
-    """Scrape all posts from a specific Instagram profile."""
+def scrape_profile(handle: str, limit: int = 50, newer_than: str | None = None,
+                   runs: ActorRuns | None = None) -> Iterator[dict]:
+    """
+    Scrape all posts from a specific Instagram profile. Returns a lazy iterator over the dataset.
+
+    newer_than ("YYYY-MM-DD") limits the run to posts after that date.
+    """
     client = get_apify_client()
+    runs = runs or ActorRuns()
     
     # Remove @ if present
     handle = handle.lstrip('@')
@@ -83,6 +116,8 @@ def scrape_profile(handle: str, limit: int = 50) -> list[dict]:
         "resultsType": "posts",
         "resultsLimit": limit,
     }
+    if newer_than:
+        run_input["onlyPostsNewerThan"] = newer_than
 
     print(f"Starting Instagram profile scrape: @{handle} (limit: {limit})")
     
@@ -90,24 +125,28 @@ def scrape_profile(handle: str, limit: int = 50) -> list[dict]:
     print(f"Run input: {json.dumps(run_input, indent=2)}")
     
     try:
-        run = client.actor("apify/instagram-scraper").call(run_input=run_input)
+        run = runs.call("apify/instagram-scraper", run_input)
         
         # Log run details
         print(f"Run ID: {run.get('id')}")
         print(f"Run status: {run.get('status')}")
         
-        items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-        print(f"Scraped {len(items)} posts from @{handle}")
+        items = client.dataset(run["defaultDatasetId"]).iterate_items()
+        # Only the first item is read here; the rest stream to the caller
+        first = next(items, None)
         
-        if not items:
+        if first is None:
             print("⚠️ No posts returned. Possible reasons:")
             print("  - Profile is private")
             print("  - Profile doesn't exist")
             print("  - Apify actor needs authentication/proxies")
             print("  - Rate limiting")
+            return iter(())
         
-        return items
+        return itertools.chain([first], items)
         
+    except RunPending:
+        raise
     except Exception as e:
         print(f"Error scraping @{handle}: {e}")
         print(f"Error type: {type(e).__name__}")
@@ -119,115 +158,16 @@ def scrape_profile(handle: str, limit: int = 50) -> list[dict]:
                 "directUrls": [f"https://www.instagram.com/{handle}/"],
                 "resultsLimit": limit,
             }
-            run = client.actor("apify/instagram-scraper").call(run_input=run_input_minimal)
-            items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-            print(f"✅ Alternative method worked! Scraped {len(items)} posts")
-            return items
+            if newer_than:
+                run_input_minimal["onlyPostsNewerThan"] = newer_than
+            run = runs.call("apify/instagram-scraper", run_input_minimal)
+            print("✅ Alternative method worked!")
+            return client.dataset(run["defaultDatasetId"]).iterate_items()
+        except RunPending:
+            raise
         except Exception as e2:
             print(f"❌ All methods failed: {e2}")
-            return []
-
-
-def compute_virality_score(post: dict) -> float:
-    """Compute a weighted virality score from engagement metrics."""
-    likes = post.get("likes_count", 0) or 0
-    comments = post.get("comments_count", 0) or 0
-    shares = post.get("shares_count", 0) or 0
-    saves = post.get("saves_count", 0) or 0
-    views = post.get("views_count", 0) or 0
-
-    engagement = likes + (comments * 2) + (shares * 3) + (saves * 4)
-    if views > 0:
-        return round(engagement / views, 6)
-    elif likes > 0:
-        return round(engagement / (likes * 10), 6)
-    return 0.0
-
-
-def transform_post(raw_post: dict, scrape_job_id: str) -> dict:
-    """Transform raw Apify Instagram data to our database schema."""
-    content_type_map = {
-        "Image": "post",
-        "Video": "reel",
-        "Sidecar": "carousel",
-        "GraphImage": "post",
-        "GraphVideo": "reel",
-        "GraphSidecar": "carousel",
-    }
-
-    # Handle different field names from different scrapers
-    post_type = raw_post.get("type") or raw_post.get("__typename", "") or raw_post.get("productType", "")
-    caption = raw_post.get("caption") or raw_post.get("text", "") or ""
-    
-    # Extract username from various possible fields
-    username = (
-        raw_post.get("ownerUsername") or 
-        raw_post.get("owner", {}).get("username") if isinstance(raw_post.get("owner"), dict) else None or
-        raw_post.get("username", "")
-    )
-    
-    # Extract URL
-    url = raw_post.get("url", "")
-    if not url and raw_post.get("shortCode"):
-        url = f"https://www.instagram.com/p/{raw_post.get('shortCode')}/"
-    
-    transformed = {
-        "platform_id": 1,  # Instagram
-        "source_url": url,
-        "source_handle": username,
-        "content_text": caption,
-        "content_type": content_type_map.get(post_type, "post"),
-        "media_urls": [raw_post.get("displayUrl", "")] if raw_post.get("displayUrl") else [],
-        "likes_count": raw_post.get("likesCount", 0) or raw_post.get("likes", 0) or 0,
-        "comments_count": raw_post.get("commentsCount", 0) or raw_post.get("comments", 0) or 0,
-        "shares_count": 0,
-        "views_count": raw_post.get("videoViewCount", 0) or raw_post.get("views", 0) or 0,
-        "saves_count": 0,
-        "hashtags": raw_post.get("hashtags", []),
-        "mentions": raw_post.get("mentions", []),
-        "posted_at": raw_post.get("timestamp") or raw_post.get("date") or raw_post.get("takenAtTimestamp"),
-        "scrape_job_id": scrape_job_id,
-        "raw_data": raw_post,
-    }
-
-    transformed["virality_score"] = compute_virality_score(transformed)
-    return transformed
-
-
-def store_posts(posts: list[dict], scrape_job_id: str) -> int:
-    """Transform and store posts in Supabase. Returns count stored."""
-    supabase = get_supabase_client()
-    stored = 0
-
-    for raw_post in posts:
-        caption = raw_post.get("caption") or raw_post.get("text", "")
-        if not caption:
-            continue
-
-        transformed = transform_post(raw_post, scrape_job_id)
-
-        try:
-            supabase.table("scraped_content").insert(transformed).execute()
-            stored += 1
-        except Exception as e:
-            print(f"Error storing post {raw_post.get('url', 'unknown')}: {e}")
-
-    return stored
-
-
-def save_raw_to_tmp(items: list[dict], mode: str) -> str:
-    """Save raw scrape results to .tmp/ for reference."""
-    tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(tmp_dir, f"instagram_{mode}_{timestamp}.json")
-
-    with open(filepath, "w") as f:
-        json.dump(items, f, indent=2, default=str)
-
-    print(f"Raw results saved to {filepath}")
-    return filepath
+            return iter(())
 
 
 def main():
@@ -250,13 +190,9 @@ def main():
             parser.error("--handle required for brand mode")
         items = scrape_profile(args.handle, args.limit)
 
-    if not items:
-        print("No posts scraped. Exiting.")
-        return
-
-    save_raw_to_tmp(items, args.mode)
-    stored = store_posts(items, scrape_job_id)
-    print(f"Done. Stored {stored}/{len(items)} posts in Supabase.")
+    with raw_archive_sink(scrape_job_id) as sink:
+        stored = store_posts(get_adapter("instagram"), items, scrape_job_id, raw_sink=sink)
+    print(f"Done. Stored {stored} new posts in Supabase.")
 
 
 if __name__ == "__main__":
@@ -7,24 +7,31 @@ Usage:
 
 Outputs:
     Stores results in Supabase scraped_content table.
-    Writes raw results to .tmp/tiktok_scrape_{timestamp}.json
+    Archives raw results to the raw-archive bucket under {scrape_job_id}/ (zstd JSONL)
 """
 
 import argparse
-import json
 import os
 import sys
+from collections.abc import Iterator
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from tools.apify_runs import ActorRuns
 from tools.utils.apify_client import get_apify_client
-from tools.utils.supabase_client import get_supabase_client
+from tools.platforms import get_adapter, store_posts
+from tools.utils.raw_archive import raw_archive_sink
 
 
-def scrape_by_hashtags(hashtags: list[str], limit: int = 100) -> list[dict]:
-    """Scrape viral TikTok posts by hashtag."""
+def scrape_by_hashtags(hashtags: list[str], limit: int = 100, runs: ActorRuns | None = None) -> Iterator[dict]:
+    """
+    Scrape viral TikTok posts by hashtag. Returns a lazy iterator over the dataset.
+
+    With runs, the actor run is resumable (see tools/apify_runs.py).
+    """
     client = get_apify_client()
+    runs = runs or ActorRuns()
 
     run_input = {
         "hashtags": hashtags,
@@ -32,105 +39,30 @@ def scrape_by_hashtags(hashtags: list[str], limit: int = 100) -> list[dict]:
     }
 
     print(f"Starting TikTok hashtag scrape: {hashtags} (limit: {limit})")
-    run = client.actor("clockworks/tiktok-hashtag-scraper").call(run_input=run_input)
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    print(f"Scraped {len(items)} TikTok videos")
-    return items
+    run = runs.call("clockworks/tiktok-hashtag-scraper", run_input)
+    return client.dataset(run["defaultDatasetId"]).iterate_items()
+
 
+def scrape_profile(handle: str, limit: int = 50, newer_than: str | None = None,
+                   runs: ActorRuns | None = None) -> Iterator[dict]:
+    """
+    Scrape videos from a specific TikTok profile. Returns a lazy iterator over the dataset.
 
-def scrape_profile(handle: str, limit: int = 50) -> list[dict]:
-    """Scrape videos from a specific TikTok profile."""
+    newer_than ("YYYY-MM-DD") limits the run to videos posted since that date.
+    """
     client = get_apify_client()
+    runs = runs or ActorRuns()
 
     run_input = {
         "profiles": [handle],
         "resultsPerPage": limit,
     }
+    if newer_than:
+        run_input["oldestPostDate"] = newer_than
 
     print(f"Starting TikTok profile scrape: @{handle} (limit: {limit})")
-    run = client.actor("clockworks/tiktok-scraper").call(run_input=run_input)
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    print(f"Scraped {len(items)} videos from @{handle}")
-    return items
-
-
-def compute_virality_score(post: dict) -> float:
-    """Compute a weighted virality score."""
-    likes = post.get("likes_count", 0) or 0
-    comments = post.get("comments_count", 0) or 0
-    shares = post.get("shares_count", 0) or 0
-    saves = post.get("saves_count", 0) or 0
-    views = post.get("views_count", 0) or 0
-
-    engagement = likes + (comments * 2) + (shares * 3) + (saves * 4)
-    if views > 0:
-        return round(engagement / views, 6)
-    elif likes > 0:
-        return round(engagement / (likes * 10), 6)
-    return 0.0
-
-
-def transform_post(raw_post: dict, scrape_job_id: str) -> dict:
-    """Transform raw Apify TikTok data to our schema."""
-    author = raw_post.get("authorMeta", {})
-    hashtag_list = [h.get("name", "") for h in raw_post.get("hashtags", [])]
-
-    transformed = {
-        "platform_id": 2,  # TikTok
-        "source_url": raw_post.get("webVideoUrl", ""),
-        "source_handle": author.get("name", ""),
-        "content_text": raw_post.get("text", ""),
-        "content_type": "video",
-        "media_urls": [raw_post.get("videoUrl", "")] if raw_post.get("videoUrl") else [],
-        "likes_count": raw_post.get("diggCount", 0),
-        "comments_count": raw_post.get("commentCount", 0),
-        "shares_count": raw_post.get("shareCount", 0),
-        "views_count": raw_post.get("playCount", 0),
-        "saves_count": raw_post.get("collectCount", 0),
-        "hashtags": hashtag_list,
-        "mentions": raw_post.get("mentions", []),
-        "posted_at": raw_post.get("createTimeISO"),
-        "scrape_job_id": scrape_job_id,
-        "raw_data": raw_post,
-    }
-
-    transformed["virality_score"] = compute_virality_score(transformed)
-    return transformed
-
-
-def store_posts(posts: list[dict], scrape_job_id: str) -> int:
-    """Transform and store posts in Supabase."""
-    supabase = get_supabase_client()
-    stored = 0
-
-    for raw_post in posts:
-        if not raw_post.get("text"):
-            continue
-
-        transformed = transform_post(raw_post, scrape_job_id)
-
-        try:
-            supabase.table("scraped_content").insert(transformed).execute()
-            stored += 1
-        except Exception as e:
-            print(f"Error storing TikTok video: {e}")
-
-    return stored
-
-
-def save_raw_to_tmp(items: list[dict], mode: str) -> str:
-    """Save raw results to .tmp/."""
-    tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(tmp_dir, f"tiktok_{mode}_{timestamp}.json")
-
-    with open(filepath, "w") as f:
-        json.dump(items, f, indent=2, default=str)
-
-    print(f"Raw results saved to {filepath}")
-    return filepath
+    run = runs.call("clockworks/tiktok-scraper", run_input)
+    return client.dataset(run["defaultDatasetId"]).iterate_items()
 
 
 def main():
@@ -153,9 +85,9 @@ def main():
             parser.error("--handle required for profile mode")
         items = scrape_profile(args.handle, args.limit)
 
-    save_raw_to_tmp(items, args.mode)
-    stored = store_posts(items, scrape_job_id)
-    print(f"Done. Stored {stored}/{len(items)} TikTok videos in Supabase.")
+    with raw_archive_sink(scrape_job_id) as sink:
+        stored = store_posts(get_adapter("tiktok"), items, scrape_job_id, raw_sink=sink)
+    print(f"Done. Stored {stored} new TikTok videos in Supabase.")
 
 
 if __name__ == "__main__":
@@ -8,13 +8,13 @@ Usage:
 
 Outputs:
     Returns extracted text content.
-    Writes raw results to .tmp/website_scrape_{timestamp}.json
+    Archives crawled pages to the raw-archive bucket under website_{timestamp}/ (zstd JSONL)
 """
 
 import argparse
-import json
 import os
 import sys
+from collections.abc import Callable
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 
@@ -23,6 +23,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import httpx
 from bs4 import BeautifulSoup
 
+from tools.utils.raw_archive import raw_archive_sink
+
 
 def extract_text_from_html(html: str, url: str) -> dict:
     """Extract meaningful text content from HTML."""
@@ -74,8 +76,9 @@ def extract_text_from_html(html: str, url: str) -> dict:
     }
 
 
-def crawl_website(base_url: str, max_pages: int = 10) -> list[dict]:
-    """Crawl a website starting from base_url, up to max_pages."""
+def crawl_website(base_url: str, max_pages: int = 10,
+                  raw_sink: Callable[[dict], str | None] | None = None) -> list[dict]:
+    """Crawl a website starting from base_url, up to max_pages. raw_sink, if given, gets each page as it is crawled."""
     visited = set()
     to_visit = [base_url]
     results = []
@@ -108,6 +111,8 @@ def crawl_website(base_url: str, max_pages: int = 10) -> list[dict]:
 
             page_data = extract_text_from_html(response.text, url)
             results.append(page_data)
+            if raw_sink is not None:
+                raw_sink(page_data)
             visited.add(normalized)
 
             # Add internal links to queue
@@ -147,29 +152,14 @@ def combine_text(pages: list[dict]) -> str:
     return "\n\n".join(sections)
 
 
-def save_raw_to_tmp(pages: list[dict]) -> str:
-    """Save crawl results to .tmp/."""
-    tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(tmp_dir, f"website_scrape_{timestamp}.json")
-
-    with open(filepath, "w") as f:
-        json.dump(pages, f, indent=2, default=str)
-
-    print(f"Raw results saved to {filepath}")
-    return filepath
-
-
 def main():
     parser = argparse.ArgumentParser(description="Website scraping tool")
     parser.add_argument("--url", required=True, help="Base URL to crawl")
     parser.add_argument("--max-pages", type=int, default=10, help="Max pages to crawl")
     args = parser.parse_args()
 
-    pages = crawl_website(args.url, args.max_pages)
-    save_raw_to_tmp(pages)
+    with raw_archive_sink(f"website_{datetime.now().strftime('%Y%m%d_%H%M%S')}") as sink:
+        pages = crawl_website(args.url, args.max_pages, raw_sink=sink)
 
     combined = combine_text(pages)
     print(f"\nCrawled {len(pages)} pages. Total text length: {len(combined)} chars")
@@ -7,24 +7,31 @@ Usage:
 
 Outputs:
     Stores results in Supabase scraped_content table.
-    Writes raw results to .tmp/youtube_scrape_{timestamp}.json
+    Archives raw results to the raw-archive bucket under {scrape_job_id}/ (zstd JSONL)
 """
 
 import argparse
-import json
 import os
 import sys
+from collections.abc import Iterator
 from datetime import datetime
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from tools.apify_runs import ActorRuns
 from tools.utils.apify_client import get_apify_client
-from tools.utils.supabase_client import get_supabase_client
+from tools.platforms import get_adapter, store_posts
+from tools.utils.raw_archive import raw_archive_sink
 
 
-def scrape_by_search(search_terms: list[str], limit: int = 50) -> list[dict]:
-    """Search YouTube for videos matching terms."""
+def scrape_by_search(search_terms: list[str], limit: int = 50, runs: ActorRuns | None = None) -> Iterator[dict]:
+    """
+    Search YouTube for videos matching terms. Returns a lazy iterator over the dataset.
+
+    With runs, the actor run is resumable (see tools/apify_runs.py).
+    """
     client = get_apify_client()
+    runs = runs or ActorRuns()
 
     run_input = {
         "searchKeywords": search_terms,
@@ -32,15 +39,14 @@ def scrape_by_search(search_terms: list[str], limit: int = 50) -> list[dict]:
     }
 
     print(f"Starting YouTube search scrape: {search_terms} (limit: {limit})")
-    run = client.actor("streamers/youtube-scraper").call(run_input=run_input)
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    print(f"Scraped {len(items)} YouTube videos")
-    return items
+    run = runs.call("streamers/youtube-scraper", run_input)
+    return client.dataset(run["defaultDatasetId"]).iterate_items()
 
 
-def scrape_channel(handle: str, limit: int = 30) -> list[dict]:
-    """Scrape videos from a specific YouTube channel."""
+def scrape_channel(handle: str, limit: int = 30, runs: ActorRuns | None = None) -> Iterator[dict]:
+    """Scrape videos from a specific YouTube channel. Returns a lazy iterator over the dataset."""
     client = get_apify_client()
+    runs = runs or ActorRuns()
 
     run_input = {
         "startUrls": [{"url": f"https://www.youtube.com/@{handle}"}],
@@ -48,89 +54,8 @@ def scrape_channel(handle: str, limit: int = 30) -> list[dict]:
     }
 
     print(f"Starting YouTube channel scrape: @{handle} (limit: {limit})")
-    run = client.actor("streamers/youtube-channel-scraper").call(run_input=run_input)
-    items = list(client.dataset(run["defaultDatasetId"]).iterate_items())
-    print(f"Scraped {len(items)} videos from @{handle}")
-    return items
-
-
-def compute_virality_score(post: dict) -> float:
-    """Compute virality score for YouTube content."""
-    likes = post.get("likes_count", 0) or 0
-    comments = post.get("comments_count", 0) or 0
-    views = post.get("views_count", 0) or 0
-
-    engagement = likes + (comments * 2)
-    if views > 0:
-        return round(engagement / views, 6)
-    elif likes > 0:
-        return round(engagement / (likes * 10), 6)
-    return 0.0
-
-
-def transform_post(raw_post: dict, scrape_job_id: str) -> dict:
-    """Transform raw Apify YouTube data to our schema."""
-    description = raw_post.get("description", "") or ""
-    title = raw_post.get("title", "") or ""
-    content_text = f"{title}\n\n{description}".strip()
-
-    transformed = {
-        "platform_id": 3,  # YouTube
-        "source_url": raw_post.get("url", ""),
-        "source_handle": raw_post.get("channelName", ""),
-        "content_text": content_text,
-        "content_type": "video",
-        "media_urls": [raw_post.get("thumbnailUrl", "")] if raw_post.get("thumbnailUrl") else [],
-        "likes_count": raw_post.get("likes", 0),
-        "comments_count": raw_post.get("commentsCount", 0),
-        "shares_count": 0,
-        "views_count": raw_post.get("viewCount", 0),
-        "saves_count": 0,
-        "hashtags": raw_post.get("hashtags", []),
-        "mentions": [],
-        "posted_at": raw_post.get("date"),
-        "scrape_job_id": scrape_job_id,
-        "raw_data": raw_post,
-    }
-
-    transformed["virality_score"] = compute_virality_score(transformed)
-    return transformed
-
-
-def store_posts(posts: list[dict], scrape_job_id: str) -> int:
-    """Transform and store posts in Supabase."""
-    supabase = get_supabase_client()
-    stored = 0
-
-    for raw_post in posts:
-        content = raw_post.get("title", "") or raw_post.get("description", "")
-        if not content:
-            continue
-
-        transformed = transform_post(raw_post, scrape_job_id)
-
-        try:
-            supabase.table("scraped_content").insert(transformed).execute()
-            stored += 1
-        except Exception as e:
-            print(f"Error storing YouTube video: {e}")
-
-    return stored
-
-
-def save_raw_to_tmp(items: list[dict], mode: str) -> str:
-    """Save raw results to .tmp/."""
-    tmp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filepath = os.path.join(tmp_dir, f"youtube_{mode}_{timestamp}.json")
-
-    with open(filepath, "w") as f:
-        json.dump(items, f, indent=2, default=str)
-
-    print(f"Raw results saved to {filepath}")
-    return filepath
+    run = runs.call("streamers/youtube-channel-scraper", run_input)
+    return client.dataset(run["defaultDatasetId"]).iterate_items()
 
 
 def main():
@@ -153,9 +78,9 @@ def main():
             parser.error("--handle required for channel mode")
         items = scrape_channel(args.handle, args.limit)
 
-    save_raw_to_tmp(items, args.mode)
-    stored = store_posts(items, scrape_job_id)
-    print(f"Done. Stored {stored}/{len(items)} YouTube videos in Supabase.")
+    with raw_archive_sink(scrape_job_id) as sink:
+        stored = store_posts(get_adapter("youtube"), items, scrape_job_id, raw_sink=sink)
+    print(f"Done. Stored {stored} new YouTube videos in Supabase.")
 
 
 if __name__ == "__main__":
@@ -15,10 +15,21 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.generate_embeddings import generate_embedding
-from tools.utils.supabase_client import get_supabase_client
-
-PLATFORM_MAP = {"instagram": 1, "tiktok": 2, "youtube": 3}
+from tools.generate_embeddings import (
+    agenerate_embedding,
+    aget_active_model,
+    generate_embedding,
+    get_active_model,
+)
+from tools.platforms import PLATFORM_MAP
+from tools.utils.supabase_client import get_async_supabase_client, get_supabase_client
+from tools.vector_index import get_local_index, index_enabled
+
+# HNSW candidate list size for match_content; higher = better recall, slower
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "100"))
+# "full" searches the VECTOR(1024) index; "half" (256-dim halfvec) and
+# "binary" (bit-quantized) search a compact index and re-rank exactly
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "full")
 
 
 def search_similar_content(
@@ -26,34 +37,115 @@ def search_similar_content(
     match_count: int = 10,
     match_threshold: float = 0.5,
     platform_filter: int | None = None,
+    query_embedding: list[float] | None = None,
+    include_embedding: bool = False,
+    mode: str | None = None,
+    query_model: str | None = None,
 ) -> list[dict]:
     """
     Search for similar content using vector similarity.
 
     Uses input_type="query" for asymmetric search (query vs documents).
+    Pass query_embedding to reuse an embedding the caller already has, and
+    include_embedding to get each match's stored embedding (for re-ranking).
+    Served from the local vector index when LOCAL_VECTOR_INDEX is on and
+    the index is fresh, otherwise from the match_content RPC
+    (match_content_quantized when mode, default VECTOR_SEARCH_MODE, is
+    "half" or "binary"). An explicit mode always queries the database.
+    query_model is the model query_embedding came from (default: the active
+    model); only vectors from that model are searched.
     """
-    query_embedding = generate_embedding(query, input_type="query")
+    query_model = query_model or get_active_model()
+    if query_embedding is None:
+        query_embedding = generate_embedding(query, input_type="query", model=query_model)
+
+    local = _search_local_index(
+        query_embedding, query_model, match_count, platform_filter, match_threshold, include_embedding, mode
+    )
+    if local is not None:
+        return local
 
+    function, params = _match_content_call(
+        query_embedding, query_model, match_count, match_threshold, platform_filter, include_embedding, mode
+    )
     supabase = get_supabase_client()
-    response = supabase.rpc(
-        "match_content",
-        {
-            "query_embedding": query_embedding,
-            "match_threshold": match_threshold,
-            "match_count": match_count,
-            "filter_platform_id": platform_filter,
-        },
-    ).execute()
+    response = supabase.rpc(function, params).execute()
+
+    return response.data
+
+
+async def asearch_similar_content(
+    query: str,
+    match_count: int = 10,
+    match_threshold: float = 0.5,
+    platform_filter: int | None = None,
+    query_embedding: list[float] | None = None,
+    include_embedding: bool = False,
+    mode: str | None = None,
+    query_model: str | None = None,
+) -> list[dict]:
+    """Async search_similar_content() for FastAPI handlers (async Voyage and Supabase clients)."""
+    query_model = query_model or await aget_active_model()
+    if query_embedding is None:
+        query_embedding = await agenerate_embedding(query, input_type="query", model=query_model)
+
+    # The local index is an in-process NumPy scan (about a millisecond), fine to run inline
+    local = _search_local_index(
+        query_embedding, query_model, match_count, platform_filter, match_threshold, include_embedding, mode
+    )
+    if local is not None:
+        return local
+
+    function, params = _match_content_call(
+        query_embedding, query_model, match_count, match_threshold, platform_filter, include_embedding, mode
+    )
+    supabase = await get_async_supabase_client()
+    response = await supabase.rpc(function, params).execute()
 
     return response.data
 
 
+def _search_local_index(
+    query_embedding, query_model, match_count, platform_filter, match_threshold, include_embedding, mode
+) -> list[dict] | None:
+    """Results from the local vector index, or None when it can't serve this query."""
+    if mode is None and index_enabled():
+        index = get_local_index()
+        if index is not None and index.is_fresh() and index.model == query_model:
+            return index.search(
+                query_embedding, match_count, platform_filter, match_threshold, include_embedding
+            )
+    return None
+
+
+def _match_content_call(
+    query_embedding, query_model, match_count, match_threshold, platform_filter, include_embedding, mode
+) -> tuple[str, dict]:
+    """RPC name and parameters for a database search."""
+    params = {
+        "query_embedding": query_embedding,
+        "match_threshold": match_threshold,
+        "match_count": match_count,
+        "filter_platform_id": platform_filter,
+        "ef_search": HNSW_EF_SEARCH,
+        "include_embedding": include_embedding,
+        "query_model": query_model,
+    }
+    mode = mode or VECTOR_SEARCH_MODE
+    function = "match_content"
+    if mode != "full":
+        function = "match_content_quantized"
+        params["quantization"] = mode
+    return function, params
+
+
 def main():
     parser = argparse.ArgumentParser(description="Vector similarity search")
     parser.add_argument("--query", required=True, help="Search query text")
     parser.add_argument("--limit", type=int, default=10)
     parser.add_argument("--threshold", type=float, default=0.5)
-    parser.add_argument("--platform", choices=["instagram", "tiktok", "youtube"])
+    parser.add_argument("--platform", choices=list(PLATFORM_MAP))
+    parser.add_argument("--mode", choices=["full", "half", "binary"], help="Override VECTOR_SEARCH_MODE")
     args = parser.parse_args()
 
     platform_id = PLATFORM_MAP.get(args.platform) if args.platform else None
@@ -63,6 +155,7 @@ def main():
         match_count=args.limit,
         match_threshold=args.threshold,
         platform_filter=platform_id,
+        mode=args.mode,
     )
 
     print(f"\nFound {len(results)} similar content items:\n")
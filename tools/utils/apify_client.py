@@ -8,8 +8,8 @@ load_dotenv()
 
 
 def get_apify_client() -> ApifyClient:
-    """Return a configured Apify client."""
+    """Return a configured Apify client (APIFY_API_URL points it at e.g. tools/apify_stub_server.py)."""
     token = os.getenv("APIFY_API_TOKEN")
     if not token:
         raise ValueError("APIFY_API_TOKEN must be set in .env")
-    return ApifyClient(token)
+    return ApifyClient(token, api_url=os.getenv("APIFY_API_URL") or None)
@@ -0,0 +1,87 @@
+"""
+Five-field cron expressions (minute hour day-of-month month day-of-week), in UTC.
+
+Fields take *, numbers, ranges (1-5), lists (1,15) and steps (*/15, 8-18/2).
+Day of week is 0-6 from Sunday (7 is Sunday too). As in cron, when both day
+fields are restricted a day matching either one fires. Also accepted:
+@hourly, @daily, @weekly, @monthly.
+"""
+
+from datetime import datetime, timedelta
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+# (low, high) for minute, hour, day of month, month, day of week
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+# Give up looking for a match this far ahead (e.g. "0 0 30 2 *" never fires)
+MAX_LOOKAHEAD = timedelta(days=366 * 5)
+
+
+def _parse_field(text: str, low: int, high: int) -> set[int]:
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Bad step in {text!r}")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not (low <= start <= end <= high):
+            raise ValueError(f"{text!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A parsed cron expression; next_after() gives the next firing time."""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        try:
+            parsed = [_parse_field(f, low, high) for f, (low, high) in zip(fields, FIELD_RANGES)]
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {e}") from None
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        weekday = (dt.weekday() + 1) % 7  # Python: Monday 0; cron: Sunday 0
+        if self.any_day or self.any_weekday:
+            return dt.day in self.days and weekday in self.weekdays
+        return dt.day in self.days or weekday in self.weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after` (keeps its tzinfo)."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = after + MAX_LOOKAHEAD
+        while dt <= limit:
+            if dt.month not in self.months:
+                # First day of the next month
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
@@ -0,0 +1,220 @@
+"""
+Live job progress: counters in scrape_jobs.progress, pushed to the events endpoint (migrations 016, 022).
+
+Producers (the job worker, scrape targets, the ingest pipeline) call
+publish(job_id, type, counts=..., **data) from any thread. counts are added
+to the job's progress snapshot, which is written to scrape_jobs.progress at
+most every PROGRESS_FLUSH_SECONDS and on every status change. Target
+progress goes to targets_progress (scraping_service._set_progress).
+
+Jobs run in a worker process, not in the API process serving the client,
+so the job row carries the progress across processes. stream(), which
+backs GET /scraping/jobs/{id}/events, subscribes to UPDATEs of the row over
+Supabase Realtime (postgres_changes, migration 022) and re-reads it only
+when one arrives, yielding it as a snapshot when it changed. If Realtime is
+unavailable (no subscription within REALTIME_SUBSCRIBE_SECONDS, or the
+channel errors later), it falls back to re-reading the row every
+DB_POLL_SECONDS. The stream ends once the job is completed or failed, or
+after STREAM_MAX_SECONDS (below Vercel's 60 s function limit); EventSource
+reconnects and gets a fresh snapshot. There are no event ids to replay:
+every snapshot is the whole state.
+
+Event types (publish):
+    status    job status changed (running, waiting, retrying, completed, failed); flushes progress
+    target    a target's progress, as in targets_progress
+    batch     one ingest batch; counts: fetched, inserted, refreshed, duplicates, failed, known
+    embedded  embeddings written for the job's new rows; counts: embedded
+    error     a target failed; counts: errors
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from tools.utils.supabase_client import get_async_supabase_client, get_supabase_client
+
+FINISHED_STATUSES = {"completed", "failed"}
+
+MAX_TRACKED_JOBS = 256
+PROGRESS_FLUSH_SECONDS = 2.0
+DB_POLL_SECONDS = 3.0
+STREAM_MAX_SECONDS = 50.0
+REALTIME_SUBSCRIBE_SECONDS = 5.0
+# Keep-alive interval while waiting on Realtime
+KEEPALIVE_SECONDS = 15.0
+SNAPSHOT_COLUMNS = "id, status, progress, targets_progress, results_count, error_message, attempts, run_after"
+
+
+class _Counters:
+    """Progress counters one process has published for a job."""
+
+    def __init__(self):
+        self.progress = {}
+        self.last_flush = 0.0
+        self.touched = time.monotonic()
+
+
+_jobs: dict[str, _Counters] = {}
+_lock = threading.Lock()
+
+
+def _counters(job_id: str) -> _Counters:
+    """Get or create a job's counters. Call with _lock held."""
+    counters = _jobs.get(job_id)
+    if counters is None:
+        if len(_jobs) >= MAX_TRACKED_JOBS:
+            idle = sorted((c.touched, key) for key, c in _jobs.items())
+            for _, key in idle[: len(_jobs) - MAX_TRACKED_JOBS + 1]:
+                del _jobs[key]
+        counters = _jobs[job_id] = _Counters()
+    counters.touched = time.monotonic()
+    return counters
+
+
+def _flush(job_id: str, snapshot: dict):
+    try:
+        get_supabase_client().table("scrape_jobs").update({"progress": snapshot}).eq("id", job_id).execute()
+    except Exception as e:
+        print(f"Progress flush for job {job_id} failed: {e}")
+
+
+def seed_progress(job_id: str, progress: dict | None):
+    """Continue counting from a stored snapshot (a job resumed or retried in this process)."""
+    with _lock:
+        counters = _counters(job_id)
+        for key, value in (progress or {}).items():
+            if isinstance(value, int) and key not in counters.progress:
+                counters.progress[key] = value
+
+
+def publish(job_id: str, event_type: str, counts: dict | None = None, **data) -> dict:
+    """Record an event for a job; counts are added to its progress snapshot. Returns the event."""
+    now = time.monotonic()
+    snapshot = None
+    event = {
+        "type": event_type,
+        "job_id": job_id,
+        "at": datetime.now(timezone.utc).isoformat(),
+        **data,
+    }
+    with _lock:
+        counters = _counters(job_id)
+        if counts:
+            event["counts"] = counts
+            for key, value in counts.items():
+                if value:
+                    counters.progress[key] = counters.progress.get(key, 0) + value
+        if counters.progress and (event_type == "status" or now - counters.last_flush >= PROGRESS_FLUSH_SECONDS):
+            counters.last_flush = now
+            snapshot = {**counters.progress, "updated_at": event["at"]}
+        if event_type == "status" and data.get("status") in FINISHED_STATUSES:
+            _jobs.pop(job_id, None)
+
+    if snapshot is not None:
+        _flush(job_id, snapshot)
+    return event
+
+
+async def _read_job(job_id: str) -> dict | None:
+    supabase = await get_async_supabase_client()
+    response = await supabase.table("scrape_jobs").select(SNAPSHOT_COLUMNS).eq("id", job_id).execute()
+    return response.data[0] if response.data else None
+
+
+class _RowChanges:
+    """Supabase Realtime subscription to UPDATEs of one scrape_jobs row."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.changed = asyncio.Event()
+        self.failed = False
+        self.channel = None
+        self._subscribed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def _notify(self, payload=None):
+        self._loop.call_soon_threadsafe(self.changed.set)
+
+    def _on_status(self, status, error=None):
+        status = getattr(status, "value", status)
+        if status == "SUBSCRIBED":
+            self._loop.call_soon_threadsafe(self._subscribed.set)
+        elif status in ("CHANNEL_ERROR", "TIMED_OUT", "CLOSED"):
+            print(f"Realtime channel for job {self.job_id} {status}: {error}; polling instead")
+            self.failed = True
+            self._notify()
+
+    async def subscribe(self) -> bool:
+        """Subscribe; False if Realtime is unavailable, so the caller polls."""
+        try:
+            supabase = await get_async_supabase_client()
+            self.channel = supabase.channel(f"scrape-job-{self.job_id}")
+            self.channel.on_postgres_changes(
+                "UPDATE", schema="public", table="scrape_jobs", filter=f"id=eq.{self.job_id}", callback=self._notify
+            )
+            await self.channel.subscribe(self._on_status)
+            await asyncio.wait_for(self._subscribed.wait(), REALTIME_SUBSCRIBE_SECONDS)
+            return not self.failed
+        except Exception as e:
+            print(f"Realtime unavailable for job {self.job_id}, polling instead: {type(e).__name__}: {e}")
+            self.failed = True
+            return False
+
+    async def close(self):
+        if self.channel is None:
+            return
+        try:
+            supabase = await get_async_supabase_client()
+            await supabase.remove_channel(self.channel)
+        except Exception as e:
+            print(f"Realtime unsubscribe for job {self.job_id} failed: {e}")
+
+
+async def stream(job_id: str, max_seconds: float = STREAM_MAX_SECONDS) -> AsyncIterator[dict | None]:
+    """
+    Yield snapshots of a job's row: the current one, then each change, until
+    it finishes or max_seconds have passed.
+
+    Changes arrive over Realtime, or by polling when it is unavailable.
+    Yields None when nothing changed for a while, so callers can send
+    keep-alives.
+    """
+    started = time.monotonic()
+    # Subscribe before the first read, so no change between the two is missed
+    changes = _RowChanges(job_id)
+    await changes.subscribe()
+    try:
+        row = await _read_job(job_id)
+        if row is None:
+            yield {"type": "error", "job_id": job_id, "message": "Job not found"}
+            return
+        yield {"type": "snapshot", **row}
+
+        while row["status"] not in FINISHED_STATUSES:
+            remaining = max_seconds - (time.monotonic() - started)
+            if changes.failed:
+                if remaining <= DB_POLL_SECONDS:
+                    return
+                await asyncio.sleep(DB_POLL_SECONDS)
+            else:
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(changes.changed.wait(), min(KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                changes.changed.clear()
+
+            latest = await _read_job(job_id)
+            if latest is None:
+                return
+            if latest == row:
+                yield None
+                continue
+            row = latest
+            yield {"type": "snapshot", **row}
+    finally:
+        await changes.close()
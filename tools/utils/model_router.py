@@ -0,0 +1,107 @@
+"""
+Model routing for Claude calls.
+
+Every Claude call names a task. The task policy below picks the model tier
+(fast or standard) and token budget, optionally overridden per content type
+and platform, so short or latency-sensitive work runs on the small model.
+Each call is recorded in model_usage so latency and cost can be compared
+by tier.
+
+Tier models can be swapped with CLAUDE_FAST_MODEL / CLAUDE_STANDARD_MODEL.
+"""
+
+import os
+import time
+
+from dotenv import load_dotenv
+
+from tools.utils.claude_client import get_claude_client
+from tools.utils.supabase_client import get_supabase_client
+
+load_dotenv()
+
+MODEL_TIERS = {
+    "fast": os.getenv("CLAUDE_FAST_MODEL", "claude-3-5-haiku-20241022"),
+    "standard": os.getenv("CLAUDE_STANDARD_MODEL", "claude-sonnet-4-20250514"),
+}
+
+# Keys are "task", "task:content_type" or "task:content_type:platform".
+# The most specific matching key wins.
+TASK_POLICIES = {
+    "chat": {"tier": "standard", "max_tokens": 4096},
+    "chat:caption:tiktok": {"tier": "fast", "max_tokens": 1024},
+    "copy": {"tier": "standard", "max_tokens": 4096},
+    "copy:caption:tiktok": {"tier": "fast", "max_tokens": 1024},
+    "brand_voice": {"tier": "standard", "max_tokens": 4096},
+    "report": {"tier": "standard", "max_tokens": 8192},
+    "report_summary": {"tier": "fast", "max_tokens": 300},
+    "session_title": {"tier": "fast", "max_tokens": 30},
+    "feedback_classification": {"tier": "fast", "max_tokens": 10},
+}
+
+
+def route_model(task: str, content_type: str | None = None, platform: str | None = None) -> dict:
+    """
+    Resolve the model for a task.
+
+    Returns dict with task, tier, model and max_tokens.
+    """
+    candidates = [f"{task}:{content_type}:{platform}", f"{task}:{content_type}", task]
+    policy = next((TASK_POLICIES[key] for key in candidates if key in TASK_POLICIES), None)
+    if policy is None:
+        raise ValueError(f"No model policy for task: {task}")
+
+    return {
+        "task": task,
+        "tier": policy["tier"],
+        "model": MODEL_TIERS[policy["tier"]],
+        "max_tokens": policy["max_tokens"],
+    }
+
+
+def record_model_usage(
+    route: dict,
+    latency_ms: int,
+    usage=None,
+    first_token_ms: int | None = None,
+    session_id: str | None = None,
+):
+    """Record which model served a call and how long it took (best-effort)."""
+    try:
+        supabase = get_supabase_client()
+        supabase.table("model_usage").insert({
+            "task": route["task"],
+            "tier": route["tier"],
+            "model": route["model"],
+            "latency_ms": latency_ms,
+            "first_token_ms": first_token_ms,
+            "input_tokens": getattr(usage, "input_tokens", None),
+            "output_tokens": getattr(usage, "output_tokens", None),
+            "session_id": session_id,
+        }).execute()
+    except Exception as e:
+        print(f"Failed to record model usage: {e}")
+
+
+def create_message(
+    task: str,
+    messages: list[dict],
+    content_type: str | None = None,
+    platform: str | None = None,
+    **kwargs,
+):
+    """Run a routed, non-streaming Claude call and record its usage."""
+    route = route_model(task, content_type, platform)
+    client = get_claude_client()
+
+    started = time.monotonic()
+    response = client.messages.create(
+        model=route["model"],
+        max_tokens=kwargs.pop("max_tokens", route["max_tokens"]),
+        messages=messages,
+        **kwargs,
+    )
+    latency_ms = int((time.monotonic() - started) * 1000)
+
+    record_model_usage(route, latency_ms, usage=response.usage)
+    return response
@@ -0,0 +1,59 @@
+"""Thread-safe rate limiter for API calls with request and token budgets."""
+
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter over requests per minute and (optionally) tokens per minute.
+
+    acquire() blocks until the call fits both budgets; acquire_async()
+    awaits instead, so sync and async callers can share one limiter.
+    Buckets start full, so short bursts go through immediately.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float | None = None):
+        self.request_rate = requests_per_minute / 60.0
+        self.token_rate = tokens_per_minute / 60.0 if tokens_per_minute else None
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute) if tokens_per_minute else None
+        self.request_level = self.request_capacity
+        self.token_level = self.token_capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.request_level = min(self.request_capacity, self.request_level + elapsed * self.request_rate)
+        if self.token_rate is not None:
+            self.token_level = min(self.token_capacity, self.token_level + elapsed * self.token_rate)
+
+    def _try_take(self, tokens: int) -> float:
+        """Take one request of `tokens` tokens if allowed; otherwise return how long to wait."""
+        if self.token_capacity is not None:
+            tokens = min(tokens, self.token_capacity)
+        with self.lock:
+            self._refill(time.monotonic())
+            wait = 0.0
+            if self.request_level < 1:
+                wait = (1 - self.request_level) / self.request_rate
+            if self.token_rate is not None and self.token_level < tokens:
+                wait = max(wait, (tokens - self.token_level) / self.token_rate)
+            if wait == 0.0:
+                self.request_level -= 1
+                if self.token_rate is not None:
+                    self.token_level -= tokens
+            return wait
+
+    def acquire(self, tokens: int = 0):
+        """Wait until one request of `tokens` tokens is allowed, then take it."""
+        while (wait := self._try_take(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """acquire() for coroutines: sleeps without blocking the event loop."""
+        while (wait := self._try_take(tokens)) > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,152 @@
+"""
+Append-only, zstd-compressed archive of raw Apify items (migrations 018, 019).
+
+Scrapes stream every raw dataset item into JSONL segments in the
+RAW_ARCHIVE_BUCKET Supabase Storage bucket, under {key}/, where key is the
+scrape job id (or the CLI's ig_viral_{timestamp}-style id). Rows whose
+segment was uploaded keep only a pointer instead of raw_data:
+
+    raw_ref = "{key}/{segment}.jsonl.zst:{line}"
+
+A segment is built in memory and uploaded when the writer is flushed
+(before every ingest batch is stored) or reaches RAW_ARCHIVE_SEGMENT_ITEMS
+items. Segment names are unique and uploaded without overwrite, so the
+archive is append-only across processes. Only segments whose upload
+succeeded are durable; rows pointing anywhere else keep their raw_data.
+Each segment is a single zstd frame, so `zstd -dc` reads a downloaded one.
+"""
+
+import io
+import json
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import zstandard
+
+from tools.utils.supabase_client import get_supabase_client
+
+# Storage bucket (019_raw_archive_storage.sql); empty disables the archive
+RAW_ARCHIVE_BUCKET = os.getenv("RAW_ARCHIVE_BUCKET", "raw-archive")
+RAW_ARCHIVE_SEGMENT_ITEMS = 5000
+ZSTD_LEVEL = 6
+SEGMENT_SUFFIX = ".jsonl.zst"
+
+
+def _safe_key(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(key)) or "unkeyed"
+
+
+def _upload(path: str, data: bytes):
+    get_supabase_client().storage.from_(RAW_ARCHIVE_BUCKET).upload(
+        path, data, {"content-type": "application/zstd", "upsert": "false"}
+    )
+
+
+@lru_cache(maxsize=8)
+def _download(path: str) -> bytes:
+    return get_supabase_client().storage.from_(RAW_ARCHIVE_BUCKET).download(path)
+
+
+class RawArchiveWriter:
+    """
+    Streams raw items into segments under one key. Not thread-safe: one writer per target.
+
+    Call it (or write()) with an item to get its raw_ref; is_durable(raw_ref)
+    says whether that item's segment has been uploaded.
+    """
+
+    def __init__(self, key: str, segment_items: int = RAW_ARCHIVE_SEGMENT_ITEMS):
+        self.key = _safe_key(key)
+        self.segment_items = segment_items
+        self.items = 0
+        self.uploaded = set()
+        self.failed = 0
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        self._buffer = None
+        self._stream = None
+        self._segment = None
+        self._line = 0
+
+    def _open_segment(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._segment = f"{stamp}-{uuid.uuid4().hex[:12]}{SEGMENT_SUFFIX}"
+        self._buffer = io.BytesIO()
+        self._stream = self._compressor.stream_writer(self._buffer, closefd=False)
+        self._line = 0
+
+    def flush(self):
+        """Upload the open segment. A failed upload leaves its items non-durable."""
+        if self._stream is None:
+            return
+        self._stream.close()
+        path = f"{self.key}/{self._segment}"
+        try:
+            _upload(path, self._buffer.getvalue())
+            self.uploaded.add(self._segment)
+        except Exception as e:
+            self.failed += self._line
+            print(f"Raw archive upload of {path} failed, its rows keep raw_data: {e}")
+        self._stream = self._buffer = None
+
+    def write(self, item: dict) -> str:
+        """Append one item. Returns its raw_ref (durable once flushed)."""
+        if self._stream is None or self._line >= self.segment_items:
+            self.flush()
+            self._open_segment()
+        self._stream.write(json.dumps(item, default=str, separators=(",", ":")).encode() + b"\n")
+        ref = f"{self.key}/{self._segment}:{self._line}"
+        self._line += 1
+        self.items += 1
+        return ref
+
+    __call__ = write
+
+    def is_durable(self, raw_ref: str) -> bool:
+        segment = raw_ref.rpartition(":")[0].rpartition("/")[2]
+        return segment in self.uploaded
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def raw_archive_sink(key: str):
+    """
+    Raw sink for ingest(): a RawArchiveWriter for the key, flushed on exit.
+
+    Yields None (no archive; rows keep raw_data) when RAW_ARCHIVE_BUCKET is empty.
+    """
+    if not RAW_ARCHIVE_BUCKET:
+        yield None
+        return
+
+    with RawArchiveWriter(key) as writer:
+        yield writer
+    if writer.items:
+        print(
+            f"Archived {writer.items - writer.failed} raw items to {RAW_ARCHIVE_BUCKET}/{writer.key} "
+            f"({len(writer.uploaded)} segments, {writer.failed} kept in raw_data)"
+        )
+
+
+def read_raw(raw_ref: str) -> dict | None:
+    """The raw item a raw_ref points to, or None if its segment or line is missing."""
+    path, _, line = raw_ref.rpartition(":")
+    try:
+        target = int(line)
+        data = _download(path)
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True) as reader:
+            lines = reader.read().split(b"\n")
+        return json.loads(lines[target]) if 0 <= target < len(lines) and lines[target] else None
+    except Exception:
+        return None
@@ -1,21 +1,44 @@
 """Shared Supabase client configuration."""
 
+import asyncio
 import os
-from supabase import create_client, Client
+from supabase import acreate_client, create_client, AsyncClient, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
 _client: Client | None = None
+_async_client: AsyncClient | None = None
+_async_lock: asyncio.Lock | None = None
+
+
+def _credentials() -> tuple[str, str]:
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env")
+    return url, key
 
 
 def get_supabase_client() -> Client:
     """Return a configured Supabase client (singleton)."""
     global _client
     if _client is None:
-        url = os.getenv("SUPABASE_URL")
-        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        if not url or not key:
-            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in .env")
-        _client = create_client(url, key)
+        _client = create_client(*_credentials())
     return _client
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Return the async Supabase client (singleton) for use inside async handlers.
+
+    Its HTTP connection pool is shared by every request on the event loop.
+    """
+    global _async_client, _async_lock
+    if _async_client is None:
+        if _async_lock is None:
+            _async_lock = asyncio.Lock()
+        async with _async_lock:
+            if _async_client is None:
+                _async_client = await acreate_client(*_credentials())
+    return _async_client
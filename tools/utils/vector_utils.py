@@ -0,0 +1,27 @@
+"""Shared helpers for handling embedding vectors."""
+
+import json
+
+import numpy as np
+
+
+def parse_vector(value) -> list[float] | None:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    if isinstance(value, np.ndarray):
+        return value
+    return list(value)
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Stack vectors into a row-normalized float32 matrix."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.size == 0:
+        return np.empty((0, 0), dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
@@ -3,22 +3,59 @@
 import os
 import voyageai
 from dotenv import load_dotenv
+from voyageai import error as voyage_error
 
 load_dotenv()
 
+# Initial model. The live model is recorded in embedding_config (migration
+# 010) and changed with tools/reembed.py, never by editing this constant.
 VOYAGE_MODEL = "voyage-3.5"
+# voyage-3.5 supports 256, 512, 1024 (default) or 2048 output dimensions.
+# Fixed by the VECTOR(1024) columns and indexes in the database, so it is
+# not configurable: a different size needs a migration first.
 EMBEDDING_DIMENSIONS = 1024
-BATCH_SIZE = 128
+
+# Per-request limits for voyage-3.5: 1000 texts, 320K tokens. Token counts
+# are estimated, so batches are packed well under the hard limit.
+MAX_BATCH_TEXTS = 1000
+MAX_BATCH_TOKENS = int(os.getenv("VOYAGE_MAX_BATCH_TOKENS", "100000"))
+# Concurrent embedding requests and account rate limits
+EMBED_CONCURRENCY = int(os.getenv("VOYAGE_CONCURRENCY", "4"))
+VOYAGE_RPM = int(os.getenv("VOYAGE_RPM", "300"))
+VOYAGE_TPM = int(os.getenv("VOYAGE_TPM", "1000000"))
+# Attempts per request. The SDK retries rate limits (429), 503s and timeouts
+# with exponential backoff and jitter; other errors are raised at once.
+VOYAGE_MAX_RETRIES = int(os.getenv("VOYAGE_MAX_RETRIES", "5"))
+# Errors a smaller request can fix (too many tokens, one bad text). Only
+# these split a batch; anything else fails the whole batch.
+SPLIT_ERRORS = (voyage_error.InvalidRequestError, voyage_error.MalformedRequestError)
 
 _client: voyageai.Client | None = None
+_async_client: voyageai.AsyncClient | None = None
+
+
+def _api_key() -> str:
+    api_key = os.getenv("VOYAGE_API_KEY")
+    if not api_key:
+        raise ValueError("VOYAGE_API_KEY must be set in .env")
+    return api_key
 
 
 def get_voyage_client() -> voyageai.Client:
     """Return a configured Voyage AI client (singleton)."""
     global _client
     if _client is None:
-        api_key = os.getenv("VOYAGE_API_KEY")
-        if not api_key:
-            raise ValueError("VOYAGE_API_KEY must be set in .env")
-        _client = voyageai.Client(api_key=api_key)
+        _client = voyageai.Client(api_key=_api_key(), max_retries=VOYAGE_MAX_RETRIES)
     return _client
+
+
+def get_async_voyage_client() -> voyageai.AsyncClient:
+    """
+    Return the async Voyage AI client (singleton) for use inside async handlers.
+
+    One instance shares its HTTP connection pool across all concurrent requests.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = voyageai.AsyncClient(api_key=_api_key(), max_retries=VOYAGE_MAX_RETRIES)
+    return _async_client
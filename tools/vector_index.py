@@ -0,0 +1,431 @@
+"""
+Local memory-mapped vector index mirroring scraped_content embeddings.
+
+Usage:
+    python tools/vector_index.py --sync
+    python tools/vector_index.py --sync --full
+    python tools/vector_index.py --stats
+    python tools/vector_index.py --query "salon marketing tips" --platform instagram --limit 5
+
+The viral corpus is small enough to search in-process. --sync pulls rows
+changed since the last sync (keyset pages on (updated_at, id), re-reading
+the last SYNC_OVERLAP_SECONDS so rows committed late are not missed) and
+publishes a new index generation into LOCAL_VECTOR_INDEX_DIR. Rows that
+became duplicates are dropped as they change. Deleted rows leave no change
+behind, so at most every LOCAL_VECTOR_INDEX_RECONCILE seconds a sync also
+lists every live representative id and drops the rest:
+
+    manifest.json            generation, row count, platform row ranges, watermark, reconciled_at
+    vectors-{g}.f16          normalized embeddings, float16 (the synced artifact)
+    vectors-{g}.f32          float32 copy made on first load, memory-mapped
+    ids-{g}.npy              (n, 16) uint8 UUID bytes
+    platform-{g}.npy         int8 platform ids
+    virality-{g}.npy         float32 virality scores
+    text-{g}.bin + text_offsets-{g}.npy   packed [content_text, source_url, source_handle, posted_at]
+
+Files are memory-mapped read-only, so every worker on a host shares one
+copy through the page cache. Rows are grouped by platform, so a platform
+filter is a contiguous slice. search_similar_content uses the index when
+LOCAL_VECTOR_INDEX=1 and the last sync is newer than
+LOCAL_VECTOR_INDEX_MAX_AGE seconds, and falls back to the match_content RPC
+otherwise.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.platforms import PLATFORM_MAP
+from tools.utils.supabase_client import get_supabase_client
+from tools.utils.vector_utils import normalize_rows, parse_vector
+from tools.utils.voyage_client import EMBEDDING_DIMENSIONS
+
+INDEX_DIR = os.getenv(
+    "LOCAL_VECTOR_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".tmp", "vector_index"),
+)
+SYNC_PAGE_SIZE = 500
+ID_PAGE_SIZE = 1000
+# Incremental syncs re-read rows updated this long before the watermark
+SYNC_OVERLAP_SECONDS = 120
+# Bump when the on-disk layout changes; older indexes are rebuilt on sync
+INDEX_FORMAT = 2
+# Loaded indexes re-check the manifest for a newer generation this often
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def index_enabled() -> bool:
+    return os.getenv("LOCAL_VECTOR_INDEX", "").lower() in ("1", "true", "yes")
+
+
+def max_index_age() -> float:
+    return float(os.getenv("LOCAL_VECTOR_INDEX_MAX_AGE", "900"))
+
+
+def reconcile_interval() -> float:
+    return float(os.getenv("LOCAL_VECTOR_INDEX_RECONCILE", "21600"))
+
+
+def _path(name: str) -> str:
+    return os.path.join(INDEX_DIR, name)
+
+
+def read_manifest() -> dict | None:
+    try:
+        with open(_path("manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: str, write):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class LocalVectorIndex:
+    """Read-only view of one index generation."""
+
+    def __init__(self, manifest: dict):
+        if manifest.get("format") != INDEX_FORMAT:
+            raise ValueError("index format is outdated, run --sync")
+        g = manifest["generation"]
+        self.manifest = manifest
+        self.generation = g
+        self.count = manifest["count"]
+        self.dim = manifest["dim"]
+        self.model = manifest.get("model")
+        self.platform_ranges = {int(k): tuple(v) for k, v in manifest["platform_ranges"].items()}
+
+        if self.count:
+            self.vectors = np.memmap(
+                self._float32_path(g), dtype=np.float32, mode="r", shape=(self.count, self.dim)
+            )
+        else:
+            self.vectors = np.empty((0, self.dim), dtype=np.float32)
+        self.ids = np.load(_path(f"ids-{g}.npy"), mmap_mode="r")
+        self.platform_ids = np.load(_path(f"platform-{g}.npy"), mmap_mode="r")
+        self.virality = np.load(_path(f"virality-{g}.npy"), mmap_mode="r")
+        self.text_offsets = np.load(_path(f"text_offsets-{g}.npy"), mmap_mode="r")
+        self.text = np.memmap(_path(f"text-{g}.bin"), dtype=np.uint8, mode="r") if self.text_offsets[-1] else b""
+
+    def _float32_path(self, g: int) -> str:
+        """Build the float32 search copy once per generation; all workers map the same file."""
+        path = _path(f"vectors-{g}.f32")
+        if not os.path.exists(path):
+            half = np.memmap(_path(f"vectors-{g}.f16"), dtype=np.float16, mode="r", shape=(self.count, self.dim))
+            _write_atomic(path, lambda f: np.asarray(half, dtype=np.float32).tofile(f))
+        return path
+
+    def is_fresh(self, max_age: float | None = None) -> bool:
+        age = time.time() - self.manifest["synced_at"]
+        return age <= (max_index_age() if max_age is None else max_age)
+
+    def row(self, i: int) -> dict:
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        content_text, source_url, source_handle, posted_at = json.loads(bytes(self.text[start:end]))
+        return {
+            "id": str(uuid.UUID(bytes=bytes(self.ids[i]))),
+            "content_text": content_text,
+            "source_url": source_url,
+            "source_handle": source_handle,
+            "platform_id": int(self.platform_ids[i]),
+            "virality_score": float(self.virality[i]),
+            "posted_at": posted_at,
+        }
+
+    def search(
+        self,
+        query_embedding: list[float],
+        match_count: int = 10,
+        platform_filter: int | None = None,
+        match_threshold: float = 0.0,
+        include_embedding: bool = False,
+    ) -> list[dict]:
+        """Top-k cosine search, same result shape as the match_content RPC."""
+        if platform_filter is None:
+            start, end = 0, self.count
+        else:
+            start, end = self.platform_ranges.get(platform_filter, (0, 0))
+        if end <= start:
+            return []
+
+        query = normalize_rows(query_embedding)[0]
+        scores = self.vectors[start:end] @ query
+
+        k = min(match_count, end - start)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            if similarity <= match_threshold:
+                break
+            result = self.row(start + int(i))
+            result["similarity"] = similarity
+            if include_embedding:
+                result["embedding"] = np.array(self.vectors[start + int(i)])
+            results.append(result)
+        return results
+
+
+_index: LocalVectorIndex | None = None
+_last_check = 0.0
+_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalVectorIndex | None:
+    """Return the current index generation, reloading when a newer one is published."""
+    global _index, _last_check
+    now = time.monotonic()
+    if _index is not None and now - _last_check < RELOAD_CHECK_SECONDS:
+        return _index
+
+    with _index_lock:
+        _last_check = now
+        manifest = read_manifest()
+        if manifest is None:
+            _index = None
+        elif _index is None or manifest["generation"] != _index.generation:
+            try:
+                _index = LocalVectorIndex(manifest)
+            except (OSError, ValueError) as e:
+                print(f"Local vector index unavailable: {e}")
+                _index = None
+        else:
+            _index.manifest = manifest
+    return _index
+
+
+def _fetch_changed_rows(watermark: str | None, column: str) -> list[dict]:
+    """
+    Page through scraped_content rows updated since the watermark.
+
+    Pages are keyset on (updated_at, id), so rows updated while the sync
+    runs cannot shift a page boundary and be skipped. The first page starts
+    SYNC_OVERLAP_SECONDS before the watermark to pick up rows whose
+    transaction committed after a newer row was already synced.
+    """
+    supabase = get_supabase_client()
+    since = None
+    if watermark:
+        since = (datetime.fromisoformat(watermark) - timedelta(seconds=SYNC_OVERLAP_SECONDS)).isoformat()
+    rows = []
+    cursor = None
+    while True:
+        query = supabase.table("scraped_content").select(
+            "id, platform_id, virality_score, content_text, source_url, source_handle, posted_at, "
+            f"duplicate_of, embedding:{column}, embedding_model:{column}_model, updated_at"
+        )
+        if cursor:
+            updated_at, last_id = cursor
+            query = query.or_(
+                f'updated_at.gt."{updated_at}",and(updated_at.eq."{updated_at}",id.gt.{last_id})'
+            )
+        elif since:
+            query = query.gte("updated_at", since)
+        page = query.order("updated_at").order("id").limit(SYNC_PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < SYNC_PAGE_SIZE:
+            return rows
+        cursor = (page[-1]["updated_at"], page[-1]["id"])
+
+
+def _fetch_live_ids() -> set[str]:
+    """Ids of every scraped_content row that is not a duplicate (keyset pages on id)."""
+    supabase = get_supabase_client()
+    ids = set()
+    last_id = None
+    while True:
+        query = supabase.table("scraped_content").select("id").is_("duplicate_of", "null")
+        if last_id:
+            query = query.gt("id", last_id)
+        page = query.order("id").limit(ID_PAGE_SIZE).execute().data or []
+        ids.update(row["id"] for row in page)
+        if len(page) < ID_PAGE_SIZE:
+            return ids
+        last_id = page[-1]["id"]
+
+
+def _load_existing(manifest: dict) -> dict[str, dict]:
+    """Current index contents as id -> row dict (with vector), for merging."""
+    index = LocalVectorIndex(manifest)
+    half = np.memmap(
+        _path(f"vectors-{index.generation}.f16"), dtype=np.float16, mode="r", shape=(index.count, index.dim)
+    ) if index.count else None
+    existing = {}
+    for i in range(index.count):
+        row = index.row(i)
+        row["vector"] = half[i]
+        existing[row["id"]] = row
+    return existing
+
+
+def sync_index(full: bool = False) -> dict:
+    """
+    Pull changed rows from Supabase and publish a new index generation.
+
+    Drops rows that were deleted (on a reconcile) or became duplicates.
+    """
+    from tools.generate_embeddings import get_embedding_config
+
+    # Mirror the live column; a promotion to a new model forces a rebuild
+    config = get_embedding_config(refresh=True)
+    model = config["active_model"]
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    manifest = read_manifest()
+    if manifest and (manifest.get("model") != model or manifest.get("format") != INDEX_FORMAT):
+        print("Embedding model or index format changed since last sync; rebuilding from scratch.")
+        full = True
+
+    started = time.monotonic()
+    existing = {} if full or manifest is None else _load_existing(manifest)
+    watermark = None if full or manifest is None else manifest.get("watermark")
+
+    changed = _fetch_changed_rows(watermark, config["active_column"])
+    for row in changed:
+        if watermark is None or row["updated_at"] > watermark:
+            watermark = row["updated_at"]
+        vector = parse_vector(row.get("embedding"))
+        if vector is None or row.get("embedding_model") != model or row.get("duplicate_of"):
+            existing.pop(row["id"], None)
+            continue
+        row["vector"] = normalize_rows(vector)[0].astype(np.float16)
+        existing[row["id"]] = row
+
+    # Deletes leave nothing to sync; periodically drop ids no longer live
+    removed = 0
+    reconciled_at = manifest.get("reconciled_at") if manifest and not full else None
+    if full or manifest is None:
+        reconciled_at = time.time()
+    elif reconciled_at is None or time.time() - reconciled_at >= reconcile_interval():
+        live = _fetch_live_ids()
+        for row_id in [row_id for row_id in existing if row_id not in live]:
+            del existing[row_id]
+            removed += 1
+        reconciled_at = time.time()
+
+    # Group rows by platform so filters are contiguous slices
+    rows = sorted(existing.values(), key=lambda r: (r.get("platform_id") or 0, r["id"]))
+    count = len(rows)
+    dim = len(rows[0]["vector"]) if rows else EMBEDDING_DIMENSIONS
+    generation = (manifest["generation"] + 1) if manifest else 1
+
+    vectors = np.empty((count, dim), dtype=np.float16)
+    ids = np.empty((count, 16), dtype=np.uint8)
+    platform_ids = np.empty(count, dtype=np.int8)
+    virality = np.empty(count, dtype=np.float32)
+    blobs = []
+    for i, row in enumerate(rows):
+        vectors[i] = row["vector"]
+        ids[i] = np.frombuffer(uuid.UUID(row["id"]).bytes, dtype=np.uint8)
+        platform_ids[i] = row.get("platform_id") or 0
+        virality[i] = row.get("virality_score") or 0.0
+        blobs.append(json.dumps(
+            [row.get("content_text"), row.get("source_url"), row.get("source_handle"), row.get("posted_at")]
+        ).encode("utf-8"))
+    text_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=text_offsets[1:])
+
+    platform_ranges = {}
+    for pid in np.unique(platform_ids):
+        hits = np.flatnonzero(platform_ids == pid)
+        platform_ranges[str(int(pid))] = [int(hits[0]), int(hits[-1]) + 1]
+
+    g = generation
+    _write_atomic(_path(f"vectors-{g}.f16"), vectors.tofile)
+    _write_atomic(_path(f"ids-{g}.npy"), lambda f: np.save(f, ids))
+    _write_atomic(_path(f"platform-{g}.npy"), lambda f: np.save(f, platform_ids))
+    _write_atomic(_path(f"virality-{g}.npy"), lambda f: np.save(f, virality))
+    _write_atomic(_path(f"text_offsets-{g}.npy"), lambda f: np.save(f, text_offsets))
+    _write_atomic(_path(f"text-{g}.bin"), lambda f: f.write(b"".join(blobs)))
+
+    new_manifest = {
+        "generation": g,
+        "format": INDEX_FORMAT,
+        "count": count,
+        "dim": dim,
+        "dtype": "float16",
+        "model": model,
+        "platform_ranges": platform_ranges,
+        "watermark": watermark,
+        "reconciled_at": reconciled_at,
+        "synced_at": time.time(),
+    }
+    # Publishing the manifest is the atomic switch to the new generation
+    _write_atomic(_path("manifest.json"), lambda f: f.write(json.dumps(new_manifest).encode("utf-8")))
+    _remove_old_generations(keep={g, g - 1})
+
+    elapsed = time.monotonic() - started
+    print(
+        f"Synced local vector index gen {g}: {count} rows ({len(changed)} changed, {removed} removed) "
+        f"in {elapsed:.1f}s"
+    )
+    return new_manifest
+
+
+def _remove_old_generations(keep: set[int]):
+    """Delete files from generations no worker should still be reading."""
+    for name in os.listdir(INDEX_DIR):
+        stem = name.split(".")[0]
+        if "-" not in stem:
+            continue
+        try:
+            g = int(stem.rsplit("-", 1)[1])
+        except ValueError:
+            continue
+        if g not in keep:
+            os.remove(_path(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local vector index")
+    parser.add_argument("--sync", action="store_true", help="Pull changes from Supabase")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch (with --sync)")
+    parser.add_argument("--stats", action="store_true", help="Show index stats")
+    parser.add_argument("--query", help="Search the local index")
+    parser.add_argument("--platform", choices=list(PLATFORM_MAP))
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.sync:
+        sync_index(full=args.full)
+    elif args.stats:
+        manifest = read_manifest()
+        if manifest is None:
+            print("No local index. Run with --sync first.")
+            return
+        age = time.time() - manifest["synced_at"]
+        print(json.dumps({**manifest, "age_seconds": round(age)}, indent=2))
+    elif args.query:
+        from tools.generate_embeddings import generate_embedding
+
+        index = get_local_index()
+        if index is None:
+            parser.error("No local index. Run with --sync first.")
+        query_embedding = generate_embedding(args.query, input_type="query")
+        started = time.perf_counter()
+        results = index.search(query_embedding, args.limit, PLATFORM_MAP.get(args.platform))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"\n{len(results)} results in {elapsed_ms:.2f} ms:\n")
+        for i, r in enumerate(results, 1):
+            print(f"{i}. @{r['source_handle']} (similarity: {r['similarity']:.3f})")
+            print(f"   {(r['content_text'] or '')[:150]}...")
+    else:
+        parser.error("Provide --sync, --stats or --query")
+
+
+if __name__ == "__main__":
+    main()
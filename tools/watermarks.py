@@ -0,0 +1,198 @@
+"""
+Per-target watermarks for incremental scraping (migration 013).
+
+Usage:
+    python tools/watermarks.py --list
+    python tools/watermarks.py --reset --platform instagram --target @somesalon
+
+A scrape target (platform + "@handle" or search term) remembers the newest
+posted_at it has stored and its most recent source_urls. The next scrape of
+the target:
+    - passes newer_than() to actors that accept a date cut-off
+      (see each platform adapter's newer_than_kinds, tools/platforms/)
+    - lets known posts skip dedup and embedding in the ingest pipeline; they
+      are still upserted, so their engagement counts are refreshed
+    - for handles (newest first), stops reading the dataset after
+      STOP_AFTER_OLD consecutive posts older than the watermark; a few old
+      pinned posts at the top don't end it early
+Only rows the upsert actually wrote are recorded (record()), and watermarks
+only advance after the whole target succeeded.
+"""
+
+import argparse
+import os
+import sys
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.utils.supabase_client import get_supabase_client
+
+# source_urls remembered per target
+MAX_SEEN_URLS = 2000
+# Consecutive posts older than the watermark before a newest-first dataset is abandoned
+STOP_AFTER_OLD = 5
+
+
+def parse_posted_at(value) -> datetime | None:
+    """posted_at as scrapers produce it (ISO string or epoch seconds) -> aware datetime."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+class Watermark:
+    """One target's watermark, plus what the current scrape has seen."""
+
+    def __init__(self, platform: str, target: str, newest_posted_at: datetime | None = None,
+                 seen_urls: Iterable[str] = (), chronological: bool = False):
+        self.platform = platform
+        self.target = target
+        self.newest_posted_at = newest_posted_at
+        self.seen_urls = set(seen_urls)
+        self.chronological = chronological
+        self.known = 0
+        self._new_urls = []
+        self._newest_seen = None
+
+    @classmethod
+    def load(cls, platform: str, target: str, chronological: bool = False) -> "Watermark":
+        supabase = get_supabase_client()
+        response = (
+            supabase.table("scrape_watermarks")
+            .select("newest_posted_at, seen_urls")
+            .eq("platform", platform)
+            .eq("target", target)
+            .execute()
+        )
+        row = response.data[0] if response.data else {}
+        return cls(
+            platform,
+            target,
+            parse_posted_at(row.get("newest_posted_at")),
+            row.get("seen_urls") or (),
+            chronological,
+        )
+
+    def newer_than(self) -> str | None:
+        """Date cut-off for actors ("YYYY-MM-DD"), or None on a target's first scrape."""
+        return self.newest_posted_at.date().isoformat() if self.newest_posted_at else None
+
+    def is_known(self, url: str | None) -> bool:
+        """Whether a post with this source_url was stored by this target before."""
+        return bool(url) and url in self.seen_urls
+
+    def filter(self, rows: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yield transformed rows, counting the known ones.
+
+        A newest-first dataset ends after STOP_AFTER_OLD consecutive posts
+        older than the watermark; everything read before that is yielded.
+        """
+        old_streak = 0
+        for row in rows:
+            url = row.get("source_url")
+            posted_at = parse_posted_at(row.get("posted_at"))
+            is_old = (
+                self.newest_posted_at is not None
+                and posted_at is not None
+                and posted_at < self.newest_posted_at
+            )
+            known = self.is_known(url)
+            if known:
+                self.known += 1
+            if self.chronological and is_old:
+                old_streak += 1
+                if old_streak >= STOP_AFTER_OLD:
+                    print(f"  {self.platform} {self.target}: reached known posts, stopping")
+                    return
+            elif not known:
+                old_streak = 0
+            yield row
+
+    def record(self, rows: list[dict], failed: list[dict]):
+        """Note a stored batch for save(), leaving out the rows whose upsert failed."""
+        failed_urls = {row.get("source_url") for row in failed}
+        for row in rows:
+            url = row.get("source_url")
+            if url in failed_urls:
+                continue
+            if url and url not in self.seen_urls:
+                self.seen_urls.add(url)
+                self._new_urls.append(url)
+            posted_at = parse_posted_at(row.get("posted_at"))
+            if posted_at and (self._newest_seen is None or posted_at > self._newest_seen):
+                self._newest_seen = posted_at
+
+    def save(self):
+        """Advance the stored watermark with the rows passed to record()."""
+        supabase = get_supabase_client()
+        supabase.rpc(
+            "advance_scrape_watermark",
+            {
+                "target_platform": self.platform,
+                "target_key": self.target,
+                "newest": self._newest_seen.isoformat() if self._newest_seen else None,
+                "urls": self._new_urls[:MAX_SEEN_URLS],
+                "max_seen": MAX_SEEN_URLS,
+            },
+        ).execute()
+
+
+def list_watermarks() -> list[dict]:
+    supabase = get_supabase_client()
+    rows = (
+        supabase.table("scrape_watermarks")
+        .select("platform, target, newest_posted_at, last_scraped_at, runs")
+        .order("platform")
+        .order("target")
+        .execute()
+    ).data or []
+    for row in rows:
+        print(
+            f"  {row['platform']:<10} {row['target']:<32} newest {row['newest_posted_at'] or '-':<26} "
+            f"runs {row['runs']}"
+        )
+    if not rows:
+        print("No watermarks yet")
+    return rows
+
+
+def reset_watermark(platform: str, target: str | None = None) -> int:
+    """Forget a target's (or a whole platform's) watermark; the next scrape is a full one."""
+    supabase = get_supabase_client()
+    query = supabase.table("scrape_watermarks").delete().eq("platform", platform)
+    if target:
+        query = query.eq("target", target)
+    count = len(query.execute().data or [])
+    print(f"Reset {count} watermarks")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental scraping watermarks")
+    parser.add_argument("--list", action="store_true", help="Show every target's watermark")
+    parser.add_argument("--reset", action="store_true", help="Forget watermarks (with --platform)")
+    parser.add_argument("--platform", choices=["instagram", "tiktok", "youtube"])
+    parser.add_argument("--target", help='"@handle" or search term (default: all on the platform)')
+    args = parser.parse_args()
+
+    if args.list:
+        list_watermarks()
+    elif args.reset:
+        if not args.platform:
+            parser.error("--reset needs --platform")
+        reset_watermark(args.platform, args.target)
+    else:
+        parser.error("Provide --list or --reset")
+
+
+if __name__ == "__main__":
+    main()